@@ -1,13 +1,18 @@
 import logging
 
+from app.logs.structured_formatters import TextFormatter
+from app.tracing.trace_log_filter import TraceLogFilter
+
 logging.root.handlers = []
-fmt = '%(asctime)s %(levelname)-8s %(message)s'
-logging.basicConfig(format=fmt,
-                    datefmt='%Y-%m-%d %H:%M:%S',
-                    level=logging.INFO,
+logging.basicConfig(level=logging.INFO,
                     filename='triggear.log')
 
 console = logging.StreamHandler()
 console.setLevel(logging.WARNING)
-console.setFormatter(logging.Formatter(fmt))
 logging.getLogger("").addHandler(console)
+
+# INFO: trace id is filled on handlers - records of library loggers propagate to them without passing root logger filters
+trace_log_filter = TraceLogFilter()
+for handler in logging.root.handlers:
+    handler.setFormatter(TextFormatter())
+    handler.addFilter(trace_log_filter)
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+import weakref
+from typing import Dict, Tuple, Optional, Callable, Coroutine, Any, List
+
+import aiohttp.web
+
+from app.enums.event_types import EventType
+from app.hook_details.hook_details import HookDetails
+from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
+from app.hook_details.push_hook_details import PushHookDetails
+from app.metrics.api_budget import retain_api_budget
+from app.metrics.triggear_metrics import SUPERSEDED_BUILDS
+from app.mongo.registration_cursor import RegistrationCursor
+from app.tasks.task_supervisor import TaskSupervisor
+
+DebounceKey = Tuple[str, str, str, str, str]
+
+
+class BuildDebouncer:
+    def __repr__(self) -> str:
+        return f"<BuildDebouncer " \
+               f"window: {self.window}, " \
+               f"abort_superseded: {self.abort_superseded}, " \
+               f"pending: {len(self.__pending)}, " \
+               f"in_flight: {len(self.__in_flight)}, " \
+               f"superseded: {self.superseded} " \
+               f">"
+
+    def __init__(self,
+                 window: float,
+                 abort_superseded: bool,
+                 task_supervisor: Optional[TaskSupervisor] = None) -> None:
+        self.window = window
+        self.abort_superseded = abort_superseded
+        self.__task_supervisor = task_supervisor
+        self.superseded = 0
+        self.stopped = False
+        self.__pending: Dict[DebounceKey, asyncio.Task] = {}
+        self.__pending_triggers: Dict[DebounceKey, Tuple[Callable[[], Coroutine], Dict[str, Any]]] = {}
+        self.__scheduled_at: Dict[DebounceKey, float] = {}
+        self.__in_flight: Dict[DebounceKey, asyncio.Task] = {}
+        self.__superseded_builds: 'weakref.WeakSet[asyncio.Task]' = weakref.WeakSet()
+        self.__watched_builds: 'weakref.WeakSet[asyncio.Task]' = weakref.WeakSet()
+
+    @staticmethod
+    def get_key(hook_details: HookDetails, registration_cursor: RegistrationCursor) -> Optional[DebounceKey]:
+        # INFO: only branch heads move - tags, releases and labels always refer to what user pointed at
+        if isinstance(hook_details, (PushHookDetails, PrOpenedHookDetails)):
+            return (hook_details.get_event_type().collection_name,
+                    registration_cursor.jenkins_url,
+                    registration_cursor.job_name,
+                    hook_details.repository,
+                    hook_details.branch)
+        return None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.window > 0 or self.abort_superseded
+
+    def schedule(self, key: Optional[DebounceKey], trigger: Callable[[], Coroutine], **details: Any) -> asyncio.Task:
+        # INFO: hooks still drained after stop are not held back - nothing would run them once the window passes
+        if key is None or not self.is_enabled or self.stopped:
+            return self.start_build(trigger, **details)
+        previous = self.__pending.pop(key, None)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+            SUPERSEDED_BUILDS.inc()
+            logging.warning(f'Trigger of {key} superseded by newer hook within {self.window}s debounce window')
+        task = asyncio.get_event_loop().create_task(self.run_debounced(key, trigger, **details))
+        retain_api_budget(task)
+        self.__pending[key] = task
+        self.__pending_triggers[key] = (trigger, details)
+        self.__scheduled_at[key] = time.monotonic()
+        return task
+
+    async def run_debounced(self, key: DebounceKey, trigger: Callable[[], Coroutine], **details: Any) -> None:
+        await asyncio.sleep(self.window)
+        # INFO: newer hook would have cancelled this task before it resumed - it's the latest one for the key
+        self.__pending.pop(key, None)
+        self.__pending_triggers.pop(key, None)
+        self.__scheduled_at.pop(key, None)
+        previous_build = self.__in_flight.pop(key, None)
+        if previous_build is not None and not previous_build.done() and self.abort_superseded:
+            self.supersede(key, previous_build)
+        build = self.start_build(trigger, **details)
+        self.__in_flight[key] = build
+        build.add_done_callback(lambda finished: self.__forget(key, finished))
+
+    def supersede(self, key: DebounceKey, build: asyncio.Task) -> None:
+        self.__superseded_builds.add(build)
+        self.superseded += 1
+        SUPERSEDED_BUILDS.inc()
+        # INFO: cancelling a build still being triggered would lose it or leave it running in Jenkins unreported
+        if build in self.__watched_builds:
+            logging.warning(f'Aborting in-flight build of {key} as newer commit was pushed')
+            build.cancel()
+        else:
+            logging.warning(f'In-flight build of {key} is still being triggered - it will be aborted once its build number is known')
+
+    def start_watching(self, build: Optional[asyncio.Task]) -> bool:
+        if build is None:
+            return False
+        self.__watched_builds.add(build)
+        return build in self.__superseded_builds
+
+    def is_superseded(self, build: Optional[asyncio.Task]) -> bool:
+        # INFO: builds are cancelled on shutdown too - only ones cancelled here were replaced by a newer commit
+        return build is not None and build in self.__superseded_builds
+
+    def start_build(self, trigger: Callable[[], Coroutine], **details: Any) -> asyncio.Task:
+        if self.__task_supervisor is not None:
+            return self.__task_supervisor.spawn(TaskSupervisor.BUILDS, trigger(), **details)
+        build = asyncio.get_event_loop().create_task(trigger())
+        retain_api_budget(build)
+        return build
+
+    def __forget(self, key: DebounceKey, build: asyncio.Task) -> None:
+        if self.__in_flight.get(key) is build:
+            del self.__in_flight[key]
+
+    def get_pending(self) -> List[Tuple[DebounceKey, float]]:
+        now = time.monotonic()
+        return [(key, now - scheduled_at) for key, scheduled_at in self.__scheduled_at.items()]
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        self.stopped = True
+        # INFO: inbox already checkpointed hooks of pending triggers - they are run now instead of being lost with the process
+        if self.__pending:
+            logging.warning(f'Triggering {len(self.__pending)} debounced builds early on shutdown')
+        for key, task in self.__pending.items():
+            task.cancel()
+            trigger, details = self.__pending_triggers[key]
+            self.start_build(trigger, **details)
+        self.__pending.clear()
+        self.__pending_triggers.clear()
+        self.__scheduled_at.clear()
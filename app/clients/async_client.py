@@ -1,7 +1,13 @@
-from typing import Dict, Union, Tuple, Optional, List
+import contextlib
+import time
+from typing import Dict, Union, Tuple, Optional, List, Callable, Iterator
 
 import aiohttp
 
+from app.metrics.api_budget import record_upstream_call
+from app.metrics.triggear_metrics import UPSTREAM_REQUEST_SECONDS, UPSTREAM_ERRORS, GITHUB_RATE_LIMIT_REMAINING, UPSTREAM_IN_FLIGHT
+from app.tracing.triggear_tracer import TRACER
+
 PayloadType = Union[Optional[Dict[str, Union[Optional[str], Optional[bool], Optional[List]]]],
                     Optional[Tuple[Union[Optional[str], Optional[bool]], ...]]]
 
@@ -36,11 +42,17 @@ class Payload:
 
 
 class AsyncClient:
+    RATE_LIMIT_REMAINING_HEADER = 'X-RateLimit-Remaining'
+
     def __init__(self,
                  base_url: str,
-                 session_headers: Dict[str, str]) -> None:
+                 session_headers: Dict[str, str],
+                 upstream: str = 'http',
+                 route_classifier: Optional[Callable[[str], str]] = None) -> None:
         self.base_url = base_url
         self.session_headers = session_headers
+        self.upstream = upstream
+        self.route_classifier = route_classifier
         self.__session: aiohttp.ClientSession = None
 
     @property
@@ -55,30 +67,62 @@ class AsyncClient:
         else:
             return f'{self.base_url}/{route}'
 
+    def get_metrics_target(self, route: str) -> str:
+        return self.route_classifier(route) if self.route_classifier is not None else self.base_url
+
+    @contextlib.contextmanager
+    def measure(self, route: str) -> Iterator[None]:
+        target = self.get_metrics_target(route)
+        started = time.monotonic()
+        record_upstream_call(self.upstream)
+        in_flight = UPSTREAM_IN_FLIGHT.labels(self.upstream, target)
+        in_flight.inc()
+        try:
+            with TRACER.span(f'{self.upstream}.request', target=target, route=route):
+                yield
+        except AsyncClientNotFoundException:
+            # INFO: 404 is an expected answer for optional files and missing builds - not an upstream failure
+            raise
+        except (AsyncClientException, aiohttp.ClientError):
+            UPSTREAM_ERRORS.labels(self.upstream, target).inc()
+            raise
+        finally:
+            in_flight.dec()
+            UPSTREAM_REQUEST_SECONDS.labels(self.upstream, target).observe(time.monotonic() - started)
+
+    def record_rate_limit(self, response: aiohttp.ClientResponse) -> None:
+        remaining = response.headers.get(self.RATE_LIMIT_REMAINING_HEADER)
+        if remaining is not None:
+            GITHUB_RATE_LIMIT_REMAINING.set(int(remaining))
+
     async def post(self,
                    route: str,
                    payload: Optional[Payload]=None,
                    params: Optional[Payload]=None,
                    headers: Optional[Dict]=None,
                    content_type: str='application/json') -> Dict:
-        async with self.session.post(self.build_url(route),
-                                     json=payload.data if payload else None,
-                                     headers=headers,
-                                     params=params.data if params else None) as resp:
-            valid_response: aiohttp.ClientResponse = await self.validate_response(resp)
-            try:
-                response_data: Dict = await valid_response.json(content_type=content_type)
-                return response_data
-            except aiohttp.ContentTypeError:
-                return {}
+        with self.measure(route):
+            async with self.session.post(self.build_url(route),
+                                         json=payload.data if payload else None,
+                                         headers=headers,
+                                         params=params.data if params else None) as resp:
+                self.record_rate_limit(resp)
+                valid_response: aiohttp.ClientResponse = await self.validate_response(resp)
+                try:
+                    response_data: Dict = await valid_response.json(content_type=content_type)
+                    return response_data
+                except aiohttp.ContentTypeError:
+                    return {}
 
     async def get(self,
                   route: str,
                   params: Optional[Payload]=None) -> Dict:
-        async with self.session.get(self.build_url(route), params=params.data if params is not None else None) as resp:
-            valid_response: aiohttp.ClientResponse = await self.validate_response(resp)
-            response_data: Dict = await valid_response.json()
-            return response_data
+        with self.measure(route):
+            async with self.session.get(self.build_url(route), params=params.data if params is not None else None) as resp:
+                self.record_rate_limit(resp)
+                valid_response: aiohttp.ClientResponse = await self.validate_response(resp)
+                response_data: Dict = await valid_response.json()
+                return response_data
 
     @staticmethod
     async def validate_response(response: aiohttp.ClientResponse) -> aiohttp.ClientResponse:
@@ -5,24 +5,37 @@ from typing import List, Dict, Tuple, Optional
 from app.clients.async_client import AsyncClient, Payload, AsyncClientException
 from app.enums.triggear_pr_label import TriggearPrLabel
 from app.exceptions.triggear_timeout_error import TriggearTimeoutError
+from app.tracing.triggear_tracer import TRACER
 
 
 class GithubClient:
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, trace_target_url: bool = False, api_url: str = 'https://api.github.com') -> None:
         self.token: str = token
+        self.trace_target_url = trace_target_url
+        self.api_url = api_url
         self.__async_github: Optional[AsyncClient] = None
 
     def get_async_github(self) -> AsyncClient:
         if self.__async_github is None:
             self.__async_github: AsyncClient = AsyncClient(
-                base_url='https://api.github.com',
+                base_url=self.api_url,
                 session_headers={
                     'Authorization': f'token {self.token}',
                     'Content-Type': 'application/json'
-                }
+                },
+                upstream='github',
+                route_classifier=self.get_route_class
             )
         return self.__async_github
 
+    @staticmethod
+    def get_route_class(route: str) -> str:
+        # INFO: /repos/{owner}/{repo}/{resource}/... - repository names would explode metric cardinality
+        parts = route.strip('/').split('/')
+        if len(parts) > 3 and parts[0] == 'repos':
+            return parts[3]
+        return parts[0]
+
     async def get_issue(self,
                         repo: str,
                         number: int) -> Dict:
@@ -135,7 +148,7 @@ class GithubClient:
         route = f'/repos/{repo}/statuses/{sha1}'
         payload = Payload.from_kwargs(
             state=state,
-            target_url=url,
+            target_url=TRACER.get_traced_url(url) if self.trace_target_url else url,
             # GitHub description length limit is 140 characters
             description=description[:135] + '...' if len(description) > 135 else description,
             context=context
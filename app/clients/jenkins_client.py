@@ -4,7 +4,8 @@ import logging
 import time
 from typing import List, Tuple, Dict, Union, Optional
 
-from app.clients.async_client import AsyncClient, AsyncClientException, Payload
+from app.clients.async_client import AsyncClient, AsyncClientException, Payload, AsyncClientNotFoundException
+from app.clients.jenkins_job_catalog import JenkinsJobCatalog
 
 
 class JenkinsInstanceConfig:
@@ -24,6 +25,7 @@ class JenkinsClient:
         self.__async_jenkins: Optional[AsyncClient] = None
         self.__crumb_header: Optional[str] = None
         self.__crumb_value: Optional[str] = None
+        self.job_catalog: JenkinsJobCatalog = JenkinsJobCatalog()
 
     def get_async_jenkins(self) -> AsyncClient:
         if self.__async_jenkins is None:
@@ -32,7 +34,8 @@ class JenkinsClient:
                 session_headers={
                     'Authorization': self.config.get_auth_header(),
                     'Content-Type': 'application/json'
-                }
+                },
+                upstream='jenkins'
             )
         return self.__async_jenkins
 
@@ -58,7 +61,39 @@ class JenkinsClient:
                            job_path: str) -> Dict:
         job_folder, job_name = self.get_job_folder_and_name(job_path)
         route = f'{job_folder}job/{job_name}/api/json?depth=0'
-        return await self.get_async_jenkins().get(route=route)
+        try:
+            return await self.get_async_jenkins().get(route=route)
+        except AsyncClientNotFoundException:
+            self.job_catalog.mark_missing(job_path)
+            raise
+
+    async def get_jobs_tree(self,
+                            depth: int) -> List[Dict]:
+        route = f'api/json?tree={JenkinsJobCatalog.get_tree_query(depth)}'
+        jobs_tree = await self.get_async_jenkins().get(route=route)
+        return list(jobs_tree.get('jobs', []))
+
+    async def refresh_job_catalog(self,
+                                  depth: int) -> None:
+        self.job_catalog.replace(JenkinsJobCatalog.flatten(await self.get_jobs_tree(depth)), depth)
+        logging.warning(f'Job catalog of {self.config.url} refreshed: {self.job_catalog}')
+
+    async def job_exists(self,
+                         job_path: str) -> bool:
+        if self.job_catalog.contains(job_path):
+            self.job_catalog.hits += 1
+            return True
+        if self.job_catalog.is_known_missing(job_path):
+            self.job_catalog.hits += 1
+            return False
+        self.job_catalog.misses += 1
+        # INFO: job may have been created after last catalog refresh or be nested deeper than catalog depth - ask Jenkins directly
+        try:
+            await self.get_job_info(job_path)
+        except AsyncClientNotFoundException:
+            return False
+        self.job_catalog.add(job_path)
+        return True
 
     async def get_jobs_next_build_number(self,
                                          job_path: str) -> int:
@@ -140,3 +175,11 @@ class JenkinsClient:
                                                    params=Payload(parameters),
                                                    headers=await self.get_crumb_header(),
                                                    content_type='text/plain')
+
+    async def stop_build(self,
+                         job_path: str,
+                         build_number: int) -> Dict:
+        folder_url, job_name = self.get_job_folder_and_name(job_path)
+        return await self.get_async_jenkins().post(route=f'{folder_url}job/{job_name}/{build_number}/stop',
+                                                   headers=await self.get_crumb_header(),
+                                                   content_type='text/plain')
@@ -0,0 +1,74 @@
+import time
+from typing import Dict, List, Optional, Set
+
+
+class JenkinsJobCatalog:
+    def __repr__(self) -> str:
+        return f"<JenkinsJobCatalog " \
+               f"jobs: {len(self.__jobs) if self.__jobs is not None else None}, " \
+               f"missing: {len(self.__missing)}, " \
+               f"depth: {self.depth}, " \
+               f"hits: {self.hits}, " \
+               f"misses: {self.misses}, " \
+               f"refreshed_at: {self.refreshed_at} " \
+               f">"
+
+    def __init__(self) -> None:
+        self.__jobs: Optional[Set[str]] = None
+        self.__missing: Set[str] = set()
+        self.depth: Optional[int] = None
+        self.refreshed_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_counts(self) -> Dict[str, int]:
+        return {'jobs': len(self.__jobs) if self.__jobs is not None else 0, 'missing': len(self.__missing)}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__jobs is not None
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self.refreshed_at if self.refreshed_at is not None else None
+
+    def replace(self, jobs: Set[str], depth: Optional[int] = None) -> None:
+        self.__jobs = jobs
+        self.depth = depth
+        # INFO: missing jobs stay missing until catalog lists them - ones deeper than it reaches are probed again, it would never list them
+        self.__missing = {job_path for job_path in self.__missing if job_path not in jobs and self.covers(job_path)}
+        self.refreshed_at = time.monotonic()
+
+    def covers(self, job_path: str) -> bool:
+        return self.depth is not None and job_path.count('/') < self.depth
+
+    def contains(self, job_path: str) -> bool:
+        return self.__jobs is not None and job_path in self.__jobs
+
+    def is_known_missing(self, job_path: str) -> bool:
+        return job_path in self.__missing
+
+    def add(self, job_path: str) -> None:
+        if self.__jobs is not None:
+            self.__jobs.add(job_path)
+        self.__missing.discard(job_path)
+
+    def mark_missing(self, job_path: str) -> None:
+        if self.__jobs is not None:
+            self.__jobs.discard(job_path)
+        self.__missing.add(job_path)
+
+    @staticmethod
+    def get_tree_query(depth: int) -> str:
+        tree = 'name,url'
+        for _ in range(depth - 1):
+            tree = f'name,url,jobs[{tree}]'
+        return f'jobs[{tree}]'
+
+    @staticmethod
+    def flatten(jobs_data: List[Dict], folder: str = '') -> Set[str]:
+        job_paths: Set[str] = set()
+        for job_data in jobs_data:
+            job_path = f"{folder}{job_data['name']}"
+            job_paths.add(job_path)
+            job_paths |= JenkinsJobCatalog.flatten(job_data.get('jobs', []), folder=f'{job_path}/')
+        return job_paths
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict
+from typing import Dict, List
 
 import yaml
 
@@ -20,6 +20,12 @@ class JenkinsesClients:
             self.__setup_jenkins_client(url)
         return self.__jenkins_clients[url]
 
+    def get_created_jenkinses(self) -> Dict[str, JenkinsClient]:
+        return dict(self.__jenkins_clients)
+
+    def get_configured_jenkinses(self) -> List[JenkinsClient]:
+        return [self.get_jenkins(url) for url in self.config.jenkins_instances.keys()]
+
     def __setup_jenkins_client(self, url: str) -> None:
         if self.config.jenkins_instances.get(url) is None:
             logging.warning(f'Missing Jenkins {url} in current config. Will reload the config to check for new instances')
@@ -1,58 +1,200 @@
+import asyncio
 import logging
-from typing import AsyncGenerator, Union, List, AsyncIterable
+import time
+from typing import AsyncGenerator, Union, List, AsyncIterable, Dict, Set, Optional
 
+import aiohttp.web
 import motor.motor_asyncio
 from datetime import datetime
+from pymongo import ASCENDING
+
+from app.config.triggear_config import TriggearConfig
 
 from app.enums.event_types import EventType
+from app.exceptions.triggear_error import TriggearError
 from app.hook_details.hook_details import HookDetails
 from app.mongo.clear_query import ClearQuery
 from app.mongo.deregistration_query import DeregistrationQuery
+from app.mongo.migrations import MigrationRunner
+from app.mongo.missed_query import MissedQuery
+from app.mongo.mongo_lease import MongoLease
+from app.mongo.mongo_write_buffer import MongoWriteBuffer
 from app.mongo.registration_cursor import RegistrationCursor
 from app.mongo.registration_fields import RegistrationFields
+from app.mongo.registration_indexes import RegistrationIndexes
 from app.mongo.registration_query import RegistrationQuery
+from app.tracing.triggear_tracer import TRACER
+from app.utilities.ttl_cache import TtlCache
 
 
 class MongoClient:
-    def __init__(self, mongo: motor.motor_asyncio.AsyncIOMotorClient) -> None:
+    REGISTRATIONS_DB = 'registered'
+    DEREGISTRATIONS_DB = 'deregistered'
+    DEREGISTRATIONS_LOG = 'log'
+    SCHEMA_SETUP_LEASE_TTL = 300
+    SCHEMA_SETUP_RETRY_INTERVAL = 1
+
+    def __init__(self,
+                 mongo: motor.motor_asyncio.AsyncIOMotorClient,
+                 config: Optional[TriggearConfig] = None) -> None:
         self.__mongo = mongo
+        self.__config = config
+        self.__write_buffer: Optional[MongoWriteBuffer] = None
+        self.missed_info_cache: TtlCache[List[Dict]] = TtlCache(ttl=config.missing_cache_ttl if config is not None else 0)
+        if config is not None:
+            # INFO: cached missed counts go stale only once buffered increments reach Mongo
+            self.__write_buffer = MongoWriteBuffer(mongo,
+                                                   max_size=config.write_buffer_max_size,
+                                                   flush_interval=config.write_buffer_flush_interval,
+                                                   on_increments_flushed=self.missed_info_cache.clear)
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        await self.setup_schema()
+        if self.__write_buffer is not None:
+            await self.__write_buffer.start(app)
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__write_buffer is not None:
+            await self.__write_buffer.stop(app)
+
+    async def setup_schema(self) -> None:
+        # INFO: migrations and convertToCapped are not safe to run concurrently - ingress workers and replicas take turns
+        lease = MongoLease(self.__mongo, name='schema_setup', ttl=self.SCHEMA_SETUP_LEASE_TTL)
+        deadline = time.monotonic() + self.SCHEMA_SETUP_LEASE_TTL
+        while not await lease.acquire():
+            if time.monotonic() > deadline:
+                raise TriggearError(f'Could not acquire {lease} to set up Mongo schema')
+            await asyncio.sleep(self.SCHEMA_SETUP_RETRY_INTERVAL)
+        try:
+            await self.ensure_indexes()
+            await MigrationRunner(self.__mongo).run()
+            await self.check_query_indexes()
+            if self.__config is not None:
+                await self.setup_deregistration_log(ttl=self.__config.deregistration_log_ttl,
+                                                    max_size=self.__config.deregistration_log_max_size)
+        finally:
+            await lease.release()
+
+    async def ensure_indexes(self) -> None:
+        for event_type in EventType.get_allowed_registration_event_types():
+            await self.get_registrations(event_type).create_indexes(RegistrationIndexes.get_index_models())
+
+    async def check_query_indexes(self) -> List[str]:
+        unindexed_queries: List[str] = []
+        for event_type in EventType.get_allowed_registration_event_types():
+            collection = self.get_registrations(event_type)
+            for name, query, sort in RegistrationIndexes.get_query_shapes():
+                cursor = collection.find(query)
+                explain = await (cursor.sort(sort) if sort is not None else cursor).explain()
+                if RegistrationIndexes.uses_collection_scan(explain):
+                    logging.error(f'{name} query {query} on {event_type.collection_name} collection has no usable index')
+                    unindexed_queries.append(f'{event_type.collection_name}:{name}')
+        return unindexed_queries
+
+    async def setup_deregistration_log(self, ttl: Optional[int], max_size: Optional[int]) -> None:
+        database = self.__mongo.get_database(self.DEREGISTRATIONS_DB)
+        collection = database.get_collection(self.DEREGISTRATIONS_LOG)
+        if max_size is not None:
+            if self.DEREGISTRATIONS_LOG not in await database.list_collection_names():
+                await database.create_collection(self.DEREGISTRATIONS_LOG, capped=True, size=max_size)
+            elif not (await collection.options()).get('capped'):
+                await database.command('convertToCapped', self.DEREGISTRATIONS_LOG, size=max_size)
+            if ttl is not None:
+                logging.warning('Deregistration log is capped - TTL index is not supported on capped collections and will not be created')
+        elif ttl is not None:
+            await collection.create_index([('timestamp', ASCENDING)], expireAfterSeconds=ttl, name='timestamp_ttl')
 
     def get_registrations(self, event_type: EventType) -> motor.motor_asyncio.AsyncIOMotorCollection:
         return self.__mongo.registered[event_type.collection_name]
 
     async def get_registered_jobs(self, hook_details: HookDetails) -> AsyncGenerator[RegistrationCursor, None]:
-        collection = self.get_registrations(hook_details.get_event_type())
-        async for cursor in collection.find(hook_details.get_query()):
-            yield RegistrationCursor(cursor)
+        event_type = hook_details.get_event_type()
+        collection = self.get_registrations(event_type)
+        # INFO: span is not activated - generator yields to the consumer, whose spans must not become its children
+        span = TRACER.start_span('mongo_client.get_registered_jobs', collection=event_type.collection_name)
+        try:
+            async for cursor in collection.find(hook_details.get_query()):
+                yield RegistrationCursor(cursor)
+        finally:
+            TRACER.finish_span(span)
+
+    @TRACER.traced('mongo_client.get_registered_jobs_by_labels')
+    async def get_registered_jobs_by_labels(self, repository: str, labels: List[str]) -> Dict[str, List[RegistrationCursor]]:
+        registrations_by_label: Dict[str, List[RegistrationCursor]] = {label: [] for label in labels}
+        collection = self.get_registrations(EventType.PR_LABELED)
+        async for cursor in collection.find({RegistrationFields.REPO: repository, RegistrationFields.LABELS: {'$in': labels}}):
+            registration_cursor = RegistrationCursor(cursor)
+            for label in registration_cursor.labels or []:
+                if label in registrations_by_label:
+                    registrations_by_label[label].append(registration_cursor)
+        return registrations_by_label
+
+    @TRACER.traced('mongo_client.get_registered_repositories')
+    async def get_registered_repositories(self, event_type: EventType) -> Set[str]:
+        return set(await self.get_registrations(event_type).distinct(RegistrationFields.REPO))
 
+    @TRACER.traced('mongo_client.get_registered_repositories_among')
+    async def get_registered_repositories_among(self, event_type: EventType, repositories: List[str]) -> Set[str]:
+        return set(await self.get_registrations(event_type).distinct(RegistrationFields.REPO, {RegistrationFields.REPO: {'$in': repositories}}))
+
+    @TRACER.traced('mongo_client.increment_missed_counter')
     async def increment_missed_counter(self, hook_details: HookDetails, registration_cursor: RegistrationCursor) -> None:
-        collection = self.get_registrations(hook_details.get_event_type())
         update_query = hook_details.get_query()
         update_query[RegistrationFields.JOB] = registration_cursor.job_name
+        if self.__write_buffer is not None:
+            self.__write_buffer.increment(self.REGISTRATIONS_DB, hook_details.get_event_type().collection_name,
+                                          update_query, RegistrationFields.MISSED_TIMES)
+            return
+        collection = self.get_registrations(hook_details.get_event_type())
         await collection.update_one(update_query, {'$inc': {RegistrationFields.MISSED_TIMES: 1}})
+        self.missed_info_cache.clear()
 
-    def get_missed_jobs(self, event_type: EventType) -> motor.motor_asyncio.AsyncIOMotorCursor:
-        return self.get_registrations(event_type).find({RegistrationFields.MISSED_TIMES: {'$gt': 0}})
+    def get_missed_jobs(self, event_type: EventType, missed_query: MissedQuery, limit: int) -> motor.motor_asyncio.AsyncIOMotorCursor:
+        return self.get_registrations(event_type).find(missed_query.get_missed_query(event_type)).sort('_id', ASCENDING).limit(limit)
 
     async def log_deregistration(self, deregistration_query: DeregistrationQuery) -> None:
-        await self.__mongo.deregistered['log'].insert_one({'job': deregistration_query.job_name,
-                                                           'caller': deregistration_query.caller,
-                                                           'eventType': deregistration_query.event_type,
-                                                           'jenkins_url': deregistration_query.jenkins_url,
-                                                           'timestamp': datetime.now()})
+        log_entry = {'job': deregistration_query.job_name,
+                     'caller': deregistration_query.caller,
+                     'eventType': deregistration_query.event_type,
+                     'jenkins_url': deregistration_query.jenkins_url,
+                     'timestamp': datetime.now()}
+        if self.__write_buffer is not None:
+            self.__write_buffer.insert(self.DEREGISTRATIONS_DB, self.DEREGISTRATIONS_LOG, log_entry)
+            return
+        await self.__mongo.deregistered['log'].insert_one(log_entry)
 
     async def deregister(self, deregistration_query: DeregistrationQuery) -> None:
         collection = self.get_registrations(EventType.get_by_collection_name(name=deregistration_query.event_type))
         await collection.delete_one(deregistration_query.get_deregistration_query())
+        self.missed_info_cache.clear()
         await self.log_deregistration(deregistration_query=deregistration_query)
 
     async def clear(self, clear_query: ClearQuery) -> None:
         collection = self.get_registrations(EventType.get_by_collection_name(name=clear_query.event_type))
         await collection.update_one(clear_query.get_clear_query(), {'$set': {RegistrationFields.MISSED_TIMES: 0}})
+        self.missed_info_cache.clear()
 
-    async def get_missed_info(self, event_type: str) -> List[str]:
-        return [f'{document[RegistrationFields.JENKINS_URL]}:{document[RegistrationFields.JOB]}#{document[RegistrationFields.MISSED_TIMES]}'
-                async for document in self.get_missed_jobs(EventType.get_by_collection_name(name=event_type))]
+    async def get_missed_info(self, missed_query: MissedQuery) -> AsyncGenerator[Dict, None]:
+        cached_page: Optional[List[Dict]] = self.missed_info_cache.get(missed_query.cache_key)
+        if cached_page is not None:
+            for missed_info in cached_page:
+                yield missed_info
+            return
+        page: List[Dict] = []
+        for event_type in missed_query.get_event_types():
+            if len(page) >= missed_query.limit:
+                break
+            async for document in self.get_missed_jobs(event_type, missed_query, missed_query.limit - len(page)):
+                missed_info = {
+                    'eventType': event_type.collection_name,
+                    RegistrationFields.JENKINS_URL: document[RegistrationFields.JENKINS_URL],
+                    RegistrationFields.JOB: document[RegistrationFields.JOB],
+                    RegistrationFields.MISSED_TIMES: document[RegistrationFields.MISSED_TIMES],
+                    'cursor': MissedQuery.get_cursor(event_type, document['_id'])
+                }
+                page.append(missed_info)
+                yield missed_info
+        self.missed_info_cache.set(missed_query.cache_key, page)
 
     async def add_or_update_registration(self, registration_query: RegistrationQuery) -> None:
         collection = self.get_registrations(EventType.get_by_collection_name(name=registration_query.event_type))
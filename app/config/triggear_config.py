@@ -11,6 +11,7 @@ class TriggearConfig:
         self.__jenkins_instances: Dict[str, JenkinsInstanceConfig] = {}
         self.__github_token: Optional[str] = None
         self.__triggear_token: Optional[str] = None
+        self.__settings: Optional[Dict] = None
 
     @property
     def jenkins_instances(self) -> Dict[str, JenkinsInstanceConfig]:
@@ -30,6 +31,230 @@ class TriggearConfig:
             self.__github_token, self.__triggear_token, self.__jenkins_instances = self.read_credentials_file()
         return self.__triggear_token
 
+    @property
+    def settings(self) -> Dict:
+        if self.__settings is None:
+            self.__settings = self.read_config_file()
+        return self.__settings
+
+    @property
+    def github_api_url(self) -> str:
+        return str(self.settings.get('github', {}).get('api_url', 'https://api.github.com')).rstrip('/')
+
+    @property
+    def job_catalog_refresh_interval(self) -> float:
+        return float(self.settings.get('jenkins_job_catalog', {}).get('refresh_interval', 300))
+
+    @property
+    def job_catalog_folder_depth(self) -> int:
+        return int(self.settings.get('jenkins_job_catalog', {}).get('folder_depth', 5))
+
+    @property
+    def write_buffer_max_size(self) -> int:
+        return int(self.settings.get('mongo_write_buffer', {}).get('max_size', 100))
+
+    @property
+    def write_buffer_flush_interval(self) -> float:
+        return float(self.settings.get('mongo_write_buffer', {}).get('flush_interval', 5))
+
+    @property
+    def deregistration_log_ttl(self) -> Optional[int]:
+        ttl_days = self.settings.get('deregistration_log', {}).get('ttl_days')
+        return int(ttl_days * 24 * 60 * 60) if ttl_days is not None else None
+
+    @property
+    def deregistration_log_max_size(self) -> Optional[int]:
+        max_size_mb = self.settings.get('deregistration_log', {}).get('capped_size_mb')
+        return int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None
+
+    @property
+    def missing_cache_ttl(self) -> float:
+        return float(self.settings.get('missing_endpoint', {}).get('cache_ttl', 10))
+
+    @property
+    def delivery_cache_size(self) -> int:
+        return int(self.settings.get('delivery_deduplication', {}).get('cache_size', 10000))
+
+    @property
+    def delivery_ttl(self) -> int:
+        return int(self.settings.get('delivery_deduplication', {}).get('ttl_hours', 24) * 60 * 60)
+
+    @property
+    def inbox_directory(self) -> str:
+        return str(self.settings.get('webhook_inbox', {}).get('directory', 'inbox'))
+
+    @property
+    def inbox_segment_size(self) -> int:
+        return int(self.settings.get('webhook_inbox', {}).get('segment_size_mb', 16) * 1024 * 1024)
+
+    @property
+    def inbox_workers(self) -> int:
+        return int(self.settings.get('webhook_inbox', {}).get('workers', 8))
+
+    @property
+    def inbox_checkpoint_interval(self) -> float:
+        return float(self.settings.get('webhook_inbox', {}).get('checkpoint_interval', 1))
+
+    @property
+    def ingress_workers(self) -> int:
+        return int(self.settings.get('ingress', {}).get('workers', 1))
+
+    @property
+    def ingress_host(self) -> str:
+        return str(self.settings.get('ingress', {}).get('host', '0.0.0.0'))
+
+    @property
+    def ingress_port(self) -> int:
+        return int(self.settings.get('ingress', {}).get('port', 8080))
+
+    @property
+    def build_debounce_window(self) -> float:
+        return float(self.settings.get('build_debounce', {}).get('window', 0))
+
+    @property
+    def build_abort_superseded(self) -> bool:
+        return bool(self.settings.get('build_debounce', {}).get('abort_superseded', False))
+
+    @property
+    def body_offload_threshold(self) -> int:
+        return int(self.settings.get('body_handling', {}).get('offload_threshold_kb', 256) * 1024)
+
+    @property
+    def max_body_size(self) -> int:
+        return int(self.settings.get('body_handling', {}).get('max_body_size_mb', 25) * 1024 * 1024)
+
+    @property
+    def body_decode_workers(self) -> int:
+        return int(self.settings.get('body_handling', {}).get('decode_workers', 2))
+
+    @property
+    def task_max_concurrency(self) -> int:
+        return int(self.settings.get('background_tasks', {}).get('max_concurrency', 256))
+
+    @property
+    def task_group_concurrency(self) -> Dict[str, int]:
+        return {group: int(limit) for group, limit in self.settings.get('background_tasks', {}).get('group_concurrency', {}).items()}
+
+    @property
+    def task_drain_timeout(self) -> float:
+        return float(self.settings.get('background_tasks', {}).get('drain_timeout', 30))
+
+    @property
+    def admission_workers(self) -> int:
+        return int(self.settings.get('admission', {}).get('workers', 16))
+
+    @property
+    def admission_repository_high_water(self) -> int:
+        return int(self.settings.get('admission', {}).get('repository_high_water', 100))
+
+    @property
+    def admission_total_high_water(self) -> int:
+        return int(self.settings.get('admission', {}).get('total_high_water', 1000))
+
+    @property
+    def admission_low_priority_events(self) -> List[str]:
+        return [str(event) for event in self.settings.get('admission', {}).get('low_priority_events', ['push'])]
+
+    @property
+    def admission_overflow_drain_interval(self) -> float:
+        return float(self.settings.get('admission', {}).get('overflow_drain_interval', 5))
+
+    @property
+    def registered_repositories_refresh_interval(self) -> float:
+        return float(self.settings.get('registered_repositories', {}).get('refresh_interval', 60))
+
+    @property
+    def registered_repositories_unknown_ttl(self) -> float:
+        return float(self.settings.get('registered_repositories', {}).get('unknown_ttl', 10))
+
+    @property
+    def tracing_sample_rate(self) -> float:
+        return float(self.settings.get('tracing', {}).get('sample_rate', 0))
+
+    @property
+    def tracing_file_path(self) -> Optional[str]:
+        file_path = self.settings.get('tracing', {}).get('file_path')
+        return str(file_path) if file_path is not None else None
+
+    @property
+    def tracing_collector_url(self) -> Optional[str]:
+        collector_url = self.settings.get('tracing', {}).get('collector_url')
+        return str(collector_url) if collector_url is not None else None
+
+    @property
+    def tracing_flush_interval(self) -> float:
+        return float(self.settings.get('tracing', {}).get('flush_interval', 5))
+
+    @property
+    def tracing_debug_target_url(self) -> bool:
+        return bool(self.settings.get('tracing', {}).get('debug_target_url', False))
+
+    @property
+    def capture_file_path(self) -> Optional[str]:
+        file_path = self.settings.get('hook_capture', {}).get('file_path')
+        return str(file_path) if file_path is not None else None
+
+    @property
+    def capture_size(self) -> int:
+        return int(self.settings.get('hook_capture', {}).get('size_mb', 64) * 1024 * 1024)
+
+    @property
+    def log_level(self) -> str:
+        return str(self.settings.get('logging', {}).get('level', 'INFO')).upper()
+
+    @property
+    def log_json_format(self) -> bool:
+        return str(self.settings.get('logging', {}).get('format', 'text')) == 'json'
+
+    @property
+    def log_queue_size(self) -> int:
+        return int(self.settings.get('logging', {}).get('queue_size', 10000))
+
+    @property
+    def log_rate_per_key(self) -> float:
+        return float(self.settings.get('logging', {}).get('rate_per_key', 10))
+
+    @property
+    def log_burst_per_key(self) -> int:
+        return int(self.settings.get('logging', {}).get('burst_per_key', 50))
+
+    @property
+    def log_debug_sample_rate(self) -> float:
+        return float(self.settings.get('logging', {}).get('debug_sample_rate', 1.0))
+
+    @property
+    def loop_monitor_interval(self) -> float:
+        return float(self.settings.get('event_loop_monitor', {}).get('interval', 0.25))
+
+    @property
+    def loop_monitor_slow_callback_threshold(self) -> float:
+        return float(self.settings.get('event_loop_monitor', {}).get('slow_callback_threshold', 0.5))
+
+    @property
+    def profile_interval(self) -> float:
+        return float(self.settings.get('diagnostics', {}).get('profile_interval', 0.01))
+
+    @property
+    def max_profile_seconds(self) -> float:
+        return float(self.settings.get('diagnostics', {}).get('max_profile_seconds', 60))
+
+    @property
+    def tracemalloc_frames(self) -> int:
+        return int(self.settings.get('diagnostics', {}).get('tracemalloc_frames', 10))
+
+    @property
+    def tracemalloc_on_startup(self) -> bool:
+        return bool(self.settings.get('diagnostics', {}).get('tracemalloc_on_startup', False))
+
+    @staticmethod
+    def read_config_file() -> Dict:
+        config_path = os.getenv('CONFIG_PATH', 'config.yml')
+        if not os.path.isfile(config_path):
+            return {}
+        with open(config_path, 'r') as stream:
+            config: Optional[Dict] = yaml.load(stream)
+            return config if config is not None else {}
+
     @staticmethod
     def read_credentials_file() -> Tuple[str, str, Dict[str, JenkinsInstanceConfig]]:
         with open(os.getenv('CREDS_PATH', 'creds.yml'), 'r') as stream:
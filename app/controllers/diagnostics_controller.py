@@ -0,0 +1,67 @@
+from typing import Optional
+
+import aiohttp.web
+import aiohttp.web_request
+
+from app.diagnostics.inflight_report import InflightReport
+from app.diagnostics.memory_snapshots import MemorySnapshots
+from app.diagnostics.sampling_profiler import SamplingProfiler
+from app.exceptions.triggear_error import TriggearError
+
+
+class DiagnosticsController:
+    DEFAULT_SECONDS = 10.0
+    DEFAULT_TOP = 20
+    DEFAULT_LIMIT = 50
+
+    def __init__(self,
+                 sampling_profiler: SamplingProfiler,
+                 memory_snapshots: MemorySnapshots,
+                 inflight_report: Optional[InflightReport] = None) -> None:
+        self.__sampling_profiler = sampling_profiler
+        self.__memory_snapshots = memory_snapshots
+        self.__inflight_report = inflight_report
+
+    async def handle_profile(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
+        try:
+            seconds = float(request.query.get('seconds', self.DEFAULT_SECONDS))
+        except ValueError:
+            return aiohttp.web.Response(status=400, text='seconds must be a number')
+        if seconds <= 0:
+            return aiohttp.web.Response(status=400, text='seconds must be positive')
+        try:
+            samples = await self.__sampling_profiler.profile(seconds, include_tasks=request.query.get('tasks') in ('1', 'true'))
+        except TriggearError as error:
+            return aiohttp.web.Response(status=409, text=str(error))
+        return aiohttp.web.Response(text=SamplingProfiler.render(samples))
+
+    async def handle_memory(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
+        group_by = request.query.get('group_by', 'lineno')
+        try:
+            seconds = float(request.query.get('seconds', self.DEFAULT_SECONDS))
+            top = int(request.query.get('top', self.DEFAULT_TOP))
+        except ValueError:
+            return aiohttp.web.Response(status=400, text='seconds and top must be numbers')
+        if group_by not in MemorySnapshots.GROUPINGS:
+            return aiohttp.web.Response(status=400, text=f'group_by must be one of {", ".join(MemorySnapshots.GROUPINGS)}')
+        try:
+            report = await self.__memory_snapshots.compare(seconds, top, group_by)
+        except TriggearError as error:
+            return aiohttp.web.Response(status=409, text=str(error))
+        return aiohttp.web.json_response(report)
+
+    async def handle_inflight(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
+        if self.__inflight_report is None:
+            return aiohttp.web.Response(status=404, text='In-flight report is not available')
+        sections = request.query['sections'].split(',') if request.query.get('sections') else InflightReport.SECTIONS
+        if any(section not in InflightReport.SECTIONS for section in sections):
+            return aiohttp.web.Response(status=400, text=f'sections must be some of {", ".join(InflightReport.SECTIONS)}')
+        try:
+            limit = int(request.query.get('limit', self.DEFAULT_LIMIT))
+            min_age = float(request.query.get('min_age', 0))
+        except ValueError:
+            return aiohttp.web.Response(status=400, text='limit and min_age must be numbers')
+        return aiohttp.web.json_response(self.__inflight_report.get_report(sections,
+                                                                          sort=request.query.get('sort', 'age'),
+                                                                          limit=limit,
+                                                                          min_age=min_age))
@@ -1,64 +1,193 @@
 import asyncio
 import logging
-from typing import Dict, Awaitable, List
+from typing import Dict, List, Callable, Coroutine
 from typing import Optional
 
 import aiohttp.web
 import aiohttp.web_request
 from aiohttp.web_response import Response
+from cached_property import cached_property
 
 from app.clients.github_client import GithubClient
 from app.config.triggear_config import TriggearConfig
 from app.data_objects.github_event import GithubEvent
+from app.diagnostics.inflight_tracker import InflightTracker
+from app.diagnostics.triggear_inflight import INFLIGHT
 from app.enums.event_types import EventType
 from app.enums.triggear_pr_label import TriggearPrLabel
 from app.hook_details.hook_details_factory import HookDetailsFactory
 from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
 from app.hook_details.push_hook_details import PushHookDetails
 from app.hook_details.tag_hook_details import TagHookDetails
+from app.ingress.body_decoder import BodyDecoder
+from app.ingress.capture_ring import CaptureRing
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.ingress.event_router import EventRouter, RouteKey
+from app.ingress.fair_admission import FairAdmission
+from app.ingress.webhook_inbox import WebhookInbox, InboxEntry
+from app.metrics.api_budget import ApiBudget, api_budget_scope
+from app.metrics.triggear_metrics import HOOKS_RECEIVED, HOOKS_IGNORED, HOOKS_HANDLED
+from app.mongo.registered_repositories import RegisteredRepositories
+from app.tasks.task_supervisor import TaskSupervisor
+from app.tracing.triggear_tracer import TRACER
 from app.triggear_heart import TriggearHeart
 from app.utilities.constants import BRANCH_DELETED_SHA
 
 
 class GithubController:
     GITHUB_EVENT_HEADER = 'X-GitHub-Event'
+    GITHUB_DELIVERY_HEADER = 'X-GitHub-Delivery'
 
     def __init__(self,
                  config: TriggearConfig,
                  github_client: GithubClient,
-                 triggear_heart: TriggearHeart) -> None:
+                 triggear_heart: TriggearHeart,
+                 delivery_deduplicator: Optional[DeliveryDeduplicator] = None,
+                 webhook_inbox: Optional[WebhookInbox] = None,
+                 body_decoder: Optional[BodyDecoder] = None,
+                 task_supervisor: Optional[TaskSupervisor] = None,
+                 fair_admission: Optional[FairAdmission] = None,
+                 registered_repositories: Optional[RegisteredRepositories] = None,
+                 capture_ring: Optional[CaptureRing] = None) -> None:
         self.config = config
         self.__github_client = github_client
         self.__triggear_heart = triggear_heart
-
+        self.__delivery_deduplicator = delivery_deduplicator
+        self.__webhook_inbox = webhook_inbox
+        self.__body_decoder = body_decoder
+        self.__task_supervisor = task_supervisor
+        self.__fair_admission = fair_admission
+        self.__registered_repositories = registered_repositories
+        self.__capture_ring = capture_ring
+
+    @TRACER.traced('github_controller.handle_hook')
     async def handle_hook(self, request: aiohttp.web_request.Request) -> Optional[Response]:
-        data = await request.json()
-        github_event = GithubEvent(event_header=request.headers.get(self.GITHUB_EVENT_HEADER),
+        event_header = request.headers.get(self.GITHUB_EVENT_HEADER)
+        TRACER.annotate(event=str(event_header), delivery=str(request.headers.get(self.GITHUB_DELIVERY_HEADER)))
+        HOOKS_RECEIVED.labels(str(event_header)).inc()
+        if self.__capture_ring is not None:
+            # INFO: body was already read and verified by authentication middleware - read() returns the cached bytes;
+            # ignored events are captured too, so replays carry the same noise as production
+            self.__capture_ring.capture(request.headers, await request.read())
+        if not EventRouter.is_handled(event_header):
+            HOOKS_IGNORED.labels(str(event_header), 'unhandled_event').inc()
+            # INFO: body was only read for HMAC - it's not decoded for events that Triggear does not handle
+            return aiohttp.web.Response(text='Hook ACK')
+        delivery_id = request.headers.get(self.GITHUB_DELIVERY_HEADER)
+        if self.__delivery_deduplicator is not None and await self.__delivery_deduplicator.is_duplicate(delivery_id):
+            logging.warning(f'Hook delivery {delivery_id} was already received - skipping it')
+            HOOKS_IGNORED.labels(event_header, 'duplicate').inc()
+            return aiohttp.web.Response(text='Hook duplicate ACK')
+        try:
+            return await self.accept_hook(request, event_header, delivery_id)
+        except Exception:
+            if self.__delivery_deduplicator is not None:
+                await self.__delivery_deduplicator.forget(delivery_id)
+            raise
+
+    async def accept_hook(self, request: aiohttp.web_request.Request, event_header: Optional[str], delivery_id: Optional[str]) -> Response:
+        if self.__webhook_inbox is not None:
+            await self.__webhook_inbox.accept(event_header, delivery_id, await request.read())
+            return aiohttp.web.Response(text='Hook ACK')
+        data = await self.decode_body(await request.read(), event_header)
+        github_event = GithubEvent(event_header=event_header,
                                    action=data.get('action'),
                                    ref=data.get('ref'))
         logging.warning(f"Hook received: {github_event}")
+        if not await self.is_from_registered_repository(data, github_event):
+            return aiohttp.web.Response(text='Hook ACK')
+        if self.__fair_admission is not None:
+            await self.__fair_admission.submit(github_event, data)
+            return aiohttp.web.Response(text='Hook ACK')
         handler_task = self.get_event_handler_task(data, github_event)
         if handler_task is not None:
-            asyncio.get_event_loop().create_task(handler_task)
+            self.spawn_handler(handler_task)
         return aiohttp.web.Response(text='Hook ACK')
 
-    def get_event_handler_task(self, data: Dict, github_event: GithubEvent) -> Optional[Awaitable]:
-        if github_event == EventType.PR_LABELED:
-            return self.handle_labeled(data)
-        elif github_event == EventType.SYNCHRONIZE:
-            return self.handle_synchronize(data)
-        elif github_event == EventType.ISSUE_COMMENT:
-            return self.handle_comment(data)
-        elif github_event == EventType.PR_OPENED:
-            return self.handle_pr_opened(data)
-        elif github_event == EventType.PUSH:
-            return self.handle_push(data)
-        elif github_event == EventType.TAGGED:
-            return self.handle_tagged(data)
-        elif github_event == EventType.RELEASE:
-            return self.handle_release(data)
+    @TRACER.traced('github_controller.handle_inbox_entry')
+    async def handle_inbox_entry(self, entry: InboxEntry) -> Optional[asyncio.Future]:
+        data = await self.decode_body(entry.body, entry.event_header)
+        github_event = GithubEvent(event_header=entry.event_header,
+                                   action=data.get('action'),
+                                   ref=data.get('ref'))
+        logging.warning(f"Hook received: {github_event} (delivery {entry.delivery_id})")
+        if not await self.is_from_registered_repository(data, github_event):
+            return None
+        if self.__fair_admission is not None:
+            # INFO: inbox worker moves on once event is admitted - entry stays unprocessed in inbox until admission
+            # either handled it or spilled it to Mongo overflow
+            return await self.__fair_admission.submit(github_event, data)
+        await self.process_event(github_event, data)
         return None
 
+    @staticmethod
+    def get_repositories(data: Dict) -> List[str]:
+        repositories = [data.get('repository', {}).get('full_name')]
+        # INFO: PR hooks are registered by head repository, which differs from the base one for forks
+        head_repository = (data.get('pull_request', {}).get('head', {}).get('repo') or {}).get('full_name')
+        if head_repository is not None:
+            repositories.append(head_repository)
+        return [repository for repository in repositories if repository is not None]
+
+    async def is_from_registered_repository(self, data: Dict, github_event: GithubEvent) -> bool:
+        event_type = EventRouter.route(github_event)
+        if self.__registered_repositories is None or event_type is None:
+            return True
+        repositories = self.get_repositories(data)
+        if await self.__registered_repositories.check(EventRouter.get_registration_event_types(event_type), repositories):
+            return True
+        self.__registered_repositories.dropped += 1
+        HOOKS_IGNORED.labels(github_event.event_header, 'unregistered_repository').inc()
+        logging.warning(f'Hook {github_event} from {repositories} dropped - no registrations for these repositories')
+        return False
+
+    @TRACER.traced('github_controller.process_event')
+    async def process_event(self, github_event: GithubEvent, data: Dict) -> None:
+        handler_task = self.get_event_handler_task(data, github_event)
+        if handler_task is not None:
+            event_type = EventRouter.route(github_event)
+            event = event_type.name.lower() if event_type is not None else str(github_event.event_header)
+            repository = data.get('repository', {}).get('full_name', '')
+            with INFLIGHT.track(InflightTracker.HOOKS,
+                                event=github_event.event_header,
+                                action=github_event.action,
+                                repositories=self.get_repositories(data)), \
+                    api_budget_scope(ApiBudget.HOOK, f'{event} of {repository}', event=event, repository=repository):
+                await handler_task
+
+    def spawn_handler(self, handler_task: Coroutine) -> None:
+        if self.__task_supervisor is not None:
+            self.__task_supervisor.spawn(TaskSupervisor.HOOKS, handler_task)
+        else:
+            asyncio.get_event_loop().create_task(handler_task)
+
+    async def decode_body(self, body: bytes, event_header: Optional[str]) -> Dict:
+        if self.__body_decoder is not None:
+            return await self.__body_decoder.decode(body, event_header)
+        if event_header == EventType.PUSH.event_header:
+            return BodyDecoder.decode_push_json(body)
+        return BodyDecoder.decode_json(body)
+
+    @cached_property
+    def event_handlers(self) -> Dict[RouteKey, Callable[[Dict], Coroutine]]:
+        return {
+            EventRouter.get_event_type_key(EventType.PR_LABELED): self.handle_labeled,
+            EventRouter.get_event_type_key(EventType.SYNCHRONIZE): self.handle_synchronize,
+            EventRouter.get_event_type_key(EventType.ISSUE_COMMENT): self.handle_comment,
+            EventRouter.get_event_type_key(EventType.PR_OPENED): self.handle_pr_opened,
+            EventRouter.get_event_type_key(EventType.PUSH): self.handle_push,
+            EventRouter.get_event_type_key(EventType.TAGGED): self.handle_tagged,
+            EventRouter.get_event_type_key(EventType.RELEASE): self.handle_release
+        }
+
+    def get_event_handler_task(self, data: Dict, github_event: GithubEvent) -> Optional[Coroutine]:
+        handler = self.event_handlers.get(EventRouter.get_route_key(github_event))
+        if handler is None:
+            HOOKS_IGNORED.labels(str(github_event.event_header), 'unhandled_action').inc()
+            return None
+        HOOKS_HANDLED.labels(str(github_event.event_header)).inc()
+        return handler(data)
+
     async def handle_release(self, data: Dict) -> None:
         await self.__triggear_heart.trigger_registered_jobs(HookDetailsFactory.get_release_details(data))
 
@@ -80,7 +209,7 @@ class GithubController:
     async def handle_synchronize(self, data: Dict) -> None:
         pr_labels = await self.__github_client.get_pr_labels(repo=data['pull_request']['head']['repo']['full_name'],
                                                              number=data['pull_request']['number'])
-        asyncio.gather(
+        await asyncio.gather(
             self.handle_pr_sync(data, pr_labels),
             self.handle_labeled_sync(data, pr_labels)
         )
@@ -91,14 +220,10 @@ class GithubController:
             await self.handle_pr_opened(data)
 
     async def handle_labeled_sync(self, data: Dict, pr_labels: List[str]) -> None:
-        if TriggearPrLabel.LABEL_SYNC in pr_labels and len(pr_labels) > 1:
-            pr_labels.remove(TriggearPrLabel.LABEL_SYNC.label_name)
-            for label in pr_labels:
-                # update data to have fields required from labeled hook
-                # it's necessary for HookDetailsFactory in handle_labeled
-                data.update({'label': {'name': label}})
-                logging.warning(f'Sync hook on PR with {TriggearPrLabel.LABEL_SYNC} - handling like PR labeled')
-                await self.handle_labeled(data)
+        labels = [label for label in pr_labels if label != TriggearPrLabel.LABEL_SYNC]
+        if TriggearPrLabel.LABEL_SYNC in pr_labels and labels:
+            logging.warning(f'Sync hook on PR with {TriggearPrLabel.LABEL_SYNC} - handling like PR labeled with {labels}')
+            await self.__triggear_heart.trigger_labeled_sync(HookDetailsFactory.get_pr_labeled_sync_details(data, labels))
 
     async def handle_comment(self, data: Dict) -> None:
         comment_body = data['comment']['body']
@@ -112,8 +237,7 @@ class GithubController:
         await self.__triggear_heart.trigger_registered_jobs(HookDetailsFactory.get_pr_sync_details(data, branch, sha))
 
     async def handle_labeled_sync_comment(self, data: Dict, branch: str, sha: str) -> None:
-        for hook_details in HookDetailsFactory.get_labeled_sync_details(data, head_branch=branch, head_sha=sha):
-            await self.__triggear_heart.trigger_registered_jobs(hook_details)
+        await self.__triggear_heart.trigger_labeled_sync(HookDetailsFactory.get_labeled_sync_details(data, head_branch=branch, head_sha=sha))
 
     async def handle_push(self, data: Dict) -> None:
         hook_details: PushHookDetails = HookDetailsFactory.get_push_details(data)
@@ -1,8 +1,27 @@
+import json
+from typing import Optional
+
 import aiohttp.web
 import aiohttp.web_request
 
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.tasks.task_supervisor import TaskSupervisor
+
 
 class HealthController:
-    @staticmethod
-    async def handle_health_check(request: aiohttp.web_request.Request) -> aiohttp.web.Response:
-        return aiohttp.web.Response(text='TriggearIsOk', reason=f'Host {request.host} asked')
+    DUPLICATE_DELIVERIES_HEADER = 'X-Triggear-Duplicate-Deliveries'
+    TASKS_HEADER = 'X-Triggear-Tasks'
+
+    def __init__(self,
+                 delivery_deduplicator: Optional[DeliveryDeduplicator] = None,
+                 task_supervisor: Optional[TaskSupervisor] = None) -> None:
+        self.__delivery_deduplicator = delivery_deduplicator
+        self.__task_supervisor = task_supervisor
+
+    async def handle_health_check(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
+        headers = {}
+        if self.__delivery_deduplicator is not None:
+            headers[self.DUPLICATE_DELIVERIES_HEADER] = str(self.__delivery_deduplicator.duplicates)
+        if self.__task_supervisor is not None:
+            headers[self.TASKS_HEADER] = json.dumps(self.__task_supervisor.get_group_stats(), sort_keys=True)
+        return aiohttp.web.Response(text='TriggearIsOk', reason=f'Host {request.host} asked', headers=headers)
@@ -0,0 +1,17 @@
+from typing import Optional
+
+import aiohttp.web
+import aiohttp.web_request
+
+from app.metrics.metrics_registry import MetricsRegistry
+
+
+class MetricsController:
+    def __init__(self, registry: MetricsRegistry, worker_id: Optional[int] = None) -> None:
+        self.__registry = registry
+        # INFO: every ingress worker keeps its own registry and answers scrapes in turn - worker label keeps their series apart
+        self.__constant_labels = {'worker': str(worker_id)} if worker_id is not None else None
+
+    async def handle_metrics(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
+        body = self.__registry.render(self.__constant_labels).encode('utf-8')
+        return aiohttp.web.Response(body=body, headers={'Content-Type': MetricsRegistry.CONTENT_TYPE})
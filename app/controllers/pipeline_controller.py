@@ -1,20 +1,26 @@
+import json
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, AsyncIterator
 
 import aiohttp.web
 import aiohttp.web_request
+from pymongo.errors import PyMongoError
 
 from app.clients.github_client import GithubClient
 from app.clients.mongo_client import MongoClient
 from app.enums.event_types import EventType
+from app.logs.structured_formatters import log_fields, log_items
 from app.mongo.clear_query import ClearQuery
 from app.mongo.deregistration_query import DeregistrationQuery
+from app.mongo.missed_query import MissedQuery
+from app.mongo.registered_repositories import RegisteredRepositories
 from app.mongo.registration_query import RegistrationQuery
 from app.request_schemes.clear_request_data import ClearRequestData
 from app.request_schemes.comment_request_data import CommentRequestData
 from app.request_schemes.deployment_request_data import DeploymentRequestData
 from app.request_schemes.deployment_status_request_data import DeploymentStatusRequestData
 from app.request_schemes.deregister_request_data import DeregisterRequestData
+from app.request_schemes.missing_request_data import MissingRequestData
 from app.request_schemes.register_request_data import RegisterRequestData
 from app.request_schemes.status_request_data import StatusRequestData
 
@@ -22,42 +28,86 @@ from app.request_schemes.status_request_data import StatusRequestData
 class PipelineController:
     def __init__(self,
                  github_client: GithubClient,
-                 mongo_client: MongoClient) -> None:
+                 mongo_client: MongoClient,
+                 registered_repositories: Optional[RegisteredRepositories] = None) -> None:
         self.__gh_client: GithubClient = github_client
         self.__mongo_client: MongoClient = mongo_client
+        self.__registered_repositories: Optional[RegisteredRepositories] = registered_repositories
 
     def get_github(self) -> GithubClient:
         return self.__gh_client
 
     async def handle_register(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
         data: Dict = await request.json()
-        logging.warning(f"Register REQ received: {data}")
+        logging.debug('Register REQ payload: %s', data)
         if not RegisterRequestData.is_valid_register_request_data(data):
             return aiohttp.web.Response(reason='Invalid register request params!', status=400)
-        await self.__mongo_client.add_or_update_registration(RegistrationQuery.from_registration_request_data(data))
+        logging.warning('Register REQ received', extra=log_items(data, RegisterRequestData.event_type,
+                                                                       RegisterRequestData.repository,
+                                                                       RegisterRequestData.jenkins_url,
+                                                                       RegisterRequestData.job_name))
+        registration_query = RegistrationQuery.from_registration_request_data(data)
+        await self.__mongo_client.add_or_update_registration(registration_query)
+        if self.__registered_repositories is not None:
+            self.__registered_repositories.add(EventType.get_by_collection_name(registration_query.event_type), registration_query.repository)
         return aiohttp.web.Response(text='Register ACK')
 
-    async def handle_missing(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
-        event_type = request.match_info.get('eventType')
-        logging.warning(f"Missing REQ received for: {event_type}")
-        if event_type not in EventType.get_allowed_registration_event_types():
+    async def handle_missing(self, request: aiohttp.web_request.Request) -> aiohttp.web.StreamResponse:
+        event_type = request.match_info.get(MissingRequestData.event_type)
+        logging.warning('Missing REQ received', extra=log_fields(event_type=event_type, query=lambda: dict(request.query)))
+        if not MissingRequestData.is_valid_missing_request_data(event_type, request.query):
             return aiohttp.web.Response(status=400, text='Invalid eventType requested')
-        return aiohttp.web.Response(text=','.join(await self.__mongo_client.get_missed_info(event_type)))
+        missed_infos = self.__mongo_client.get_missed_info(MissedQuery.from_missing_request_data(event_type, request.query)).__aiter__()
+        # INFO: first batch is fetched before 200 is sent - failing query still ends with an error status
+        missed_info = await self.get_next_missed_info(missed_infos)
+        response = aiohttp.web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        try:
+            while missed_info is not None:
+                await response.write(json.dumps(missed_info).encode('utf-8') + b'\n')
+                missed_info = await self.get_next_missed_info(missed_infos)
+        except PyMongoError as error:
+            logging.exception('Missing REQ failed after streaming started')
+            await response.write(json.dumps({'error': str(error)}).encode('utf-8') + b'\n')
+            # INFO: connection is dropped without terminating chunk - clients cannot take truncated stream for complete one
+            response.force_close()
+            raise
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    async def get_next_missed_info(missed_infos: AsyncIterator[Dict]) -> Optional[Dict]:
+        try:
+            return await missed_infos.__anext__()
+        except StopAsyncIteration:
+            return None
 
     async def handle_deregister(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
         data: Dict = await request.json()
-        logging.warning(f"Deregister REQ received: {data}")
+        logging.debug('Deregister REQ payload: %s', data)
         if not DeregisterRequestData.is_valid_deregister_request_data(data):
             return aiohttp.web.Response(reason='Invalid deregister request params!', status=400)
-        await self.__mongo_client.deregister(DeregistrationQuery.from_deregistration_request_data(data))
+        logging.warning('Deregister REQ received', extra=log_items(data, DeregisterRequestData.event_type,
+                                                                         DeregisterRequestData.jenkins_url,
+                                                                         DeregisterRequestData.job_name,
+                                                                         DeregisterRequestData.caller))
+        deregistration_query = DeregistrationQuery.from_deregistration_request_data(data)
+        await self.__mongo_client.deregister(deregistration_query)
+        if self.__registered_repositories is not None:
+            # INFO: deregistration is keyed by job, not repository - other jobs may still keep the repository registered
+            await self.__registered_repositories.refresh_event_type(EventType.get_by_collection_name(deregistration_query.event_type))
         return aiohttp.web.Response(text=f'Deregistration of {data[DeregisterRequestData.job_name]} '
                                          f'for {data[DeregisterRequestData.event_type]} succeeded')
 
     async def handle_clear(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
         data: Dict = await request.json()
-        logging.warning(f"Clear REQ received: {data}")
+        logging.debug('Clear REQ payload: %s', data)
         if not ClearRequestData.is_valid_clear_request_data(data):
             return aiohttp.web.Response(reason='Invalid clear request params!', status=400)
+        logging.warning('Clear REQ received', extra=log_items(data, ClearRequestData.event_type,
+                                                                    ClearRequestData.jenkins_url,
+                                                                    ClearRequestData.job_name))
         clear_query = ClearQuery.from_clear_request_data(data)
         await self.__mongo_client.clear(clear_query)
         return aiohttp.web.Response(text=f'Clear of {clear_query.job_name} missed counter succeeded')
@@ -66,7 +116,11 @@ class PipelineController:
         data = await request.json()
         if not StatusRequestData.is_valid_status_data(data):
             return aiohttp.web.Response(reason='Invalid status request params!', status=400)
-        logging.warning(f"Status REQ received: {data}")
+        logging.debug('Status REQ payload: %s', data)
+        logging.warning('Status REQ received', extra=log_items(data, StatusRequestData.repository,
+                                                                     StatusRequestData.sha,
+                                                                     StatusRequestData.state,
+                                                                     StatusRequestData.context))
         await self.get_github().create_github_build_status(
             repo=data['repository'],
             sha=data['sha'],
@@ -81,7 +135,10 @@ class PipelineController:
         data = await request.json()
         if not CommentRequestData.is_valid_comment_data(data):
             return aiohttp.web.Response(reason='Invalid comment request params!', status=400)
-        logging.warning(f"Comment REQ received: {data}")
+        logging.debug('Comment REQ payload: %s', data)
+        logging.warning('Comment REQ received', extra=log_items(data, CommentRequestData.repository,
+                                                                      CommentRequestData.sha,
+                                                                      CommentRequestData.job_name))
         await self.get_github().create_comment(
             repo=data['repository'],
             sha=data['sha'],
@@ -91,9 +148,12 @@ class PipelineController:
 
     async def handle_deployment(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
         data: Dict = await request.json()
-        logging.warning(f'Deployment request received: {data}')
+        logging.debug('Deployment REQ payload: %s', data)
         if not DeploymentRequestData.is_valid_deployment_request_data(data):
             return aiohttp.web.Response(reason='Invalid deployment request payload!', status=400)
+        logging.warning('Deployment REQ received', extra=log_items(data, DeploymentRequestData.repo,
+                                                                         DeploymentRequestData.ref,
+                                                                         DeploymentRequestData.environment))
         await self.get_github().create_deployment(repo=data[DeploymentRequestData.repo],
                                                   ref=data[DeploymentRequestData.ref],
                                                   environment=data[DeploymentRequestData.environment],
@@ -102,9 +162,13 @@ class PipelineController:
 
     async def handle_deployment_status(self, request: aiohttp.web_request.Request) -> aiohttp.web.Response:
         data: Dict = await request.json()
-        logging.warning(f'Deployment status request received: {data}')
+        logging.debug('Deployment status REQ payload: %s', data)
         if not DeploymentStatusRequestData.is_valid_deployment_status_request_data(data):
             return aiohttp.web.Response(reason='Invalid deployment status request payload!', status=400)
+        logging.warning('Deployment status REQ received', extra=log_items(data, DeploymentStatusRequestData.repo,
+                                                                                DeploymentStatusRequestData.ref,
+                                                                                DeploymentStatusRequestData.environment,
+                                                                                DeploymentStatusRequestData.state))
         deployments: List = await self.get_github().get_deployments(repo=data[DeploymentRequestData.repo],
                                                                     ref=data[DeploymentRequestData.ref],
                                                                     environment=data[DeploymentRequestData.environment])
@@ -0,0 +1,113 @@
+import collections
+from typing import Optional, Dict, Any, List, Iterable
+
+from app.builds.build_debouncer import BuildDebouncer
+from app.clients.jenkinses_clients import JenkinsesClients
+from app.clients.mongo_client import MongoClient
+from app.diagnostics.inflight_tracker import InflightTracker, InflightItem
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.metrics.triggear_metrics import UPSTREAM_IN_FLIGHT
+from app.mongo.registered_repositories import RegisteredRepositories
+from app.tasks.task_supervisor import TaskSupervisor, SupervisedTask
+
+
+def get_hit_rate(hits: int, lookups: int) -> Optional[float]:
+    return round(hits / lookups, 3) if lookups else None
+
+
+class InflightReport:
+    SECTIONS = InflightTracker.KINDS + ('tasks', 'queued_triggers', 'upstreams', 'caches')
+
+    def __init__(self,
+                 inflight_tracker: InflightTracker,
+                 task_supervisor: Optional[TaskSupervisor] = None,
+                 build_debouncer: Optional[BuildDebouncer] = None,
+                 mongo_client: Optional[MongoClient] = None,
+                 delivery_deduplicator: Optional[DeliveryDeduplicator] = None,
+                 registered_repositories: Optional[RegisteredRepositories] = None,
+                 jenkinses_clients: Optional[JenkinsesClients] = None) -> None:
+        self.__inflight_tracker = inflight_tracker
+        self.__task_supervisor = task_supervisor
+        self.__build_debouncer = build_debouncer
+        self.__mongo_client = mongo_client
+        self.__delivery_deduplicator = delivery_deduplicator
+        self.__registered_repositories = registered_repositories
+        self.__jenkinses_clients = jenkinses_clients
+
+    @staticmethod
+    def select(entries: Iterable[Dict[str, Any]], sort: str, limit: int, min_age: float) -> Dict[str, Any]:
+        matching = [entry for entry in entries if entry['age'] >= min_age]
+        # INFO: entries without sort field go last - sorting by e.g. polls keeps only watches on top
+        matching.sort(key=lambda entry: (entry.get(sort) is not None, entry.get(sort) or 0), reverse=True)
+        return {'count': len(matching), 'items': matching[:limit]}
+
+    @staticmethod
+    def get_item_entry(item: InflightItem) -> Dict[str, Any]:
+        return dict(item.details, age=round(item.get_age(), 3))
+
+    @staticmethod
+    def get_task_entry(supervised_task: SupervisedTask) -> Dict[str, Any]:
+        return dict(supervised_task.details,
+                    group=supervised_task.group,
+                    name=supervised_task.name,
+                    running=supervised_task.started is not None,
+                    age=round(supervised_task.get_age(), 3))
+
+    def get_tasks(self) -> List[SupervisedTask]:
+        return self.__task_supervisor.get_tasks() if self.__task_supervisor is not None else []
+
+    def get_queued_triggers(self) -> Dict[str, Dict[str, int]]:
+        queued: Dict[str, Dict[str, int]] = collections.defaultdict(lambda: {'debounced': 0, 'waiting_for_slot': 0})
+        if self.__build_debouncer is not None:
+            for key, _ in self.__build_debouncer.get_pending():
+                queued[key[1]]['debounced'] += 1
+        for supervised_task in self.get_tasks():
+            if supervised_task.group == TaskSupervisor.BUILDS and supervised_task.started is None:
+                queued[str(supervised_task.details.get('jenkins_url'))]['waiting_for_slot'] += 1
+        return dict(queued)
+
+    @staticmethod
+    def get_upstreams() -> Dict[str, Dict[str, float]]:
+        upstreams: Dict[str, Dict[str, float]] = collections.defaultdict(dict)
+        for (upstream, target), gauge in UPSTREAM_IN_FLIGHT.get_children():
+            upstreams[upstream][target] = gauge.get()  # type: ignore
+        return dict(upstreams)
+
+    def get_caches(self) -> Dict[str, Any]:
+        caches: Dict[str, Any] = {}
+        if self.__mongo_client is not None:
+            cache = self.__mongo_client.missed_info_cache
+            caches['missed_info'] = {'entries': len(cache), 'max_entries': cache.max_entries, 'hits': cache.hits, 'misses': cache.misses,
+                                     'hit_rate': get_hit_rate(cache.hits, cache.hits + cache.misses)}
+        if self.__delivery_deduplicator is not None:
+            deduplicator = self.__delivery_deduplicator
+            caches['deliveries'] = {'entries': deduplicator.get_cached_count(), 'max_entries': deduplicator.max_entries,
+                                    'checked': deduplicator.checked, 'duplicates': deduplicator.duplicates,
+                                    'duplicate_rate': get_hit_rate(deduplicator.duplicates, deduplicator.checked)}
+        if self.__registered_repositories is not None:
+            caches['registered_repositories'] = self.__registered_repositories.get_counts()
+        if self.__jenkinses_clients is not None:
+            caches['job_catalogs'] = {
+                url: dict(client.job_catalog.get_counts(), hits=client.job_catalog.hits, misses=client.job_catalog.misses,
+                          hit_rate=get_hit_rate(client.job_catalog.hits, client.job_catalog.hits + client.job_catalog.misses),
+                          age=client.job_catalog.age())
+                for url, client in self.__jenkinses_clients.get_created_jenkinses().items()
+            }
+        return caches
+
+    def get_report(self, sections: Iterable[str], sort: str = 'age', limit: int = 50, min_age: float = 0.0) -> Dict[str, Any]:
+        report: Dict[str, Any] = {}
+        for section in sections:
+            if section in InflightTracker.KINDS:
+                report[section] = self.select(map(self.get_item_entry, self.__inflight_tracker.get_items(section)), sort, limit, min_age)
+            elif section == 'tasks':
+                report[section] = self.select(map(self.get_task_entry, self.get_tasks()), sort, limit, min_age)
+            elif section == 'queued_triggers':
+                report[section] = self.get_queued_triggers()
+            elif section == 'upstreams':
+                report[section] = self.get_upstreams()
+            elif section == 'caches':
+                report[section] = self.get_caches()
+            else:
+                raise ValueError(f'{section} is not one of {self.SECTIONS}')
+        return report
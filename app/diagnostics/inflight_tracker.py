@@ -0,0 +1,56 @@
+import contextlib
+import itertools
+import time
+from typing import Dict, Any, Iterator, List, Optional
+
+
+class InflightItem:
+    def __repr__(self) -> str:
+        return f"<InflightItem " \
+               f"kind: {self.kind}, " \
+               f"age: {self.get_age():.1f}s, " \
+               f"details: {self.details} " \
+               f">"
+
+    def __init__(self,
+                 kind: str,
+                 details: Dict[str, Any]) -> None:
+        self.kind = kind
+        self.details = details
+        self.started = time.monotonic()
+
+    def get_age(self) -> float:
+        return time.monotonic() - self.started
+
+    def update(self, **details: Any) -> None:
+        self.details.update(details)
+
+
+class InflightTracker:
+    HOOKS = 'hooks'
+    REGISTRATIONS = 'registrations'
+    TRIGGERS = 'triggers'
+    WATCHES = 'watches'
+    KINDS = (HOOKS, REGISTRATIONS, TRIGGERS, WATCHES)
+
+    def __repr__(self) -> str:
+        return f"<InflightTracker " \
+               f"items: {len(self.__items)} " \
+               f">"
+
+    def __init__(self) -> None:
+        self.__ids = itertools.count()
+        self.__items: Dict[int, InflightItem] = {}
+
+    @contextlib.contextmanager
+    def track(self, kind: str, **details: Any) -> Iterator[InflightItem]:
+        item_id = next(self.__ids)
+        item = InflightItem(kind, details)
+        self.__items[item_id] = item
+        try:
+            yield item
+        finally:
+            del self.__items[item_id]
+
+    def get_items(self, kind: Optional[str] = None) -> List[InflightItem]:
+        return [item for item in self.__items.values() if kind is None or item.kind == kind]
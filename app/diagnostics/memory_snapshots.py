@@ -0,0 +1,93 @@
+import asyncio
+import tracemalloc
+from typing import Optional, Dict, Any, List
+
+import aiohttp.web
+
+from app.exceptions.triggear_error import TriggearError
+
+
+class MemorySnapshots:
+    GROUPINGS = ('lineno', 'filename', 'traceback')
+    EXCLUDED_TRACES = (tracemalloc.Filter(False, tracemalloc.__file__),
+                       tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                       tracemalloc.Filter(False, '<unknown>'))
+
+    def __repr__(self) -> str:
+        return f"<MemorySnapshots " \
+               f"frames: {self.frames}, " \
+               f"trace_on_startup: {self.trace_on_startup}, " \
+               f"max_window: {self.max_window}, " \
+               f"running: {self.running} " \
+               f">"
+
+    def __init__(self,
+                 frames: int,
+                 trace_on_startup: bool,
+                 max_window: float) -> None:
+        self.frames = frames
+        self.trace_on_startup = trace_on_startup
+        self.max_window = max_window
+        self.running = False
+        self.__started_tracing = False
+        self.__previous: Optional[tracemalloc.Snapshot] = None
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        # INFO: tracing slows allocations down - without trace_on_startup it is enabled only for a requested window
+        if self.trace_on_startup and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.__started_tracing = True
+            self.__previous = await self.take_snapshot()
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+        self.__previous = None
+
+    @classmethod
+    def take(cls) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(cls.EXCLUDED_TRACES)
+
+    async def take_snapshot(self) -> tracemalloc.Snapshot:
+        return await asyncio.get_event_loop().run_in_executor(None, self.take)
+
+    @staticmethod
+    def get_location(statistic: Any) -> List[str]:
+        return [str(frame) for frame in statistic.traceback]
+
+    @staticmethod
+    def get_report(previous: tracemalloc.Snapshot, current: tracemalloc.Snapshot, top: int, group_by: str) -> Dict[str, Any]:
+        statistics = current.statistics(group_by)
+        return {
+            'group_by': group_by,
+            'traced_bytes': sum(statistic.size for statistic in statistics),
+            'top': [{'location': MemorySnapshots.get_location(statistic), 'size': statistic.size, 'count': statistic.count}
+                    for statistic in statistics[:top]],
+            'diff': [{'location': MemorySnapshots.get_location(statistic), 'size': statistic.size, 'size_diff': statistic.size_diff,
+                      'count': statistic.count, 'count_diff': statistic.count_diff}
+                     for statistic in current.compare_to(previous, group_by)[:top]]
+        }
+
+    async def compare(self, window: float, top: int, group_by: str) -> Dict[str, Any]:
+        if group_by not in self.GROUPINGS:
+            raise ValueError(f'{group_by} is not one of {self.GROUPINGS}')
+        if self.running:
+            raise TriggearError(f'{self} is already comparing snapshots')
+        self.running = True
+        started_tracing = not tracemalloc.is_tracing()
+        try:
+            if started_tracing:
+                tracemalloc.start(self.frames)
+                self.__previous = None
+            # INFO: with tracing on since startup, diff covers time since previous request - window is waited only for first one
+            if self.__previous is None:
+                self.__previous = await self.take_snapshot()
+                await asyncio.sleep(min(window, self.max_window))
+            current = await self.take_snapshot()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.running = False
+        previous, self.__previous = self.__previous, None if started_tracing else current
+        return await asyncio.get_event_loop().run_in_executor(None, self.get_report, previous, current, top, group_by)
@@ -0,0 +1,92 @@
+import asyncio
+import collections
+import os
+import sys
+import threading
+from types import FrameType
+from typing import List, Counter, Iterable
+
+from app.exceptions.triggear_error import TriggearError
+
+
+class SamplingProfiler:
+    TASKS_ROOT = 'asyncio-tasks'
+
+    def __repr__(self) -> str:
+        return f"<SamplingProfiler " \
+               f"interval: {self.interval}, " \
+               f"max_duration: {self.max_duration}, " \
+               f"running: {self.running} " \
+               f">"
+
+    def __init__(self,
+                 interval: float,
+                 max_duration: float) -> None:
+        self.interval = interval
+        self.max_duration = max_duration
+        self.running = False
+
+    @staticmethod
+    def format_frame(frame: FrameType) -> str:
+        code = frame.f_code
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+    @staticmethod
+    def collapse(root: str, frames: Iterable[FrameType]) -> str:
+        return ';'.join([root] + [SamplingProfiler.format_frame(frame) for frame in frames])
+
+    @staticmethod
+    def get_thread_frames(frame: FrameType) -> List[FrameType]:
+        frames: List[FrameType] = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        return frames
+
+    @staticmethod
+    def render(samples: Counter[str]) -> str:
+        # INFO: collapsed stacks format read by flamegraph.pl and speedscope
+        return ''.join(f'{stack} {count}\n' for stack, count in samples.most_common())
+
+    def sample_threads(self, samples: Counter[str], sampler_thread_id: int) -> None:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != sampler_thread_id:
+                samples[self.collapse(thread_names.get(thread_id, str(thread_id)), self.get_thread_frames(frame))] += 1
+
+    def sample_tasks(self, samples: Counter[str]) -> None:
+        # INFO: stacks of suspended coroutines show where tasks wait, which thread samples of the loop cannot
+        for task in asyncio.all_tasks():
+            stack = task.get_stack()
+            if stack:
+                samples[self.collapse(self.TASKS_ROOT, stack)] += 1
+
+    async def profile(self, duration: float, include_tasks: bool = False) -> Counter[str]:
+        if self.running:
+            raise TriggearError(f'{self} is already profiling')
+        self.running = True
+        loop = asyncio.get_event_loop()
+        thread_samples: Counter[str] = collections.Counter()
+        task_samples: Counter[str] = collections.Counter()
+        stopped = threading.Event()
+
+        def run_sampler() -> None:
+            sampler_thread_id = threading.get_ident()
+            while not stopped.wait(self.interval):
+                self.sample_threads(thread_samples, sampler_thread_id)
+
+        # INFO: threads are sampled from a separate thread, so busy event loop is sampled too, not only its idle moments
+        sampler = threading.Thread(target=run_sampler, name='sampling-profiler', daemon=True)
+        try:
+            sampler.start()
+            deadline = loop.time() + min(duration, self.max_duration)
+            while loop.time() < deadline:
+                await asyncio.sleep(min(self.interval, deadline - loop.time()) if include_tasks else deadline - loop.time())
+                if include_tasks:
+                    self.sample_tasks(task_samples)
+        finally:
+            stopped.set()
+            await loop.run_in_executor(None, sampler.join)
+            self.running = False
+        return thread_samples + task_samples
@@ -0,0 +1,3 @@
+from app.diagnostics.inflight_tracker import InflightTracker
+
+INFLIGHT = InflightTracker()
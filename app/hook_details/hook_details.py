@@ -1,3 +1,4 @@
+import time
 from typing import Dict, Union, Any
 
 from app.clients.github_client import GithubClient
@@ -6,6 +7,9 @@ from app.mongo.registration_cursor import RegistrationCursor
 
 
 class HookDetails:
+    def __init__(self) -> None:
+        self.received_at = time.monotonic()
+
     def __repr__(self) -> str:
         raise NotImplementedError()
 
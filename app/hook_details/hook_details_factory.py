@@ -5,7 +5,6 @@ from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
 from app.hook_details.push_hook_details import PushHookDetails
 from app.hook_details.release_hook_details import ReleaseHookDetails
 from app.hook_details.tag_hook_details import TagHookDetails
-from app.utilities.functions import flatten_list
 from typing import Set
 
 
@@ -50,10 +49,25 @@ class HookDetailsFactory:
 
     @staticmethod
     def __get_changes(commits: List[Dict]) -> Set[str]:
-        additions = flatten_list([commit['added'] for commit in commits])
-        removals = flatten_list([commit['removed'] for commit in commits])
-        modifications = flatten_list([commit['modified'] for commit in commits])
-        return set(additions + removals + modifications)
+        changes: Set[str] = set()
+        for commit in commits:
+            changes.update(commit['added'])
+            changes.update(commit['removed'])
+            changes.update(commit['modified'])
+        return changes
+
+    @staticmethod
+    def get_pr_labeled_sync_details(data: Dict, labels: List[str]) -> List[LabeledHookDetails]:
+        return [
+            LabeledHookDetails(
+                repository=data['pull_request']['head']['repo']['full_name'],
+                branch=data['pull_request']['head']['ref'],
+                sha=data['pull_request']['head']['sha'],
+                label=label,
+                who=data['sender']['login'],
+                pr_url=data['pull_request']['html_url']
+            ) for label in labels
+        ]
 
     @staticmethod
     def get_labeled_details(data: Dict) -> LabeledHookDetails:
@@ -25,6 +25,7 @@ class LabeledHookDetails(HookDetails):
                  label: str,
                  who: str,
                  pr_url: str) -> None:
+        super().__init__()
         self.repository = repository
         self.branch = branch
         self.sha = sha
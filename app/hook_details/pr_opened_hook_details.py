@@ -19,6 +19,7 @@ class PrOpenedHookDetails(HookDetails):
                  repository: str,
                  branch: str,
                  sha: str) -> None:
+        super().__init__()
         self.repository = repository
         self.branch = branch
         self.sha = sha
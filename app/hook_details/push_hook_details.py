@@ -22,6 +22,7 @@ class PushHookDetails(HookDetails):
                  branch: str,
                  sha: str,
                  changes: Set[str]) -> None:
+        super().__init__()
         self.repository = repository
         self.branch = branch
         self.sha = sha
@@ -21,6 +21,7 @@ class ReleaseHookDetails(HookDetails):
                  tag: str,
                  release_target: str,
                  is_prerelease: bool) -> None:
+        super().__init__()
         self.repository: str = repository
         self.tag: str = tag
         self.release_target: str = release_target
@@ -19,6 +19,7 @@ class TagHookDetails(HookDetails):
                  repository: str,
                  sha: str,
                  tag: str) -> None:
+        super().__init__()
         self.repository = repository
         self.sha = sha
         self.tag = tag
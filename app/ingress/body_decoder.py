@@ -0,0 +1,61 @@
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, List, Tuple, Any
+
+import aiohttp.web
+
+from app.enums.event_types import EventType
+
+
+class BodyDecoder:
+    COMMIT_CHANGE_KEYS = ('added', 'removed', 'modified')
+    COMMIT_KEPT_KEYS = ('id',) + COMMIT_CHANGE_KEYS
+
+    def __repr__(self) -> str:
+        return f"<BodyDecoder " \
+               f"offload_threshold: {self.offload_threshold}, " \
+               f"workers: {self.workers} " \
+               f">"
+
+    def __init__(self,
+                 offload_threshold: int,
+                 workers: int) -> None:
+        self.offload_threshold = offload_threshold
+        self.workers = workers
+        self.__executor: Optional[ProcessPoolExecutor] = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.__executor
+
+    @staticmethod
+    def decode_json(body: bytes) -> Dict:
+        data: Dict = json.loads(body)
+        return data
+
+    @staticmethod
+    def get_slim_object(pairs: List[Tuple[str, Any]]) -> Dict:
+        document = dict(pairs)
+        # INFO: commit is dropped to changed paths as soon as it is parsed - messages, authors and urls of big pushes are never kept
+        if all(key in document for key in BodyDecoder.COMMIT_CHANGE_KEYS):
+            return {key: document[key] for key in BodyDecoder.COMMIT_KEPT_KEYS if key in document}
+        return document
+
+    @staticmethod
+    def decode_push_json(body: bytes) -> Dict:
+        data: Dict = json.loads(body, object_pairs_hook=BodyDecoder.get_slim_object)
+        return data
+
+    async def decode(self, body: bytes, event_header: Optional[str] = None) -> Dict:
+        decode_function = self.decode_push_json if event_header == EventType.PUSH.event_header else self.decode_json
+        # INFO: json.loads holds the GIL for whole decode - large bodies go to other processes so that event loop keeps serving
+        if self.workers > 0 and len(body) >= self.offload_threshold:
+            return await asyncio.get_event_loop().run_in_executor(self.get_executor(), decode_function, body)
+        return decode_function(body)
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
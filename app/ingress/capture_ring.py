@@ -0,0 +1,198 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Optional, Dict, List, Iterator, Mapping
+
+import aiohttp.web
+
+
+class CapturedHook:
+    def __repr__(self) -> str:
+        return f"<CapturedHook " \
+               f"sequence: {self.sequence}, " \
+               f"received_at: {self.received_at}, " \
+               f"event_header: {self.headers.get(CaptureRing.EVENT_HEADER)}, " \
+               f"delivery_id: {self.headers.get(CaptureRing.DELIVERY_HEADER)} " \
+               f">"
+
+    def __init__(self,
+                 sequence: int,
+                 received_at: float,
+                 headers: Dict[str, str],
+                 body: bytes) -> None:
+        self.sequence = sequence
+        self.received_at = received_at
+        self.headers = headers
+        self.body = body
+
+    @property
+    def event_header(self) -> Optional[str]:
+        return self.headers.get(CaptureRing.EVENT_HEADER)
+
+    @staticmethod
+    def encode(headers: Dict[str, str], body: bytes) -> bytes:
+        return json.dumps(headers).encode() + b'\n' + body
+
+    @staticmethod
+    def decode(sequence: int, received_at: float, payload: bytes) -> 'CapturedHook':
+        headers, body = payload.split(b'\n', 1)
+        return CapturedHook(sequence, received_at, json.loads(headers.decode()), body)
+
+
+class CaptureRing:
+    MAGIC = b'TRGCAP01'
+    # INFO: magic, offset of next record, offset of oldest record, number of records, next sequence number
+    FILE_HEADER = struct.Struct('>8sQQQQ')
+    # INFO: payload length, sequence number, receive time and payload CRC32 - length of WRAP means "continue at data start"
+    RECORD_HEADER = struct.Struct('>IQdI')
+    WRAP = 0xFFFFFFFF
+    EVENT_HEADER = 'X-GitHub-Event'
+    DELIVERY_HEADER = 'X-GitHub-Delivery'
+    # INFO: signatures are not captured - replay re-signs bodies with the token of the target instance
+    CAPTURED_HEADERS = (EVENT_HEADER, DELIVERY_HEADER, 'X-GitHub-Hook-ID', 'Content-Type', 'User-Agent')
+
+    def __repr__(self) -> str:
+        return f"<CaptureRing " \
+               f"file_path: {self.file_path}, " \
+               f"size: {self.size}, " \
+               f"records: {self.records}, " \
+               f"captured: {self.captured}, " \
+               f"skipped: {self.skipped} " \
+               f">"
+
+    def __init__(self,
+                 file_path: str,
+                 size: int) -> None:
+        self.file_path = file_path
+        self.size = size
+        self.head = self.FILE_HEADER.size
+        self.tail = self.FILE_HEADER.size
+        self.records = 0
+        self.next_sequence = 1
+        self.captured = 0
+        self.skipped = 0
+        self.__map: Optional[mmap.mmap] = None
+        self.__writable = False
+
+    def open(self, writable: bool = True) -> None:
+        self.__writable = writable
+        previous_size = self.size
+        if writable:
+            fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                previous_size = os.fstat(fd).st_size
+                if previous_size != self.size:
+                    os.ftruncate(fd, self.size)
+                self.__map = mmap.mmap(fd, self.size)
+            finally:
+                os.close(fd)
+        else:
+            with open(self.file_path, 'rb') as capture_file:
+                self.size = previous_size = os.fstat(capture_file.fileno()).st_size
+                self.__map = mmap.mmap(capture_file.fileno(), self.size, access=mmap.ACCESS_READ)
+        magic, head, tail, records, next_sequence = self.FILE_HEADER.unpack_from(self.__map, 0)
+        if magic == self.MAGIC and previous_size == self.size:
+            self.head, self.tail, self.records, self.next_sequence = head, tail, records, next_sequence
+        elif writable:
+            if previous_size > 0:
+                logging.warning(f'{self.file_path} is not a capture ring of size {self.size} - starting an empty one')
+            self.write_file_header()
+        else:
+            raise ValueError(f'{self.file_path} is not a capture ring')
+
+    def close(self) -> None:
+        if self.__map is not None:
+            if self.__writable:
+                self.__map.flush()
+            self.__map.close()
+            self.__map = None
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.open()
+        logging.warning(f'Capturing hooks to {self} - {self.records} records kept from previous runs')
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        self.close()
+
+    def write_file_header(self) -> None:
+        self.FILE_HEADER.pack_into(self.__map, 0, self.MAGIC, self.head, self.tail, self.records, self.next_sequence)
+
+    def is_wrap_at(self, offset: int) -> bool:
+        return self.size - offset < self.RECORD_HEADER.size or struct.unpack_from('>I', self.__map, offset)[0] == self.WRAP
+
+    def evict_oldest(self) -> None:
+        if self.is_wrap_at(self.tail):
+            self.tail = self.FILE_HEADER.size
+            return
+        length = struct.unpack_from('>I', self.__map, self.tail)[0]
+        self.tail += self.RECORD_HEADER.size + length
+        self.records -= 1
+        if self.records == 0:
+            self.tail = self.head
+
+    def append(self, headers: Dict[str, str], body: bytes, received_at: Optional[float] = None) -> bool:
+        if self.__map is None or not self.__writable:
+            raise RuntimeError(f'{self} is not open for writing')
+        payload = CapturedHook.encode(headers, body)
+        record_size = self.RECORD_HEADER.size + len(payload)
+        # INFO: one record may take at most half of the ring - bigger ones would evict everything else
+        if record_size > (self.size - self.FILE_HEADER.size) // 2:
+            self.skipped += 1
+            return False
+        if self.head + record_size > self.size:
+            # INFO: oldest records lying behind head are evicted up to the end of file before head wraps to data start
+            while self.records > 0 and self.tail >= self.head:
+                self.evict_oldest()
+            if self.size - self.head >= self.RECORD_HEADER.size:
+                struct.pack_into('>I', self.__map, self.head, self.WRAP)
+            self.head = self.FILE_HEADER.size
+        while self.records > 0 and self.head <= self.tail < self.head + record_size:
+            self.evict_oldest()
+        if self.records == 0:
+            self.tail = self.head
+        # INFO: evictions are persisted before overwriting, so header never points at a half-written record
+        self.write_file_header()
+        payload_offset = self.head + self.RECORD_HEADER.size
+        self.__map[payload_offset:payload_offset + len(payload)] = payload
+        self.RECORD_HEADER.pack_into(self.__map, self.head, len(payload), self.next_sequence,
+                                     time.time() if received_at is None else received_at, zlib.crc32(payload))
+        self.head += record_size
+        self.records += 1
+        self.next_sequence += 1
+        self.write_file_header()
+        self.captured += 1
+        return True
+
+    def capture(self, request_headers: Mapping[str, str], body: bytes) -> None:
+        try:
+            self.append({header: request_headers[header] for header in self.CAPTURED_HEADERS if header in request_headers}, body)
+        except Exception:
+            logging.exception(f'Could not capture hook to {self}')
+
+    def read(self) -> Iterator[CapturedHook]:
+        if self.__map is None:
+            raise RuntimeError(f'{self} is not open')
+        offset = self.tail
+        for _ in range(self.records):
+            if self.is_wrap_at(offset):
+                offset = self.FILE_HEADER.size
+            length, sequence, received_at, checksum = self.RECORD_HEADER.unpack_from(self.__map, offset)
+            payload = self.__map[offset + self.RECORD_HEADER.size:offset + self.RECORD_HEADER.size + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                logging.warning(f'{self.file_path} has a torn record at offset {offset} - stopping reading')
+                return
+            yield CapturedHook.decode(sequence, received_at, payload)
+            offset += self.RECORD_HEADER.size + length
+
+    @staticmethod
+    def read_file(file_path: str) -> List[CapturedHook]:
+        capture_ring = CaptureRing(file_path, 0)
+        capture_ring.open(writable=False)
+        try:
+            return list(capture_ring.read())
+        finally:
+            capture_ring.close()
@@ -0,0 +1,83 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+import aiohttp.web
+import motor.motor_asyncio
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.metrics.triggear_metrics import DUPLICATE_DELIVERIES
+
+
+class DeliveryDeduplicator:
+    DELIVERIES_DB = 'triggear'
+    DELIVERIES_COLLECTION = 'deliveries'
+
+    def __repr__(self) -> str:
+        return f"<DeliveryDeduplicator " \
+               f"cached: {len(self.__recent)}, " \
+               f"max_entries: {self.max_entries}, " \
+               f"ttl: {self.ttl}, " \
+               f"checked: {self.checked}, " \
+               f"duplicates: {self.duplicates} " \
+               f">"
+
+    def __init__(self,
+                 mongo: motor.motor_asyncio.AsyncIOMotorClient,
+                 max_entries: int,
+                 ttl: int) -> None:
+        self.__mongo = mongo
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.checked = 0
+        self.duplicates = 0
+        self.__recent: OrderedDict = OrderedDict()
+
+    def get_deliveries(self) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        return self.__mongo.get_database(self.DELIVERIES_DB).get_collection(self.DELIVERIES_COLLECTION)
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        await self.get_deliveries().create_index([('timestamp', ASCENDING)], expireAfterSeconds=self.ttl, name='timestamp_ttl')
+
+    def get_cached_count(self) -> int:
+        return len(self.__recent)
+
+    def __remember(self, delivery_id: str) -> bool:
+        if delivery_id in self.__recent:
+            self.__recent.move_to_end(delivery_id)
+            return False
+        self.__recent[delivery_id] = None
+        if len(self.__recent) > self.max_entries:
+            self.__recent.popitem(last=False)
+        return True
+
+    async def is_duplicate(self, delivery_id: Optional[str]) -> bool:
+        if delivery_id is None:
+            return False
+        self.checked += 1
+        if not self.__remember(delivery_id):
+            self.duplicates += 1
+            DUPLICATE_DELIVERIES.inc()
+            return True
+        try:
+            await self.get_deliveries().insert_one({'_id': delivery_id, 'timestamp': datetime.utcnow()})
+        except DuplicateKeyError:
+            self.duplicates += 1
+            DUPLICATE_DELIVERIES.inc()
+            return True
+        except PyMongoError:
+            # INFO: processing a delivery twice is better than dropping it when Mongo is unavailable
+            logging.exception(f'Could not store delivery {delivery_id} - it will be processed without deduplication')
+        return False
+
+    async def forget(self, delivery_id: Optional[str]) -> None:
+        # INFO: delivery that was not accepted gets redelivered by sender - it must not be acked as duplicate then
+        if delivery_id is None:
+            return
+        self.__recent.pop(delivery_id, None)
+        try:
+            await self.get_deliveries().delete_one({'_id': delivery_id})
+        except PyMongoError:
+            logging.exception(f'Could not forget delivery {delivery_id} - its redelivery will be skipped as duplicate')
@@ -0,0 +1,45 @@
+from typing import Dict, Tuple, Optional, FrozenSet
+
+from app.data_objects.github_event import GithubEvent
+from app.enums.event_types import EventType
+
+RouteKey = Tuple[str, Optional[str], Optional[str]]
+
+
+class EventRouter:
+    REF_ROOT = 'refs/'
+
+    @staticmethod
+    def get_event_type_key(event_type: EventType) -> RouteKey:
+        return event_type.event_header, event_type.action, event_type.ref_prefix
+
+    @staticmethod
+    def get_ref_prefix(ref: Optional[str]) -> Optional[str]:
+        if ref is None:
+            return None
+        # INFO: 'refs/heads/feature/x' -> 'refs/heads/', so that branch names with slashes route like any other
+        separator = ref.find('/', len(EventRouter.REF_ROOT))
+        return ref[:separator + 1] if ref.startswith(EventRouter.REF_ROOT) and separator != -1 else ref
+
+    @staticmethod
+    def get_route_key(github_event: GithubEvent) -> RouteKey:
+        return github_event.event_header, github_event.action, EventRouter.get_ref_prefix(github_event.ref)
+
+    @staticmethod
+    def is_handled(event_header: Optional[str]) -> bool:
+        return event_header in HANDLED_EVENT_HEADERS
+
+    @staticmethod
+    def route(github_event: GithubEvent) -> Optional[EventType]:
+        return ROUTES.get(EventRouter.get_route_key(github_event))
+
+    @staticmethod
+    def get_registration_event_types(event_type: EventType) -> Tuple[EventType, ...]:
+        if event_type.collection_name is not None:
+            return event_type,
+        # INFO: sync hooks and comments are handled like PR opened or labeled depending on PR labels
+        return EventType.PR_OPENED, EventType.PR_LABELED
+
+
+ROUTES: Dict[RouteKey, EventType] = {EventRouter.get_event_type_key(event_type): event_type for event_type in EventType}
+HANDLED_EVENT_HEADERS: FrozenSet[str] = frozenset(event_type.event_header for event_type in EventType)
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Callable, Coroutine, Optional, List, Deque, Any
+
+import aiohttp.web
+import motor.motor_asyncio
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from app.data_objects.github_event import GithubEvent
+from app.metrics.triggear_metrics import ADMISSION_BACKLOG, ADMISSION_SPILLED
+from app.tracing.tracer import Span
+from app.tracing.triggear_tracer import TRACER
+
+AdmissionHandler = Callable[[GithubEvent, Dict], Coroutine]
+
+
+class AdmittedEvent:
+    def __repr__(self) -> str:
+        return f"<AdmittedEvent " \
+               f"repository: {self.repository}, " \
+               f"github_event: {self.github_event}, " \
+               f"overflow_id: {self.overflow_id} " \
+               f">"
+
+    def __init__(self,
+                 repository: str,
+                 github_event: GithubEvent,
+                 data: Dict,
+                 overflow_id: Any = None) -> None:
+        self.repository = repository
+        self.github_event = github_event
+        self.data = data
+        self.overflow_id = overflow_id
+        self.span: Optional[Span] = TRACER.get_current_span()
+        self.processed: asyncio.Future = asyncio.get_event_loop().create_future()
+
+    def get_overflow_document(self) -> Dict[str, Any]:
+        # INFO: payload is kept as JSON string - GitHub payload keys are not guaranteed to be valid Mongo field names
+        return {
+            'repository': self.repository,
+            'event_header': self.github_event.event_header,
+            'action': self.github_event.action,
+            'ref': self.github_event.ref,
+            'body': json.dumps(self.data),
+            'timestamp': datetime.utcnow()
+        }
+
+    @staticmethod
+    def from_overflow_document(document: Dict[str, Any]) -> 'AdmittedEvent':
+        return AdmittedEvent(document['repository'],
+                             GithubEvent(document['event_header'], document['action'], document['ref']),
+                             json.loads(document['body']),
+                             document['_id'])
+
+
+class FairAdmission:
+    OVERFLOW_DB = 'triggear'
+    OVERFLOW_COLLECTION = 'overflow'
+    # INFO: drained event is deleted from overflow once processed - lease makes it drainable again if Triggear died before that
+    OVERFLOW_LEASE = timedelta(minutes=10)
+
+    def __repr__(self) -> str:
+        return f"<FairAdmission " \
+               f"workers: {self.workers}, " \
+               f"backlog: {self.backlog}, " \
+               f"repositories: {len(self.__queues)}, " \
+               f"spilled: {self.spilled} " \
+               f">"
+
+    def __init__(self,
+                 mongo: motor.motor_asyncio.AsyncIOMotorClient,
+                 workers: int,
+                 repository_high_water: int,
+                 total_high_water: int,
+                 low_priority_events: List[str],
+                 overflow_drain_interval: float) -> None:
+        self.__mongo = mongo
+        self.workers = workers
+        self.repository_high_water = repository_high_water
+        self.total_high_water = total_high_water
+        self.low_priority_events = low_priority_events
+        self.overflow_drain_interval = overflow_drain_interval
+        self.backlog = 0
+        self.spilled = 0
+        self.__queues: Dict[str, Deque[AdmittedEvent]] = OrderedDict()
+        self.__ready: Deque[str] = deque()
+        self.__available: Optional[asyncio.Semaphore] = None
+        self.__handler: Optional[AdmissionHandler] = None
+        self.__tasks: List[asyncio.Task] = []
+
+    def set_handler(self, handler: AdmissionHandler) -> None:
+        self.__handler = handler
+
+    def get_overflow(self) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        return self.__mongo.get_database(self.OVERFLOW_DB).get_collection(self.OVERFLOW_COLLECTION)
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.__available = asyncio.Semaphore(0)
+        ADMISSION_BACKLOG.set_function(lambda: self.backlog)
+        await self.get_overflow().create_index([('timestamp', ASCENDING)], name='timestamp')
+        loop = asyncio.get_event_loop()
+        self.__tasks = [loop.create_task(self.run_worker()) for _ in range(self.workers)]
+        self.__tasks.append(loop.create_task(self.run_overflow_drainer()))
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        for task in self.__tasks:
+            task.cancel()
+        if self.backlog:
+            logging.warning(f'Leaving {self.backlog} admitted events of {self} unprocessed on shutdown - they are replayed from inbox or overflow')
+
+    @staticmethod
+    def get_event_name(github_event: GithubEvent) -> str:
+        return github_event.event_header if github_event.action is None else f'{github_event.event_header}.{github_event.action}'
+
+    def get_repository_backlog(self) -> Dict[str, int]:
+        return {repository: len(queue) for repository, queue in self.__queues.items()}
+
+    def is_over_high_water(self, repository: str) -> bool:
+        return self.backlog >= self.total_high_water or len(self.__queues.get(repository, ())) >= self.repository_high_water
+
+    async def submit(self, github_event: GithubEvent, data: Dict) -> asyncio.Future:
+        repository = data.get('repository', {}).get('full_name', '')
+        admitted_event = AdmittedEvent(repository, github_event, data)
+        if self.get_event_name(github_event) in self.low_priority_events and self.is_over_high_water(repository):
+            try:
+                await self.get_overflow().insert_one(admitted_event.get_overflow_document())
+                self.spilled += 1
+                ADMISSION_SPILLED.inc()
+                admitted_event.processed.set_result(None)
+                return admitted_event.processed
+            except PyMongoError:
+                logging.exception(f'Could not spill {admitted_event} to overflow - keeping it in memory')
+        self.enqueue(admitted_event)
+        return admitted_event.processed
+
+    def enqueue(self, admitted_event: AdmittedEvent) -> None:
+        if self.__available is None:
+            raise RuntimeError(f'{self} is not started')
+        queue = self.__queues.get(admitted_event.repository)
+        if queue is None:
+            queue = self.__queues[admitted_event.repository] = deque()
+            self.__ready.append(admitted_event.repository)
+        queue.append(admitted_event)
+        self.backlog += 1
+        self.__available.release()
+
+    def dequeue(self) -> AdmittedEvent:
+        # INFO: repositories are served round-robin - a busy one goes to the back of the line after every event it gets
+        repository = self.__ready.popleft()
+        queue = self.__queues[repository]
+        admitted_event = queue.popleft()
+        if queue:
+            self.__ready.append(repository)
+        else:
+            del self.__queues[repository]
+        self.backlog -= 1
+        return admitted_event
+
+    async def process(self, admitted_event: AdmittedEvent) -> None:
+        try:
+            if self.__handler is None:
+                raise RuntimeError(f'{self} has no handler set')
+            with TRACER.activate(admitted_event.span):
+                await self.__handler(admitted_event.github_event, admitted_event.data)
+        except asyncio.CancelledError:
+            # INFO: event interrupted by stop stays in inbox log or leased in overflow - it is processed again after restart
+            raise
+        except Exception:
+            logging.exception(f'Processing of {admitted_event} failed')
+        if admitted_event.overflow_id is not None:
+            await self.forget_overflow(admitted_event)
+        if not admitted_event.processed.done():
+            admitted_event.processed.set_result(None)
+
+    async def forget_overflow(self, admitted_event: AdmittedEvent) -> None:
+        try:
+            await self.get_overflow().delete_one({'_id': admitted_event.overflow_id})
+        except PyMongoError:
+            logging.exception(f'Could not delete processed {admitted_event} from overflow - it will be processed again after its lease')
+
+    async def run_worker(self) -> None:
+        while True:
+            await self.__available.acquire()
+            await self.process(self.dequeue())
+
+    async def drain_overflow(self) -> int:
+        drained = 0
+        # INFO: spilled events are taken back only while backlog is under half of the high-water mark
+        while self.backlog < self.total_high_water // 2:
+            now = datetime.utcnow()
+            document = await self.get_overflow().find_one_and_update({'leased_until': {'$not': {'$gt': now}}},
+                                                                     {'$set': {'leased_until': now + self.OVERFLOW_LEASE}},
+                                                                     sort=[('timestamp', ASCENDING)])
+            if document is None:
+                break
+            self.enqueue(AdmittedEvent.from_overflow_document(document))
+            drained += 1
+        return drained
+
+    async def run_overflow_drainer(self) -> None:
+        while True:
+            await asyncio.sleep(self.overflow_drain_interval)
+            try:
+                drained = await self.drain_overflow()
+                if drained:
+                    logging.warning(f'Drained {drained} spilled events back into {self}')
+            except PyMongoError:
+                logging.exception(f'Could not drain overflow of {self}')
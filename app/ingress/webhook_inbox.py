@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Awaitable, Optional, List, Set
+
+import aiohttp.web
+
+from app.ingress.write_ahead_log import WriteAheadLog
+from app.metrics.triggear_metrics import INBOX_QUEUED, INBOX_CHECKPOINT
+from app.tracing.tracer import Span
+from app.tracing.triggear_tracer import TRACER
+
+
+class InboxEntry:
+    def __repr__(self) -> str:
+        return f"<InboxEntry " \
+               f"sequence: {self.sequence}, " \
+               f"event_header: {self.event_header}, " \
+               f"delivery_id: {self.delivery_id} " \
+               f">"
+
+    def __init__(self,
+                 sequence: int,
+                 event_header: Optional[str],
+                 delivery_id: Optional[str],
+                 body: bytes) -> None:
+        self.sequence = sequence
+        self.event_header = event_header
+        self.delivery_id = delivery_id
+        self.body = body
+        # INFO: entries replayed from the log after restart start new traces
+        self.span: Optional[Span] = TRACER.get_current_span()
+
+    @staticmethod
+    def encode(event_header: Optional[str], delivery_id: Optional[str], body: bytes) -> bytes:
+        return json.dumps({'event': event_header, 'delivery': delivery_id}).encode() + b'\n' + body
+
+    @staticmethod
+    def decode(sequence: int, payload: bytes) -> 'InboxEntry':
+        headers, body = payload.split(b'\n', 1)
+        decoded_headers = json.loads(headers.decode())
+        return InboxEntry(sequence, decoded_headers['event'], decoded_headers['delivery'], body)
+
+
+# INFO: handler returns a future when it handed entry over for processing elsewhere - entry is done once it resolves
+InboxHandler = Callable[[InboxEntry], Awaitable[Optional[asyncio.Future]]]
+
+
+class WebhookInbox:
+    def __repr__(self) -> str:
+        return f"<WebhookInbox " \
+               f"workers: {self.workers}, " \
+               f"checkpoint: {self.checkpoint}, " \
+               f"queued: {self.__queue.qsize() if self.__queue is not None else 0} " \
+               f">"
+
+    def __init__(self,
+                 write_ahead_log: WriteAheadLog,
+                 workers: int,
+                 checkpoint_interval: float) -> None:
+        self.__write_ahead_log = write_ahead_log
+        self.workers = workers
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint = 0
+        self.__persisted_checkpoint = 0
+        self.__done: Set[int] = set()
+        self.__handler: Optional[InboxHandler] = None
+        self.__queue: Optional[asyncio.Queue] = None
+        self.__tasks: List[asyncio.Task] = []
+
+    def set_handler(self, handler: InboxHandler) -> None:
+        self.__handler = handler
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.__queue = asyncio.Queue()
+        INBOX_QUEUED.set_function(self.__queue.qsize)
+        INBOX_CHECKPOINT.set_function(lambda: self.checkpoint)
+        unprocessed = await self.__write_ahead_log.open()
+        self.checkpoint = self.__persisted_checkpoint = self.__write_ahead_log.read_checkpoint()
+        if unprocessed:
+            logging.warning(f'Replaying {len(unprocessed)} unprocessed hooks from {self.__write_ahead_log}')
+        for sequence, payload in unprocessed:
+            self.__queue.put_nowait(InboxEntry.decode(sequence, payload))
+        loop = asyncio.get_event_loop()
+        self.__tasks = [loop.create_task(self.run_worker()) for _ in range(self.workers)]
+        self.__tasks.append(loop.create_task(self.run_checkpointer()))
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        # INFO: entries that were not processed yet stay in the log and will be replayed on next start
+        await self.persist_checkpoint()
+        await self.__write_ahead_log.close()
+
+    async def accept(self, event_header: Optional[str], delivery_id: Optional[str], body: bytes) -> None:
+        if self.__queue is None:
+            raise RuntimeError(f'{self} is not started')
+        sequence, committed = self.__write_ahead_log.append(InboxEntry.encode(event_header, delivery_id, body))
+        try:
+            await committed
+        except Exception:
+            # INFO: sender will get an error and redeliver - do not block checkpoint on this entry
+            self.mark_done(sequence)
+            raise
+        self.__queue.put_nowait(InboxEntry(sequence, event_header, delivery_id, body))
+
+    def mark_done(self, sequence: int) -> None:
+        self.__done.add(sequence)
+        while self.checkpoint + 1 in self.__done:
+            self.checkpoint += 1
+            self.__done.remove(self.checkpoint)
+
+    async def process(self, entry: InboxEntry) -> None:
+        try:
+            if self.__handler is None:
+                raise RuntimeError(f'{self} has no handler set')
+            with TRACER.activate(entry.span):
+                processed = await self.__handler(entry)
+        except asyncio.CancelledError:
+            # INFO: entry interrupted by stop is not checkpointed - it will be replayed on next start
+            raise
+        except Exception:
+            logging.exception(f'Processing of {entry} failed')
+            processed = None
+        if processed is None:
+            self.mark_done(entry.sequence)
+        else:
+            processed.add_done_callback(lambda future: self.__mark_processed(entry.sequence, future))
+
+    def __mark_processed(self, sequence: int, processed: asyncio.Future) -> None:
+        if not processed.cancelled():
+            self.mark_done(sequence)
+
+    async def run_worker(self) -> None:
+        while True:
+            entry: InboxEntry = await self.__queue.get()
+            await self.process(entry)
+
+    async def persist_checkpoint(self) -> None:
+        if self.checkpoint > self.__persisted_checkpoint:
+            checkpoint = self.checkpoint
+            await asyncio.get_event_loop().run_in_executor(None, self.__write_ahead_log.write_checkpoint, checkpoint)
+            self.__persisted_checkpoint = checkpoint
+
+    async def run_checkpointer(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self.persist_checkpoint()
+            except Exception:
+                logging.exception(f'Could not persist checkpoint of {self}')
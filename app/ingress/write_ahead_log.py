@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import struct
+import zlib
+from typing import List, Tuple, Optional, IO
+
+
+class WriteAheadLog:
+    SEGMENT_SUFFIX = '.log'
+    CHECKPOINT_FILE = 'checkpoint'
+    # INFO: every record is prefixed with its sequence number, payload length and payload CRC32
+    RECORD_HEADER = struct.Struct('>QII')
+
+    def __repr__(self) -> str:
+        return f"<WriteAheadLog " \
+               f"directory: {self.directory}, " \
+               f"segment_size: {self.segment_size}, " \
+               f"next_sequence: {self.next_sequence} " \
+               f">"
+
+    def __init__(self,
+                 directory: str,
+                 segment_size: int) -> None:
+        self.directory = directory
+        self.segment_size = segment_size
+        self.next_sequence = 1
+        self.__segment: Optional[IO[bytes]] = None
+        self.__sealed_segments: List[IO[bytes]] = []
+        self.__pending: List[Tuple[int, asyncio.Future]] = []
+        self.__commit_requested: Optional[asyncio.Event] = None
+        self.__committer: Optional[asyncio.Task] = None
+
+    def get_segment_path(self, first_sequence: int) -> str:
+        return os.path.join(self.directory, f'{first_sequence:020d}{self.SEGMENT_SUFFIX}')
+
+    def get_segments(self) -> List[Tuple[int, str]]:
+        return sorted((int(file_name[:-len(self.SEGMENT_SUFFIX)]), os.path.join(self.directory, file_name))
+                      for file_name in os.listdir(self.directory) if file_name.endswith(self.SEGMENT_SUFFIX))
+
+    def read_checkpoint(self) -> int:
+        checkpoint_path = os.path.join(self.directory, self.CHECKPOINT_FILE)
+        if not os.path.isfile(checkpoint_path):
+            return 0
+        with open(checkpoint_path, 'r') as checkpoint_file:
+            return int(checkpoint_file.read().strip() or 0)
+
+    def write_checkpoint(self, sequence: int) -> None:
+        checkpoint_path = os.path.join(self.directory, self.CHECKPOINT_FILE)
+        with open(f'{checkpoint_path}.tmp', 'w') as checkpoint_file:
+            checkpoint_file.write(str(sequence))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(f'{checkpoint_path}.tmp', checkpoint_path)
+        segments = self.get_segments()
+        # INFO: segment can be dropped once the first record of the following one is not newer than checkpoint
+        for (_, segment_path), (next_first_sequence, _) in zip(segments, segments[1:]):
+            if next_first_sequence - 1 <= sequence:
+                os.remove(segment_path)
+
+    def read_segment(self, segment_path: str) -> List[Tuple[int, bytes]]:
+        records: List[Tuple[int, bytes]] = []
+        with open(segment_path, 'rb') as segment:
+            data = segment.read()
+        offset = 0
+        while offset + self.RECORD_HEADER.size <= len(data):
+            sequence, length, checksum = self.RECORD_HEADER.unpack_from(data, offset)
+            payload = data[offset + self.RECORD_HEADER.size:offset + self.RECORD_HEADER.size + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                break
+            records.append((sequence, payload))
+            offset += self.RECORD_HEADER.size + length
+        if offset != len(data):
+            logging.warning(f'Segment {segment_path} has torn record at offset {offset} - ignoring its tail')
+        return records
+
+    def read_unprocessed(self) -> List[Tuple[int, bytes]]:
+        checkpoint = self.read_checkpoint()
+        records: List[Tuple[int, bytes]] = []
+        last_sequence = checkpoint
+        for _, segment_path in self.get_segments():
+            for sequence, payload in self.read_segment(segment_path):
+                last_sequence = max(last_sequence, sequence)
+                if sequence > checkpoint:
+                    records.append((sequence, payload))
+        self.next_sequence = last_sequence + 1
+        return records
+
+    async def open(self) -> List[Tuple[int, bytes]]:
+        os.makedirs(self.directory, exist_ok=True)
+        unprocessed = self.read_unprocessed()
+        # INFO: new segment is always started so that a torn tail of the previous one is never appended to
+        self.__segment = open(self.get_segment_path(self.next_sequence), 'ab')
+        self.__commit_requested = asyncio.Event()
+        self.__committer = asyncio.get_event_loop().create_task(self.run_committer())
+        return unprocessed
+
+    def append(self, payload: bytes) -> Tuple[int, asyncio.Future]:
+        if self.__segment is None or self.__commit_requested is None:
+            raise RuntimeError(f'{self} is not open')
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self.__segment.write(self.RECORD_HEADER.pack(sequence, len(payload), zlib.crc32(payload)) + payload)
+        committed: asyncio.Future = asyncio.get_event_loop().create_future()
+        self.__pending.append((sequence, committed))
+        if self.__segment.tell() >= self.segment_size:
+            self.__sealed_segments.append(self.__segment)
+            self.__segment = open(self.get_segment_path(self.next_sequence), 'ab')
+        self.__commit_requested.set()
+        return sequence, committed
+
+    @staticmethod
+    def sync(segments: List[IO[bytes]], sealed_segments: List[IO[bytes]]) -> None:
+        for segment in segments:
+            segment.flush()
+            os.fsync(segment.fileno())
+        for segment in sealed_segments:
+            segment.close()
+
+    async def commit(self) -> None:
+        # INFO: group commit - every record appended since previous fsync is made durable by a single fsync
+        pending, self.__pending = self.__pending, []
+        sealed_segments, self.__sealed_segments = self.__sealed_segments, []
+        if not pending and not sealed_segments:
+            return
+        segments = sealed_segments + ([self.__segment] if self.__segment is not None else [])
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self.sync, segments, sealed_segments)
+        except Exception as exception:
+            logging.exception(f'Could not commit {len(pending)} records to {self}')
+            for _, committed in pending:
+                if not committed.done():
+                    committed.set_exception(exception)
+            return
+        for sequence, committed in pending:
+            if not committed.done():
+                committed.set_result(sequence)
+
+    async def run_committer(self) -> None:
+        while True:
+            await self.__commit_requested.wait()
+            self.__commit_requested.clear()
+            await self.commit()
+
+    async def close(self) -> None:
+        if self.__committer is not None:
+            self.__committer.cancel()
+        await self.commit()
+        if self.__segment is not None:
+            self.__segment.close()
+            self.__segment = None
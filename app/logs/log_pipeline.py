@@ -0,0 +1,90 @@
+import logging
+import logging.handlers
+import queue
+from typing import Optional, List
+
+import aiohttp.web
+
+from app.logs.rate_limit_filter import RateLimitFilter
+from app.logs.structured_formatters import JsonFormatter, TextFormatter
+from app.metrics.triggear_metrics import LOG_RECORDS_SUPPRESSED
+from app.tracing.trace_log_filter import TraceLogFilter
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # INFO: queue is in-process - message and lazy fields are formatted on writer thread, not on the event loop
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_SUPPRESSED.labels('queue_full').inc()
+
+
+class LogWriter(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # INFO: queue may be full on shutdown - waiting for writer keeps records logged before it
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    def __repr__(self) -> str:
+        return f"<LogPipeline " \
+               f"queue_size: {self.queue_size}, " \
+               f"json_format: {self.json_format}, " \
+               f"level: {self.level}, " \
+               f"dropped: {self.dropped} " \
+               f">"
+
+    def __init__(self,
+                 queue_size: int,
+                 json_format: bool,
+                 level: str,
+                 rate_limit_filter: Optional[RateLimitFilter] = None) -> None:
+        self.queue_size = queue_size
+        self.json_format = json_format
+        self.level = level
+        self.__rate_limit_filter = rate_limit_filter
+        self.__handlers: List[logging.Handler] = []
+        self.__queue_handler: Optional[NonBlockingQueueHandler] = None
+        self.__writer: Optional[LogWriter] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.__queue_handler.dropped if self.__queue_handler is not None else 0
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.install()
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        self.uninstall()
+
+    def install(self) -> None:
+        logging.root.setLevel(self.level)
+        formatter = JsonFormatter() if self.json_format else TextFormatter()
+        self.__handlers = list(logging.root.handlers)
+        for handler in self.__handlers:
+            handler.setFormatter(formatter)
+        log_queue: queue.Queue = queue.Queue(self.queue_size)
+        self.__queue_handler = NonBlockingQueueHandler(log_queue)
+        # INFO: trace id lives in context of the logging caller - it has to be read before record is queued
+        self.__queue_handler.addFilter(TraceLogFilter())
+        if self.__rate_limit_filter is not None:
+            self.__queue_handler.addFilter(self.__rate_limit_filter)
+        self.__writer = LogWriter(log_queue, *self.__handlers, respect_handler_level=True)
+        self.__writer.start()
+        logging.root.handlers = [self.__queue_handler]
+
+    def uninstall(self) -> None:
+        if self.__writer is None:
+            return
+        logging.root.handlers = self.__handlers
+        self.__writer.stop()
+        self.__writer = None
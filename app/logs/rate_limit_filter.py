@@ -0,0 +1,65 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Tuple, Callable
+
+from app.metrics.triggear_metrics import LOG_RECORDS_SUPPRESSED
+
+LogKey = Tuple[str, int]
+
+
+class RateLimitFilter(logging.Filter):
+    def __repr__(self) -> str:
+        return f"<RateLimitFilter " \
+               f"rate: {self.rate}, " \
+               f"burst: {self.burst}, " \
+               f"debug_sample_rate: {self.debug_sample_rate}, " \
+               f"keys: {len(self.__buckets)} " \
+               f">"
+
+    def __init__(self,
+                 rate: float,
+                 burst: int,
+                 debug_sample_rate: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sampler: Callable[[], float] = random.random) -> None:
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.debug_sample_rate = debug_sample_rate
+        self.__clock = clock
+        self.__sampler = sampler
+        self.__buckets: Dict[LogKey, Tuple[float, float]] = {}
+        self.__suppressed: Dict[LogKey, int] = {}
+        # INFO: records come from event loop and executor threads alike
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def get_key(record: logging.LogRecord) -> LogKey:
+        # INFO: call site is the message key - f-string messages differ for every record, their call sites do not
+        return record.pathname, record.lineno
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1 and self.__sampler() >= self.debug_sample_rate:
+            LOG_RECORDS_SUPPRESSED.labels('sampled').inc()
+            return False
+        if self.rate <= 0:
+            return True
+        key = self.get_key(record)
+        now = self.__clock()
+        with self.__lock:
+            tokens, updated_at = self.__buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+            if tokens < 1:
+                self.__buckets[key] = tokens, now
+                self.__suppressed[key] = self.__suppressed.get(key, 0) + 1
+                LOG_RECORDS_SUPPRESSED.labels('rate_limited').inc()
+                return False
+            self.__buckets[key] = tokens - 1, now
+            suppressed = self.__suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
@@ -0,0 +1,63 @@
+import datetime
+import functools
+import json
+import logging
+from typing import Dict, Any, Mapping
+
+
+def log_fields(**fields: Any) -> Dict[str, Dict[str, Any]]:
+    # INFO: callable values are evaluated by formatter - on writer thread and only for records that passed level and rate limits
+    return {'fields': fields}
+
+
+def get_item(mapping: Mapping, key: str) -> Any:
+    return mapping.get(key)
+
+
+def log_items(mapping: Mapping, *keys: str) -> Dict[str, Dict[str, Any]]:
+    return log_fields(**{key: functools.partial(get_item, mapping, key) for key in keys})
+
+
+def get_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {}
+    for key, value in (getattr(record, 'fields', None) or {}).items():
+        try:
+            fields[key] = value() if callable(value) else value
+        except Exception as exception:
+            fields[key] = f'<could not evaluate: {exception!r}>'
+    return fields
+
+
+class TextFormatter(logging.Formatter):
+    FORMAT = '%(asctime)s %(levelname)-8s [%(trace_id)s] %(message)s'
+    DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self) -> None:
+        super().__init__(self.FORMAT, self.DATE_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        for key, value in get_fields(record).items():
+            message += f' {key}={value}'
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            message += f' ({suppressed} similar messages suppressed)'
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        document: Dict[str, Any] = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'trace_id': getattr(record, 'trace_id', None),
+            'message': record.getMessage()
+        }
+        document.update(get_fields(record))
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            document['suppressed'] = suppressed
+        if record.exc_info:
+            document['exception'] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
@@ -1,36 +1,145 @@
+import asyncio
+import logging
 import os
+import signal
+import socket
+import time
+from typing import Optional, Callable, Dict, Any
 
 import motor.motor_asyncio
 from aiohttp import web
 
+from app.builds.build_debouncer import BuildDebouncer
 from app.clients.github_client import GithubClient
 from app.clients.jenkinses_clients import JenkinsesClients
 from app.clients.mongo_client import MongoClient
 from app.config.triggear_config import TriggearConfig
+from app.controllers.diagnostics_controller import DiagnosticsController
 from app.controllers.github_controller import GithubController
 from app.controllers.health_controller import HealthController
+from app.controllers.metrics_controller import MetricsController
 from app.controllers.pipeline_controller import PipelineController
+from app.diagnostics.inflight_report import InflightReport
+from app.diagnostics.memory_snapshots import MemorySnapshots
+from app.diagnostics.sampling_profiler import SamplingProfiler
+from app.diagnostics.triggear_inflight import INFLIGHT
+from app.exceptions.triggear_error import TriggearError
+from app.ingress.body_decoder import BodyDecoder
+from app.ingress.capture_ring import CaptureRing
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.ingress.fair_admission import FairAdmission
+from app.ingress.webhook_inbox import WebhookInbox
+from app.ingress.write_ahead_log import WriteAheadLog
+from app.logs.log_pipeline import LogPipeline
+from app.logs.rate_limit_filter import RateLimitFilter
+from app.middlewares.api_budget_middleware import api_budget
 from app.middlewares.authentication_middleware import AuthenticationMiddleware
+from app.metrics.event_loop_monitor import EventLoopMonitor
+from app.metrics.mongo_command_listener import MongoCommandListener
+from app.metrics.triggear_metrics import REGISTRY
 from app.middlewares.exceptions_middleware import exceptions
+from app.mongo.registered_repositories import RegisteredRepositories
 from app.routes import Routes
+from app.tasks.task_supervisor import TaskSupervisor
+from app.tracing.span_exporter import SpanExporter
+from app.tracing.triggear_tracer import TRACER
 from app.triggear_heart import TriggearHeart
+from app.workers.job_catalog_refresher import JobCatalogRefresher
 
 
-def main() -> None:
-    app_config = TriggearConfig()
-    motor_mongo = motor.motor_asyncio.AsyncIOMotorClient(os.environ.get('MONGO_URL'))
+def create_app(app_config: TriggearConfig, worker_id: Optional[int] = None) -> web.Application:
+    log_pipeline = LogPipeline(queue_size=app_config.log_queue_size,
+                               json_format=app_config.log_json_format,
+                               level=app_config.log_level,
+                               rate_limit_filter=RateLimitFilter(rate=app_config.log_rate_per_key,
+                                                                 burst=app_config.log_burst_per_key,
+                                                                 debug_sample_rate=app_config.log_debug_sample_rate))
+    motor_mongo = motor.motor_asyncio.AsyncIOMotorClient(os.environ.get('MONGO_URL'), event_listeners=[MongoCommandListener()])
+
+    # INFO: like inbox, traces file is local to a process - every worker appends to its own file
+    traces_path = app_config.tracing_file_path
+    if traces_path is not None and worker_id is not None:
+        traces_path = f'{traces_path}.worker-{worker_id}'
+    span_exporter = SpanExporter(file_path=traces_path,
+                                 collector_url=app_config.tracing_collector_url,
+                                 flush_interval=app_config.tracing_flush_interval)
+    TRACER.configure(sample_rate=app_config.tracing_sample_rate, exporter=span_exporter)
 
-    gh_client = GithubClient(app_config.github_token)
-    mongo_client = MongoClient(mongo=motor_mongo)
+    gh_client = GithubClient(app_config.github_token,
+                             trace_target_url=app_config.tracing_debug_target_url,
+                             api_url=app_config.github_api_url)
+    mongo_client = MongoClient(mongo=motor_mongo, config=app_config)
     jenkinses_clients = JenkinsesClients(app_config)
-    triggear_heart = TriggearHeart(mongo_client, gh_client, jenkinses_clients)
+    registered_repositories = RegisteredRepositories(mongo_client=mongo_client,
+                                                     refresh_interval=app_config.registered_repositories_refresh_interval,
+                                                     unknown_ttl=app_config.registered_repositories_unknown_ttl)
+    task_supervisor = TaskSupervisor(max_concurrency=app_config.task_max_concurrency,
+                                     group_concurrency=app_config.task_group_concurrency,
+                                     drain_timeout=app_config.task_drain_timeout)
+    build_debouncer = BuildDebouncer(window=app_config.build_debounce_window,
+                                     abort_superseded=app_config.build_abort_superseded,
+                                     task_supervisor=task_supervisor)
+    triggear_heart = TriggearHeart(mongo_client, gh_client, jenkinses_clients, build_debouncer, task_supervisor)
+    delivery_deduplicator = DeliveryDeduplicator(mongo=motor_mongo,
+                                                 max_entries=app_config.delivery_cache_size,
+                                                 ttl=app_config.delivery_ttl)
+    # INFO: write-ahead log is local to a process - every worker gets its own inbox directory
+    inbox_directory = app_config.inbox_directory if worker_id is None else os.path.join(app_config.inbox_directory, f'worker-{worker_id}')
+    webhook_inbox = WebhookInbox(write_ahead_log=WriteAheadLog(directory=inbox_directory,
+                                                               segment_size=app_config.inbox_segment_size),
+                                 workers=app_config.inbox_workers,
+                                 checkpoint_interval=app_config.inbox_checkpoint_interval)
+    job_catalog_refresher = JobCatalogRefresher(config=app_config, jenkinses_clients=jenkinses_clients)
 
-    github_controller = GithubController(triggear_heart=triggear_heart, github_client=gh_client, config=app_config)
-    pipeline_controller = PipelineController(github_client=gh_client, mongo_client=mongo_client)
-    health_controller = HealthController()
-    authentication_middleware = AuthenticationMiddleware(config=app_config)
+    fair_admission = FairAdmission(mongo=motor_mongo,
+                                   workers=app_config.admission_workers,
+                                   repository_high_water=app_config.admission_repository_high_water,
+                                   total_high_water=app_config.admission_total_high_water,
+                                   low_priority_events=app_config.admission_low_priority_events,
+                                   overflow_drain_interval=app_config.admission_overflow_drain_interval)
+    capture_ring: Optional[CaptureRing] = None
+    if app_config.capture_file_path is not None:
+        # INFO: ring file is mapped by a single writer - every worker captures to its own file
+        capture_path = app_config.capture_file_path if worker_id is None else f'{app_config.capture_file_path}.worker-{worker_id}'
+        capture_ring = CaptureRing(file_path=capture_path, size=app_config.capture_size)
+    body_decoder = BodyDecoder(offload_threshold=app_config.body_offload_threshold, workers=app_config.body_decode_workers)
+    github_controller = GithubController(triggear_heart=triggear_heart,
+                                         github_client=gh_client,
+                                         config=app_config,
+                                         delivery_deduplicator=delivery_deduplicator,
+                                         webhook_inbox=webhook_inbox,
+                                         body_decoder=body_decoder,
+                                         task_supervisor=task_supervisor,
+                                         fair_admission=fair_admission,
+                                         registered_repositories=registered_repositories,
+                                         capture_ring=capture_ring)
+    webhook_inbox.set_handler(github_controller.handle_inbox_entry)
+    fair_admission.set_handler(github_controller.process_event)
+    pipeline_controller = PipelineController(github_client=gh_client,
+                                             mongo_client=mongo_client,
+                                             registered_repositories=registered_repositories)
+    health_controller = HealthController(delivery_deduplicator=delivery_deduplicator, task_supervisor=task_supervisor)
+    metrics_controller = MetricsController(registry=REGISTRY, worker_id=worker_id)
+    event_loop_monitor = EventLoopMonitor(interval=app_config.loop_monitor_interval,
+                                          slow_callback_threshold=app_config.loop_monitor_slow_callback_threshold)
+    memory_snapshots = MemorySnapshots(frames=app_config.tracemalloc_frames,
+                                       trace_on_startup=app_config.tracemalloc_on_startup,
+                                       max_window=app_config.max_profile_seconds)
+    diagnostics_controller = DiagnosticsController(sampling_profiler=SamplingProfiler(interval=app_config.profile_interval,
+                                                                                      max_duration=app_config.max_profile_seconds),
+                                                   memory_snapshots=memory_snapshots,
+                                                   inflight_report=InflightReport(inflight_tracker=INFLIGHT,
+                                                                                  task_supervisor=task_supervisor,
+                                                                                  build_debouncer=build_debouncer,
+                                                                                  mongo_client=mongo_client,
+                                                                                  delivery_deduplicator=delivery_deduplicator,
+                                                                                  registered_repositories=registered_repositories,
+                                                                                  jenkinses_clients=jenkinses_clients))
+    authentication_middleware = AuthenticationMiddleware(config=app_config, offload_threshold=app_config.body_offload_threshold)
 
-    app = web.Application(middlewares=(authentication_middleware.authentication, exceptions))
+    # INFO: GitHub caps hook payloads at 25 MB - aiohttp default of 1 MB would reject big pushes with 413
+    app = web.Application(middlewares=(authentication_middleware.authentication, exceptions, api_budget),
+                          client_max_size=app_config.max_body_size)
     app.router.add_post(Routes.GITHUB.route, github_controller.handle_hook)
     app.router.add_post(Routes.REGISTER.route, pipeline_controller.handle_register)
     app.router.add_post(Routes.STATUS.route, pipeline_controller.handle_status)
@@ -41,8 +150,111 @@ def main() -> None:
     app.router.add_post(Routes.CLEAR.route, pipeline_controller.handle_clear)
     app.router.add_post(Routes.DEPLOYMENT.route, pipeline_controller.handle_deployment)
     app.router.add_post(Routes.DEPLOYMENT_STATUS.route, pipeline_controller.handle_deployment_status)
+    app.router.add_get(Routes.METRICS.route, metrics_controller.handle_metrics)
+    app.router.add_get(Routes.PROFILE.route, diagnostics_controller.handle_profile)
+    app.router.add_get(Routes.MEMORY.route, diagnostics_controller.handle_memory)
+    app.router.add_get(Routes.INFLIGHT.route, diagnostics_controller.handle_inflight)
+
+    # INFO: writer thread is started on startup - in forked workers, not in the supervisor before fork
+    app.on_startup.append(log_pipeline.start)
+    app.on_startup.append(span_exporter.start)
+    app.on_startup.append(event_loop_monitor.start)
+    app.on_startup.append(memory_snapshots.start)
+    app.on_startup.append(mongo_client.start)
+    app.on_startup.append(registered_repositories.start)
+    app.on_startup.append(delivery_deduplicator.start)
+    app.on_startup.append(job_catalog_refresher.start)
+    app.on_startup.append(fair_admission.start)
+    app.on_startup.append(webhook_inbox.start)
+    if capture_ring is not None:
+        app.on_startup.append(capture_ring.start)
+    # INFO: aiohttp stops accepting connections before on_shutdown - debounced triggers, in-flight hooks and builds get drain_timeout to finish
+    app.on_shutdown.append(build_debouncer.stop)
+    app.on_shutdown.append(task_supervisor.drain)
+    app.on_cleanup.append(webhook_inbox.stop)
+    if capture_ring is not None:
+        app.on_cleanup.append(capture_ring.stop)
+    app.on_cleanup.append(fair_admission.stop)
+    app.on_cleanup.append(body_decoder.stop)
+    app.on_cleanup.append(registered_repositories.stop)
+    app.on_cleanup.append(job_catalog_refresher.stop)
+    app.on_cleanup.append(mongo_client.stop)
+    app.on_cleanup.append(memory_snapshots.stop)
+    app.on_cleanup.append(event_loop_monitor.stop)
+    app.on_cleanup.append(span_exporter.stop)
+    app.on_cleanup.append(log_pipeline.stop)
+    return app
+
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+def run_worker(app_config: TriggearConfig, worker_id: int) -> None:
+    # INFO: supervisor signal handlers and event loop must not leak into forked worker
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    logging.warning(f'Worker {worker_id} started with pid {os.getpid()}')
+    web.run_app(create_app(app_config, worker_id), sock=create_reuseport_socket(app_config.ingress_host, app_config.ingress_port))
+
+
+def fork_worker(worker_target: Callable[[int], None], worker_id: int) -> int:
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        exit_code = 0
+        try:
+            worker_target(worker_id)
+        except Exception:
+            logging.exception(f'Worker {worker_id} crashed')
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
 
-    web.run_app(app)
+
+def run_supervised_workers(workers: int, worker_target: Callable[[int], None], restart_delay: float = 1) -> None:
+    children: Dict[int, int] = {fork_worker(worker_target, worker_id): worker_id for worker_id in range(workers)}
+    stopping = False
+
+    def stop_workers(signal_number: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    signal.signal(signal.SIGINT, stop_workers)
+    while children:
+        pid, status = os.wait()
+        worker_id = children.pop(pid, None)
+        # INFO: clean exit means the worker was asked to shut down - only crashed workers are restarted
+        if worker_id is None or stopping or status == 0:
+            continue
+        logging.error(f'Worker {worker_id} (pid {pid}) exited with status {status} - restarting it')
+        time.sleep(restart_delay)
+        children[fork_worker(worker_target, worker_id)] = worker_id
+
+
+def check_multiprocess_config(app_config: TriggearConfig) -> None:
+    # INFO: debounce windows and in-flight builds to supersede live in memory of one process - workers cannot see each other's
+    if app_config.ingress_workers > 1 and (app_config.build_debounce_window > 0 or app_config.build_abort_superseded):
+        raise TriggearError(f'ingress.workers is {app_config.ingress_workers}, but build_debounce is enabled - builds are debounced '
+                            f'only within one process, so set build_debounce.window to 0 and abort_superseded to false or use one worker')
+
+
+def main() -> None:
+    app_config = TriggearConfig()
+    check_multiprocess_config(app_config)
+    if app_config.ingress_workers > 1:
+        run_supervised_workers(app_config.ingress_workers, lambda worker_id: run_worker(app_config, worker_id))
+    else:
+        web.run_app(create_app(app_config), host=app_config.ingress_host, port=app_config.ingress_port)
 
 
 if __name__ == "__main__":  # pragma: no cover
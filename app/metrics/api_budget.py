@@ -0,0 +1,120 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional, Counter, Iterator
+
+from app.logs.structured_formatters import log_fields
+from app.metrics.triggear_metrics import ATTRIBUTED_UPSTREAM_CALLS, UPSTREAM_CALLS_PER_SCOPE
+
+
+class ApiBudget:
+    HOOK = 'hook'
+    PIPELINE = 'pipeline'
+    TRIGGER = 'trigger'
+    BACKGROUND = 'background'
+
+    def __repr__(self) -> str:
+        return f"<ApiBudget " \
+               f"source: {self.source}, " \
+               f"event: {self.event}, " \
+               f"repository: {self.repository}, " \
+               f"holders: {self.holders}, " \
+               f"calls: {dict(self.calls)} " \
+               f">"
+
+    def __init__(self,
+                 source: str,
+                 event: str,
+                 repository: str,
+                 parent: Optional['ApiBudget'] = None,
+                 description: str = '') -> None:
+        self.source = source
+        self.event = event
+        self.repository = repository
+        self.parent = parent
+        self.description = description
+        self.calls: Counter[str] = collections.Counter()
+        self.finished = False
+        self.holders = 1
+        self.started = time.monotonic()
+        # INFO: nested scope holds its parent - whatever keeps it running keeps its parent's summary open too
+        if parent is not None:
+            parent.retain()
+        self.__unflushed: Counter[str] = collections.Counter()
+
+    def record(self, upstream: str) -> None:
+        self.calls[upstream] += 1
+        if self.parent is not None:
+            self.parent.record(upstream)
+            return
+        self.__unflushed[upstream] += 1
+        # INFO: builds spawned by a hook outlive its scope - their calls are attributed to it as they happen
+        if self.finished:
+            self.flush()
+
+    def flush(self) -> None:
+        for upstream, calls in self.__unflushed.items():
+            ATTRIBUTED_UPSTREAM_CALLS.labels(self.source, self.event, self.repository, upstream).inc(calls)
+        self.__unflushed.clear()
+
+    def retain(self) -> None:
+        self.holders += 1
+        if self.parent is not None:
+            self.parent.retain()
+
+    def release(self) -> None:
+        self.holders -= 1
+        if self.holders == 0:
+            self.finish()
+        if self.parent is not None:
+            self.parent.release()
+
+    def finish(self) -> None:
+        self.finished = True
+        self.flush()
+        for upstream, calls in self.calls.items():
+            UPSTREAM_CALLS_PER_SCOPE.labels(self.source, self.event, upstream).observe(calls)
+        logging.warning('%s %s completed in %.3fs - upstream calls: %s', self.source, self.description, time.monotonic() - self.started,
+                        self.get_summary(), extra=log_fields(upstream_calls=dict(self.calls)))
+
+    def get_summary(self) -> str:
+        return ', '.join(f'{upstream}={calls}' for upstream, calls in sorted(self.calls.items())) or 'none'
+
+
+CURRENT_API_BUDGET: ContextVar[Optional[ApiBudget]] = ContextVar('current_api_budget', default=None)
+
+
+def record_upstream_call(upstream: str) -> None:
+    api_budget = CURRENT_API_BUDGET.get()
+    if api_budget is not None:
+        api_budget.record(upstream)
+    else:
+        ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.BACKGROUND, '', '', upstream).inc()
+
+
+def retain_api_budget(task: asyncio.Future) -> None:
+    # INFO: debounced triggers and build watches run after their hook returned - its summary waits for the last of them
+    api_budget = CURRENT_API_BUDGET.get()
+    if api_budget is not None:
+        api_budget.retain()
+        task.add_done_callback(lambda finished: api_budget.release())
+
+
+@contextlib.contextmanager
+def api_budget_scope(source: str, description: str, event: Optional[str] = None, repository: Optional[str] = None) -> Iterator[ApiBudget]:
+    parent = CURRENT_API_BUDGET.get()
+    # INFO: nested scopes inherit labels of the hook or request that caused them
+    api_budget = ApiBudget(source,
+                           event if event is not None else parent.event if parent is not None else '',
+                           repository if repository is not None else parent.repository if parent is not None else '',
+                           parent,
+                           description)
+    token = CURRENT_API_BUDGET.set(api_budget)
+    try:
+        yield api_budget
+    finally:
+        CURRENT_API_BUDGET.reset(token)
+        api_budget.release()
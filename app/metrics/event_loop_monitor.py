@@ -0,0 +1,87 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional, Deque, Tuple
+
+import aiohttp.web
+
+from app.metrics.triggear_metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_BLOCKED, EVENT_LOOP_TASKS
+
+BlockedLoopReport = Tuple[float, float, str]
+
+
+class EventLoopMonitor:
+    def __repr__(self) -> str:
+        return f"<EventLoopMonitor " \
+               f"interval: {self.interval}, " \
+               f"slow_callback_threshold: {self.slow_callback_threshold}, " \
+               f"reports: {len(self.reports)} " \
+               f">"
+
+    def __init__(self,
+                 interval: float,
+                 slow_callback_threshold: float,
+                 max_reports: int = 20) -> None:
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        # INFO: (detected at, blocked for, stack of the blocking callback) - newest last
+        self.reports: Deque[BlockedLoopReport] = collections.deque(maxlen=max_reports)
+        self.__heartbeat = time.monotonic()
+        self.__reported_heartbeat: Optional[float] = None
+        self.__loop_thread_id: Optional[int] = None
+        self.__sampler: Optional[asyncio.Task] = None
+        self.__watchdog: Optional[threading.Thread] = None
+        self.__stopped = threading.Event()
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        if self.interval <= 0:
+            return
+        loop = asyncio.get_event_loop()
+        EVENT_LOOP_TASKS.set_function(lambda: len(asyncio.all_tasks(loop)))
+        self.__loop_thread_id = threading.get_ident()
+        self.__heartbeat = time.monotonic()
+        self.__sampler = loop.create_task(self.run_sampler())
+        if self.slow_callback_threshold > 0:
+            self.__stopped.clear()
+            self.__watchdog = threading.Thread(target=self.run_watchdog, name='event-loop-watchdog', daemon=True)
+            self.__watchdog.start()
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__sampler is not None:
+            self.__sampler.cancel()
+        self.__stopped.set()
+        if self.__watchdog is not None:
+            self.__watchdog.join(self.slow_callback_threshold * 2)
+            self.__watchdog = None
+
+    async def run_sampler(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(self.interval)
+            # INFO: sleep ends late by exactly as long as other callbacks kept the loop busy
+            EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - started_at - self.interval))
+            self.__heartbeat = time.monotonic()
+
+    def run_watchdog(self) -> None:
+        while not self.__stopped.wait(self.slow_callback_threshold / 2):
+            self.check(time.monotonic())
+
+    def check(self, now: float) -> Optional[BlockedLoopReport]:
+        heartbeat = self.__heartbeat
+        blocked_for = now - heartbeat - self.interval
+        # INFO: one report per stall - heartbeat does not move until the blocking callback returns
+        if blocked_for < self.slow_callback_threshold or heartbeat == self.__reported_heartbeat:
+            return None
+        self.__reported_heartbeat = heartbeat
+        frame = sys._current_frames().get(self.__loop_thread_id) if self.__loop_thread_id is not None else None
+        stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<stack not available>'
+        report = (time.time(), blocked_for, stack)
+        self.reports.append(report)
+        EVENT_LOOP_BLOCKED.inc()
+        logging.warning(f'Event loop blocked for at least {blocked_for:.3f}s by:\n{stack}')
+        return report
@@ -0,0 +1,195 @@
+import bisect
+import threading
+from typing import Dict, Tuple, List, Callable, Optional, Sequence, Iterator
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape_label_value(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    TYPE = ''
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} " \
+               f"name: {self.name}, " \
+               f"label_names: {self.label_names} " \
+               f">"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.__children: Dict[LabelValues, 'Metric'] = {}
+        self.__lock = threading.Lock()
+
+    def create_child(self) -> 'Metric':
+        raise NotImplementedError()
+
+    def labels(self, *label_values: str) -> 'Metric':
+        # INFO: children are created once per label values - hot path only pays for a dict lookup afterwards
+        child = self.__children.get(label_values)
+        if child is None:
+            with self.__lock:
+                child = self.__children.setdefault(label_values, self.create_child())
+        return child
+
+    def get_children(self) -> List[Tuple[LabelValues, 'Metric']]:
+        return list(self.__children.items()) if self.label_names else [((), self)]
+
+    def render_samples(self, label_names: Sequence[str], label_values: LabelValues) -> Iterator[str]:
+        raise NotImplementedError()
+
+    def render(self, constant_labels: Optional[Dict[str, str]] = None) -> Iterator[str]:
+        constant_labels = constant_labels or {}
+        label_names = tuple(constant_labels.keys()) + self.label_names
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.TYPE}'
+        for label_values, child in self.get_children():
+            yield from child.render_samples(label_names, tuple(constant_labels.values()) + label_values)
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self.value = 0.0
+        self.__value_lock = threading.Lock()
+
+    def create_child(self) -> 'Counter':
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1) -> None:
+        # INFO: log writer and profiler threads update metrics next to the event loop
+        with self.__value_lock:
+            self.value += amount
+
+    def render_samples(self, label_names: Sequence[str], label_values: LabelValues) -> Iterator[str]:
+        yield f'{self.name}{format_labels(label_names, label_values)} {format_value(self.value)}'
+
+
+class Gauge(Metric):
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self.__value_lock = threading.Lock()
+
+    def create_child(self) -> 'Gauge':
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        with self.__value_lock:
+            self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self.__value_lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self.__value_lock:
+            self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        # INFO: value is read from its owner on scrape - nothing is recorded on the hot path
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+    def render_samples(self, label_names: Sequence[str], label_values: LabelValues) -> Iterator[str]:
+        yield f'{self.name}{format_labels(label_names, label_values)} {format_value(self.get())}'
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.__observe_lock = threading.Lock()
+
+    def create_child(self) -> 'Histogram':
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        # INFO: Mongo command listener observes from driver threads
+        with self.__observe_lock:
+            self.bucket_counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def render_samples(self, label_names: Sequence[str], label_values: LabelValues) -> Iterator[str]:
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.buckets + (float('inf'),), self.bucket_counts):
+            cumulative += bucket_count
+            bucket_label = 'le="' + format_value(upper_bound) + '"'
+            yield f'{self.name}_bucket{format_labels(label_names, label_values, bucket_label)} {cumulative}'
+        yield f'{self.name}_sum{format_labels(label_names, label_values)} {format_value(self.sum)}'
+        yield f'{self.name}_count{format_labels(label_names, label_values)} {self.count}'
+
+
+class MetricsRegistry:
+    CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+    def __repr__(self) -> str:
+        return f"<MetricsRegistry " \
+               f"metrics: {len(self.__metrics)} " \
+               f">"
+
+    def __init__(self) -> None:
+        self.__metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.__metrics:
+            raise ValueError(f'Metric {metric.name} is already registered in {self}')
+        self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        counter = Counter(name, documentation, label_names)
+        self.register(counter)
+        return counter
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        gauge = Gauge(name, documentation, label_names)
+        self.register(gauge)
+        return gauge
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self.register(histogram)
+        return histogram
+
+    def render(self, constant_labels: Optional[Dict[str, str]] = None) -> str:
+        lines: List[str] = []
+        for metric in self.__metrics.values():
+            lines.extend(metric.render(constant_labels))
+        return '\n'.join(lines) + '\n'
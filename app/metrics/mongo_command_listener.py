@@ -0,0 +1,15 @@
+from pymongo import monitoring
+
+from app.metrics.triggear_metrics import MONGO_COMMAND_SECONDS, MONGO_COMMAND_FAILURES
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGO_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1000000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGO_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1000000)
+        MONGO_COMMAND_FAILURES.labels(event.command_name).inc()
@@ -0,0 +1,45 @@
+from app.metrics.metrics_registry import MetricsRegistry
+
+REGISTRY = MetricsRegistry()
+
+HOOKS_RECEIVED = REGISTRY.counter('triggear_hooks_received_total', 'GitHub hooks received', ['event'])
+HOOKS_HANDLED = REGISTRY.counter('triggear_hooks_handled_total', 'GitHub hooks passed to their handler', ['event'])
+HOOKS_IGNORED = REGISTRY.counter('triggear_hooks_ignored_total', 'GitHub hooks skipped before reaching a handler', ['event', 'reason'])
+
+HOOK_TO_TRIGGER_SECONDS = REGISTRY.histogram('triggear_hook_to_trigger_seconds',
+                                             'Time from hook details creation to Jenkins accepting the build')
+TRIGGER_TO_STATUS_SECONDS = REGISTRY.histogram('triggear_trigger_to_status_seconds',
+                                               'Time from Jenkins accepting the build to final GitHub status')
+WATCHED_BUILDS = REGISTRY.gauge('triggear_watched_builds', 'Builds currently polled for their final state')
+
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram('triggear_upstream_request_seconds',
+                                              'Latency of requests to Jenkins (by URL) and GitHub (by route class)', ['upstream', 'target'])
+UPSTREAM_ERRORS = REGISTRY.counter('triggear_upstream_errors_total', 'Failed requests to Jenkins and GitHub', ['upstream', 'target'])
+GITHUB_RATE_LIMIT_REMAINING = REGISTRY.gauge('triggear_github_rate_limit_remaining', 'GitHub API requests left in current rate limit window')
+
+MONGO_COMMAND_SECONDS = REGISTRY.histogram('triggear_mongo_command_seconds', 'Latency of Mongo commands', ['command'])
+MONGO_COMMAND_FAILURES = REGISTRY.counter('triggear_mongo_command_failures_total', 'Failed Mongo commands', ['command'])
+
+DUPLICATE_DELIVERIES = REGISTRY.counter('triggear_duplicate_deliveries_total', 'Hook deliveries recognized as duplicates')
+SUPERSEDED_BUILDS = REGISTRY.counter('triggear_superseded_builds_total', 'Triggers and builds superseded by newer hooks')
+INBOX_QUEUED = REGISTRY.gauge('triggear_inbox_queued', 'Hooks accepted to inbox and waiting for a worker')
+INBOX_CHECKPOINT = REGISTRY.gauge('triggear_inbox_checkpoint', 'Last inbox sequence number processed without gaps')
+SUPERVISED_TASKS = REGISTRY.gauge('triggear_supervised_tasks', 'Background tasks owned by task supervisor')
+ADMISSION_BACKLOG = REGISTRY.gauge('triggear_admission_backlog', 'Hooks waiting in fair admission queues')
+ADMISSION_SPILLED = REGISTRY.counter('triggear_admission_spilled_total', 'Low priority hooks spilled to Mongo overflow')
+LOG_RECORDS_SUPPRESSED = REGISTRY.counter('triggear_log_records_suppressed_total',
+                                           'Log records not written due to rate limit, debug sampling or full queue', ['reason'])
+
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram('triggear_event_loop_lag_seconds', 'Delay of event loop timers caused by busy callbacks',
+                                            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+EVENT_LOOP_BLOCKED = REGISTRY.counter('triggear_event_loop_blocked_total', 'Callbacks that blocked event loop longer than slow callback threshold')
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge('triggear_upstream_requests_in_flight', 'Upstream requests waiting for response',
+                                    ['upstream', 'target'])
+EVENT_LOOP_TASKS = REGISTRY.gauge('triggear_event_loop_tasks', 'Tasks alive on event loop')
+ATTRIBUTED_UPSTREAM_CALLS = REGISTRY.counter('triggear_attributed_upstream_calls_total',
+                                             'Upstream calls by hook or pipeline request that caused them',
+                                             ['source', 'event', 'repository', 'upstream'])
+UPSTREAM_CALLS_PER_SCOPE = REGISTRY.histogram('triggear_upstream_calls_per_scope',
+                                              'Upstream calls made while processing one hook, pipeline request or trigger',
+                                              ['source', 'event', 'upstream'],
+                                              buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
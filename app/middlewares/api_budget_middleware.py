@@ -0,0 +1,30 @@
+from typing import Callable, Awaitable
+
+import aiohttp.web_request
+from aiohttp import web
+
+from app.metrics.api_budget import ApiBudget, api_budget_scope
+from app.routes import Routes
+
+RequestHandlerType = Callable[[aiohttp.web_request.Request], Awaitable[aiohttp.web.Response]]
+
+# INFO: hooks are attributed when they are processed - acknowledging them does not call upstreams
+budgeted_routes = {
+    Routes.REGISTER.route_id,
+    Routes.STATUS.route_id,
+    Routes.COMMENT.route_id,
+    Routes.MISSING.route_id,
+    Routes.DEREGISTER.route_id,
+    Routes.CLEAR.route_id,
+    Routes.DEPLOYMENT.route_id,
+    Routes.DEPLOYMENT_STATUS.route_id
+}
+
+
+@web.middleware
+async def api_budget(request: aiohttp.web_request.Request, handler: RequestHandlerType) -> aiohttp.web.Response:
+    route_id = request.path.split('/')[1]
+    if route_id not in budgeted_routes:
+        return await handler(request)
+    with api_budget_scope(ApiBudget.PIPELINE, route_id, event=route_id):
+        return await handler(request)
@@ -1,7 +1,8 @@
+import asyncio
 import hmac
 import logging
 from enum import Enum, auto
-from typing import Callable, Awaitable, Dict
+from typing import Callable, Awaitable, Dict, Optional
 
 import aiohttp.web_request
 from aiohttp import web
@@ -36,15 +37,22 @@ authentication_policies = {
     Routes.DEREGISTER.route_id: AuthenticationPolicy.TOKEN,
     Routes.CLEAR.route_id: AuthenticationPolicy.TOKEN,
     Routes.DEPLOYMENT.route_id: AuthenticationPolicy.TOKEN,
-    Routes.DEPLOYMENT_STATUS.route_id: AuthenticationPolicy.TOKEN
+    Routes.DEPLOYMENT_STATUS.route_id: AuthenticationPolicy.TOKEN,
+    # INFO: Prometheus sends it with `authorization: {type: Token, credentials: <triggear token>}` scrape config
+    Routes.METRICS.route_id: AuthenticationPolicy.TOKEN,
+    # INFO: covers every /debug route - PROFILE, MEMORY and INFLIGHT share route id
+    Routes.PROFILE.route_id: AuthenticationPolicy.TOKEN
 }
 
 
 class AuthenticationMiddleware:
     GITHUB_SIGNATURE_HEADER = 'X-Hub-Signature'
+    GITHUB_SIGNATURE_256_HEADER = 'X-Hub-Signature-256'
+    SUPPORTED_DIGESTS = ('sha1', 'sha256')
 
-    def __init__(self, config: TriggearConfig) -> None:
+    def __init__(self, config: TriggearConfig, offload_threshold: Optional[int] = None) -> None:
         self.config = config
+        self.offload_threshold = offload_threshold
 
     @cached_property
     def expected_token(self) -> str:
@@ -65,18 +73,27 @@ class AuthenticationMiddleware:
         else:
             return AuthenticationResult.UNAUTHORIZED
 
+    def is_signature_valid(self, body: bytes, digest: str, signature: str) -> bool:
+        mac = hmac.new(bytearray(self.config.triggear_token, 'utf-8'), msg=body, digestmod=digest)
+        return hmac.compare_digest(str(mac.hexdigest()), str(signature))
+
     async def github_handler(self, request: aiohttp.web_request.Request) -> AuthenticationResult:
-        header_signature = request.headers.get(self.GITHUB_SIGNATURE_HEADER)
+        header_signature = request.headers.get(self.GITHUB_SIGNATURE_256_HEADER) or request.headers.get(self.GITHUB_SIGNATURE_HEADER)
 
         if header_signature is None:
             return AuthenticationResult.UNAUTHORIZED
-        sha_name, signature = header_signature.split('=')
-        if sha_name != 'sha1':
+        digest, signature = header_signature.split('=', 1)
+        if digest not in self.SUPPORTED_DIGESTS:
             return AuthenticationResult.NOT_IMPLEMENTED
 
+        # INFO: aiohttp caches read body - handlers get exactly the bytes verified here without reading the stream again
         req_body = await request.read()
-        mac = hmac.new(bytearray(self.config.triggear_token, 'utf-8'), msg=req_body, digestmod='sha1')
-        if not hmac.compare_digest(str(mac.hexdigest()), str(signature)):
+        if self.offload_threshold is not None and req_body is not None and len(req_body) >= self.offload_threshold:
+            # INFO: hashlib releases GIL for large inputs, so HMAC of big payloads runs in parallel with the event loop
+            is_valid = await asyncio.get_event_loop().run_in_executor(None, self.is_signature_valid, req_body, digest, signature)
+        else:
+            is_valid = self.is_signature_valid(req_body, digest, signature)
+        if not is_valid:
             return AuthenticationResult.UNAUTHORIZED
         return AuthenticationResult.AUTHENTICATED
 
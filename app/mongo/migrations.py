@@ -0,0 +1,70 @@
+import logging
+from typing import Callable, Awaitable, List
+
+import motor.motor_asyncio
+
+from app.enums.event_types import EventType
+from app.mongo.registration_fields import RegistrationFields
+
+MigrationFunction = Callable[[motor.motor_asyncio.AsyncIOMotorClient], Awaitable[None]]
+
+
+class Migration:
+    def __repr__(self) -> str:
+        return f"<Migration " \
+               f"version: {self.version}, " \
+               f"description: {self.description} " \
+               f">"
+
+    def __init__(self,
+                 version: int,
+                 description: str,
+                 apply: MigrationFunction) -> None:
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+async def add_missed_times_to_registrations(mongo: motor.motor_asyncio.AsyncIOMotorClient) -> None:
+    for event_type in EventType.get_allowed_registration_event_types():
+        await mongo.get_database('registered').get_collection(event_type.collection_name).update_many(
+            {RegistrationFields.MISSED_TIMES: {'$exists': False}},
+            {'$set': {RegistrationFields.MISSED_TIMES: 0}}
+        )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'add missed_times to registrations that never missed a job', add_missed_times_to_registrations),
+]
+
+
+class MigrationRunner:
+    SCHEMA_DB = 'triggear'
+    SCHEMA_COLLECTION = 'schema'
+    SCHEMA_ID = 'registrations'
+
+    def __init__(self,
+                 mongo: motor.motor_asyncio.AsyncIOMotorClient,
+                 migrations: List[Migration] = MIGRATIONS) -> None:
+        self.__mongo = mongo
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+
+    def get_schema_collection(self) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        return self.__mongo.get_database(self.SCHEMA_DB).get_collection(self.SCHEMA_COLLECTION)
+
+    async def get_current_version(self) -> int:
+        schema = await self.get_schema_collection().find_one({'_id': self.SCHEMA_ID})
+        return int(schema['version']) if schema is not None else 0
+
+    async def run(self) -> int:
+        current_version = await self.get_current_version()
+        for migration in self.migrations:
+            if migration.version <= current_version:
+                continue
+            logging.warning(f'Applying schema migration {migration}')
+            await migration.apply(self.__mongo)
+            await self.get_schema_collection().update_one({'_id': self.SCHEMA_ID},
+                                                          {'$set': {'version': migration.version}},
+                                                          upsert=True)
+            current_version = migration.version
+        return current_version
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional, Any, Tuple
+
+from bson import ObjectId
+
+from app.enums.event_types import EventType
+from app.mongo.registration_fields import RegistrationFields
+from app.request_schemes.missing_request_data import MissingRequestData
+
+
+class MissedQuery:
+    def __repr__(self) -> str:
+        return f"<MissedQuery " \
+               f"event_type: {self.event_type}, " \
+               f"threshold: {self.threshold}, " \
+               f"after: {self.after}, " \
+               f"limit: {self.limit} " \
+               f">"
+
+    def __init__(self,
+                 event_type: str,
+                 threshold: int,
+                 limit: int,
+                 after: Optional[str] = None) -> None:
+        self.event_type = event_type
+        self.threshold = threshold
+        self.limit = limit
+        self.after = after
+
+    @property
+    def cache_key(self) -> Tuple[str, int, int, Optional[str]]:
+        return self.event_type, self.threshold, self.limit, self.after
+
+    def get_event_types(self) -> List[EventType]:
+        if self.event_type == MissingRequestData.all_event_types:
+            event_types = EventType.get_allowed_registration_event_types()
+        else:
+            event_types = [EventType.get_by_collection_name(self.event_type)]
+        if self.after is not None:
+            after_collection, _ = self.get_after_position()
+            collection_names = [event_type.collection_name for event_type in event_types]
+            event_types = event_types[collection_names.index(after_collection):] if after_collection in collection_names else []
+        return event_types
+
+    def get_after_position(self) -> Tuple[str, ObjectId]:
+        collection_name, _, document_id = self.after.partition(':')
+        return collection_name, ObjectId(document_id)
+
+    def get_missed_query(self, event_type: EventType) -> Dict[str, Any]:
+        query: Dict[str, Any] = {RegistrationFields.MISSED_TIMES: {'$gt': 0, '$gte': self.threshold}}
+        if self.after is not None:
+            after_collection, after_id = self.get_after_position()
+            if after_collection == event_type.collection_name:
+                query['_id'] = {'$gt': after_id}
+        return query
+
+    @staticmethod
+    def get_cursor(event_type: EventType, document_id: ObjectId) -> str:
+        return f'{event_type.collection_name}:{document_id}'
+
+    @staticmethod
+    def from_missing_request_data(event_type: str, query: Dict[str, str]) -> 'MissedQuery':
+        return MissedQuery(
+            event_type=event_type,
+            threshold=int(query.get(MissingRequestData.threshold, 1)),
+            limit=int(query.get(MissingRequestData.limit, MissingRequestData.default_limit)),
+            after=query.get(MissingRequestData.after)
+        )
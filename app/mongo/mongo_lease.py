@@ -0,0 +1,55 @@
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+
+import motor.motor_asyncio
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+
+class MongoLease:
+    LEASES_DB = 'triggear'
+    LEASES_COLLECTION = 'leases'
+
+    def __repr__(self) -> str:
+        return f"<MongoLease " \
+               f"name: {self.name}, " \
+               f"owner: {self.owner}, " \
+               f"ttl: {self.ttl} " \
+               f">"
+
+    def __init__(self,
+                 mongo: motor.motor_asyncio.AsyncIOMotorClient,
+                 name: str,
+                 ttl: float,
+                 owner: Optional[str] = None) -> None:
+        self.__mongo = mongo
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner if owner is not None else f'{socket.gethostname()}:{os.getpid()}'
+
+    def get_leases(self) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        return self.__mongo.get_database(self.LEASES_DB).get_collection(self.LEASES_COLLECTION)
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            # INFO: lease is taken over when it's ours already or when previous owner did not renew it in time
+            await self.get_leases().find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': self.owner, 'expires_at': now + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        except PyMongoError:
+            logging.exception(f'Could not acquire {self}')
+            return False
+        return True
+
+    async def release(self) -> None:
+        try:
+            await self.get_leases().delete_one({'_id': self.name, 'owner': self.owner})
+        except PyMongoError:
+            logging.exception(f'Could not release {self}')
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from typing import Dict, List, Tuple, Optional, Any, Set, Callable
+
+import aiohttp.web
+import motor.motor_asyncio
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+CollectionKey = Tuple[str, str]
+Increment = Tuple[Dict[str, Any], Dict[str, int]]
+
+
+class MongoWriteBuffer:
+    def __repr__(self) -> str:
+        return f"<MongoWriteBuffer " \
+               f"pending_increments: {self.pending_increments}, " \
+               f"pending_inserts: {self.pending_inserts}, " \
+               f"max_size: {self.max_size}, " \
+               f"flush_interval: {self.flush_interval} " \
+               f">"
+
+    def __init__(self,
+                 mongo: motor.motor_asyncio.AsyncIOMotorClient,
+                 max_size: int,
+                 flush_interval: float,
+                 on_increments_flushed: Optional[Callable[[], None]] = None) -> None:
+        self.__mongo = mongo
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.__on_increments_flushed = on_increments_flushed
+        self.__increments: Dict[CollectionKey, Dict[str, Increment]] = {}
+        self.__inserts: Dict[CollectionKey, List[Dict[str, Any]]] = {}
+        self.__flush_lock = asyncio.Lock()
+        self.__flush_task: Optional[asyncio.Future] = None
+        self.__flush_tasks: Set[asyncio.Future] = set()
+        self.__periodic_task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_increments(self) -> int:
+        return sum(len(increments) for increments in self.__increments.values())
+
+    @property
+    def pending_inserts(self) -> int:
+        return sum(len(documents) for documents in self.__inserts.values())
+
+    def get_collection(self, database: str, collection: str) -> motor.motor_asyncio.AsyncIOMotorCollection:
+        return self.__mongo.get_database(database).get_collection(collection)
+
+    @staticmethod
+    def get_increment_key(query: Dict[str, Any]) -> str:
+        return repr(sorted(query.items()))
+
+    def increment(self,
+                  database: str,
+                  collection: str,
+                  query: Dict[str, Any],
+                  field: str) -> None:
+        collection_increments = self.__increments.setdefault((database, collection), {})
+        key = self.get_increment_key(query)
+        _, increments = collection_increments.setdefault(key, (query, {}))
+        increments[field] = increments.get(field, 0) + 1
+        self.__flush_if_full()
+
+    def insert(self,
+               database: str,
+               collection: str,
+               document: Dict[str, Any]) -> None:
+        self.__inserts.setdefault((database, collection), []).append(document)
+        self.__flush_if_full()
+
+    def __flush_if_full(self) -> None:
+        if self.pending_increments + self.pending_inserts >= self.max_size and (self.__flush_task is None or self.__flush_task.done()):
+            self.__flush_task = self.start_flush()
+
+    def start_flush(self) -> asyncio.Future:
+        # INFO: flushes run as tracked tasks - stop waits for them instead of cancelling them after buffers were swapped
+        flush_task = asyncio.ensure_future(self.flush())
+        self.__flush_tasks.add(flush_task)
+        flush_task.add_done_callback(self.__flush_tasks.discard)
+        return flush_task
+
+    def restore_increments(self, collection_key: CollectionKey, increments: Dict[str, Increment]) -> None:
+        collection_increments = self.__increments.setdefault(collection_key, {})
+        for key, (query, fields) in increments.items():
+            _, pending_fields = collection_increments.setdefault(key, (query, {}))
+            for field, amount in fields.items():
+                pending_fields[field] = pending_fields.get(field, 0) + amount
+
+    def restore_inserts(self, collection_key: CollectionKey, documents: List[Dict[str, Any]]) -> None:
+        self.__inserts[collection_key] = documents + self.__inserts.get(collection_key, [])
+
+    async def flush(self) -> None:
+        async with self.__flush_lock:
+            increments, self.__increments = self.__increments, {}
+            inserts, self.__inserts = self.__inserts, {}
+            increments_flushed = False
+            for (database, collection), collection_increments in increments.items():
+                operations: List[UpdateOne] = [UpdateOne(query, {'$inc': fields}) for query, fields in collection_increments.values()]
+                try:
+                    await self.get_collection(database, collection).bulk_write(operations, ordered=False)
+                    increments_flushed = True
+                except BulkWriteError:
+                    # INFO: unordered batch was applied except for rejected operations - retrying them would fail again
+                    logging.exception(f'Mongo rejected some of {len(operations)} increments to {database}.{collection}')
+                    increments_flushed = True
+                except Exception:
+                    logging.exception(f'Failed to flush {len(operations)} increments to {database}.{collection} - retrying with next flush')
+                    self.restore_increments((database, collection), collection_increments)
+            if increments_flushed and self.__on_increments_flushed is not None:
+                self.__on_increments_flushed()
+            for (database, collection), documents in inserts.items():
+                try:
+                    await self.get_collection(database, collection).insert_many(documents, ordered=False)
+                except BulkWriteError:
+                    logging.exception(f'Mongo rejected some of {len(documents)} documents to {database}.{collection}')
+                except Exception:
+                    logging.exception(f'Failed to flush {len(documents)} documents to {database}.{collection} - retrying with next flush')
+                    self.restore_inserts((database, collection), documents)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.shield(self.start_flush())
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.__periodic_task = asyncio.get_event_loop().create_task(self.run())
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__periodic_task is not None:
+            self.__periodic_task.cancel()
+        await asyncio.gather(*self.__flush_tasks, return_exceptions=True)
+        logging.warning(f'Flushing {self} before shutdown')
+        await self.flush()
+        if self.pending_increments or self.pending_inserts:
+            logging.error(f'Could not flush {self} before shutdown - pending writes are lost')
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Dict, Set, Optional, Iterable, List, Tuple
+
+import aiohttp.web
+
+from app.clients.mongo_client import MongoClient
+from app.enums.event_types import EventType
+from app.utilities.ttl_cache import TtlCache
+
+
+class RegisteredRepositories:
+    def __repr__(self) -> str:
+        return f"<RegisteredRepositories " \
+               f"refresh_interval: {self.refresh_interval}, " \
+               f"repositories: {self.get_counts()}, " \
+               f"dropped: {self.dropped}, " \
+               f"rechecked: {self.rechecked}, " \
+               f"unknown: {self.unknown_repositories} " \
+               f">"
+
+    def __init__(self,
+                 mongo_client: MongoClient,
+                 refresh_interval: float,
+                 unknown_ttl: float = 0) -> None:
+        self.__mongo_client = mongo_client
+        self.refresh_interval = refresh_interval
+        self.unknown_repositories: TtlCache[bool] = TtlCache(ttl=unknown_ttl, max_entries=1024)
+        self.dropped = 0
+        self.rechecked = 0
+        self.__repositories: Dict[str, Set[str]] = {}
+        self.__added: List[Tuple[str, str]] = []
+        self.__task: Optional[asyncio.Task] = None
+
+    def get_counts(self) -> Dict[str, int]:
+        return {collection_name: len(repositories) for collection_name, repositories in self.__repositories.items()}
+
+    def is_registered(self, event_types: Iterable[EventType], repositories: Iterable[str]) -> bool:
+        for event_type in event_types:
+            registered = self.__repositories.get(event_type.collection_name)
+            # INFO: until first successful load nothing is known - hooks go through to Mongo as they used to
+            if registered is None or any(repository in registered for repository in repositories):
+                return True
+        return False
+
+    async def check(self, event_types: Iterable[EventType], repositories: List[str]) -> bool:
+        if self.is_registered(event_types, repositories):
+            return True
+        # INFO: repositories just confirmed unknown are dropped without Mongo - noise from one repository costs one query per ttl
+        unknown_key = (tuple(event_type.collection_name for event_type in event_types), tuple(repositories))
+        if self.unknown_repositories.get(unknown_key):
+            return False
+        # INFO: registrations served by other processes reach local set only with its refresh - Mongo is asked before hook is dropped
+        self.rechecked += 1
+        try:
+            for event_type in event_types:
+                registered = await self.__mongo_client.get_registered_repositories_among(event_type, repositories)
+                for repository in registered:
+                    self.add(event_type, repository)
+                if registered:
+                    return True
+        except Exception:
+            logging.exception(f'Could not recheck {repositories} in Mongo - letting hook through')
+            return True
+        self.unknown_repositories.set(unknown_key, True)
+        return False
+
+    def add(self, event_type: EventType, repository: str) -> None:
+        self.__repositories.setdefault(event_type.collection_name, set()).add(repository)
+        self.__added.append((event_type.collection_name, repository))
+
+    async def refresh_event_type(self, event_type: EventType) -> None:
+        self.__added = [(name, repository) for name, repository in self.__added if name != event_type.collection_name]
+        repositories = await self.__mongo_client.get_registered_repositories(event_type)
+        # INFO: registrations added while distinct query was running are not lost when its result replaces the set
+        repositories.update(repository for name, repository in self.__added if name == event_type.collection_name)
+        self.__repositories[event_type.collection_name] = repositories
+
+    async def refresh(self) -> None:
+        for event_type in EventType.get_allowed_registration_event_types():
+            try:
+                await self.refresh_event_type(event_type)
+            except Exception:
+                logging.exception(f'Could not refresh {event_type.collection_name} registered repositories of {self}')
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        await self.refresh()
+        self.__task = asyncio.get_event_loop().create_task(self.run())
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
@@ -0,0 +1,62 @@
+from typing import Dict, List, Any, Tuple, Optional
+
+from pymongo import ASCENDING, IndexModel
+
+from app.enums.event_types import EventType
+from app.hook_details.labeled_hook_details import LabeledHookDetails
+from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
+from app.hook_details.push_hook_details import PushHookDetails
+from app.hook_details.release_hook_details import ReleaseHookDetails
+from app.hook_details.tag_hook_details import TagHookDetails
+from app.mongo.clear_query import ClearQuery
+from app.mongo.deregistration_query import DeregistrationQuery
+from app.mongo.missed_query import MissedQuery
+from app.mongo.registration_fields import RegistrationFields
+from app.mongo.registration_query import RegistrationQuery
+
+
+QueryShape = Tuple[str, Dict[str, Any], Optional[List[Tuple[str, int]]]]
+
+
+class RegistrationIndexes:
+    @staticmethod
+    def get_index_models() -> List[IndexModel]:
+        return [
+            # hook queries: {repository} and {repository, labels}
+            IndexModel([(RegistrationFields.REPO, ASCENDING), (RegistrationFields.LABELS, ASCENDING)],
+                       name='repository_labels'),
+            # registration upserts: {jenkins_url, repository, job}
+            IndexModel([(RegistrationFields.JENKINS_URL, ASCENDING), (RegistrationFields.REPO, ASCENDING), (RegistrationFields.JOB, ASCENDING)],
+                       name='jenkins_url_repository_job'),
+            # deregistration and clear: {job, jenkins_url}
+            IndexModel([(RegistrationFields.JOB, ASCENDING), (RegistrationFields.JENKINS_URL, ASCENDING)],
+                       name='job_jenkins_url'),
+            # /missing: {missed_times > 0} in _id order
+            IndexModel([('_id', ASCENDING), (RegistrationFields.MISSED_TIMES, ASCENDING)],
+                       partialFilterExpression={RegistrationFields.MISSED_TIMES: {'$gt': 0}},
+                       name='missed_times_partial')
+        ]
+
+    @staticmethod
+    def get_query_shapes() -> List[QueryShape]:
+        labeled_hook_details = LabeledHookDetails('repo', 'branch', 'sha', 'label', 'who', 'pr_url')
+        missed_counter_query = labeled_hook_details.get_query()
+        missed_counter_query[RegistrationFields.JOB] = 'job'
+        return [
+            ('RegistrationQuery', RegistrationQuery('push', 'url', 'job', 'repo', [], [], [], [], []).get_registration_query(), None),
+            ('DeregistrationQuery', DeregistrationQuery('url', 'job', 'push', 'caller').get_deregistration_query(), None),
+            ('ClearQuery', ClearQuery('url', 'job', 'push').get_clear_query(), None),
+            ('LabeledHookDetails', labeled_hook_details.get_query(), None),
+            ('LabeledSync', {RegistrationFields.REPO: 'repo', RegistrationFields.LABELS: {'$in': ['label']}}, None),
+            ('PrOpenedHookDetails', PrOpenedHookDetails('repo', 'branch', 'sha').get_query(), None),
+            ('PushHookDetails', PushHookDetails('repo', 'branch', 'sha', set()).get_query(), None),
+            ('ReleaseHookDetails', ReleaseHookDetails('repo', 'tag', 'target', False).get_query(), None),
+            ('TagHookDetails', TagHookDetails('repo', 'sha', 'tag').get_query(), None),
+            ('MissedCounter', missed_counter_query, None),
+            ('RegisteredRepositoriesAmong', {RegistrationFields.REPO: {'$in': ['repo']}}, None),
+            ('MissedQuery', MissedQuery('push', 1, 1).get_missed_query(EventType.PUSH), [('_id', ASCENDING)])
+        ]
+
+    @staticmethod
+    def uses_collection_scan(explain: Dict[str, Any]) -> bool:
+        return 'COLLSCAN' in repr(explain.get('queryPlanner', {}).get('winningPlan', {}))
@@ -33,13 +33,14 @@ class RegistrationQuery:
             RegistrationFields.JOB: self.job_name
         }
 
-    def get_full_document(self) -> Dict[str, Union[str, List[str]]]:
+    def get_full_document(self) -> Dict[str, Union[str, int, List[str]]]:
         return dict({
             RegistrationFields.LABELS: self.labels,
             RegistrationFields.REQUESTED_PARAMS: self.requested_params,
             RegistrationFields.BRANCH_RESTRICTIONS: self.branch_restrictions,
             RegistrationFields.CHANGE_RESTRICTIONS: self.change_restrictions,
-            RegistrationFields.FILE_RESTRICTIONS: self.file_restrictions
+            RegistrationFields.FILE_RESTRICTIONS: self.file_restrictions,
+            RegistrationFields.MISSED_TIMES: 0
         }, **self.get_registration_query())
 
     @staticmethod
@@ -0,0 +1,42 @@
+from typing import Dict
+
+from bson import ObjectId
+
+from app.enums.event_types import EventType
+
+
+class MissingRequestData:
+    event_type = 'eventType'
+    after = 'after'
+    limit = 'limit'
+    threshold = 'threshold'
+
+    all_event_types = 'all'
+    default_limit = 1000
+    max_limit = 10000
+
+    @staticmethod
+    def __is_valid_event_type(event_type: str) -> bool:
+        return event_type == MissingRequestData.all_event_types or event_type in EventType.get_allowed_registration_event_types()
+
+    @staticmethod
+    def __is_valid_positive_int(value: str) -> bool:
+        return value.isdigit() and int(value) > 0
+
+    @staticmethod
+    def __is_valid_cursor(cursor: str) -> bool:
+        collection_name, _, document_id = cursor.partition(':')
+        return collection_name in EventType.get_allowed_registration_event_types() and ObjectId.is_valid(document_id)
+
+    @staticmethod
+    def is_valid_missing_request_data(event_type: str, query: Dict[str, str]) -> bool:
+        if event_type is None or not MissingRequestData.__is_valid_event_type(event_type):
+            return False
+        for field in [MissingRequestData.limit, MissingRequestData.threshold]:
+            if field in query and not MissingRequestData.__is_valid_positive_int(query[field]):
+                return False
+        if MissingRequestData.limit in query and int(query[MissingRequestData.limit]) > MissingRequestData.max_limit:
+            return False
+        if MissingRequestData.after in query and not MissingRequestData.__is_valid_cursor(query[MissingRequestData.after]):
+            return False
+        return True
@@ -12,6 +12,10 @@ class Routes(Enum):
     CLEAR = ('/clear', 'clear')
     DEPLOYMENT = ('/deployment', 'deployment')
     DEPLOYMENT_STATUS = ('/deployment_status', 'deployment_status')
+    METRICS = ('/metrics', 'metrics')
+    PROFILE = ('/debug/profile', 'debug')
+    MEMORY = ('/debug/memory', 'debug')
+    INFLIGHT = ('/debug/inflight', 'debug')
 
     def __init__(self, route: str, route_name: str) -> None:
         self.route: str = route
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Any, Coroutine, List
+
+import aiohttp.web
+
+from app.metrics.api_budget import retain_api_budget
+from app.metrics.triggear_metrics import SUPERVISED_TASKS
+
+
+class SupervisedTask:
+    def __repr__(self) -> str:
+        return f"<SupervisedTask " \
+               f"group: {self.group}, " \
+               f"name: {self.name}, " \
+               f"age: {self.get_age():.1f}s, " \
+               f"running: {self.started is not None}, " \
+               f"detached: {self.detached} " \
+               f">"
+
+    def __init__(self,
+                 group: str,
+                 name: str,
+                 details: Optional[Dict[str, Any]] = None) -> None:
+        self.group = group
+        self.name = name
+        self.details = details if details is not None else {}
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        self.detached = False
+        self.semaphores: List[asyncio.Semaphore] = []
+
+    def get_age(self) -> float:
+        return time.monotonic() - self.created
+
+
+class TaskSupervisor:
+    HOOKS = 'hooks'
+    BUILDS = 'builds'
+
+    def __repr__(self) -> str:
+        return f"<TaskSupervisor " \
+               f"max_concurrency: {self.max_concurrency}, " \
+               f"group_concurrency: {self.group_concurrency}, " \
+               f"drain_timeout: {self.drain_timeout}, " \
+               f"tasks: {len(self.__tasks)} " \
+               f">"
+
+    def __init__(self,
+                 max_concurrency: int,
+                 group_concurrency: Dict[str, int],
+                 drain_timeout: float) -> None:
+        self.max_concurrency = max_concurrency
+        self.group_concurrency = group_concurrency
+        self.drain_timeout = drain_timeout
+        self.failed = 0
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__group_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.__tasks: Dict[asyncio.Task, SupervisedTask] = {}
+        SUPERVISED_TASKS.set_function(lambda: len(self.__tasks))
+
+    def get_semaphore(self) -> asyncio.Semaphore:
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.__semaphore
+
+    def get_group_semaphore(self, group: str) -> Optional[asyncio.Semaphore]:
+        if group not in self.group_concurrency:
+            return None
+        if group not in self.__group_semaphores:
+            self.__group_semaphores[group] = asyncio.Semaphore(self.group_concurrency[group])
+        return self.__group_semaphores[group]
+
+    def spawn(self, group: str, coroutine: Coroutine, **details: Any) -> asyncio.Task:
+        supervised_task = SupervisedTask(group, getattr(coroutine, '__qualname__', repr(coroutine)), details)
+        task = asyncio.get_event_loop().create_task(self.run(supervised_task, coroutine))
+        self.__tasks[task] = supervised_task
+        task.add_done_callback(self.__forget)
+        retain_api_budget(task)
+        return task
+
+    async def run(self, supervised_task: SupervisedTask, coroutine: Coroutine) -> Any:
+        group_semaphore = self.get_group_semaphore(supervised_task.group)
+        try:
+            for semaphore in (self.get_semaphore(), group_semaphore):
+                if semaphore is not None:
+                    await semaphore.acquire()
+                    supervised_task.semaphores.append(semaphore)
+            supervised_task.started = time.monotonic()
+            return await coroutine
+        finally:
+            self.release(supervised_task)
+            # INFO: task cancelled while waiting for a slot never started its coroutine - close it to avoid "never awaited" warning
+            if supervised_task.started is None:
+                coroutine.close()
+
+    @staticmethod
+    def release(supervised_task: SupervisedTask) -> None:
+        while supervised_task.semaphores:
+            supervised_task.semaphores.pop().release()
+
+    def detach(self) -> None:
+        # INFO: called by a running task entering long, cheap waiting (build watches) - its slots go to queued tasks
+        # and drain neither waits for nor cancels it, as it could not be resumed after restart anyway
+        supervised_task = self.__tasks.get(asyncio.current_task())
+        if supervised_task is not None and not supervised_task.detached:
+            supervised_task.detached = True
+            self.release(supervised_task)
+
+    def __forget(self, task: asyncio.Task) -> None:
+        supervised_task = self.__tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            logging.error(f'Task {supervised_task} failed', exc_info=task.exception())
+
+    def get_tasks(self) -> List[SupervisedTask]:
+        return list(self.__tasks.values())
+
+    def get_attached_tasks(self) -> List[asyncio.Task]:
+        return [task for task, supervised_task in self.__tasks.items() if not supervised_task.detached]
+
+    def get_group_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats: Dict[str, Dict[str, Any]] = {}
+        for supervised_task in self.__tasks.values():
+            group_stats = stats.setdefault(supervised_task.group, {'running': 0, 'waiting': 0, 'oldest_age': 0.0})
+            group_stats['running' if supervised_task.started is not None else 'waiting'] += 1
+            group_stats['oldest_age'] = round(max(group_stats['oldest_age'], supervised_task.get_age()), 3)
+        return stats
+
+    async def drain(self, app: aiohttp.web.Application) -> None:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.drain_timeout
+        if self.__tasks:
+            logging.warning(f'Draining {self}: {self.get_group_stats()}')
+        # INFO: draining tasks can spawn new ones (hooks schedule builds) - wait until nothing is left or deadline passes
+        while self.get_attached_tasks() and loop.time() < deadline:
+            await asyncio.wait(self.get_attached_tasks(), timeout=deadline - loop.time())
+        tasks = self.get_attached_tasks()
+        if tasks:
+            logging.error(f'Cancelling tasks not finished within {self.drain_timeout}s drain deadline: {self.get_group_stats()}')
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self.__tasks:
+            logging.warning(f'Leaving {len(self.__tasks)} detached tasks running on shutdown')
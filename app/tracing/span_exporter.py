@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, List, Deque
+
+import aiohttp
+import aiohttp.web
+
+
+class SpanExporter:
+    SERVICE_NAME = 'triggear'
+
+    def __repr__(self) -> str:
+        return f"<SpanExporter " \
+               f"file_path: {self.file_path}, " \
+               f"collector_url: {self.collector_url}, " \
+               f"flush_interval: {self.flush_interval}, " \
+               f"queued: {len(self.__spans)}, " \
+               f"dropped: {self.dropped} " \
+               f">"
+
+    def __init__(self,
+                 file_path: Optional[str],
+                 collector_url: Optional[str],
+                 flush_interval: float,
+                 max_queue_size: int = 10000) -> None:
+        self.file_path = file_path
+        self.collector_url = collector_url
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.dropped = 0
+        self.__spans: Deque[Dict[str, Any]] = deque()
+        self.__task: Optional[asyncio.Task] = None
+        self.__session: Optional[aiohttp.ClientSession] = None
+
+    def export(self, otlp_span: Dict[str, Any]) -> None:
+        # INFO: spans are finished on hot path - exporting only queues them and never blocks on IO
+        if len(self.__spans) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self.__spans.append(otlp_span)
+
+    @classmethod
+    def get_otlp_document(cls, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': cls.SERVICE_NAME}}]},
+                'scopeSpans': [{'scope': {'name': cls.SERVICE_NAME}, 'spans': spans}]
+            }]
+        }
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.__task = asyncio.get_event_loop().create_task(self.run())
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+        await self.flush()
+        if self.__session is not None:
+            await self.__session.close()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception(f'Could not flush spans of {self}')
+
+    async def flush(self) -> None:
+        if not self.__spans:
+            return
+        spans = list(self.__spans)
+        self.__spans.clear()
+        document = self.get_otlp_document(spans)
+        if self.collector_url is not None:
+            await self.send_to_collector(document)
+        elif self.file_path is not None:
+            await asyncio.get_event_loop().run_in_executor(None, self.append_to_file, json.dumps(document))
+
+    async def send_to_collector(self, document: Dict[str, Any]) -> None:
+        if self.__session is None:
+            self.__session = aiohttp.ClientSession()
+        try:
+            async with self.__session.post(self.collector_url, json=document) as response:
+                if response.status >= 400:
+                    logging.error(f'Collector {self.collector_url} rejected {len(document["resourceSpans"][0]["scopeSpans"][0]["spans"])} '
+                                  f'spans with status {response.status}')
+        except aiohttp.ClientError:
+            logging.exception(f'Could not send spans to collector {self.collector_url}')
+
+    def append_to_file(self, line: str) -> None:
+        with open(self.file_path, 'a') as traces_file:
+            traces_file.write(line + '\n')
@@ -0,0 +1,12 @@
+import logging
+
+from app.tracing.tracer import Tracer
+
+
+class TraceLogFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id = Tracer.get_trace_id()
+        # INFO: records queued by LogPipeline were stamped on caller side - writer thread has no current span
+        if trace_id is not None or not hasattr(record, 'trace_id'):
+            record.trace_id = trace_id if trace_id is not None else '-'
+        return True
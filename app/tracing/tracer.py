@@ -0,0 +1,165 @@
+import contextlib
+import functools
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Iterator, Callable, TypeVar
+
+from app.tracing.span_exporter import SpanExporter
+
+AsyncFunction = TypeVar('AsyncFunction', bound=Callable[..., Any])
+
+
+class Span:
+    STATUS_UNSET = 0
+    STATUS_OK = 1
+    STATUS_ERROR = 2
+
+    def __repr__(self) -> str:
+        return f"<Span " \
+               f"name: {self.name}, " \
+               f"trace_id: {self.trace_id}, " \
+               f"span_id: {self.span_id}, " \
+               f"parent_span_id: {self.parent_span_id}, " \
+               f"sampled: {self.sampled} " \
+               f">"
+
+    def __init__(self,
+                 name: str,
+                 trace_id: str,
+                 parent_span_id: Optional[str],
+                 sampled: bool,
+                 attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.status = self.STATUS_UNSET
+        self.status_message: Optional[str] = None
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exception: BaseException) -> None:
+        self.status = self.STATUS_ERROR
+        self.status_message = f'{type(exception).__name__}: {exception}'
+
+    def end(self) -> None:
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+
+    @staticmethod
+    def get_otlp_value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def get_otlp_span(self) -> Dict[str, Any]:
+        otlp_span: Dict[str, Any] = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_time),
+            'endTimeUnixNano': str(self.end_time if self.end_time is not None else self.start_time),
+            'attributes': [{'key': key, 'value': self.get_otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': self.status}
+        }
+        if self.parent_span_id is not None:
+            otlp_span['parentSpanId'] = self.parent_span_id
+        if self.status_message is not None:
+            otlp_span['status']['message'] = self.status_message
+        return otlp_span
+
+
+CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+class Tracer:
+    def __repr__(self) -> str:
+        return f"<Tracer " \
+               f"sample_rate: {self.sample_rate}, " \
+               f"exporter: {self.exporter} " \
+               f">"
+
+    def __init__(self,
+                 sample_rate: float = 0.0,
+                 exporter: Optional[SpanExporter] = None) -> None:
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def configure(self, sample_rate: float, exporter: Optional[SpanExporter]) -> None:
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @staticmethod
+    def get_current_span() -> Optional[Span]:
+        return CURRENT_SPAN.get()
+
+    @staticmethod
+    def get_trace_id() -> Optional[str]:
+        current_span = CURRENT_SPAN.get()
+        return current_span.trace_id if current_span is not None else None
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        parent = parent if parent is not None else CURRENT_SPAN.get()
+        if parent is None:
+            # INFO: sampling is decided once per trace - unsampled spans still carry trace id for logs
+            return Span(name, '%032x' % random.getrandbits(128), None, random.random() < self.sample_rate, attributes)
+        return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+
+    def finish_span(self, span: Span) -> None:
+        span.end()
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span.get_otlp_span())
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Span]:
+        span = self.start_span(name, parent, **attributes)
+        token = CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException as exception:
+            span.set_error(exception)
+            raise
+        finally:
+            CURRENT_SPAN.reset(token)
+            self.finish_span(span)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def activate(span: Optional[Span]) -> Iterator[None]:
+        token = CURRENT_SPAN.set(span)
+        try:
+            yield
+        finally:
+            CURRENT_SPAN.reset(token)
+
+    @staticmethod
+    def annotate(**attributes: Any) -> None:
+        current_span = CURRENT_SPAN.get()
+        if current_span is not None:
+            current_span.attributes.update(attributes)
+
+    def traced(self, name: str) -> Callable[[AsyncFunction], AsyncFunction]:
+        def decorator(function: AsyncFunction) -> AsyncFunction:
+            @functools.wraps(function)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(name):
+                    return await function(*args, **kwargs)
+            return wrapper  # type: ignore
+        return decorator
+
+    def get_traced_url(self, url: str) -> str:
+        trace_id = self.get_trace_id()
+        # INFO: fragment is not sent to Jenkins - link keeps working while trace id stays visible in GitHub status
+        return f'{url}#trace-{trace_id}' if trace_id is not None and url else url
+
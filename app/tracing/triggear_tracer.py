@@ -0,0 +1,3 @@
+from app.tracing.tracer import Tracer
+
+TRACER = Tracer()
@@ -1,104 +1,201 @@
 import asyncio
 import logging
-from typing import Optional, Dict, Union
+import time
+from typing import Optional, Dict, Union, List
 
-from app.clients.async_client import AsyncClientNotFoundException, AsyncClientException
+from app.builds.build_debouncer import BuildDebouncer
+from app.clients.async_client import AsyncClientException
 from app.clients.github_client import GithubClient
 from app.clients.jenkinses_clients import JenkinsesClients
 from app.clients.mongo_client import MongoClient
+from app.diagnostics.inflight_tracker import InflightTracker
+from app.diagnostics.triggear_inflight import INFLIGHT
 from app.enums.jenkins_build_state import JenkinsBuildState
-from app.mongo.registration_fields import RegistrationFields
 from app.hook_details.hook_details import HookDetails
 from app.hook_details.hook_params_parser import HookParamsParser
+from app.hook_details.labeled_hook_details import LabeledHookDetails
+from app.metrics.api_budget import ApiBudget, api_budget_scope
+from app.metrics.triggear_metrics import HOOK_TO_TRIGGER_SECONDS, TRIGGER_TO_STATUS_SECONDS, WATCHED_BUILDS
 from app.mongo.registration_cursor import RegistrationCursor
+from app.mongo.registration_fields import RegistrationFields
+from app.tasks.task_supervisor import TaskSupervisor
+from app.tracing.triggear_tracer import TRACER
 
 
 class TriggearHeart:
+    BUILD_POLL_INTERVAL = 1
+
     def __init__(self,
                  mongo_client: MongoClient,
                  github_client: GithubClient,
-                 jenkinses_clients: JenkinsesClients) -> None:
+                 jenkinses_clients: JenkinsesClients,
+                 build_debouncer: Optional[BuildDebouncer] = None,
+                 task_supervisor: Optional[TaskSupervisor] = None) -> None:
         self.__mongo_client: MongoClient = mongo_client
         self.__github_client: GithubClient = github_client
         self.__jenkinses_clients: JenkinsesClients = jenkinses_clients
+        self.__build_debouncer: Optional[BuildDebouncer] = build_debouncer
+        self.__task_supervisor: Optional[TaskSupervisor] = task_supervisor
 
+    @TRACER.traced('triggear_heart.trigger_registered_jobs')
     async def trigger_registered_jobs(self, hook_details: HookDetails) -> None:
         async for registration_cursor in self.__mongo_client.get_registered_jobs(hook_details):
+            await self.trigger_registration(hook_details, registration_cursor)
+
+    async def trigger_labeled_sync(self, labeled_hook_details: List[LabeledHookDetails]) -> None:
+        if not labeled_hook_details:
+            return
+        registrations_by_label = await self.__mongo_client.get_registered_jobs_by_labels(
+            labeled_hook_details[0].repository,
+            [hook_details.label for hook_details in labeled_hook_details]
+        )
+        await asyncio.gather(*[
+            self.trigger_registration(hook_details, registration_cursor)
+            for hook_details in labeled_hook_details
+            for registration_cursor in registrations_by_label.get(hook_details.label, [])
+        ])
+
+    async def trigger_registration(self, hook_details: HookDetails, registration_cursor: RegistrationCursor) -> None:
+        with INFLIGHT.track(InflightTracker.REGISTRATIONS, jenkins_url=registration_cursor.jenkins_url, job=registration_cursor.job_name):
             if await hook_details.should_trigger(registration_cursor, self.__github_client):
-                try:
-                    await self.__jenkinses_clients.get_jenkins(registration_cursor.jenkins_url)\
-                        .get_job_info(registration_cursor.job_name)  # Raises if job does not exist on Jenkins
-                    asyncio.get_event_loop().create_task(self.trigger_registered_job(hook_details, registration_cursor))
-                except AsyncClientNotFoundException:
-                    logging.exception(f"Job {registration_cursor.jenkins_url}:{registration_cursor.job_name} was not found on Jenkins anymore - "
-                                      f"incrementing {RegistrationFields.MISSED_TIMES} for query {hook_details.get_query()}")
+                jenkins_client = self.__jenkinses_clients.get_jenkins(registration_cursor.jenkins_url)
+                if await jenkins_client.job_exists(registration_cursor.job_name):
+                    if self.__build_debouncer is not None:
+                        self.__build_debouncer.schedule(BuildDebouncer.get_key(hook_details, registration_cursor),
+                                                        lambda: self.trigger_registered_job(hook_details, registration_cursor),
+                                                        jenkins_url=registration_cursor.jenkins_url,
+                                                        job=registration_cursor.job_name)
+                    elif self.__task_supervisor is not None:
+                        self.__task_supervisor.spawn(TaskSupervisor.BUILDS,
+                                                     self.trigger_registered_job(hook_details, registration_cursor),
+                                                     jenkins_url=registration_cursor.jenkins_url,
+                                                     job=registration_cursor.job_name)
+                    else:
+                        asyncio.get_event_loop().create_task(self.trigger_registered_job(hook_details, registration_cursor))
+                else:
+                    logging.warning(f"Job {registration_cursor.jenkins_url}:{registration_cursor.job_name} was not found on Jenkins anymore - "
+                                    f"incrementing {RegistrationFields.MISSED_TIMES} for query {hook_details.get_query()}")
                     await self.__mongo_client.increment_missed_counter(hook_details, registration_cursor)
-
             else:
-                logging.warning(f'Hook details {hook_details} will not be run due to unmet registration restrictions in {registration_cursor}')
+                logging.info('Registration %s:%s will not be run due to unmet registration restrictions',
+                             registration_cursor.jenkins_url, registration_cursor.job_name)
+                logging.debug('Hook details %s will not be run due to unmet registration restrictions in %s', hook_details, registration_cursor)
 
+    @TRACER.traced('triggear_heart.trigger_registered_job')
     async def trigger_registered_job(self,
                                      hook_details: HookDetails,
                                      registration_cursor: RegistrationCursor) -> None:
-        hook_details.setup_final_param_values(registration_cursor)
-        job_params = HookParamsParser.get_requested_parameters_values(hook_details, registration_cursor)
-        jenkins_client = self.__jenkinses_clients.get_jenkins(registration_cursor.jenkins_url)
-        try:
-            next_build_number = await jenkins_client.get_jobs_next_build_number(registration_cursor.job_name)
-        except KeyError:
-            # INFO: KeyError means that nextBuildNumber is not available - either plugin is not installed or it's a MultiBranch pipeline
-            # In both cases we just want to run the job
-            logging.warning(f"Running job that didn't have next build number: {registration_cursor.job_name}")
-            await jenkins_client.build_jenkins_job(registration_cursor.job_name, job_params)
-            return
-        job_url: Optional[str] = await jenkins_client.get_job_url(registration_cursor.job_name)
-        try:
-            await jenkins_client.build_jenkins_job(registration_cursor.job_name, job_params)
-            logging.warning(f"Scheduled build of: {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number}"
-                            f"with params: {job_params}")
-        except AsyncClientException:
-            logging.exception(f"Job {registration_cursor.jenkins_url}:{registration_cursor.job_name} did "
-                              f"not accept {job_params} as parameters but it requested them")
-
-            await self.report_unaccepted_parameters_to_github(hook_details, registration_cursor, job_url, next_build_number, job_params)
-            return
-
-        build_info = await jenkins_client.get_build_info_data(registration_cursor.job_name, next_build_number)
-        if build_info is not None:
-            logging.warning(f"Creating pending status for {registration_cursor.jenkins_url}:{registration_cursor.job_name} "
-                            f"in repo {registration_cursor.repo} (ref {hook_details.get_ref()})")
-
-            await self.__github_client.create_github_build_status(repo=registration_cursor.repo,
-                                                                  sha=hook_details.get_ref(),
-                                                                  state="pending",
-                                                                  url=build_info['url'],
-                                                                  description="build in progress",
-                                                                  context=registration_cursor.job_name)
+        TRACER.annotate(jenkins_url=registration_cursor.jenkins_url, job=registration_cursor.job_name)
+        with INFLIGHT.track(InflightTracker.TRIGGERS,
+                            jenkins_url=registration_cursor.jenkins_url,
+                            job=registration_cursor.job_name,
+                            phase='triggering') as trigger, \
+                api_budget_scope(ApiBudget.TRIGGER, f'{registration_cursor.jenkins_url}:{registration_cursor.job_name}'):
+            hook_details.setup_final_param_values(registration_cursor)
+            job_params = HookParamsParser.get_requested_parameters_values(hook_details, registration_cursor)
+            jenkins_client = self.__jenkinses_clients.get_jenkins(registration_cursor.jenkins_url)
+            try:
+                next_build_number = await jenkins_client.get_jobs_next_build_number(registration_cursor.job_name)
+            except KeyError:
+                # INFO: KeyError means that nextBuildNumber is not available - either plugin is not installed or it's a MultiBranch pipeline
+                # In both cases we just want to run the job
+                logging.warning(f"Running job that didn't have next build number: {registration_cursor.job_name}")
+                await jenkins_client.build_jenkins_job(registration_cursor.job_name, job_params)
+                HOOK_TO_TRIGGER_SECONDS.observe(time.monotonic() - hook_details.received_at)
+                return
+            job_url: Optional[str] = await jenkins_client.get_job_url(registration_cursor.job_name)
+            try:
+                await jenkins_client.build_jenkins_job(registration_cursor.job_name, job_params)
+                triggered_at = time.monotonic()
+                HOOK_TO_TRIGGER_SECONDS.observe(triggered_at - hook_details.received_at)
+                logging.warning(f"Scheduled build of: {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number}"
+                                f"with params: {job_params}")
+            except AsyncClientException:
+                logging.exception(f"Job {registration_cursor.jenkins_url}:{registration_cursor.job_name} did "
+                                  f"not accept {job_params} as parameters but it requested them")
 
-            while await jenkins_client.is_job_building(registration_cursor.job_name, next_build_number):
-                await asyncio.sleep(1)
+                await self.report_unaccepted_parameters_to_github(hook_details, registration_cursor, job_url, next_build_number, job_params)
+                return
 
+            trigger.update(phase='waiting_for_build', build_number=next_build_number)
             build_info = await jenkins_client.get_build_info_data(registration_cursor.job_name, next_build_number)
-            logging.warning(f"Build {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number} finished.")
-
-            final_build_state = JenkinsBuildState.get_by_build_info(build_info)
-            logging.warning(f"Creating build status for {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number} - "
-                            f"verdict: {final_build_state}.")
-
             if build_info is not None:
+                logging.warning(f"Creating pending status for {registration_cursor.jenkins_url}:{registration_cursor.job_name} "
+                                f"in repo {registration_cursor.repo} (ref {hook_details.get_ref()})")
+
                 await self.__github_client.create_github_build_status(repo=registration_cursor.repo,
                                                                       sha=hook_details.get_ref(),
-                                                                      state=final_build_state.state,
+                                                                      state="pending",
                                                                       url=build_info['url'],
-                                                                      description=final_build_state.description,
+                                                                      description="build in progress",
                                                                       context=registration_cursor.job_name)
+
+                # INFO: build number is known from here on - only now can superseding stop it in Jenkins and report it
+                if self.__build_debouncer is not None and self.__build_debouncer.start_watching(asyncio.current_task()):
+                    await self.report_superseded_build(hook_details, registration_cursor, next_build_number, build_info['url'])
+                    return
+
+                WATCHED_BUILDS.inc()
+                trigger.update(phase='watching', build_number=next_build_number)
+                if self.__task_supervisor is not None:
+                    self.__task_supervisor.detach()
+                try:
+                    with TRACER.span('triggear_heart.await_build', build_number=next_build_number), \
+                            INFLIGHT.track(InflightTracker.WATCHES,
+                                           jenkins_url=registration_cursor.jenkins_url,
+                                           job=registration_cursor.job_name,
+                                           build_number=next_build_number,
+                                           polls=0) as watch:
+                        while await jenkins_client.is_job_building(registration_cursor.job_name, next_build_number):
+                            watch.update(polls=watch.details['polls'] + 1, next_poll_at=time.time() + self.BUILD_POLL_INTERVAL)
+                            await asyncio.sleep(self.BUILD_POLL_INTERVAL)
+                except asyncio.CancelledError:
+                    if self.__build_debouncer is not None and self.__build_debouncer.is_superseded(asyncio.current_task()):
+                        await self.report_superseded_build(hook_details, registration_cursor, next_build_number, build_info['url'])
+                    raise
+                finally:
+                    WATCHED_BUILDS.dec()
+
+                trigger.update(phase='reporting')
+                build_info = await jenkins_client.get_build_info_data(registration_cursor.job_name, next_build_number)
+                logging.warning(f"Build {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number} finished.")
+
+                final_build_state = JenkinsBuildState.get_by_build_info(build_info)
+                logging.warning(f"Creating build status for {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number} - "
+                                f"verdict: {final_build_state}.")
+
+                if build_info is not None:
+                    await self.__github_client.create_github_build_status(repo=registration_cursor.repo,
+                                                                          sha=hook_details.get_ref(),
+                                                                          state=final_build_state.state,
+                                                                          url=build_info['url'],
+                                                                          description=final_build_state.description,
+                                                                          context=registration_cursor.job_name)
+                    TRIGGER_TO_STATUS_SECONDS.observe(time.monotonic() - triggered_at)
+                else:
+                    logging.warning(f'Could not create status for {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number} '
+                                    f'as build info was null')
             else:
-                logging.warning(f'Could not create status for {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{next_build_number} '
-                                f'as build info was null')
-        else:
-            logging.exception(f"Triggear was not able to find build number {next_build_number} for job "
-                              f"{registration_cursor.jenkins_url}:{registration_cursor.job_name}. Task aborted.")
-            await self.report_not_found_build_to_github(hook_details, registration_cursor, job_url, next_build_number)
+                logging.exception(f"Triggear was not able to find build number {next_build_number} for job "
+                                  f"{registration_cursor.jenkins_url}:{registration_cursor.job_name}. Task aborted.")
+                await self.report_not_found_build_to_github(hook_details, registration_cursor, job_url, next_build_number)
+
+    async def report_superseded_build(self,
+                                      hook_details: HookDetails,
+                                      registration_cursor: RegistrationCursor,
+                                      build_number: int,
+                                      build_url: str) -> None:
+        logging.warning(f"Build {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{build_number} was superseded - stopping it")
+        try:
+            await self.__jenkinses_clients.get_jenkins(registration_cursor.jenkins_url).stop_build(registration_cursor.job_name, build_number)
+        except AsyncClientException:
+            logging.exception(f'Could not stop superseded build {registration_cursor.jenkins_url}:{registration_cursor.job_name} #{build_number}')
+        await self.__github_client.create_github_build_status(repo=registration_cursor.repo,
+                                                              sha=hook_details.get_ref(),
+                                                              state="error",
+                                                              url=build_url,
+                                                              description="build superseded by newer commit",
+                                                              context=registration_cursor.job_name)
 
     async def report_not_found_build_to_github(self,
                                                hook_details: HookDetails,
@@ -0,0 +1,43 @@
+import time
+from typing import Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+ValueType = TypeVar('ValueType')
+
+
+class TtlCache(Generic[ValueType]):
+    def __repr__(self) -> str:
+        return f"<TtlCache " \
+               f"entries: {len(self.__entries)}, " \
+               f"ttl: {self.ttl}, " \
+               f"hits: {self.hits}, " \
+               f"misses: {self.misses} " \
+               f">"
+
+    def __init__(self, ttl: float, max_entries: int = 128) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__entries: Dict[Hashable, Tuple[float, ValueType]] = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable) -> Optional[ValueType]:
+        entry = self.__entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.__entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: ValueType) -> None:
+        if self.ttl <= 0:
+            return
+        if len(self.__entries) >= self.max_entries and key not in self.__entries:
+            self.__entries.pop(next(iter(self.__entries)))
+        self.__entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self) -> None:
+        self.__entries.clear()
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp.web
+
+from app.clients.jenkinses_clients import JenkinsesClients
+from app.config.triggear_config import TriggearConfig
+
+
+class JobCatalogRefresher:
+    def __init__(self,
+                 config: TriggearConfig,
+                 jenkinses_clients: JenkinsesClients) -> None:
+        self.config = config
+        self.__jenkinses_clients = jenkinses_clients
+        self.__task: Optional[asyncio.Task] = None
+
+    async def start(self, app: aiohttp.web.Application) -> None:
+        self.__task = asyncio.get_event_loop().create_task(self.run())
+
+    async def stop(self, app: aiohttp.web.Application) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+
+    async def run(self) -> None:
+        while True:
+            await self.refresh_catalogs()
+            await asyncio.sleep(self.config.job_catalog_refresh_interval)
+
+    async def refresh_catalogs(self) -> None:
+        for jenkins_client in self.__jenkinses_clients.get_configured_jenkinses():
+            try:
+                await jenkins_client.refresh_job_catalog(self.config.job_catalog_folder_depth)
+            except Exception:
+                logging.exception(f'Could not refresh job catalog of {jenkins_client.config.url}')
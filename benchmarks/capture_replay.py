@@ -0,0 +1,217 @@
+"""
+Replays hooks captured by Triggear (hook_capture.file_path in config.yml) to reproduce production traffic offline.
+
+    python -m benchmarks.capture_replay summary hooks.capture
+    python -m benchmarks.capture_replay triggear hooks.capture --url http://localhost:8080 --token <triggear token> --speed 2
+    MONGO_URL=localhost:27017 python -m benchmarks.capture_replay matching hooks.capture
+    python -m benchmarks.capture_replay export hooks.capture replay.jsonl
+
+`triggear` re-signs every body with the given token and sends it at captured inter-arrival times divided by --speed
+(0 sends as fast as possible). New delivery ids are used unless --keep-delivery-ids is set, so Triggear does not drop
+replayed hooks as duplicates. `matching` runs hook details extraction and should_trigger of captured hooks against
+registrations read from MONGO_URL, without calling Jenkins - file restrictions are assumed to match and only counted.
+`export` writes JSON lines accepted by `python -m benchmarks.load_test --replay`.
+"""
+import argparse
+import asyncio
+import collections
+import hmac
+import json
+import os
+import time
+import uuid
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import aiohttp
+import pymongo
+
+from app.clients.mongo_client import MongoClient
+from app.data_objects.github_event import GithubEvent
+from app.enums.event_types import EventType
+from app.hook_details.hook_details import HookDetails
+from app.hook_details.hook_details_factory import HookDetailsFactory
+from app.hook_details.hook_params_parser import HookParamsParser
+from app.ingress.body_decoder import BodyDecoder
+from app.ingress.capture_ring import CaptureRing, CapturedHook
+from app.ingress.event_router import EventRouter, RouteKey
+from app.mongo.registration_cursor import RegistrationCursor
+from app.mongo.registration_fields import RegistrationFields
+from benchmarks.load_test.__main__ import summarize_latencies
+from benchmarks.matching_engine import run_until_complete
+
+HOOK_DETAILS_FACTORIES: Dict[RouteKey, Callable[[Dict], HookDetails]] = {
+    EventRouter.get_event_type_key(EventType.PUSH): HookDetailsFactory.get_push_details,
+    EventRouter.get_event_type_key(EventType.TAGGED): HookDetailsFactory.get_tag_details,
+    EventRouter.get_event_type_key(EventType.RELEASE): HookDetailsFactory.get_release_details,
+    EventRouter.get_event_type_key(EventType.PR_OPENED): HookDetailsFactory.get_pr_opened_details,
+    EventRouter.get_event_type_key(EventType.PR_LABELED): HookDetailsFactory.get_labeled_details
+}
+
+
+class CountingGithub:
+    def __init__(self) -> None:
+        self.file_checks = 0
+
+    async def are_files_in_repo(self, repo: str, ref: str, files: List[str]) -> bool:
+        self.file_checks += 1
+        return True
+
+
+def decode(hook: CapturedHook) -> Dict:
+    if hook.event_header == EventType.PUSH.event_header:
+        return BodyDecoder.decode_push_json(hook.body)
+    return BodyDecoder.decode_json(hook.body)
+
+
+def get_github_event(hook: CapturedHook, data: Dict) -> GithubEvent:
+    return GithubEvent(event_header=hook.event_header, action=data.get('action'), ref=data.get('ref'))
+
+
+def summary(hooks: List[CapturedHook]) -> Dict[str, Any]:
+    if not hooks:
+        return {'hooks': 0}
+    return {'hooks': len(hooks),
+            'sequences': [hooks[0].sequence, hooks[-1].sequence],
+            'received': [time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(hook.received_at)) for hook in (hooks[0], hooks[-1])],
+            'duration': round(hooks[-1].received_at - hooks[0].received_at, 3),
+            'body_bytes': sum(len(hook.body) for hook in hooks),
+            'events': dict(collections.Counter(str(hook.event_header) for hook in hooks))}
+
+
+def export(hooks: List[CapturedHook], output_path: str) -> Dict[str, Any]:
+    with open(output_path, 'w') as output_file:
+        for hook in hooks:
+            output_file.write(json.dumps({'event': hook.event_header, 'body': decode(hook)}) + '\n')
+    return {'exported': len(hooks), 'output': output_path}
+
+
+def get_schedule(hooks: List[CapturedHook], speed: float) -> List[float]:
+    if speed <= 0:
+        return [0.0] * len(hooks)
+    return [(hook.received_at - hooks[0].received_at) / speed for hook in hooks]
+
+
+async def replay_to_triggear(hooks: List[CapturedHook], url: str, token: str, speed: float, keep_delivery_ids: bool) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = collections.Counter()
+
+    async def send_hook(session: aiohttp.ClientSession, hook: CapturedHook) -> None:
+        headers = dict(hook.headers)
+        if not keep_delivery_ids:
+            headers[CaptureRing.DELIVERY_HEADER] = str(uuid.uuid4())
+        headers['X-Hub-Signature-256'] = 'sha256=' + hmac.new(token.encode(), msg=hook.body, digestmod='sha256').hexdigest()
+        sent_at = time.monotonic()
+        async with session.post(f'{url}/github', data=hook.body, headers=headers) as response:
+            await response.read()
+            statuses[response.status] += 1
+        latencies.append(time.monotonic() - sent_at)
+
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    # INFO: open loop like GitHub - hooks are sent on captured schedule no matter how slow Triggear answers
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        tasks = []
+        for hook, delay in zip(hooks, get_schedule(hooks, speed)):
+            await asyncio.sleep(max(0.0, started + delay - loop.time()))
+            tasks.append(loop.create_task(send_hook(session, hook)))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    duration = loop.time() - started
+    return {'sent': len(hooks),
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'errors': sum(1 for result in results if isinstance(result, Exception)),
+            'duration': round(duration, 3),
+            'hooks_per_second': round(len(hooks) / duration, 2) if duration else None,
+            'ack_latency': summarize_latencies(latencies)}
+
+
+def read_registrations(mongo_url: str) -> Dict[Tuple[str, str], List[Dict]]:
+    registrations: Dict[Tuple[str, str], List[Dict]] = collections.defaultdict(list)
+    database = pymongo.MongoClient(mongo_url)[MongoClient.REGISTRATIONS_DB]
+    for event_type in EventType.get_allowed_registration_event_types():
+        for document in database[event_type.collection_name].find():
+            registrations[(event_type.collection_name, document.get(RegistrationFields.REPO))].append(document)
+    return registrations
+
+
+def matches_query(document: Dict, query: Dict[str, Any]) -> bool:
+    for key, value in query.items():
+        field = document.get(key)
+        if not (value in field if isinstance(field, list) else field == value):
+            return False
+    return True
+
+
+def get_hook_details(hook: CapturedHook) -> Optional[HookDetails]:
+    data = decode(hook)
+    factory = HOOK_DETAILS_FACTORIES.get(EventRouter.get_route_key(get_github_event(hook, data)))
+    return factory(data) if factory is not None else None
+
+
+def replay_to_matching(hooks: List[CapturedHook], registrations: Dict[Tuple[str, str], List[Dict]]) -> Dict[str, Any]:
+    github = CountingGithub()
+    timings: Dict[str, List[float]] = collections.defaultdict(list)
+    skipped: Dict[str, int] = collections.Counter()
+    considered = triggered = 0
+    for hook in hooks:
+        started = time.perf_counter()
+        hook_details = get_hook_details(hook)
+        if hook_details is None:
+            # INFO: sync and comment hooks need PR labels or branch from GitHub before they can be matched
+            skipped[str(hook.event_header)] += 1
+            continue
+        event_type = hook_details.get_event_type()
+        query = hook_details.get_query()
+        for document in registrations.get((event_type.collection_name, query.get(RegistrationFields.REPO)), []):
+            if not matches_query(document, query):
+                continue
+            considered += 1
+            registration = RegistrationCursor(document)
+            if run_until_complete(hook_details.should_trigger(registration, github)):
+                HookParamsParser.get_requested_parameters_values(hook_details, registration)
+                triggered += 1
+        timings[event_type.collection_name].append(time.perf_counter() - started)
+    return {'matched_hooks': sum(len(values) for values in timings.values()),
+            'skipped': dict(skipped),
+            'registrations_considered': considered,
+            'triggers': triggered,
+            'file_restriction_checks': github.file_checks,
+            'seconds_per_hook': {collection: dict(summarize_latencies(values), count=len(values))
+                                 for collection, values in sorted(timings.items())}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', choices=['summary', 'triggear', 'matching', 'export'])
+    parser.add_argument('capture', help='capture ring file written by Triggear')
+    parser.add_argument('output', nargs='?', help='JSON lines file written by export')
+    parser.add_argument('--url', default='http://localhost:8080', help='Triggear to replay hooks to')
+    parser.add_argument('--token', help='triggear_token of target instance used to sign hooks')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed relative to capture, 0 for as fast as possible')
+    parser.add_argument('--keep-delivery-ids', action='store_true')
+    parser.add_argument('--limit', type=int, help='replay only first N captured hooks')
+    args = parser.parse_args()
+
+    hooks = CaptureRing.read_file(args.capture)[:args.limit]
+    report: Dict[str, Any] = {'capture': summary(hooks)}
+    if args.target == 'summary':
+        result = None
+    elif args.target == 'export':
+        if args.output is None:
+            parser.error('export needs an output file')
+        result = export(hooks, args.output)
+    elif args.target == 'triggear':
+        if args.token is None:
+            parser.error('triggear replay needs --token to sign hooks')
+        result = asyncio.get_event_loop().run_until_complete(replay_to_triggear(hooks, args.url, args.token, args.speed,
+                                                                                args.keep_delivery_ids))
+    else:
+        if not os.environ.get('MONGO_URL'):
+            parser.error('MONGO_URL must point to Mongo with registrations to match against')
+        result = replay_to_matching(hooks, read_registrations(os.environ['MONGO_URL']))
+    if result is not None:
+        report['result'] = result
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
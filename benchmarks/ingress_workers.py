@@ -0,0 +1,147 @@
+"""
+Measures hooks per second accepted by the SO_REUSEPORT ingress for different worker counts.
+
+Every worker serves /github with the real AuthenticationMiddleware (HMAC of the whole body)
+followed by JSON decoding and push details extraction - the CPU heavy part of hook ingress.
+
+    python -m benchmarks.ingress_workers --workers 1 2 4 --payload-mb 1 --duration 10
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import List, Dict
+
+import aiohttp
+from aiohttp import web
+
+from app.hook_details.hook_details_factory import HookDetailsFactory
+from app.main import run_supervised_workers, create_reuseport_socket
+from app.middlewares.authentication_middleware import AuthenticationMiddleware
+from app.routes import Routes
+
+TOKEN = 'benchmark-token'
+
+
+class BenchmarkConfig:
+    triggear_token = TOKEN
+
+
+def get_push_payload(size: int) -> bytes:
+    files_per_commit = 100
+    commits = []
+    payload = {'ref': 'refs/heads/master', 'after': 'a' * 40, 'repository': {'full_name': 'org/repo'}, 'commits': commits}
+    while len(json.dumps(payload)) < size:
+        commit_number = len(commits)
+        commits.append({
+            'id': f'{commit_number:040d}',
+            'message': 'benchmark commit ' * 10,
+            'added': [f'src/added/{commit_number}/{index}.py' for index in range(files_per_commit)],
+            'removed': [f'src/removed/{commit_number}/{index}.py' for index in range(files_per_commit)],
+            'modified': [f'src/modified/{commit_number}/{index}.py' for index in range(files_per_commit)]
+        })
+    return json.dumps(payload).encode()
+
+
+async def handle_hook(request: web.Request) -> web.Response:
+    data = json.loads(await request.read())
+    HookDetailsFactory.get_push_details(data)
+    return web.Response(text='Hook ACK')
+
+
+def run_benchmark_worker(port: int, worker_id: int) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    app = web.Application(middlewares=(AuthenticationMiddleware(config=BenchmarkConfig()).authentication,))  # type: ignore
+    app.router.add_post(Routes.GITHUB.route, handle_hook)
+    web.run_app(app, sock=create_reuseport_socket('127.0.0.1', port), print=None)
+
+
+def run_server(workers: int, port: int) -> None:
+    run_supervised_workers(workers, lambda worker_id: run_benchmark_worker(port, worker_id))
+
+
+async def send_hooks(port: int, payload: bytes, duration: float, concurrency: int) -> int:
+    signature = 'sha1=' + hmac.new(TOKEN.encode(), msg=payload, digestmod='sha1').hexdigest()
+    headers = {'X-Hub-Signature': signature, 'X-GitHub-Event': 'push', 'Content-Type': 'application/json'}
+    deadline = time.monotonic() + duration
+    sent = 0
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        nonlocal sent
+        while time.monotonic() < deadline:
+            async with session.post(f'http://127.0.0.1:{port}/github', data=payload, headers=headers) as response:
+                await response.read()
+                if response.status == 200:
+                    sent += 1
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[client(session) for _ in range(concurrency)])
+    return sent
+
+
+def run_client(port: int, payload: bytes, duration: float, concurrency: int, results: 'multiprocessing.Queue') -> None:
+    results.put(asyncio.new_event_loop().run_until_complete(send_hooks(port, payload, duration, concurrency)))
+
+
+def wait_for_port(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f'Benchmark server did not start on port {port}')
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return int(sock.getsockname()[1])
+
+
+def measure(workers: int, payload: bytes, duration: float, clients: int, concurrency: int) -> Dict:
+    port = get_free_port()
+    server = multiprocessing.Process(target=run_server, args=(workers, port))
+    server.start()
+    try:
+        wait_for_port(port)
+        # INFO: short warm up lets every worker accept its first connections before measuring
+        asyncio.new_event_loop().run_until_complete(send_hooks(port, payload, 0.5, concurrency))
+        results: multiprocessing.Queue = multiprocessing.Queue()
+        client_processes = [multiprocessing.Process(target=run_client, args=(port, payload, duration, concurrency, results))
+                            for _ in range(clients)]
+        for client_process in client_processes:
+            client_process.start()
+        hooks = sum(results.get() for _ in client_processes)
+        for client_process in client_processes:
+            client_process.join()
+    finally:
+        os.kill(server.pid, signal.SIGTERM)
+        server.join()
+    return {'workers': workers, 'hooks': hooks, 'hooks_per_second': round(hooks / duration, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--payload-mb', type=float, default=1)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=max(2, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    payload = get_push_payload(int(args.payload_mb * 1024 * 1024))
+    results: List[Dict] = [measure(workers, payload, args.duration, args.clients, args.concurrency) for workers in args.workers]
+    print(json.dumps({'payload_bytes': len(payload), 'cpu_count': os.cpu_count(), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
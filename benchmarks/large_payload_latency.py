@@ -0,0 +1,122 @@
+"""
+Measures latency of small hooks while large pushes are being ingested by the same process.
+
+Server runs the real AuthenticationMiddleware (HMAC-SHA256 of the whole body) followed by BodyDecoder,
+once with everything inline and once with large bodies offloaded to thread (HMAC) and process (JSON) pools.
+
+    python -m benchmarks.large_payload_latency --payload-mb 5 --duration 10
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from app.ingress.body_decoder import BodyDecoder
+from app.middlewares.authentication_middleware import AuthenticationMiddleware
+from app.routes import Routes
+from benchmarks.ingress_workers import BenchmarkConfig, TOKEN, get_push_payload, get_free_port, wait_for_port
+
+SMALL_PAYLOAD = json.dumps({'ref': 'refs/heads/master', 'after': 'a' * 40, 'repository': {'full_name': 'org/repo'}, 'commits': []}).encode()
+
+
+def run_server(port: int, offload_threshold: Optional[int], decode_workers: int) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    body_decoder = BodyDecoder(offload_threshold=offload_threshold or 0, workers=decode_workers)
+
+    async def handle_hook(request: web.Request) -> web.Response:
+        await body_decoder.decode(await request.read(), request.headers.get('X-GitHub-Event'))
+        return web.Response(text='Hook ACK')
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    authentication_middleware = AuthenticationMiddleware(config=BenchmarkConfig(), offload_threshold=offload_threshold)  # type: ignore
+    app = web.Application(middlewares=(authentication_middleware.authentication,), client_max_size=1024 ** 3)
+    app.router.add_post(Routes.GITHUB.route, handle_hook)
+    app.on_cleanup.append(body_decoder.stop)
+    web.run_app(app, host='127.0.0.1', port=port, print=None)
+
+
+def get_headers(payload: bytes) -> Dict[str, str]:
+    signature = 'sha256=' + hmac.new(TOKEN.encode(), msg=payload, digestmod='sha256').hexdigest()
+    return {'X-Hub-Signature-256': signature, 'X-GitHub-Event': 'push', 'Content-Type': 'application/json'}
+
+
+async def send_large_hooks(session: aiohttp.ClientSession, port: int, payload: bytes, deadline: float) -> None:
+    headers = get_headers(payload)
+    while time.monotonic() < deadline:
+        async with session.post(f'http://127.0.0.1:{port}/github', data=payload, headers=headers) as response:
+            await response.read()
+
+
+async def send_small_hooks(session: aiohttp.ClientSession, port: int, deadline: float, interval: float) -> List[float]:
+    headers = get_headers(SMALL_PAYLOAD)
+    latencies: List[float] = []
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        async with session.post(f'http://127.0.0.1:{port}/github', data=SMALL_PAYLOAD, headers=headers) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_load(port: int, payload: bytes, duration: float, large_senders: int, interval: float) -> List[float]:
+    deadline = time.monotonic() + duration
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+        results = await asyncio.gather(send_small_hooks(session, port, deadline, interval),
+                                       *[send_large_hooks(session, port, payload, deadline) for _ in range(large_senders)])
+    return results[0]
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def measure(mode: str, offload_threshold: Optional[int], decode_workers: int, payload: bytes,
+            duration: float, large_senders: int, interval: float) -> Dict:
+    port = get_free_port()
+    server = multiprocessing.Process(target=run_server, args=(port, offload_threshold, decode_workers))
+    server.start()
+    try:
+        wait_for_port(port)
+        latencies = asyncio.new_event_loop().run_until_complete(run_load(port, payload, duration, large_senders, interval))
+    finally:
+        os.kill(server.pid, signal.SIGTERM)
+        server.join()
+    return {
+        'mode': mode,
+        'small_hooks': len(latencies),
+        'p50_ms': round(get_percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(get_percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payload-mb', type=float, default=5)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--large-senders', type=int, default=2)
+    parser.add_argument('--interval', type=float, default=0.01)
+    parser.add_argument('--offload-threshold-kb', type=int, default=256)
+    parser.add_argument('--decode-workers', type=int, default=2)
+    args = parser.parse_args()
+
+    payload = get_push_payload(int(args.payload_mb * 1024 * 1024))
+    results = [
+        measure('inline', None, 0, payload, args.duration, args.large_senders, args.interval),
+        measure('offloaded', args.offload_threshold_kb * 1024, args.decode_workers, payload, args.duration, args.large_senders, args.interval)
+    ]
+    print(json.dumps({'payload_bytes': len(payload), 'cpu_count': os.cpu_count(), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""
+Hermetic load test of a whole Triggear process against fake GitHub and fake Jenkins.
+
+Fakes serve the GitHub endpoints used by GithubClient and the Jenkins endpoints used by JenkinsClient
+with configurable latency, error rate and build duration. Triggear runs from app.main.create_app with
+generated config and creds pointing at them, registers jobs through its own API and receives signed
+push hooks at a fixed rate - synthetic ones or replayed from a JSON lines file of {"event": ..., "body": ...}.
+
+Registrations are stored in the Mongo from MONGO_URL (use a throwaway instance) and deregistered at the end.
+
+    MONGO_URL=localhost:27017 python -m benchmarks.load_test --rate 50 --duration 30 --build-duration 2
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Any, Optional, Tuple
+
+import aiohttp
+import yaml
+from aiohttp import web
+
+from benchmarks.ingress_workers import get_free_port, wait_for_port
+from benchmarks.large_payload_latency import get_percentile
+from benchmarks.load_test.fake_github import FakeGithub
+from benchmarks.load_test.fake_jenkins import FakeJenkins
+
+TOKEN = 'load-test-token'
+CALLER = 'load-test'
+Hook = Tuple[str, str, bytes]
+
+
+def get_job_names(jobs_per_repository: int) -> List[str]:
+    return [f'load-test-job-{index}' for index in range(jobs_per_repository)]
+
+
+def run_fakes(github_port: int, jenkins_port: int, args: argparse.Namespace) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    fake_github = FakeGithub(latency=args.github_latency, error_rate=args.github_error_rate)
+    fake_jenkins = FakeJenkins(url=f'http://127.0.0.1:{jenkins_port}',
+                               jobs=get_job_names(args.jobs_per_repository),
+                               latency=args.jenkins_latency,
+                               error_rate=args.jenkins_error_rate,
+                               build_duration=args.build_duration)
+    for fake, port in ((fake_github, github_port), (fake_jenkins, jenkins_port)):
+        runner = web.AppRunner(fake.create_app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+    loop.run_forever()
+
+
+def write_triggear_config(directory: str, github_port: int, jenkins_port: int, triggear_port: int) -> Tuple[str, str]:
+    config_path = os.path.join(directory, 'config.yml')
+    creds_path = os.path.join(directory, 'creds.yml')
+    with open(config_path, 'w') as config_file:
+        yaml.safe_dump({
+            'github': {'api_url': f'http://127.0.0.1:{github_port}'},
+            'ingress': {'host': '127.0.0.1', 'port': triggear_port},
+            'webhook_inbox': {'directory': os.path.join(directory, 'inbox')},
+            # INFO: every hook carries a new commit on the same branch - debouncing would supersede most of them
+            'build_debounce': {'window': 0},
+            'registered_repositories': {'refresh_interval': 5}
+        }, config_file)
+    with open(creds_path, 'w') as creds_file:
+        yaml.safe_dump({
+            'github_token': 'load-test',
+            'triggear_token': TOKEN,
+            'jenkins_instances': [{'url': f'http://127.0.0.1:{jenkins_port}', 'user': 'load-test', 'token': 'load-test'}]
+        }, creds_file)
+    return config_path, creds_path
+
+
+def run_triggear(config_path: str, creds_path: str) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.environ['CONFIG_PATH'] = config_path
+    os.environ['CREDS_PATH'] = creds_path
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    from app.config.triggear_config import TriggearConfig
+    from app.main import create_app
+    app_config = TriggearConfig()
+    web.run_app(create_app(app_config), host=app_config.ingress_host, port=app_config.ingress_port, print=None)
+
+
+def get_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f'/proc/{pid}/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def get_push_body(repository: str, index: int) -> Dict[str, Any]:
+    sha = hashlib.sha1(f'{repository}:{index}'.encode()).hexdigest()
+    return {
+        'ref': 'refs/heads/load-test',
+        'before': '1' * 40,
+        'after': sha,
+        'repository': {'full_name': repository},
+        'commits': [{'id': sha, 'message': 'load test', 'added': [], 'removed': [], 'modified': [f'src/file_{index}.py']}]
+    }
+
+
+def read_replayed_hooks(replay_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    with open(replay_path) as replay_file:
+        return [(entry['event'], entry['body']) for entry in map(json.loads, filter(str.strip, replay_file))]
+
+
+def prepare_hooks(replayed: List[Tuple[str, Dict[str, Any]]], repositories: List[str], count: int) -> Tuple[List[Hook], Dict[str, int]]:
+    hooks: List[Hook] = []
+    hook_index_by_sha: Dict[str, int] = {}
+    for index in range(count):
+        if replayed:
+            event, body = replayed[index % len(replayed)]
+            if event == 'push':
+                # INFO: every replay gets its own commit so triggers can be matched back to the hook that caused them
+                body = dict(body, after=hashlib.sha1(f'{body.get("after")}:{index}'.encode()).hexdigest())
+        else:
+            event, body = 'push', get_push_body(repositories[index % len(repositories)], index)
+        if event == 'push':
+            hook_index_by_sha[body['after']] = index
+        hooks.append((event, str(uuid.uuid4()), json.dumps(body).encode()))
+    return hooks, hook_index_by_sha
+
+
+def get_repositories(replayed: List[Tuple[str, Dict[str, Any]]], repositories: int) -> List[str]:
+    if replayed:
+        return sorted({body['repository']['full_name'] for event, body in replayed if event == 'push'})
+    return [f'load-test/repo-{index}' for index in range(repositories)]
+
+
+async def call_api(session: aiohttp.ClientSession, triggear_url: str, route: str, data: Dict[str, Any]) -> None:
+    async with session.post(f'{triggear_url}{route}', json=data, headers={'Authorization': f'Token {TOKEN}'}) as response:
+        if response.status != 200:
+            raise RuntimeError(f'{route} failed with {response.status}: {await response.text()}')
+
+
+async def register_jobs(triggear_url: str, jenkins_url: str, repositories: List[str], jobs: List[str], file_restrictions: List[str]) -> None:
+    async with aiohttp.ClientSession() as session:
+        for repository in repositories:
+            for job in jobs:
+                await call_api(session, triggear_url, '/register', {
+                    'eventType': 'push', 'repository': repository, 'jobName': job, 'jenkins_url': jenkins_url, 'labels': [],
+                    'requested_params': ['sha'], 'branch_restrictions': [], 'change_restrictions': [], 'file_restrictions': file_restrictions
+                })
+
+
+async def deregister_jobs(triggear_url: str, jenkins_url: str, jobs: List[str]) -> None:
+    async with aiohttp.ClientSession() as session:
+        for job in jobs:
+            await call_api(session, triggear_url, '/deregister', {'eventType': 'push', 'caller': CALLER, 'jobName': job, 'jenkins_url': jenkins_url})
+
+
+async def send_hooks(triggear_url: str, hooks: List[Hook], rate: float) -> Tuple[List[float], int, float]:
+    sent_at: List[float] = [0.0] * len(hooks)
+    acknowledged = 0
+
+    async def send_hook(session: aiohttp.ClientSession, index: int) -> None:
+        nonlocal acknowledged
+        event, delivery_id, body = hooks[index]
+        headers = {'X-GitHub-Event': event,
+                   'X-GitHub-Delivery': delivery_id,
+                   'X-Hub-Signature-256': 'sha256=' + hmac.new(TOKEN.encode(), msg=body, digestmod='sha256').hexdigest(),
+                   'Content-Type': 'application/json'}
+        sent_at[index] = time.time()
+        async with session.post(f'{triggear_url}/github', data=body, headers=headers) as response:
+            await response.read()
+            if response.status == 200:
+                acknowledged += 1
+
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    # INFO: open loop - hooks are sent on schedule no matter how slow Triggear answers, like GitHub does
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        tasks = []
+        for index in range(len(hooks)):
+            await asyncio.sleep(max(0.0, started + index / rate - loop.time()))
+            tasks.append(loop.create_task(send_hook(session, index)))
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return sent_at, acknowledged, loop.time() - started
+
+
+async def get_stats(url: str) -> Dict[str, Any]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'{url}/_stats') as response:
+            return dict(await response.json())
+
+
+async def sample_memory(pid: int, samples: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = get_rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        await asyncio.sleep(0.5)
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    return {'p50': round(get_percentile(latencies, 0.5), 4),
+            'p95': round(get_percentile(latencies, 0.95), 4),
+            'p99': round(get_percentile(latencies, 0.99), 4),
+            'max': round(max(latencies), 4)}
+
+
+def get_calls_per_hook(stats: Dict[str, Any], hooks: int) -> Dict[str, Any]:
+    calls: Dict[str, int] = stats['calls']
+    return {'total': round(sum(calls.values()) / max(hooks, 1), 2),
+            'routes': {route: round(count / max(hooks, 1), 2) for route, count in sorted(calls.items())},
+            'errors': stats['errors']}
+
+
+async def run_load(args: argparse.Namespace, triggear_url: str, jenkins_url: str, github_url: str, triggear_pid: int) -> Dict[str, Any]:
+    replayed = read_replayed_hooks(args.replay) if args.replay else []
+    repositories = get_repositories(replayed, args.repositories)
+    jobs = get_job_names(args.jobs_per_repository)
+    hooks, hook_index_by_sha = prepare_hooks(replayed, repositories, int(args.rate * args.duration))
+
+    await register_jobs(triggear_url, jenkins_url, repositories, jobs, args.file_restrictions)
+    memory_samples: List[float] = []
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.get_event_loop().create_task(sample_memory(triggear_pid, memory_samples, stop_sampling))
+    try:
+        sent_at, acknowledged, send_duration = await send_hooks(triggear_url, hooks, args.rate)
+        # INFO: hooks sent at the very end still need time to be triggered and to get their final statuses
+        await asyncio.sleep(args.settle)
+    finally:
+        stop_sampling.set()
+        await sampler
+        await deregister_jobs(triggear_url, jenkins_url, jobs)
+
+    github_stats = await get_stats(github_url)
+    jenkins_stats = await get_stats(jenkins_url)
+    latencies = [trigger['time'] - sent_at[hook_index_by_sha[trigger['parameters']['sha']]]
+                 for trigger in jenkins_stats['triggers']
+                 if trigger['parameters'].get('sha') in hook_index_by_sha]
+    triggers_within_run = [trigger for trigger in jenkins_stats['triggers'] if trigger['time'] <= min(sent_at) + send_duration]
+    return {
+        'hooks_sent': len(hooks),
+        'hooks_acknowledged': acknowledged,
+        'hooks_per_second': round(acknowledged / send_duration, 1),
+        'triggers_expected': len(hook_index_by_sha) * len(jobs),
+        'triggers': len(jenkins_stats['triggers']),
+        'triggers_per_second': round(len(triggers_within_run) / send_duration, 1),
+        'final_statuses': sum(1 for status in github_stats['statuses'] if status['state'] != 'pending'),
+        'hook_to_trigger_seconds': summarize_latencies(latencies),
+        'upstream_calls_per_hook': {'github': get_calls_per_hook(github_stats, len(hooks)),
+                                    'jenkins': get_calls_per_hook(jenkins_stats, len(hooks))},
+        'triggear_rss_mb': {'start': memory_samples[0] if memory_samples else None,
+                            'peak': max(memory_samples) if memory_samples else None,
+                            'end': memory_samples[-1] if memory_samples else None}
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=20, help='hooks per second')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--settle', type=float, default=10, help='seconds to wait for triggers after last hook')
+    parser.add_argument('--repositories', type=int, default=10)
+    parser.add_argument('--jobs-per-repository', type=int, default=2)
+    parser.add_argument('--file-restrictions', nargs='*', default=[], help='registered file restrictions - each costs a GitHub call')
+    parser.add_argument('--replay', help='JSON lines file with {"event": ..., "body": ...} hooks to replay instead of synthetic pushes')
+    parser.add_argument('--github-latency', type=float, default=0.05)
+    parser.add_argument('--github-error-rate', type=float, default=0.0)
+    parser.add_argument('--jenkins-latency', type=float, default=0.02)
+    parser.add_argument('--jenkins-error-rate', type=float, default=0.0)
+    parser.add_argument('--build-duration', type=float, default=2.0)
+    args = parser.parse_args()
+
+    if not os.environ.get('MONGO_URL'):
+        parser.error('MONGO_URL must point to a local (throwaway) Mongo instance')
+
+    github_port, jenkins_port, triggear_port = get_free_port(), get_free_port(), get_free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        config_path, creds_path = write_triggear_config(directory, github_port, jenkins_port, triggear_port)
+        fakes = multiprocessing.Process(target=run_fakes, args=(github_port, jenkins_port, args))
+        triggear = multiprocessing.Process(target=run_triggear, args=(config_path, creds_path))
+        fakes.start()
+        try:
+            wait_for_port(github_port)
+            wait_for_port(jenkins_port)
+            triggear.start()
+            try:
+                wait_for_port(triggear_port, timeout=30)
+                result = asyncio.new_event_loop().run_until_complete(run_load(args,
+                                                                              f'http://127.0.0.1:{triggear_port}',
+                                                                              f'http://127.0.0.1:{jenkins_port}',
+                                                                              f'http://127.0.0.1:{github_port}',
+                                                                              triggear.pid))
+            finally:
+                os.kill(triggear.pid, signal.SIGTERM)
+                triggear.join()
+        finally:
+            os.kill(fakes.pid, signal.SIGTERM)
+            fakes.join()
+    print(json.dumps({'parameters': vars(args), 'result': result}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import time
+from typing import Dict, Any, List
+
+from aiohttp import web
+
+from app.enums.triggear_pr_label import TriggearPrLabel
+from benchmarks.load_test.fake_upstream import FakeUpstream
+
+
+class FakeGithub(FakeUpstream):
+    def __init__(self,
+                 latency: float,
+                 error_rate: float) -> None:
+        super().__init__(latency, error_rate)
+        self.statuses: List[Dict[str, Any]] = []
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_get('/repos/{owner}/{repo}/commits/{sha}', self.handle_commit)
+        app.router.add_get('/repos/{owner}/{repo}/contents/{path:.+}', self.handle_contents)
+        app.router.add_get('/repos/{owner}/{repo}/pulls/{number}', self.handle_pull_request)
+        app.router.add_get('/repos/{owner}/{repo}/issues/{number}', self.handle_issue)
+        app.router.add_get('/repos/{owner}/{repo}/labels', self.handle_labels)
+        app.router.add_post('/repos/{owner}/{repo}/issues/{number}/labels', self.handle_created)
+        app.router.add_post('/repos/{owner}/{repo}/commits/{sha}/comments', self.handle_created)
+        app.router.add_post('/repos/{owner}/{repo}/statuses/{sha}', self.handle_status)
+        app.router.add_get('/repos/{owner}/{repo}/deployments', self.handle_deployments)
+        app.router.add_post('/repos/{owner}/{repo}/deployments', self.handle_created)
+        app.router.add_post('/repos/{owner}/{repo}/deployments/{deployment_id}/statuses', self.handle_created)
+
+    @staticmethod
+    def get_headers() -> Dict[str, str]:
+        return {'X-RateLimit-Remaining': '5000'}
+
+    async def handle_commit(self, request: web.Request) -> web.Response:
+        return web.json_response({'sha': request.match_info['sha'].ljust(40, '0')}, headers=self.get_headers())
+
+    async def handle_contents(self, request: web.Request) -> web.Response:
+        return web.json_response({'path': request.match_info['path'], 'type': 'file'}, headers=self.get_headers())
+
+    async def handle_pull_request(self, request: web.Request) -> web.Response:
+        number = int(request.match_info['number'])
+        return web.json_response({'number': number, 'head': {'sha': f'{number:040d}', 'ref': f'branch-{number}'}}, headers=self.get_headers())
+
+    async def handle_issue(self, request: web.Request) -> web.Response:
+        return web.json_response({'number': int(request.match_info['number']), 'labels': []}, headers=self.get_headers())
+
+    async def handle_labels(self, request: web.Request) -> web.Response:
+        return web.json_response([{'name': label.label_name} for label in TriggearPrLabel], headers=self.get_headers())
+
+    async def handle_deployments(self, request: web.Request) -> web.Response:
+        return web.json_response([], headers=self.get_headers())
+
+    async def handle_created(self, request: web.Request) -> web.Response:
+        return web.json_response({}, status=201, headers=self.get_headers())
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.statuses.append({'sha': request.match_info['sha'], 'state': data.get('state'), 'time': time.time()})
+        return web.json_response({}, status=201, headers=self.get_headers())
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['statuses'] = self.statuses
+        return stats
@@ -0,0 +1,99 @@
+import time
+from typing import Dict, Any, List, Optional
+
+from aiohttp import web
+
+from benchmarks.load_test.fake_upstream import FakeUpstream
+
+
+class FakeBuild:
+    def __init__(self,
+                 number: int,
+                 parameters: Dict[str, str],
+                 duration: float) -> None:
+        self.number = number
+        self.parameters = parameters
+        self.triggered = time.time()
+        self.finishes = self.triggered + duration
+        self.stopped = False
+
+    def is_building(self) -> bool:
+        return not self.stopped and time.time() < self.finishes
+
+    def get_result(self) -> Optional[str]:
+        if self.stopped:
+            return 'ABORTED'
+        return None if self.is_building() else 'SUCCESS'
+
+
+class FakeJenkins(FakeUpstream):
+    def __init__(self,
+                 url: str,
+                 jobs: List[str],
+                 latency: float,
+                 error_rate: float,
+                 build_duration: float) -> None:
+        super().__init__(latency, error_rate)
+        self.url = url
+        self.jobs = jobs
+        self.build_duration = build_duration
+        self.builds: Dict[str, List[FakeBuild]] = {job: [] for job in jobs}
+
+    def add_routes(self, app: web.Application) -> None:
+        app.router.add_get('/crumbIssuer/api/json', self.handle_crumb)
+        app.router.add_get('/api/json', self.handle_jobs_tree)
+        app.router.add_get('/job/{job}/api/json', self.handle_job_info)
+        app.router.add_post('/job/{job}/build', self.handle_build)
+        app.router.add_post('/job/{job}/buildWithParameters', self.handle_build)
+        app.router.add_get('/job/{job}/{number}/api/json', self.handle_build_info)
+        app.router.add_post('/job/{job}/{number}/stop', self.handle_stop)
+
+    def get_job_url(self, job: str) -> str:
+        return f'{self.url}/job/{job}/'
+
+    def get_build(self, request: web.Request) -> Optional[FakeBuild]:
+        builds = self.builds.get(request.match_info['job'], [])
+        number = int(request.match_info['number'])
+        return builds[number - 1] if 0 < number <= len(builds) else None
+
+    async def handle_crumb(self, request: web.Request) -> web.Response:
+        return web.json_response({'crumbRequestField': 'Jenkins-Crumb', 'crumb': 'load-test'})
+
+    async def handle_jobs_tree(self, request: web.Request) -> web.Response:
+        return web.json_response({'jobs': [{'name': job, 'url': self.get_job_url(job)} for job in self.jobs]})
+
+    async def handle_job_info(self, request: web.Request) -> web.Response:
+        job = request.match_info['job']
+        if job not in self.builds:
+            return web.Response(status=404, text='Job not found')
+        return web.json_response({'name': job, 'url': self.get_job_url(job), 'nextBuildNumber': len(self.builds[job]) + 1})
+
+    async def handle_build(self, request: web.Request) -> web.Response:
+        job = request.match_info['job']
+        if job not in self.builds:
+            return web.Response(status=404, text='Job not found')
+        builds = self.builds[job]
+        builds.append(FakeBuild(len(builds) + 1, dict(request.query), self.build_duration))
+        return web.Response(status=201, text='')
+
+    async def handle_build_info(self, request: web.Request) -> web.Response:
+        build = self.get_build(request)
+        if build is None:
+            return web.Response(status=404, text='Build not found')
+        return web.json_response({'number': build.number,
+                                  'building': build.is_building(),
+                                  'result': build.get_result(),
+                                  'url': f'{self.get_job_url(request.match_info["job"])}{build.number}/'})
+
+    async def handle_stop(self, request: web.Request) -> web.Response:
+        build = self.get_build(request)
+        if build is None:
+            return web.Response(status=404, text='Build not found')
+        build.stopped = True
+        return web.Response(status=200, text='')
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['triggers'] = [{'job': job, 'parameters': build.parameters, 'time': build.triggered}
+                             for job, builds in self.builds.items() for build in builds]
+        return stats
@@ -0,0 +1,52 @@
+import asyncio
+import random
+from collections import Counter
+from typing import Dict, Any, Callable, Awaitable
+
+from aiohttp import web
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+class FakeUpstream:
+    STATS_ROUTE = '/_stats'
+
+    def __init__(self,
+                 latency: float,
+                 error_rate: float) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+        self.errors = 0
+
+    def get_latency(self) -> float:
+        # INFO: +-50% jitter keeps requests from the same burst from finishing in lockstep
+        return self.latency * random.uniform(0.5, 1.5)
+
+    @web.middleware
+    async def simulate(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.path == self.STATS_ROUTE:
+            return await handler(request)
+        resource = request.match_info.route.resource
+        self.calls[f'{request.method} {resource.canonical if resource is not None else "unmatched"}'] += 1
+        if self.latency:
+            await asyncio.sleep(self.get_latency())
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=500, text='Simulated upstream error')
+        return await handler(request)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'calls': dict(self.calls), 'errors': self.errors}
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.get_stats())
+
+    def add_routes(self, app: web.Application) -> None:
+        raise NotImplementedError()
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=(self.simulate,))
+        app.router.add_get(self.STATS_ROUTE, self.handle_stats)
+        self.add_routes(app)
+        return app
@@ -0,0 +1,181 @@
+"""
+Microbenchmarks of the pure-Python matching hot paths on a synthetic registration corpus.
+
+Covers HookParamsParser, app.utilities.functions prefix helpers, should_trigger of every hook details type,
+EventType.__eq__ dispatch next to EventRouter lookup, push details extraction and RegisterRequestData validation.
+Results are written as JSON - pass a previous result as --compare to see regressions between commits.
+
+    python -m benchmarks.matching_engine --registrations 5000 --files-per-push 5000 --output before.json
+    python -m benchmarks.matching_engine --registrations 5000 --files-per-push 5000 --compare before.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from typing import Callable, Dict, Any, List, Coroutine, Optional, Tuple
+
+from app.enums.event_types import EventType
+from app.hook_details.hook_details import HookDetails
+from app.hook_details.hook_details_factory import HookDetailsFactory
+from app.hook_details.hook_params_parser import HookParamsParser
+from app.ingress.event_router import EventRouter
+from app.request_schemes.register_request_data import RegisterRequestData
+from app.utilities.functions import starts_with_item_from_list, item_if_string_starts_with_item_from_list, any_starts_with, \
+    get_all_starting_with
+from benchmarks.registration_corpus import RegistrationCorpus
+
+# INFO: (operations per call, function) - results are reported per operation so corpus size does not skew comparisons
+Benchmark = Tuple[int, Callable[[], Any]]
+
+
+class FilesPresentGithub:
+    async def are_files_in_repo(self, repo: str, ref: str, files: List[str]) -> bool:
+        return True
+
+
+def run_until_complete(coroutine: Coroutine) -> Any:
+    # INFO: should_trigger never suspends without file restrictions - driving it directly keeps event loop out of timings
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError(f'{coroutine} suspended - benchmarks must not do IO')
+
+
+def get_should_trigger_benchmark(corpus: RegistrationCorpus, hook_details_list: List[HookDetails]) -> Benchmark:
+    github = FilesPresentGithub()
+
+    def run() -> None:
+        for hook_details in hook_details_list:
+            for registration in corpus.registrations:
+                run_until_complete(hook_details.should_trigger(registration, github))  # type: ignore
+    return len(hook_details_list) * len(corpus.registrations), run
+
+
+def get_benchmarks(corpus: RegistrationCorpus) -> Dict[str, Benchmark]:
+    push = corpus.pushes[0]
+    changes = list(push.changes)
+    restrictions = corpus.registration_documents[0]['change_restrictions']
+    allowed_parameters = set(push.get_allowed_parameters().keys())
+    requested_params = [param for registration in corpus.registrations for param in registration.requested_params or []]
+    event_types = list(EventType)
+
+    def first_matching_event_type(github_event: Any) -> Optional[EventType]:
+        for event_type in event_types:
+            if event_type == github_event:
+                return event_type
+        return None
+
+    return {
+        'hook_params_parser.get_requested_parameters_values': (
+            len(corpus.registrations) * len(corpus.pushes),
+            lambda: [HookParamsParser.get_requested_parameters_values(hook_details, registration)
+                     for hook_details in corpus.pushes for registration in corpus.registrations]),
+        'functions.starts_with_item_from_list': (
+            len(changes), lambda: [starts_with_item_from_list(change, restrictions) for change in changes]),
+        'functions.item_if_string_starts_with_item_from_list': (
+            len(requested_params), lambda: [item_if_string_starts_with_item_from_list(param, allowed_parameters) for param in requested_params]),
+        'functions.any_starts_with': (
+            len(corpus.registrations),
+            lambda: [any_starts_with(push.changes, registration.change_restrictions or []) for registration in corpus.registrations]),
+        'functions.get_all_starting_with': (
+            len(corpus.registrations),
+            lambda: [get_all_starting_with(push.changes, registration.change_restrictions or []) for registration in corpus.registrations]),
+        'should_trigger.push': get_should_trigger_benchmark(corpus, corpus.pushes),
+        'should_trigger.pr_opened': get_should_trigger_benchmark(corpus, corpus.pull_requests),
+        'should_trigger.labeled': get_should_trigger_benchmark(corpus, corpus.labels),
+        'should_trigger.tagged': get_should_trigger_benchmark(corpus, corpus.tags),
+        'should_trigger.release': get_should_trigger_benchmark(corpus, corpus.releases),
+        'event_type.eq_dispatch': (
+            len(corpus.github_events), lambda: [first_matching_event_type(github_event) for github_event in corpus.github_events]),
+        'event_router.route': (
+            len(corpus.github_events), lambda: [EventRouter.route(github_event) for github_event in corpus.github_events]),
+        'hook_details_factory.get_push_details': (
+            len(corpus.push_payloads), lambda: [HookDetailsFactory.get_push_details(payload) for payload in corpus.push_payloads]),
+        'register_request_data.is_valid_register_request_data': (
+            len(corpus.register_requests),
+            lambda: [RegisterRequestData.is_valid_register_request_data(request) for request in corpus.register_requests])
+    }
+
+
+def measure(benchmark: Benchmark, repeat: int, min_time: float) -> Dict[str, Any]:
+    operations, function = benchmark
+    timer = timeit.Timer(function)
+    # INFO: first call warms up caches - then small benchmarks are looped so one sample takes min_time and timer resolution does not dominate
+    number = max(1, int(min_time / max(timer.timeit(1), 1e-9)))
+    samples = [duration / (number * operations) for duration in timer.repeat(repeat=repeat, number=number)]
+    return {'operations': operations,
+            'loops': number,
+            'min_ns_per_op': round(min(samples) * 1e9, 1),
+            'median_ns_per_op': round(statistics.median(samples) * 1e9, 1)}
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions: List[str] = []
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f'{name:60} {"new":>10}', file=sys.stderr)
+            continue
+        ratio = result['min_ns_per_op'] / previous['min_ns_per_op'] if previous['min_ns_per_op'] else float('inf')
+        marker = ' REGRESSION' if ratio > 1 + tolerance else ''
+        print(f'{name:60} {previous["min_ns_per_op"]:>12} -> {result["min_ns_per_op"]:>12} ns/op  x{ratio:.2f}{marker}', file=sys.stderr)
+        if marker:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repositories', type=int, default=200)
+    parser.add_argument('--registrations', type=int, default=2000)
+    parser.add_argument('--restrictions', type=int, default=5, help='change restrictions per registration')
+    parser.add_argument('--files-per-push', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimal duration of a single sample in seconds')
+    parser.add_argument('--only', nargs='*', help='run only benchmarks whose names start with given prefixes')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown ratio reported as regression')
+    args = parser.parse_args()
+
+    corpus = RegistrationCorpus(repositories=args.repositories,
+                                registrations=args.registrations,
+                                restrictions=args.restrictions,
+                                files_per_push=args.files_per_push,
+                                seed=args.seed)
+    results = {name: measure(benchmark, args.repeat, args.min_time)
+               for name, benchmark in get_benchmarks(corpus).items()
+               if not args.only or starts_with_item_from_list(name, args.only)}
+    report = {'commit': get_commit(),
+              'python': platform.python_version(),
+              'corpus': {'repositories': args.repositories, 'registrations': args.registrations, 'restrictions': args.restrictions,
+                         'files_per_push': args.files_per_push, 'seed': args.seed},
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('corpus') != report['corpus']:
+            print(f'Baseline corpus {baseline.get("corpus")} differs from {report["corpus"]} - ratios are not comparable', file=sys.stderr)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import random
+from typing import List, Dict, Any
+
+from app.data_objects.github_event import GithubEvent
+from app.enums.event_types import EventType
+from app.hook_details.labeled_hook_details import LabeledHookDetails
+from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
+from app.hook_details.push_hook_details import PushHookDetails
+from app.hook_details.release_hook_details import ReleaseHookDetails
+from app.hook_details.tag_hook_details import TagHookDetails
+from app.mongo.registration_cursor import RegistrationCursor
+from app.mongo.registration_fields import RegistrationFields
+
+REQUESTED_PARAMS = ['branch', 'sha', 'changes', 'tag', 'who', 'pr_url', 'release_target', 'is_prerelease',
+                    'branch:GIT_BRANCH', 'sha:GIT_COMMIT', 'changes:CHANGED_FILES', 'tag:RELEASE_TAG']
+BRANCHES = ['master', 'develop', 'release/1.0', 'release/2.0', 'feature/login', 'feature/search', 'hotfix/crash']
+EXTENSIONS = ['py', 'java', 'yml', 'md', 'json', 'kt']
+
+
+class RegistrationCorpus:
+    def __repr__(self) -> str:
+        return f"<RegistrationCorpus " \
+               f"repositories: {len(self.repositories)}, " \
+               f"registrations: {len(self.registrations)}, " \
+               f"restrictions: {self.restrictions}, " \
+               f"files_per_push: {self.files_per_push}, " \
+               f"seed: {self.seed} " \
+               f">"
+
+    def __init__(self,
+                 repositories: int,
+                 registrations: int,
+                 restrictions: int,
+                 files_per_push: int,
+                 seed: int = 0) -> None:
+        self.restrictions = restrictions
+        self.files_per_push = files_per_push
+        self.seed = seed
+        self.__random = random.Random(seed)
+        self.repositories = [f'org-{index % 7}/service-{index}' for index in range(repositories)]
+        self.directories = self.get_directories()
+        self.registration_documents = [self.get_registration_document(index) for index in range(registrations)]
+        self.registrations = [RegistrationCursor(document) for document in self.registration_documents]  # type: ignore
+        self.register_requests = [self.get_register_request(document) for document in self.registration_documents]
+        self.push_payloads = [self.get_push_payload(repository) for repository in self.repositories[:3]]
+        self.pushes = [PushHookDetails(payload['repository']['full_name'], payload['ref'][11:], payload['after'],
+                                       {path for commit in payload['commits'] for path in commit['modified']})
+                       for payload in self.push_payloads]
+        self.pull_requests = [PrOpenedHookDetails(repository, self.__random.choice(BRANCHES), self.get_sha())
+                              for repository in self.repositories[:3]]
+        self.labels = [LabeledHookDetails(repository, self.__random.choice(BRANCHES), self.get_sha(), 'triggear-pr-sync', 'octocat',
+                                          f'https://github.com/{repository}/pull/1') for repository in self.repositories[:3]]
+        self.tags = [TagHookDetails(repository, self.get_sha(), f'v{index}.0.0') for index, repository in enumerate(self.repositories[:3])]
+        self.releases = [ReleaseHookDetails(repository, f'v{index}.0.0', 'master', index % 2 == 0)
+                         for index, repository in enumerate(self.repositories[:3])]
+        self.github_events = self.get_github_events()
+
+    def get_sha(self) -> str:
+        return '%040x' % self.__random.getrandbits(160)
+
+    def get_directories(self) -> List[str]:
+        # INFO: monorepo-like tree - restrictions are prefixes of real directories, so some of them match
+        return [f'services/{service}/src/{module}/' for service in range(20) for module in ('api', 'core', 'db', 'web', 'jobs')] + \
+               [f'libs/{library}/' for library in range(30)] + ['docs/', 'ci/', 'deploy/']
+
+    def get_path(self) -> str:
+        return f'{self.__random.choice(self.directories)}file_{self.__random.randrange(10000)}.{self.__random.choice(EXTENSIONS)}'
+
+    def get_restrictions(self) -> List[str]:
+        return [self.__random.choice(self.directories) for _ in range(self.restrictions)]
+
+    def get_registration_document(self, index: int) -> Dict[str, Any]:
+        event_type = EventType.get_allowed_registration_event_types()[index % 5]
+        return {
+            RegistrationFields.REPO: self.repositories[index % len(self.repositories)],
+            RegistrationFields.JOB: f'folder-{index % 13}/job-{index}',
+            RegistrationFields.JENKINS_URL: f'https://jenkins-{index % 3}.example.com',
+            RegistrationFields.LABELS: ['triggear-pr-sync'] if event_type == EventType.PR_LABELED else [],
+            RegistrationFields.REQUESTED_PARAMS: self.__random.sample(REQUESTED_PARAMS, self.__random.randint(1, 5)),
+            RegistrationFields.BRANCH_RESTRICTIONS: self.__random.sample(BRANCHES, self.__random.randint(0, 3)),
+            RegistrationFields.CHANGE_RESTRICTIONS: self.get_restrictions(),
+            # INFO: file restrictions would cost a GitHub call per registration - benchmarks keep them empty
+            RegistrationFields.FILE_RESTRICTIONS: []
+        }
+
+    @staticmethod
+    def get_register_request(document: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'eventType': 'push',
+            'repository': document[RegistrationFields.REPO],
+            'jobName': document[RegistrationFields.JOB],
+            'jenkins_url': document[RegistrationFields.JENKINS_URL],
+            'labels': document[RegistrationFields.LABELS],
+            'requested_params': document[RegistrationFields.REQUESTED_PARAMS],
+            'branch_restrictions': document[RegistrationFields.BRANCH_RESTRICTIONS],
+            'change_restrictions': document[RegistrationFields.CHANGE_RESTRICTIONS],
+            'file_restrictions': document[RegistrationFields.FILE_RESTRICTIONS]
+        }
+
+    def get_push_payload(self, repository: str) -> Dict[str, Any]:
+        commits = []
+        files_per_commit = 50
+        for commit_index in range(max(1, self.files_per_push // files_per_commit)):
+            commits.append({'id': self.get_sha(), 'added': [], 'removed': [],
+                            'modified': [self.get_path() for _ in range(min(files_per_commit, self.files_per_push))]})
+        return {'ref': f'refs/heads/{self.__random.choice(BRANCHES)}', 'after': self.get_sha(),
+                'repository': {'full_name': repository}, 'commits': commits}
+
+    def get_github_events(self) -> List[GithubEvent]:
+        events = [GithubEvent('push', None, f'refs/heads/{branch}') for branch in BRANCHES] + \
+                 [GithubEvent('push', None, f'refs/tags/v{index}.0') for index in range(3)] + \
+                 [GithubEvent('pull_request', action, None) for action in ('opened', 'labeled', 'synchronize', 'closed', 'edited')] + \
+                 [GithubEvent('issue_comment', 'created', None), GithubEvent('release', 'published', None), GithubEvent('status', None, None)]
+        return [self.__random.choice(events) for _ in range(1000)]
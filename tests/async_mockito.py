@@ -16,7 +16,7 @@ class async_iter:
         self.not_done = list(items)
         self.done = list()
 
-    async def __aiter__(self):
+    def __aiter__(self):
         return self
 
     async def __anext__(self):
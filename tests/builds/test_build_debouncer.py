@@ -0,0 +1,191 @@
+import asyncio
+
+import pytest
+from mockito import mock
+
+from app.builds.build_debouncer import BuildDebouncer
+from app.hook_details.labeled_hook_details import LabeledHookDetails
+from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
+from app.hook_details.push_hook_details import PushHookDetails
+from app.mongo.registration_cursor import RegistrationCursor
+from app.tasks.task_supervisor import TaskSupervisor
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestBuildDebouncer:
+    async def test__get_key__is_set_only_for_moving_branch_heads(self):
+        registration_cursor: RegistrationCursor = mock({'jenkins_url': 'url', 'job_name': 'job'}, spec=RegistrationCursor, strict=True)
+
+        assert BuildDebouncer.get_key(PushHookDetails('repo', 'master', 'sha', set()), registration_cursor) == \
+            ('push', 'url', 'job', 'repo', 'master')
+        assert BuildDebouncer.get_key(PrOpenedHookDetails('repo', 'feature', 'sha'), registration_cursor) == \
+            ('opened', 'url', 'job', 'repo', 'feature')
+        assert BuildDebouncer.get_key(LabeledHookDetails('repo', 'feature', 'sha', 'label', 'who', 'url'), registration_cursor) is None
+
+    async def test__triggers_without_key__are_run_immediately(self):
+        triggered = []
+
+        async def trigger():
+            triggered.append('run')
+
+        await BuildDebouncer(window=10, abort_superseded=False).schedule(None, trigger)
+        assert triggered == ['run']
+
+    async def test__triggers__are_run_immediately__when_debouncing_is_disabled(self):
+        triggered = []
+        debouncer = BuildDebouncer(window=0, abort_superseded=False)
+
+        async def trigger(sha: str):
+            triggered.append(sha)
+
+        await debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('first'))
+        await debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('second'))
+
+        assert triggered == ['first', 'second']
+        assert debouncer.get_pending() == []
+        assert debouncer.superseded == 0
+
+    async def test__only_last_trigger_within_window__is_run(self):
+        triggered = []
+        debouncer = BuildDebouncer(window=0.02, abort_superseded=False)
+
+        async def trigger(sha: str):
+            triggered.append(sha)
+
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('first'))
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('second'))
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'other'), lambda: trigger('other'))
+        await asyncio.sleep(0.05)
+
+        assert sorted(triggered) == ['other', 'second']
+        assert debouncer.superseded == 1
+
+    async def test__in_flight_build__is_cancelled_by_newer_one__when_abort_is_enabled(self):
+        cancelled = []
+        debouncer = BuildDebouncer(window=0, abort_superseded=True)
+
+        async def watch(sha: str):
+            debouncer.start_watching(asyncio.current_task())
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append((sha, debouncer.is_superseded(asyncio.current_task())))
+                raise
+
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: watch('first'))
+        await asyncio.sleep(0.01)
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: watch('second'))
+        await asyncio.sleep(0.01)
+
+        assert cancelled == [('first', True)]
+        assert debouncer.superseded == 1
+
+    async def test__build_being_triggered__is_not_cancelled__but_superseded_once_it_starts_watching(self):
+        cancelled = []
+        release = asyncio.Event()
+        watching = []
+        debouncer = BuildDebouncer(window=0, abort_superseded=True)
+
+        async def trigger(sha: str):
+            try:
+                await release.wait()
+                watching.append((sha, debouncer.start_watching(asyncio.current_task())))
+            except asyncio.CancelledError:
+                cancelled.append(sha)
+                raise
+
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('first'))
+        await asyncio.sleep(0.01)
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('second'))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.sleep(0.01)
+
+        assert cancelled == []
+        assert sorted(watching) == [('first', True), ('second', False)]
+        assert debouncer.superseded == 1
+
+    async def test__build_cancelled_elsewhere__is_not_superseded(self):
+        cancelled = []
+        debouncer = BuildDebouncer(window=0, abort_superseded=True)
+
+        async def watch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(debouncer.is_superseded(asyncio.current_task()))
+                raise
+
+        build = debouncer.start_build(watch)
+        await asyncio.sleep(0)
+        build.cancel()
+        await asyncio.gather(build, return_exceptions=True)
+
+        assert cancelled == [False]
+        assert not debouncer.is_superseded(None)
+
+    async def test__in_flight_build__keeps_running__when_abort_is_disabled(self):
+        cancelled = []
+        debouncer = BuildDebouncer(window=0, abort_superseded=False)
+
+        async def watch(sha: str):
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                cancelled.append(sha)
+                raise
+
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: watch('first'))
+        await asyncio.sleep(0.01)
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: watch('second'))
+        await asyncio.sleep(0.1)
+
+        assert cancelled == []
+
+    async def test__stop__triggers_pending_builds__and_later_hooks_right_away(self):
+        triggered = []
+        debouncer = BuildDebouncer(window=10, abort_superseded=False)
+
+        async def trigger(sha: str):
+            triggered.append(sha)
+
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('first'))
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('second'))
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'other'), lambda: trigger('other'))
+
+        await debouncer.stop(mock())
+        await debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), lambda: trigger('late'))
+        await asyncio.sleep(0)
+
+        assert sorted(triggered) == ['late', 'other', 'second']
+        assert debouncer.get_pending() == []
+
+    async def test__builds__are_spawned_through_task_supervisor__when_it_is_set(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+        triggered = []
+
+        async def trigger():
+            triggered.append('run')
+
+        await BuildDebouncer(window=0, abort_superseded=False, task_supervisor=task_supervisor).schedule(None, trigger)
+        assert triggered == ['run']
+        assert task_supervisor.get_tasks() == []
+
+    async def test__pending_triggers__are_listed_until_window_passes__and_details_are_passed_to_task_supervisor(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+        debouncer = BuildDebouncer(window=0.02, abort_superseded=False, task_supervisor=task_supervisor)
+        release = asyncio.Event()
+
+        async def trigger():
+            await release.wait()
+
+        debouncer.schedule(('push', 'url', 'job', 'repo', 'master'), trigger, jenkins_url='url', job='job')
+        assert [key for key, age in debouncer.get_pending()] == [('push', 'url', 'job', 'repo', 'master')]
+
+        await asyncio.sleep(0.05)
+        assert debouncer.get_pending() == []
+        assert [supervised_task.details for supervised_task in task_supervisor.get_tasks()] == [{'jenkins_url': 'url', 'job': 'job'}]
+        release.set()
+        await asyncio.sleep(0)
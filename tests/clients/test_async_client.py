@@ -5,6 +5,7 @@ import pytest
 from mockito import expect, mock
 
 from app.clients.async_client import AsyncClient, Payload, AsyncClientException, AsyncClientNotFoundException
+from app.metrics.triggear_metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, GITHUB_RATE_LIMIT_REMAINING
 from tests.async_mockito import async_value
 
 pytestmark = pytest.mark.asyncio
@@ -37,7 +38,7 @@ class TestAsyncClient:
 
     async def test__post__should_be_executed_on_session__and_have_response_validated(self):
         async_client = AsyncClient('http://example.com', {'Authorization': 'token dummy'})
-        response = mock(spec=aiohttp.ClientResponse, strict=True)
+        response = mock({'headers': {}}, spec=aiohttp.ClientResponse, strict=True)
         session: aiohttp.ClientSession = mock({'closed': False}, spec=aiohttp.ClientSession, strict=True)
         payload = Payload.from_kwargs(some='param')
 
@@ -56,7 +57,7 @@ class TestAsyncClient:
     ])
     async def test__get__should_be_executed_on_session__and_have_response_validated(self, params: Payload, params_data: Union[None, List[str]]):
         async_client = AsyncClient('http://example.com', {'Authorization': 'token dummy'})
-        response = mock(spec=aiohttp.ClientResponse, strict=True)
+        response = mock({'headers': {}}, spec=aiohttp.ClientResponse, strict=True)
         session: aiohttp.ClientSession = mock({'closed': False}, spec=aiohttp.ClientSession)
 
         expect(aiohttp, times=1).ClientSession(headers={'Authorization': 'token dummy'}).thenReturn(session)
@@ -97,7 +98,7 @@ class TestAsyncClient:
 
     async def test__when_post_fails_to_parse_json_response__should_return_empty_dict(self):
         async_client = AsyncClient('http://example.com', {'Authorization': 'token dummy'})
-        response = mock(spec=aiohttp.ClientResponse, strict=True)
+        response = mock({'headers': {}}, spec=aiohttp.ClientResponse, strict=True)
         session: aiohttp.ClientSession = mock({'closed': False}, spec=aiohttp.ClientSession, strict=True)
         payload = Payload.from_kwargs(some='param')
         expect(aiohttp, times=1).ClientSession(headers={'Authorization': 'token dummy'}).thenReturn(session)
@@ -108,3 +109,37 @@ class TestAsyncClient:
         expect(response).json(content_type='application/json').thenRaise(aiohttp.ContentTypeError('', ''))
 
         assert await async_client.post('subpage', payload) == {}
+
+    async def test__when_request_fails__upstream_error_should_be_counted_for_metrics_target(self):
+        async_client = AsyncClient('http://example.com', {'Authorization': 'token dummy'}, upstream='jenkins')
+        errors = UPSTREAM_ERRORS.labels('jenkins', 'http://example.com')
+        failures_before = errors.value
+        requests_before = UPSTREAM_REQUEST_SECONDS.labels('jenkins', 'http://example.com').count
+
+        with pytest.raises(AsyncClientException):
+            with async_client.measure('job/build'):
+                raise AsyncClientException('failed', 500)
+
+        assert errors.value == failures_before + 1
+        assert UPSTREAM_REQUEST_SECONDS.labels('jenkins', 'http://example.com').count == requests_before + 1
+
+    async def test__when_resource_is_not_found__upstream_error_should_not_be_counted(self):
+        async_client = AsyncClient('http://example.com', {'Authorization': 'token dummy'}, upstream='jenkins')
+        errors = UPSTREAM_ERRORS.labels('jenkins', 'http://example.com')
+        failures_before = errors.value
+
+        with pytest.raises(AsyncClientNotFoundException):
+            with async_client.measure('job/build'):
+                raise AsyncClientNotFoundException('missing')
+
+        assert errors.value == failures_before
+
+    async def test__metrics_target__should_use_route_classifier__when_given(self):
+        async_client = AsyncClient('http://example.com', {}, upstream='github', route_classifier=lambda route: 'statuses')
+        assert async_client.get_metrics_target('/repos/a/b/statuses/123') == 'statuses'
+        assert AsyncClient('http://example.com', {}).get_metrics_target('/any') == 'http://example.com'
+
+    async def test__rate_limit_header__should_be_exposed_as_gauge(self):
+        async_client = AsyncClient('http://example.com', {}, upstream='github')
+        async_client.record_rate_limit(mock({'headers': {'X-RateLimit-Remaining': '4321'}}, spec=aiohttp.ClientResponse, strict=True))
+        assert GITHUB_RATE_LIMIT_REMAINING.get() == 4321
@@ -8,6 +8,7 @@ from mockito import mock, expect, when, captor
 from app.clients.async_client import AsyncClient, AsyncClientException, Payload, AsyncClientNotFoundException
 from app.clients.github_client import GithubClient
 from app.exceptions.triggear_timeout_error import TriggearTimeoutError
+from app.tracing.triggear_tracer import TRACER
 from tests.async_mockito import async_value
 
 pytestmark = pytest.mark.asyncio
@@ -24,6 +25,20 @@ class TestGithubClient:
             'Authorization': f'token {token}',
             'Content-Type': 'application/json'
         }
+        assert async_client.upstream == 'github'
+
+    async def test__when_api_url_is_given__async_github_should_use_it(self):
+        async_client = GithubClient('token', api_url='https://github.example.com/api/v3').get_async_github()
+        assert async_client.base_url == 'https://github.example.com/api/v3'
+
+    @pytest.mark.parametrize("route, route_class", [
+        ('/repos/futuresimple/triggear/statuses/123abc', 'statuses'),
+        ('/repos/futuresimple/triggear/issues/12/labels', 'issues'),
+        ('/repos/futuresimple/triggear', 'repos'),
+        ('/rate_limit', 'rate_limit')
+    ])
+    async def test__route_class__should_not_contain_repository_name(self, route: str, route_class: str):
+        assert GithubClient.get_route_class(route) == route_class
 
     async def test__when_async_github_api_client_was_created__it_is_returned_instead_of_creating_new(self):
         token = 'token'
@@ -172,6 +187,22 @@ class TestGithubClient:
         assert payload.data.get('description') == 'whatever you need'
         assert payload.data.get('context') == 'job'
 
+    async def test__create_github_build_status__adds_trace_id_to_target_url__when_enabled(self):
+        async_github: AsyncClient = mock(spec=AsyncClient, strict=True)
+        github_client = GithubClient(mock(), trace_target_url=True)
+
+        when(github_client).get_async_github().thenReturn(async_github)
+        expect(github_client).get_commit_sha1(repo='repo', sha='123456').thenReturn(async_value('123456123456'))
+        arg_captor = captor()
+        expect(async_github)\
+            .post(route='/repos/repo/statuses/123456123456', payload=arg_captor)\
+            .thenReturn(async_value(None))
+
+        with TRACER.span('hook') as span:
+            await github_client.create_github_build_status('repo', '123456', 'pending', 'http://example.com', 'whatever you need', 'job')
+
+        assert arg_captor.value.data.get('target_url') == f'http://example.com#trace-{span.trace_id}'
+
     async def test__get_issue__calls_github_endpoint_properly(self):
         async_github: AsyncClient = mock(spec=AsyncClient, strict=True)
         github_client = GithubClient(mock())
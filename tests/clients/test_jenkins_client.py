@@ -5,7 +5,7 @@ import time
 
 from mockito import mock, when, expect, captor
 
-from app.clients.async_client import AsyncClientException, AsyncClient, Payload
+from app.clients.async_client import AsyncClientException, AsyncClient, Payload, AsyncClientNotFoundException
 from app.clients.jenkins_client import JenkinsClient, JenkinsInstanceConfig
 from tests.async_mockito import async_value
 
@@ -180,6 +180,15 @@ class TestJenkinsClient:
 
         assert {} == await jenkins_client.get_build_info('triggear/tests', 213)
 
+    async def test__stop_build__calls_proper_jenkins_endpoint(self):
+        jenkins_client = JenkinsClient(JenkinsInstanceConfig('url', 'username', 'password'))
+        async_client: AsyncClient = mock(spec=AsyncClient, strict=True)
+
+        expect(jenkins_client).get_async_jenkins().thenReturn(async_client)
+        expect(async_client).post(route='job/triggear/job/tests/213/stop', headers=None, content_type='text/plain').thenReturn(async_value({}))
+
+        assert {} == await jenkins_client.stop_build('triggear/tests', 213)
+
     async def test__set_crumb__calls_proper_jenkins_endpoint__and_result_is_available_via_get(self):
         jenkins_client = JenkinsClient(mock())
 
@@ -222,3 +231,59 @@ class TestJenkinsClient:
         expect(tested_client, times=1).set_crumb_header().thenReturn(async_value(None))
 
         await tested_client.build_jenkins_job('job', {'param': 'value'})
+
+    async def test__refresh_job_catalog__replaces_catalog_with_flattened_jobs_tree(self):
+        instance_config = JenkinsInstanceConfig('url', 'username', 'password')
+        async_client: AsyncClient = mock(spec=AsyncClient, strict=True)
+
+        tested_client = JenkinsClient(instance_config)
+        expect(tested_client).get_async_jenkins().thenReturn(async_client)
+        expect(async_client).get(route='api/json?tree=jobs[name,url,jobs[name,url]]')\
+            .thenReturn(async_value({'jobs': [{'name': 'folder', 'jobs': [{'name': 'job'}]}, {'name': 'other'}]}))
+
+        await tested_client.refresh_job_catalog(2)
+
+        assert tested_client.job_catalog.is_loaded
+        assert tested_client.job_catalog.contains('folder/job')
+        assert tested_client.job_catalog.contains('other')
+        assert not tested_client.job_catalog.contains('job')
+        assert tested_client.job_catalog.depth == 2
+
+    async def test__job_exists__does_not_call_jenkins__when_job_is_in_catalog(self):
+        tested_client = JenkinsClient(JenkinsInstanceConfig('url', 'username', 'password'))
+        tested_client.job_catalog.replace({'folder/job'})
+        expect(tested_client, times=0).get_job_info(any)
+
+        assert await tested_client.job_exists('folder/job')
+
+    async def test__job_exists__asks_jenkins_and_caches_result__when_job_is_not_in_catalog(self):
+        tested_client = JenkinsClient(JenkinsInstanceConfig('url', 'username', 'password'))
+        tested_client.job_catalog.replace(set())
+        expect(tested_client, times=1).get_job_info('new_job').thenReturn(async_value({}))
+
+        assert await tested_client.job_exists('new_job')
+        assert await tested_client.job_exists('new_job')
+
+    async def test__job_exists__finds_recreated_job__nested_deeper_than_catalog__after_refresh(self):
+        tested_client = JenkinsClient(JenkinsInstanceConfig('url', 'username', 'password'))
+        tested_client.job_catalog.replace(set(), depth=2)
+        tested_client.job_catalog.mark_missing('deep/folder/job')
+        assert not await tested_client.job_exists('deep/folder/job')
+
+        tested_client.job_catalog.replace(set(), depth=2)
+        expect(tested_client, times=1).get_job_info('deep/folder/job').thenReturn(async_value({}))
+
+        assert await tested_client.job_exists('deep/folder/job')
+
+    async def test__job_exists__returns_false_and_remembers_missing_job__when_jenkins_returns_404(self):
+        async_client: AsyncClient = mock(spec=AsyncClient, strict=True)
+        tested_client = JenkinsClient(JenkinsInstanceConfig('url', 'username', 'password'))
+        tested_client.job_catalog.replace({'gone'})
+        tested_client.job_catalog.mark_missing('gone')
+
+        expect(tested_client).get_async_jenkins().thenReturn(async_client)
+        expect(async_client, times=1).get(route='job/missing/api/json?depth=0').thenRaise(AsyncClientNotFoundException('not found'))
+
+        assert not await tested_client.job_exists('missing')
+        assert not await tested_client.job_exists('missing')
+        assert not await tested_client.job_exists('gone')
@@ -0,0 +1,71 @@
+import pytest
+
+from app.clients.jenkins_job_catalog import JenkinsJobCatalog
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestJenkinsJobCatalog:
+    async def test__get_tree_query__nests_jobs_up_to_depth(self):
+        assert JenkinsJobCatalog.get_tree_query(1) == 'jobs[name,url]'
+        assert JenkinsJobCatalog.get_tree_query(3) == 'jobs[name,url,jobs[name,url,jobs[name,url]]]'
+
+    async def test__flatten__returns_full_job_paths_including_folders(self):
+        jobs_tree = [
+            {'name': 'folder', 'url': 'u', 'jobs': [
+                {'name': 'sub', 'url': 'u', 'jobs': [{'name': 'job', 'url': 'u'}]},
+                {'name': 'other', 'url': 'u'}
+            ]},
+            {'name': 'top', 'url': 'u'}
+        ]
+        assert JenkinsJobCatalog.flatten(jobs_tree) == {'folder', 'folder/sub', 'folder/sub/job', 'folder/other', 'top'}
+
+    async def test__not_loaded_catalog__contains_nothing(self):
+        catalog = JenkinsJobCatalog()
+        assert not catalog.is_loaded
+        assert catalog.age() is None
+        assert not catalog.contains('job')
+
+    async def test__mark_missing__removes_job__and_add_restores_it(self):
+        catalog = JenkinsJobCatalog()
+        catalog.replace({'job'})
+
+        catalog.mark_missing('job')
+        assert not catalog.contains('job')
+        assert catalog.is_known_missing('job')
+
+        catalog.add('job')
+        assert catalog.contains('job')
+        assert not catalog.is_known_missing('job')
+
+    async def test__replace__keeps_missing_jobs__until_they_show_up_in_catalog(self):
+        catalog = JenkinsJobCatalog()
+        catalog.mark_missing('job')
+        catalog.mark_missing('restored')
+
+        catalog.replace({'other', 'restored'}, depth=2)
+
+        assert catalog.is_loaded
+        assert catalog.age() >= 0
+        assert catalog.is_known_missing('job')
+        assert not catalog.is_known_missing('restored')
+
+    async def test__replace__forgets_missing_jobs__nested_deeper_than_catalog(self):
+        catalog = JenkinsJobCatalog()
+        catalog.replace(set(), depth=2)
+        catalog.mark_missing('deep/folder/job')
+
+        catalog.replace(set(), depth=2)
+
+        assert not catalog.is_known_missing('deep/folder/job')
+
+    async def test__covers__only_jobs_within_catalog_depth(self):
+        catalog = JenkinsJobCatalog()
+        assert not catalog.covers('job')
+
+        catalog.replace({'job', 'folder/job'}, depth=2)
+
+        assert catalog.covers('job')
+        assert catalog.covers('folder/other')
+        assert not catalog.covers('deep/folder/job')
@@ -1,17 +1,27 @@
-from typing import List
+import asyncio
+import time
+from typing import List, Dict
 
 import pytest
+from bson import ObjectId
 from datetime import datetime
-from mockito import mock, expect, captor
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorCursor
+from mockito import mock, expect, captor, when
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorCursor, AsyncIOMotorDatabase
+from pymongo import UpdateOne, IndexModel
 from pymongo.results import InsertOneResult, UpdateResult
 
 from app.clients.mongo_client import MongoClient
+from app.config.triggear_config import TriggearConfig
 from app.enums.event_types import EventType
+from app.exceptions.triggear_error import TriggearError
 from app.hook_details.hook_details import HookDetails
 from app.mongo.clear_query import ClearQuery
 from app.mongo.deregistration_query import DeregistrationQuery
+from app.mongo.missed_query import MissedQuery
+from app.mongo.migrations import MigrationRunner
+from app.mongo.mongo_lease import MongoLease
 from app.mongo.registration_cursor import RegistrationCursor
+from app.mongo.registration_indexes import RegistrationIndexes
 from app.mongo.registration_query import RegistrationQuery
 from tests.async_mockito import async_iter, async_value
 
@@ -20,6 +30,14 @@ pytestmark = pytest.mark.asyncio
 
 @pytest.mark.usefixtures('unstub')
 class TestMongoClient:
+    @staticmethod
+    def get_mongo(database_name: str, collection_name: str, collection: AsyncIOMotorCollection) -> AsyncIOMotorClient:
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        database: AsyncIOMotorDatabase = mock(spec=AsyncIOMotorDatabase, strict=True)
+        when(mongo).get_database(database_name).thenReturn(database)
+        when(database).get_collection(collection_name).thenReturn(collection)
+        return mongo
+
     async def test__get_registration(self):
         collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
         mongo: AsyncIOMotorClient = mock({'registered': {'push': collection}}, spec=AsyncIOMotorClient, strict=True)
@@ -40,6 +58,22 @@ class TestMongoClient:
         async for job in mongo_client.get_registered_jobs(hook_details):
             assert job.cursor == cursor
 
+    async def test__get_registered_jobs_by_labels__runs_single_query__and_groups_results_per_label(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        first_registration = {'job': 'first', 'labels': ['label1', 'label2', 'unrelated']}
+        second_registration = {'job': 'second', 'labels': ['label2']}
+
+        mongo_client = MongoClient(mongo)
+        expect(mongo_client).get_registrations(EventType.PR_LABELED).thenReturn(collection)
+        expect(collection, times=1).find({'repository': 'repo', 'labels': {'$in': ['label1', 'label2', 'label3']}})\
+            .thenReturn(async_iter(second_registration, first_registration))
+
+        registrations = await mongo_client.get_registered_jobs_by_labels('repo', ['label1', 'label2', 'label3'])
+
+        assert {label: [cursor.job_name for cursor in cursors] for label, cursors in registrations.items()} == \
+            {'label1': ['first'], 'label2': ['first', 'second'], 'label3': []}
+
     async def test__increment_missed_counter(self):
         collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
         mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
@@ -60,8 +94,10 @@ class TestMongoClient:
         mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
         mongo_client = MongoClient(mongo)
         expect(mongo_client).get_registrations(EventType.TAGGED).thenReturn(collection)
-        expect(collection).find({'missed_times': {'$gt': 0}}).thenReturn(async_value(missed_jobs))
-        assert await mongo_client.get_missed_jobs(EventType.TAGGED) == missed_jobs
+        expect(collection).find({'missed_times': {'$gt': 0, '$gte': 3}}).thenReturn(missed_jobs)
+        expect(missed_jobs).sort('_id', 1).thenReturn(missed_jobs)
+        expect(missed_jobs).limit(10).thenReturn(missed_jobs)
+        assert mongo_client.get_missed_jobs(EventType.TAGGED, MissedQuery('tagged', threshold=3, limit=20), 10) == missed_jobs
 
     async def test__log_deregistration(self):
         collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
@@ -106,17 +142,108 @@ class TestMongoClient:
         expect(collection).update_one({}, {'$set': {'missed_times': 0}}).thenReturn(async_value(None))
         await mongo_client.clear(clear_query)
 
-    async def test__get_missed_info(self):
+    async def test__get_missed_info__streams_documents_from_all_collections_up_to_limit__and_caches_page(self):
+        config: TriggearConfig = mock({'write_buffer_max_size': 100, 'write_buffer_flush_interval': 5, 'missing_cache_ttl': 10},
+                                      spec=TriggearConfig, strict=True)
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        mongo_client = MongoClient(mongo, config)
+        missed_query = MissedQuery('all', threshold=1, limit=3)
+
+        first_id, second_id, third_id = ObjectId(), ObjectId(), ObjectId()
+        expect(mongo_client, times=1).get_missed_jobs(EventType.PR_LABELED, missed_query, 3).thenReturn(async_iter(
+            {'_id': second_id, 'jenkins_url': 'url2', 'job': 'job2', 'missed_times': 22},
+            {'_id': first_id, 'jenkins_url': 'url1', 'job': 'job1', 'missed_times': 2}
+        ))
+        expect(mongo_client, times=1).get_missed_jobs(EventType.TAGGED, missed_query, 1).thenReturn(async_iter(
+            {'_id': third_id, 'jenkins_url': 'url3', 'job': 'job3', 'missed_times': 1}
+        ))
+
+        result: List[Dict] = [missed_info async for missed_info in mongo_client.get_missed_info(missed_query)]
+        assert result == [
+            {'eventType': 'labeled', 'jenkins_url': 'url1', 'job': 'job1', 'missed_times': 2, 'cursor': f'labeled:{first_id}'},
+            {'eventType': 'labeled', 'jenkins_url': 'url2', 'job': 'job2', 'missed_times': 22, 'cursor': f'labeled:{second_id}'},
+            {'eventType': 'tagged', 'jenkins_url': 'url3', 'job': 'job3', 'missed_times': 1, 'cursor': f'tagged:{third_id}'}
+        ]
+        assert [missed_info async for missed_info in mongo_client.get_missed_info(missed_query)] == result
+
+    async def test__clear__invalidates_missed_info_cache(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        clear_query: ClearQuery = mock({'event_type': 'push'}, spec=ClearQuery, strict=True)
+        mongo_client = MongoClient(mongo)
+        mongo_client.missed_info_cache.ttl = 10
+        mongo_client.missed_info_cache.set('key', [])
+
+        when(mongo_client).get_registrations(EventType.PUSH).thenReturn(collection)
+        when(clear_query).get_clear_query().thenReturn({})
+        when(collection).update_one({}, {'$set': {'missed_times': 0}}).thenReturn(async_value(None))
+        await mongo_client.clear(clear_query)
+
+        assert mongo_client.missed_info_cache.get('key') is None
+
+    async def test__ensure_indexes__creates_registration_indexes_in_every_collection(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        mongo_client = MongoClient(mongo)
+        index_models = [IndexModel([('job', 1)])]
+
+        when(RegistrationIndexes).get_index_models().thenReturn(index_models)
+        when(mongo_client).get_registrations(any).thenReturn(collection)
+        expect(collection, times=5).create_indexes(index_models).thenAnswer(lambda *args: async_value(['job_1']))
+        await mongo_client.ensure_indexes()
+
+    async def test__setup_schema__waits_for_schema_lease__and_releases_it_after_setup(self):
+        mongo_client = MongoClient(mock(spec=AsyncIOMotorClient, strict=True))
+
+        expect(MongoLease, times=2).acquire().thenReturn(async_value(False)).thenReturn(async_value(True))
+        expect(asyncio).sleep(1).thenReturn(async_value(None))
+        expect(mongo_client).ensure_indexes().thenReturn(async_value(None))
+        expect(MigrationRunner).run().thenReturn(async_value(1))
+        expect(mongo_client).check_query_indexes().thenReturn(async_value([]))
+        expect(MongoLease).release().thenReturn(async_value(None))
+
+        await mongo_client.setup_schema()
+
+    async def test__setup_schema__releases_lease__when_migration_fails(self):
+        mongo_client = MongoClient(mock(spec=AsyncIOMotorClient, strict=True))
+
+        expect(MongoLease).acquire().thenReturn(async_value(True))
+        expect(mongo_client).ensure_indexes().thenReturn(async_value(None))
+        expect(MigrationRunner).run().thenRaise(ValueError())
+        expect(MongoLease).release().thenReturn(async_value(None))
+
+        with pytest.raises(ValueError):
+            await mongo_client.setup_schema()
+
+    async def test__setup_schema__fails__when_lease_is_not_released_in_time(self):
+        mongo_client = MongoClient(mock(spec=AsyncIOMotorClient, strict=True))
+
+        when(time).monotonic().thenReturn(0).thenReturn(301)
+        expect(MongoLease).acquire().thenReturn(async_value(False))
+        expect(mongo_client, times=0).ensure_indexes()
+
+        with pytest.raises(TriggearError):
+            await mongo_client.setup_schema()
+
+    async def test__check_query_indexes__reports_queries_resolved_with_collection_scan(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        indexed_cursor: AsyncIOMotorCursor = mock(spec=AsyncIOMotorCursor, strict=True)
+        unindexed_cursor: AsyncIOMotorCursor = mock(spec=AsyncIOMotorCursor, strict=True)
+        sorted_cursor: AsyncIOMotorCursor = mock(spec=AsyncIOMotorCursor, strict=True)
         mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
         mongo_client = MongoClient(mongo)
 
-        first_doc = {'jenkins_url': 'url1', 'job': 'job1', 'missed_times': 2}
-        second_doc = {'jenkins_url': 'url2', 'job': 'job2', 'missed_times': 22}
-        expect(mongo_client).get_missed_jobs(EventType.PUSH).thenReturn(async_iter(first_doc, second_doc))
-        result: List[str] = await mongo_client.get_missed_info('push')
-        assert len(result) == 2
-        assert 'url1:job1#2' in result
-        assert 'url2:job2#22' in result
+        when(RegistrationIndexes).get_query_shapes().thenReturn([('Indexed', {'job': 'job'}, None),
+                                                                  ('Unindexed', {'other': 'field'}, [('_id', 1)])])
+        when(mongo_client).get_registrations(any).thenReturn(collection)
+        when(collection).find({'job': 'job'}).thenReturn(indexed_cursor)
+        when(collection).find({'other': 'field'}).thenReturn(unindexed_cursor)
+        when(unindexed_cursor).sort([('_id', 1)]).thenReturn(sorted_cursor)
+        when(indexed_cursor).explain().thenAnswer(lambda: async_value({'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}}))
+        when(sorted_cursor).explain().thenAnswer(lambda: async_value({'queryPlanner': {'winningPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}}}))
+
+        assert await mongo_client.check_query_indexes() == ['labeled:Unindexed', 'tagged:Unindexed', 'opened:Unindexed',
+                                                            'push:Unindexed', 'release:Unindexed']
 
     async def test__add_or_update__should_add__if_registration_does_not_exist(self):
         collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
@@ -148,3 +275,84 @@ class TestMongoClient:
         await mongo_client.add_or_update_registration(registration_query)
 
 
+    async def test__get_registered_repositories__returns_distinct_repositories(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo_client = MongoClient(mock(spec=AsyncIOMotorClient, strict=True))
+
+        expect(mongo_client).get_registrations(EventType.PUSH).thenReturn(collection)
+        expect(collection).distinct('repository').thenReturn(async_value(['org/repo1', 'org/repo2']))
+
+        assert await mongo_client.get_registered_repositories(EventType.PUSH) == {'org/repo1', 'org/repo2'}
+
+    async def test__get_registered_repositories_among__returns_only_given_repositories_with_registrations(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo_client = MongoClient(mock(spec=AsyncIOMotorClient, strict=True))
+
+        expect(mongo_client).get_registrations(EventType.PUSH).thenReturn(collection)
+        expect(collection).distinct('repository', {'repository': {'$in': ['org/repo', 'fork/repo']}}).thenReturn(async_value(['org/repo']))
+
+        assert await mongo_client.get_registered_repositories_among(EventType.PUSH, ['org/repo', 'fork/repo']) == {'org/repo'}
+
+    async def test__when_write_buffer_is_configured__missed_counter_increments_are_buffered(self):
+        config: TriggearConfig = mock({'write_buffer_max_size': 100, 'write_buffer_flush_interval': 5, 'missing_cache_ttl': 10}, spec=TriggearConfig, strict=True)
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo: AsyncIOMotorClient = self.get_mongo('registered', 'push', collection)
+        hook_details: HookDetails = mock(spec=HookDetails, strict=True)
+        registration_cursor: RegistrationCursor = mock({'job_name': 'job'}, spec=RegistrationCursor, strict=True)
+        mongo_client = MongoClient(mongo, config)
+
+        when(hook_details).get_event_type().thenReturn(EventType.PUSH)
+        expect(hook_details).get_query().thenReturn({'repository': 'repo'})
+        expect(collection, times=0).update_one(any, any)
+        await mongo_client.increment_missed_counter(hook_details, registration_cursor)
+
+        mongo_client.missed_info_cache.set('key', [])
+        assert mongo_client.missed_info_cache.get('key') == []
+
+        operations_captor = captor()
+        expect(collection).bulk_write(operations_captor, ordered=False).thenReturn(async_value(None))
+        await mongo_client.stop(mock())
+        assert operations_captor.value == [UpdateOne({'repository': 'repo', 'job': 'job'}, {'$inc': {'missed_times': 1}})]
+        assert mongo_client.missed_info_cache.get('key') is None
+
+    async def test__when_write_buffer_is_configured__deregistration_log_is_buffered(self):
+        config: TriggearConfig = mock({'write_buffer_max_size': 100, 'write_buffer_flush_interval': 5, 'missing_cache_ttl': 10}, spec=TriggearConfig, strict=True)
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo: AsyncIOMotorClient = self.get_mongo('deregistered', 'log', collection)
+        deregistration_query: DeregistrationQuery = mock({'job_name': 'job', 'caller': 'me', 'event_type': 'type', 'jenkins_url': 'url'},
+                                                         spec=DeregistrationQuery, strict=True)
+        mongo_client = MongoClient(mongo, config)
+
+        expect(collection, times=0).insert_one(any)
+        await mongo_client.log_deregistration(deregistration_query)
+
+        documents_captor = captor()
+        expect(collection).insert_many(documents_captor, ordered=False).thenReturn(async_value(None))
+        await mongo_client.stop(mock())
+        assert [document['job'] for document in documents_captor.value] == ['job']
+
+    async def test__setup_deregistration_log__creates_ttl_index__when_only_ttl_is_set(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo: AsyncIOMotorClient = self.get_mongo('deregistered', 'log', collection)
+
+        expect(collection).create_index([('timestamp', 1)], expireAfterSeconds=60, name='timestamp_ttl').thenReturn(async_value(None))
+        await MongoClient(mongo).setup_deregistration_log(ttl=60, max_size=None)
+
+    @pytest.mark.parametrize("collection_names, options, expect_create, expect_convert", [
+        ([], {}, 1, 0),
+        (['log'], {}, 0, 1),
+        (['log'], {'capped': True}, 0, 0),
+    ])
+    async def test__setup_deregistration_log__makes_log_capped__when_max_size_is_set(self, collection_names, options, expect_create, expect_convert):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        database: AsyncIOMotorDatabase = mock(spec=AsyncIOMotorDatabase, strict=True)
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        when(mongo).get_database('deregistered').thenReturn(database)
+        when(database).get_collection('log').thenReturn(collection)
+
+        expect(database).list_collection_names().thenReturn(async_value(collection_names))
+        expect(collection, times=len(collection_names)).options().thenReturn(async_value(options))
+        expect(database, times=expect_create).create_collection('log', capped=True, size=1024).thenReturn(async_value(None))
+        expect(database, times=expect_convert).command('convertToCapped', 'log', size=1024).thenReturn(async_value(None))
+        expect(collection, times=0).create_index(any)
+        await MongoClient(mongo).setup_deregistration_log(ttl=60, max_size=1024)
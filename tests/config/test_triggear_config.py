@@ -76,3 +76,119 @@ class TestTriggearConfig:
         triggear_config = TriggearConfig()
         expect(triggear_config).read_credentials_file().thenReturn(('token', 'triggear_token', {}))
         assert triggear_config.triggear_token == 'triggear_token'
+
+    async def test__when_config_file_does_not_exist__settings_should_fall_back_to_defaults(self):
+        when(os).getenv('CONFIG_PATH', 'config.yml').thenReturn('does/not/exist')
+
+        triggear_config = TriggearConfig()
+
+        assert triggear_config.settings == {}
+        assert triggear_config.job_catalog_refresh_interval == 300.0
+        assert triggear_config.job_catalog_folder_depth == 5
+        assert triggear_config.write_buffer_max_size == 100
+        assert triggear_config.write_buffer_flush_interval == 5.0
+        assert triggear_config.deregistration_log_ttl is None
+        assert triggear_config.deregistration_log_max_size is None
+        assert triggear_config.missing_cache_ttl == 10.0
+        assert triggear_config.delivery_cache_size == 10000
+        assert triggear_config.delivery_ttl == 24 * 60 * 60
+        assert triggear_config.inbox_directory == 'inbox'
+        assert triggear_config.inbox_segment_size == 16 * 1024 * 1024
+        assert triggear_config.inbox_workers == 8
+        assert triggear_config.inbox_checkpoint_interval == 1.0
+        assert triggear_config.ingress_workers == 1
+        assert triggear_config.ingress_host == '0.0.0.0'
+        assert triggear_config.ingress_port == 8080
+        assert triggear_config.build_debounce_window == 0
+        assert not triggear_config.build_abort_superseded
+        assert triggear_config.body_offload_threshold == 256 * 1024
+        assert triggear_config.body_decode_workers == 2
+        assert triggear_config.max_body_size == 25 * 1024 * 1024
+        assert triggear_config.task_max_concurrency == 256
+        assert triggear_config.task_group_concurrency == {}
+        assert triggear_config.task_drain_timeout == 30
+        assert triggear_config.admission_workers == 16
+        assert triggear_config.admission_repository_high_water == 100
+        assert triggear_config.admission_total_high_water == 1000
+        assert triggear_config.admission_low_priority_events == ['push']
+        assert triggear_config.admission_overflow_drain_interval == 5
+        assert triggear_config.registered_repositories_refresh_interval == 60
+        assert triggear_config.registered_repositories_unknown_ttl == 10
+        assert triggear_config.tracing_sample_rate == 0
+        assert triggear_config.github_api_url == 'https://api.github.com'
+        assert triggear_config.tracing_file_path is None
+        assert triggear_config.tracing_collector_url is None
+        assert triggear_config.tracing_flush_interval == 5
+        assert not triggear_config.tracing_debug_target_url
+        assert triggear_config.capture_file_path is None
+        assert triggear_config.capture_size == 64 * 1024 * 1024
+        assert triggear_config.log_level == 'INFO'
+        assert not triggear_config.log_json_format
+        assert triggear_config.log_queue_size == 10000
+        assert triggear_config.log_rate_per_key == 10
+        assert triggear_config.log_burst_per_key == 50
+        assert triggear_config.log_debug_sample_rate == 1.0
+        assert triggear_config.loop_monitor_interval == 0.25
+        assert triggear_config.loop_monitor_slow_callback_threshold == 0.5
+        assert triggear_config.profile_interval == 0.01
+        assert triggear_config.max_profile_seconds == 60
+        assert triggear_config.tracemalloc_frames == 10
+        assert triggear_config.tracemalloc_on_startup is False
+
+    async def test__when_config_file_is_valid__settings_should_be_read_from_it(self):
+        when(os).getenv('CONFIG_PATH', 'config.yml').thenReturn('./tests/config/example_configs/config.yaml')
+
+        triggear_config = TriggearConfig()
+
+        assert triggear_config.settings['rerun_time_limit'] == 2
+        assert triggear_config.job_catalog_refresh_interval == 60.0
+        assert triggear_config.job_catalog_folder_depth == 3
+        assert triggear_config.write_buffer_max_size == 10
+        assert triggear_config.write_buffer_flush_interval == 1.0
+        assert triggear_config.deregistration_log_ttl is None
+        assert triggear_config.deregistration_log_max_size == 2 * 1024 * 1024
+        assert triggear_config.missing_cache_ttl == 3.0
+        assert triggear_config.delivery_cache_size == 50
+        assert triggear_config.delivery_ttl == 2 * 60 * 60
+        assert triggear_config.inbox_directory == '/tmp/inbox'
+        assert triggear_config.inbox_segment_size == 1024 * 1024
+        assert triggear_config.inbox_workers == 2
+        assert triggear_config.inbox_checkpoint_interval == 0.5
+        assert triggear_config.ingress_workers == 4
+        assert triggear_config.ingress_host == '127.0.0.1'
+        assert triggear_config.ingress_port == 9090
+        assert triggear_config.build_debounce_window == 30.0
+        assert triggear_config.build_abort_superseded
+        assert triggear_config.body_offload_threshold == 64 * 1024
+        assert triggear_config.body_decode_workers == 0
+        assert triggear_config.max_body_size == 5 * 1024 * 1024
+        assert triggear_config.task_max_concurrency == 20
+        assert triggear_config.task_group_concurrency == {'hooks': 10, 'builds': 5}
+        assert triggear_config.task_drain_timeout == 3
+        assert triggear_config.admission_workers == 4
+        assert triggear_config.admission_repository_high_water == 10
+        assert triggear_config.admission_total_high_water == 50
+        assert triggear_config.admission_low_priority_events == ['push']
+        assert triggear_config.admission_overflow_drain_interval == 1
+        assert triggear_config.registered_repositories_refresh_interval == 15
+        assert triggear_config.registered_repositories_unknown_ttl == 3
+        assert triggear_config.tracing_sample_rate == 0.5
+        assert triggear_config.github_api_url == 'https://github.example.com/api/v3'
+        assert triggear_config.tracing_file_path == '/tmp/traces.jsonl'
+        assert triggear_config.tracing_collector_url == 'http://collector:4318/v1/traces'
+        assert triggear_config.tracing_flush_interval == 2
+        assert triggear_config.tracing_debug_target_url
+        assert triggear_config.capture_file_path == '/tmp/hooks.capture'
+        assert triggear_config.capture_size == 8 * 1024 * 1024
+        assert triggear_config.log_level == 'DEBUG'
+        assert triggear_config.log_json_format
+        assert triggear_config.log_queue_size == 100
+        assert triggear_config.log_rate_per_key == 2.5
+        assert triggear_config.log_burst_per_key == 5
+        assert triggear_config.log_debug_sample_rate == 0.1
+        assert triggear_config.loop_monitor_interval == 0.1
+        assert triggear_config.loop_monitor_slow_callback_threshold == 0
+        assert triggear_config.profile_interval == 0.002
+        assert triggear_config.max_profile_seconds == 5
+        assert triggear_config.tracemalloc_frames == 3
+        assert triggear_config.tracemalloc_on_startup is True
@@ -0,0 +1,97 @@
+import collections
+import json
+
+import pytest
+import aiohttp.web
+import aiohttp.web_request
+from mockito import mock, expect
+
+from app.controllers.diagnostics_controller import DiagnosticsController
+from app.diagnostics.inflight_report import InflightReport
+from app.diagnostics.memory_snapshots import MemorySnapshots
+from app.diagnostics.sampling_profiler import SamplingProfiler
+from app.exceptions.triggear_error import TriggearError
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+async def raise_already_running():
+    raise TriggearError('already running')
+
+
+@pytest.mark.usefixtures('unstub')
+class TestDiagnosticsController:
+    async def test__handle_profile__should_return_collapsed_stacks(self):
+        request = mock({'query': {'seconds': '2.5', 'tasks': '1'}}, spec=aiohttp.web_request.Request, strict=True)
+        sampling_profiler = mock(spec=SamplingProfiler, strict=True)
+        expect(sampling_profiler).profile(2.5, include_tasks=True).thenReturn(async_value(collections.Counter({'main;run (x.py:1)': 4})))
+
+        response: aiohttp.web.Response = await DiagnosticsController(sampling_profiler, mock(strict=True)).handle_profile(request)
+
+        assert response.status == 200
+        assert response.text == 'main;run (x.py:1) 4\n'
+
+    @pytest.mark.parametrize('seconds', ['abc', '0', '-1'])
+    async def test__handle_profile__when_seconds_are_invalid__should_return_400(self, seconds: str):
+        request = mock({'query': {'seconds': seconds}}, spec=aiohttp.web_request.Request, strict=True)
+        sampling_profiler = mock(spec=SamplingProfiler, strict=True)
+        expect(sampling_profiler, times=0).profile(...)
+
+        response: aiohttp.web.Response = await DiagnosticsController(sampling_profiler, mock(strict=True)).handle_profile(request)
+
+        assert response.status == 400
+
+    async def test__handle_profile__when_profile_is_running__should_return_409(self):
+        request = mock({'query': {}}, spec=aiohttp.web_request.Request, strict=True)
+        sampling_profiler = mock(spec=SamplingProfiler, strict=True)
+        expect(sampling_profiler).profile(10.0, include_tasks=False).thenReturn(raise_already_running())
+
+        response: aiohttp.web.Response = await DiagnosticsController(sampling_profiler, mock(strict=True)).handle_profile(request)
+
+        assert response.status == 409
+        assert response.text == 'already running'
+
+    async def test__handle_memory__should_return_snapshot_report(self):
+        request = mock({'query': {'seconds': '1', 'top': '3', 'group_by': 'filename'}}, spec=aiohttp.web_request.Request, strict=True)
+        memory_snapshots = mock(spec=MemorySnapshots, strict=True)
+        expect(memory_snapshots).compare(1.0, 3, 'filename').thenReturn(async_value({'group_by': 'filename', 'top': [], 'diff': []}))
+
+        response: aiohttp.web.Response = await DiagnosticsController(mock(strict=True), memory_snapshots).handle_memory(request)
+
+        assert response.status == 200
+        assert json.loads(response.text) == {'group_by': 'filename', 'top': [], 'diff': []}
+
+    @pytest.mark.parametrize('query', [{'top': 'many'}, {'group_by': 'module'}])
+    async def test__handle_memory__when_query_is_invalid__should_return_400(self, query):
+        request = mock({'query': query}, spec=aiohttp.web_request.Request, strict=True)
+        memory_snapshots = mock(spec=MemorySnapshots, strict=True)
+        expect(memory_snapshots, times=0).compare(...)
+
+        response: aiohttp.web.Response = await DiagnosticsController(mock(strict=True), memory_snapshots).handle_memory(request)
+
+        assert response.status == 400
+
+    async def test__handle_inflight__should_return_report_of_requested_sections(self):
+        request = mock({'query': {'sections': 'watches,caches', 'sort': 'polls', 'limit': '5', 'min_age': '30'}},
+                       spec=aiohttp.web_request.Request, strict=True)
+        inflight_report = mock(spec=InflightReport, strict=True)
+        expect(inflight_report).get_report(['watches', 'caches'], sort='polls', limit=5, min_age=30.0)\
+            .thenReturn({'watches': {'count': 0, 'items': []}, 'caches': {}})
+
+        response: aiohttp.web.Response = await DiagnosticsController(mock(strict=True), mock(strict=True), inflight_report)\
+            .handle_inflight(request)
+
+        assert response.status == 200
+        assert json.loads(response.text) == {'watches': {'count': 0, 'items': []}, 'caches': {}}
+
+    @pytest.mark.parametrize('query', [{'sections': 'watches,threads'}, {'limit': 'all'}])
+    async def test__handle_inflight__when_query_is_invalid__should_return_400(self, query):
+        request = mock({'query': query}, spec=aiohttp.web_request.Request, strict=True)
+        inflight_report = mock(spec=InflightReport, strict=True)
+        expect(inflight_report, times=0).get_report(...)
+
+        response: aiohttp.web.Response = await DiagnosticsController(mock(strict=True), mock(strict=True), inflight_report)\
+            .handle_inflight(request)
+
+        assert response.status == 400
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import logging
 
 import pytest
@@ -9,13 +10,22 @@ from mockito import mock, when, expect, captor
 from app.clients.github_client import GithubClient
 from app.controllers.github_controller import GithubController
 from app.data_objects.github_event import GithubEvent
+from app.enums.event_types import EventType
 from app.hook_details.hook_details import HookDetails
 from app.hook_details.hook_details_factory import HookDetailsFactory
 from app.hook_details.labeled_hook_details import LabeledHookDetails
+from app.ingress.body_decoder import BodyDecoder
+from app.ingress.capture_ring import CaptureRing
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.ingress.fair_admission import FairAdmission
+from app.ingress.webhook_inbox import WebhookInbox, InboxEntry
+from app.metrics.api_budget import ApiBudget, CURRENT_API_BUDGET
+from app.mongo.registered_repositories import RegisteredRepositories
 from app.hook_details.pr_opened_hook_details import PrOpenedHookDetails
 from app.hook_details.push_hook_details import PushHookDetails
 from app.hook_details.release_hook_details import ReleaseHookDetails
 from app.hook_details.tag_hook_details import TagHookDetails
+from app.tasks.task_supervisor import TaskSupervisor
 from app.triggear_heart import TriggearHeart
 from tests.async_mockito import async_value
 
@@ -96,7 +106,7 @@ class TestGithubController:
 
         github_event_captor = captor()
 
-        when(request).json().thenReturn(async_value({'action': 'action', 'ref': '123321'}))
+        when(request).read().thenReturn(async_value(b'{"action": "action", "ref": "123321"}'))
         when(github_controller).get_event_handler_task({'action': 'action', 'ref': '123321'}, github_event_captor).thenReturn(event_handler)
 
         expect(asyncio).get_event_loop().thenReturn(event_loop)
@@ -119,7 +129,7 @@ class TestGithubController:
 
         github_event_captor = captor()
 
-        when(request).json().thenReturn(async_value({'action': 'action', 'ref': '123321'}))
+        when(request).read().thenReturn(async_value(b'{"action": "action", "ref": "123321"}'))
         when(github_controller).get_event_handler_task({'action': 'action', 'ref': '123321'}, github_event_captor).thenReturn(None)
 
         expect(asyncio, times=0).get_event_loop().thenReturn(event_loop)
@@ -132,6 +142,172 @@ class TestGithubController:
         assert github_event.action == 'action'
         assert github_event.ref == '123321'
 
+    async def test__when_event_header_is_not_handled__hook_should_be_acked_without_reading_body(self):
+        delivery_deduplicator: DeliveryDeduplicator = mock(spec=DeliveryDeduplicator, strict=True)
+        webhook_inbox: WebhookInbox = mock(spec=WebhookInbox, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), delivery_deduplicator, webhook_inbox)
+        request: aiohttp.web_request.Request = mock({'headers': {'X-GitHub-Event': 'check_run', 'X-GitHub-Delivery': 'delivery'}},
+                                                    spec=aiohttp.web_request.Request, strict=True)
+
+        expect(delivery_deduplicator, times=0).is_duplicate(any)
+        expect(webhook_inbox, times=0).accept(any, any, any)
+        expect(request, times=0).read()
+
+        response = await github_controller.handle_hook(request)
+        assert response.status == 200
+        assert response.text == 'Hook ACK'
+
+    @pytest.mark.parametrize("github_event", [
+        GithubEvent('push', None, 'refs/pull/12/head'),
+        GithubEvent('pull_request', 'closed', None),
+        GithubEvent('status', None, None)
+    ])
+    async def test__when_no_route_matches__no_handler_should_be_returned(self, github_event: GithubEvent):
+        assert GithubController(mock(), mock(), mock()).get_event_handler_task({}, github_event) is None
+
+    async def test__push_to_branch_with_slashes__should_be_routed_to_push_handler(self):
+        github_controller = GithubController(mock(), mock(), mock())
+
+        expect(github_controller, times=1).handle_push({}).thenReturn('mock')
+
+        assert 'mock' == github_controller.get_event_handler_task({}, GithubEvent('push', None, 'refs/heads/feature/with/slashes'))
+
+    async def test__when_delivery_was_already_received__hook_should_be_acked_without_processing(self):
+        delivery_deduplicator: DeliveryDeduplicator = mock(spec=DeliveryDeduplicator, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), delivery_deduplicator)
+        request: aiohttp.web_request.Request = mock({'headers': {'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'delivery'}},
+                                                    spec=aiohttp.web_request.Request, strict=True)
+
+        expect(delivery_deduplicator).is_duplicate('delivery').thenReturn(async_value(True))
+        expect(request, times=0).read()
+        expect(github_controller, times=0).get_event_handler_task(any, any)
+
+        response = await github_controller.handle_hook(request)
+        assert response.status == 200
+        assert response.text == 'Hook duplicate ACK'
+
+    async def test__when_delivery_is_new__hook_should_be_processed(self):
+        delivery_deduplicator: DeliveryDeduplicator = mock(spec=DeliveryDeduplicator, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), delivery_deduplicator)
+        request: aiohttp.web_request.Request = mock({'headers': {'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'delivery'}},
+                                                    spec=aiohttp.web_request.Request, strict=True)
+
+        expect(delivery_deduplicator).is_duplicate('delivery').thenReturn(async_value(False))
+        expect(request).read().thenReturn(async_value(b'{"action": "action"}'))
+        expect(github_controller).get_event_handler_task({'action': 'action'}, any).thenReturn(None)
+
+        response = await github_controller.handle_hook(request)
+        assert response.text == 'Hook ACK'
+
+    async def test__when_inbox_is_set__hook_should_be_acked_after_being_stored_in_it(self):
+        webhook_inbox: WebhookInbox = mock(spec=WebhookInbox, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), webhook_inbox=webhook_inbox)
+        request: aiohttp.web_request.Request = mock({'headers': {'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'delivery'}},
+                                                    spec=aiohttp.web_request.Request, strict=True)
+
+        expect(request).read().thenReturn(async_value(b'{}'))
+        expect(webhook_inbox).accept('push', 'delivery', b'{}').thenReturn(async_value(None))
+        expect(github_controller, times=0).get_event_handler_task(any, any)
+
+        response = await github_controller.handle_hook(request)
+        assert response.text == 'Hook ACK'
+
+    async def test__when_inbox_does_not_accept_hook__delivery_should_be_forgotten__so_redelivery_is_not_skipped(self):
+        delivery_deduplicator: DeliveryDeduplicator = mock(spec=DeliveryDeduplicator, strict=True)
+        webhook_inbox: WebhookInbox = mock(spec=WebhookInbox, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), delivery_deduplicator, webhook_inbox)
+        request: aiohttp.web_request.Request = mock({'headers': {'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'delivery'}},
+                                                    spec=aiohttp.web_request.Request, strict=True)
+
+        expect(delivery_deduplicator).is_duplicate('delivery').thenReturn(async_value(False))
+        expect(request).read().thenReturn(async_value(b'{}'))
+        expect(webhook_inbox).accept('push', 'delivery', b'{}').thenRaise(OSError('disk full'))
+        expect(delivery_deduplicator, times=1).forget('delivery').thenReturn(async_value(None))
+
+        with pytest.raises(OSError):
+            await github_controller.handle_hook(request)
+
+    async def test__when_capture_ring_is_set__handled_hooks_should_be_captured(self):
+        capture_ring: CaptureRing = mock(spec=CaptureRing, strict=True)
+        webhook_inbox: WebhookInbox = mock(spec=WebhookInbox, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), webhook_inbox=webhook_inbox, capture_ring=capture_ring)
+        headers = {'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'delivery'}
+        request: aiohttp.web_request.Request = mock({'headers': headers}, spec=aiohttp.web_request.Request, strict=True)
+
+        when(request).read().thenReturn(async_value(b'{}')).thenReturn(async_value(b'{}'))
+        expect(capture_ring).capture(headers, b'{}')
+        expect(webhook_inbox).accept('push', 'delivery', b'{}').thenReturn(async_value(None))
+
+        response = await github_controller.handle_hook(request)
+        assert response.text == 'Hook ACK'
+
+    async def test__when_capture_ring_is_set__unhandled_hooks_should_be_captured_too(self):
+        capture_ring: CaptureRing = mock(spec=CaptureRing, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), capture_ring=capture_ring)
+        headers = {'X-GitHub-Event': 'ping'}
+        request: aiohttp.web_request.Request = mock({'headers': headers}, spec=aiohttp.web_request.Request, strict=True)
+
+        when(request).read().thenReturn(async_value(b'{"zen": "ping"}'))
+        expect(capture_ring).capture(headers, b'{"zen": "ping"}')
+
+        response = await github_controller.handle_hook(request)
+        assert response.text == 'Hook ACK'
+
+    async def test__when_task_supervisor_is_set__handler_should_be_spawned_in_hooks_group(self):
+        task_supervisor: TaskSupervisor = mock(spec=TaskSupervisor, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), task_supervisor=task_supervisor)
+
+        expect(task_supervisor).spawn('hooks', 'handler_coroutine')
+
+        github_controller.spawn_handler('handler_coroutine')
+
+    async def test__handle_inbox_entry__when_fair_admission_is_set__returns_once_event_is_admitted__with_its_processed_future(self):
+        fair_admission: FairAdmission = mock(spec=FairAdmission, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), fair_admission=fair_admission)
+        processed = asyncio.get_event_loop().create_future()
+
+        expect(fair_admission).submit(any, {'action': 'labeled'}).thenReturn(async_value(processed))
+        expect(github_controller, times=0).get_event_handler_task(any, any)
+
+        assert processed == await github_controller.handle_inbox_entry(InboxEntry(1, 'pull_request', 'delivery', b'{"action": "labeled"}'))
+        assert not processed.done()
+
+    async def test__hook_from_unregistered_repository__should_be_dropped_before_handling(self):
+        registered_repositories: RegisteredRepositories = mock({'dropped': 0}, spec=RegisteredRepositories, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), registered_repositories=registered_repositories)
+        data = {'ref': 'refs/heads/master', 'repository': {'full_name': 'org/unregistered'}}
+
+        expect(registered_repositories).check((EventType.PUSH,), ['org/unregistered']).thenReturn(async_value(False))
+        expect(github_controller, times=0).get_event_handler_task(any, any)
+
+        await github_controller.handle_inbox_entry(InboxEntry(1, 'push', 'delivery', json.dumps(data).encode()))
+        assert registered_repositories.dropped == 1
+
+    async def test__get_repositories__includes_head_repository_of_pull_requests(self):
+        data = {'repository': {'full_name': 'org/repo'}, 'pull_request': {'head': {'repo': {'full_name': 'fork/repo'}}}}
+        assert GithubController.get_repositories(data) == ['org/repo', 'fork/repo']
+        assert GithubController.get_repositories({'repository': {'full_name': 'org/repo'}, 'pull_request': {'head': {'repo': None}}}) == ['org/repo']
+
+    async def test__handle_inbox_entry__awaits_event_handler(self):
+        github_controller = GithubController(mock(), mock(), mock())
+        github_event_captor = captor()
+
+        expect(github_controller).get_event_handler_task({'action': 'labeled'}, github_event_captor).thenReturn(async_value(None))
+
+        await github_controller.handle_inbox_entry(InboxEntry(1, 'pull_request', 'delivery', b'{"action": "labeled"}'))
+
+        assert github_event_captor.value.event_header == 'pull_request'
+        assert github_event_captor.value.action == 'labeled'
+
+    async def test__handle_inbox_entry__when_body_decoder_is_set__should_decode_with_it(self):
+        body_decoder: BodyDecoder = mock(spec=BodyDecoder, strict=True)
+        github_controller = GithubController(mock(), mock(), mock(), body_decoder=body_decoder)
+
+        expect(body_decoder).decode(b'{"action": "labeled"}', 'pull_request').thenReturn(async_value({'action': 'decoded'}))
+        expect(github_controller).get_event_handler_task({'action': 'decoded'}, any).thenReturn(async_value(None))
+
+        await github_controller.handle_inbox_entry(InboxEntry(1, 'pull_request', 'delivery', b'{"action": "labeled"}'))
+
     async def test__handle_release_calls_triggear_heart(self):
         mock(HookDetailsFactory)
 
@@ -243,7 +419,7 @@ class TestGithubController:
 
         await github_controller.handle_pr_sync_comment(data, 'master', '123321')
 
-    async def test__handle_synchronize__calls_labeled_and_pr_sync_in_asyncio_gather(self):
+    async def test__handle_synchronize__awaits_labeled_and_pr_sync_in_asyncio_gather(self):
         mock(asyncio, strict=True)
 
         pr_sync_handle_coro = mock(strict=True)
@@ -257,7 +433,7 @@ class TestGithubController:
         expect(github_client).get_pr_labels(repo='triggear', number=23).thenReturn(async_value(pr_labels))
         expect(github_controller).handle_pr_sync(data, pr_labels).thenReturn(pr_sync_handle_coro)
         expect(github_controller).handle_labeled_sync(data, pr_labels).thenReturn(labeled_sync_handle_coro)
-        expect(asyncio).gather(pr_sync_handle_coro, labeled_sync_handle_coro)
+        expect(asyncio).gather(pr_sync_handle_coro, labeled_sync_handle_coro).thenReturn(async_value(None))
 
         await github_controller.handle_synchronize(data)
 
@@ -307,7 +483,7 @@ class TestGithubController:
 
         await github_controller.handle_comment(data)
 
-    async def test__handle_labeled_sync_comment__should_trigger_jobs_for_all_returned_hook_details(self):
+    async def test__handle_labeled_sync_comment__should_trigger_jobs_for_all_returned_hook_details_at_once(self):
         mock(HookDetailsFactory)
 
         branch = 'staging'
@@ -321,17 +497,44 @@ class TestGithubController:
 
         expect(HookDetailsFactory).get_labeled_sync_details(data, head_branch=branch, head_sha=sha)\
             .thenReturn([first_hook_details, second_hook_details])
-        expect(triggear_heart).trigger_registered_jobs(first_hook_details).thenReturn(async_value(None))
-        expect(triggear_heart).trigger_registered_jobs(second_hook_details).thenReturn(async_value(None))
+        expect(triggear_heart, times=1).trigger_labeled_sync([first_hook_details, second_hook_details]).thenReturn(async_value(None))
 
         await github_controller.handle_labeled_sync_comment(data, branch, sha)
 
-    async def test__handle_labeled_sync__calls_handle_labeled__for_every_label(self):
-        data = {}
+    async def test__handle_labeled_sync__triggers_all_labels_at_once__without_mutating_payload(self):
+        data = {'pull_request': {'head': {'repo': {'full_name': 'repo'}, 'ref': 'branch', 'sha': 'sha'}, 'html_url': 'pr_url'},
+                'sender': {'login': 'who'}}
+        pr_labels = ['triggear-label-sync', 'other-label', 'dummy-label']
+        triggear_heart: TriggearHeart = mock(spec=TriggearHeart, strict=True)
+        github_controller = GithubController(mock(), mock(), triggear_heart)
+        hook_details_captor = captor()
+
+        expect(triggear_heart, times=1).trigger_labeled_sync(hook_details_captor).thenReturn(async_value(None))
+
+        await github_controller.handle_labeled_sync(data, pr_labels)
+
+        assert [hook_details.label for hook_details in hook_details_captor.value] == ['other-label', 'dummy-label']
+        assert 'label' not in data
+        assert pr_labels == ['triggear-label-sync', 'other-label', 'dummy-label']
+
+    async def test__handle_labeled_sync__does_nothing__when_only_label_sync_is_set(self):
         triggear_heart: TriggearHeart = mock(spec=TriggearHeart, strict=True)
         github_controller = GithubController(mock(), mock(), triggear_heart)
 
-        expect(github_controller, times=1).handle_labeled({'label': {'name': 'other-label'}}).thenReturn(async_value(None))
-        expect(github_controller, times=1).handle_labeled({'label': {'name': 'dummy-label'}}).thenReturn(async_value(None))
+        expect(triggear_heart, times=0).trigger_labeled_sync(any)
+
+        await github_controller.handle_labeled_sync({}, ['triggear-label-sync'])
+
+    async def test__processed_hook__should_attribute_upstream_calls_to_its_event_and_repository(self):
+        github_controller = GithubController(mock(), mock(), mock())
+        budgets = []
+
+        async def handle_tagged(data):
+            budgets.append(CURRENT_API_BUDGET.get())
+
+        when(github_controller).handle_tagged({'repository': {'full_name': 'org/repo'}}).thenReturn(handle_tagged({}))
+
+        await github_controller.process_event(GithubEvent('push', None, 'refs/tags/1.0'), {'repository': {'full_name': 'org/repo'}})
 
-        await github_controller.handle_labeled_sync(data, ['triggear-label-sync', 'other-label', 'dummy-label'])
+        assert (budgets[0].source, budgets[0].event, budgets[0].repository) == (ApiBudget.HOOK, 'tagged', 'org/repo')
+        assert budgets[0].finished
@@ -1,9 +1,11 @@
 import pytest
 import aiohttp.web
 import aiohttp.web_request
-from mockito import mock
+from mockito import mock, expect
 
 from app.controllers.health_controller import HealthController
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.tasks.task_supervisor import TaskSupervisor
 
 pytestmark = pytest.mark.asyncio
 
@@ -16,3 +18,18 @@ class TestHealthController:
         assert response.status == 200
         assert response.text == 'TriggearIsOk'
         assert response.reason == 'Host custom_host asked'
+
+    async def test__handle_health_check__should_expose_duplicate_deliveries_counter(self):
+        request = mock({'host': 'custom_host'}, spec=aiohttp.web_request.Request, strict=True)
+        delivery_deduplicator: DeliveryDeduplicator = mock({'duplicates': 3}, spec=DeliveryDeduplicator, strict=True)
+        response: aiohttp.web.Response = await HealthController(delivery_deduplicator).handle_health_check(request)
+        assert response.status == 200
+        assert response.headers['X-Triggear-Duplicate-Deliveries'] == '3'
+
+    async def test__handle_health_check__should_expose_task_group_stats(self):
+        request = mock({'host': 'custom_host'}, spec=aiohttp.web_request.Request, strict=True)
+        task_supervisor: TaskSupervisor = mock(spec=TaskSupervisor, strict=True)
+        expect(task_supervisor).get_group_stats().thenReturn({'hooks': {'running': 1, 'waiting': 0, 'oldest_age': 0.5}})
+
+        response: aiohttp.web.Response = await HealthController(task_supervisor=task_supervisor).handle_health_check(request)
+        assert response.headers['X-Triggear-Tasks'] == '{"hooks": {"oldest_age": 0.5, "running": 1, "waiting": 0}}'
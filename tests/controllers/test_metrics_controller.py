@@ -0,0 +1,35 @@
+import pytest
+import aiohttp.web
+import aiohttp.web_request
+from mockito import mock, expect
+
+from app.controllers.metrics_controller import MetricsController
+from app.metrics.metrics_registry import MetricsRegistry
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMetricsController:
+    async def test__handle_metrics__should_return_rendered_registry__in_prometheus_text_format(self):
+        request = mock(spec=aiohttp.web_request.Request, strict=True)
+        registry = mock(spec=MetricsRegistry, strict=True)
+
+        expect(registry).render(None).thenReturn('# HELP up Up\n# TYPE up gauge\nup 1\n')
+
+        response: aiohttp.web.Response = await MetricsController(registry).handle_metrics(request)
+
+        assert response.status == 200
+        assert response.body == b'# HELP up Up\n# TYPE up gauge\nup 1\n'
+        assert response.headers['Content-Type'] == 'text/plain; version=0.0.4'
+
+    async def test__handle_metrics__should_label_samples_with_worker__when_running_in_ingress_worker(self):
+        request = mock(spec=aiohttp.web_request.Request, strict=True)
+        registry = MetricsRegistry()
+        registry.counter('hooks_total', 'Hooks received', ['event']).labels('push').inc()
+
+        response: aiohttp.web.Response = await MetricsController(registry, worker_id=2).handle_metrics(request)
+
+        assert response.body == b'# HELP hooks_total Hooks received\n' \
+                                b'# TYPE hooks_total counter\n' \
+                                b'hooks_total{worker="2",event="push"} 1.0\n'
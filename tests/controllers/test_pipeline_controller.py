@@ -4,14 +4,18 @@ import aiohttp.web
 import aiohttp.web_request
 import pytest
 from aiohttp import ClientResponse
-from mockito import mock, when, expect
+from mockito import mock, when, expect, captor
+from pymongo.errors import PyMongoError
 
 from app.clients.async_client import AsyncClientNotFoundException
 from app.clients.github_client import GithubClient
 from app.clients.mongo_client import MongoClient
 from app.controllers.pipeline_controller import PipelineController
+from app.enums.event_types import EventType
 from app.mongo.clear_query import ClearQuery
 from app.mongo.deregistration_query import DeregistrationQuery
+from app.mongo.missed_query import MissedQuery
+from app.mongo.registered_repositories import RegisteredRepositories
 from app.mongo.registration_query import RegistrationQuery
 from app.request_schemes.clear_request_data import ClearRequestData
 from app.request_schemes.comment_request_data import CommentRequestData
@@ -20,7 +24,7 @@ from app.request_schemes.deployment_status_request_data import DeploymentStatusR
 from app.request_schemes.deregister_request_data import DeregisterRequestData
 from app.request_schemes.register_request_data import RegisterRequestData
 from app.request_schemes.status_request_data import StatusRequestData
-from tests.async_mockito import async_value
+from tests.async_mockito import async_value, async_iter
 
 pytestmark = pytest.mark.asyncio
 
@@ -186,8 +190,29 @@ class TestPipelineController:
         assert response.status == 200
         assert response.reason == 'OK'
 
-    async def test__when_event_type_is_missing__handle_missing_should_return_400(self):
-        request = mock({'match_info': {}}, spec=aiohttp.web_request.Request, strict=True)
+    async def test__when_registration_succeeds__repository_should_be_added_to_registered_repositories(self):
+        request = mock(spec=aiohttp.web_request.Request, strict=True)
+        registration_query: RegistrationQuery = mock({'event_type': 'push', 'repository': 'org/repo'}, spec=RegistrationQuery, strict=True)
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories: RegisteredRepositories = mock(spec=RegisteredRepositories, strict=True)
+        pipeline_controller = PipelineController(mock(), mongo_client, registered_repositories)
+
+        when(request).json().thenReturn(async_value({}))
+        when(RegisterRequestData).is_valid_register_request_data({}).thenReturn(True)
+        when(RegistrationQuery).from_registration_request_data({}).thenReturn(registration_query)
+        expect(mongo_client).add_or_update_registration(registration_query).thenReturn(async_value(None))
+        expect(registered_repositories).add(EventType.PUSH, 'org/repo')
+
+        response: aiohttp.web.Response = await pipeline_controller.handle_register(request)
+        assert response.status == 200
+
+    @pytest.mark.parametrize("match_info, query", [
+        ({}, {}),
+        ({'eventType': 'unknown'}, {}),
+        ({'eventType': 'push'}, {'limit': 'ten'}),
+    ])
+    async def test__when_missing_request_is_invalid__handle_missing_should_return_400(self, match_info: Dict, query: Dict):
+        request = mock({'match_info': match_info, 'query': query}, spec=aiohttp.web_request.Request, strict=True)
 
         pipeline_controller = PipelineController(mock(), mock())
 
@@ -196,17 +221,72 @@ class TestPipelineController:
         assert result.status == 400
         assert result.text == 'Invalid eventType requested'
 
-    async def test__when_missing_endpoint_is_called__should_return_all_related_registrations_with_missing_times_more_then_0(self):
-        request = mock({'match_info': {'eventType': 'push'}}, spec=aiohttp.web_request.Request, strict=True)
+    async def test__when_missing_endpoint_is_called__should_stream_registrations_with_missing_times_as_ndjson(self):
+        request = mock({'match_info': {'eventType': 'all'}, 'query': {'threshold': '2', 'limit': '2'}},
+                       spec=aiohttp.web_request.Request, strict=True)
 
         mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
         pipeline_controller = PipelineController(mock(), mongo_client)
-        expect(mongo_client).get_missed_info('push').thenReturn(async_value(['url:push_job_1#7', 'url:push_job_2#13']))
-
-        result: aiohttp.web.Response = await pipeline_controller.handle_missing(request)
+        missed_query_captor = captor()
+        expect(mongo_client).get_missed_info(missed_query_captor).thenReturn(async_iter(
+            {'eventType': 'push', 'jenkins_url': 'url', 'job': 'push_job_2', 'missed_times': 13, 'cursor': 'push:2'},
+            {'eventType': 'push', 'jenkins_url': 'url', 'job': 'push_job_1', 'missed_times': 7, 'cursor': 'push:1'}
+        ))
+        expect(aiohttp.web.StreamResponse).prepare(request).thenReturn(async_value(None))
+        written_chunks: List[bytes] = []
+        when(aiohttp.web.StreamResponse).write(any).thenAnswer(lambda chunk: written_chunks.append(chunk) or async_value(None))
+        expect(aiohttp.web.StreamResponse).write_eof().thenReturn(async_value(None))
+
+        result: aiohttp.web.StreamResponse = await pipeline_controller.handle_missing(request)
 
         assert result.status == 200
-        assert result.text == 'url:push_job_1#7,url:push_job_2#13'
+        assert result.headers['Content-Type'] == 'application/x-ndjson'
+        assert written_chunks == [
+            b'{"eventType": "push", "jenkins_url": "url", "job": "push_job_1", "missed_times": 7, "cursor": "push:1"}\n',
+            b'{"eventType": "push", "jenkins_url": "url", "job": "push_job_2", "missed_times": 13, "cursor": "push:2"}\n'
+        ]
+        missed_query: MissedQuery = missed_query_captor.value
+        assert missed_query.event_type == 'all'
+        assert missed_query.threshold == 2
+        assert missed_query.limit == 2
+        assert missed_query.after is None
+
+    async def test__when_missing_query_fails_before_streaming__should_not_send_200(self):
+        request = mock({'match_info': {'eventType': 'push'}, 'query': {}}, spec=aiohttp.web_request.Request, strict=True)
+
+        async def failing_missed_info():
+            raise PyMongoError('cursor lost')
+            yield
+
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        expect(mongo_client).get_missed_info(any).thenReturn(failing_missed_info())
+        expect(aiohttp.web.StreamResponse, times=0).prepare(...)
+
+        with pytest.raises(PyMongoError):
+            await PipelineController(mock(), mongo_client).handle_missing(request)
+
+    async def test__when_missing_query_fails_while_streaming__should_write_error_line_and_drop_connection(self):
+        request = mock({'match_info': {'eventType': 'push'}, 'query': {}}, spec=aiohttp.web_request.Request, strict=True)
+
+        async def failing_missed_info():
+            yield {'eventType': 'push', 'jenkins_url': 'url', 'job': 'push_job', 'missed_times': 7, 'cursor': 'push:1'}
+            raise PyMongoError('cursor lost')
+
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        expect(mongo_client).get_missed_info(any).thenReturn(failing_missed_info())
+        expect(aiohttp.web.StreamResponse).prepare(request).thenReturn(async_value(None))
+        written_chunks: List[bytes] = []
+        when(aiohttp.web.StreamResponse).write(any).thenAnswer(lambda chunk: written_chunks.append(chunk) or async_value(None))
+        expect(aiohttp.web.StreamResponse).force_close()
+        expect(aiohttp.web.StreamResponse, times=0).write_eof()
+
+        with pytest.raises(PyMongoError):
+            await PipelineController(mock(), mongo_client).handle_missing(request)
+
+        assert written_chunks == [
+            b'{"eventType": "push", "jenkins_url": "url", "job": "push_job", "missed_times": 7, "cursor": "push:1"}\n',
+            b'{"error": "cursor lost"}\n'
+        ]
 
     async def test__when_deregister_is_missing_parameters__should_return_400(self):
         request = mock(spec=aiohttp.web_request.Request, strict=True)
@@ -244,6 +324,22 @@ class TestPipelineController:
         assert response.status == 200
         assert response.text == 'Deregistration of job for push succeeded'
 
+    async def test__when_deregistration_succeeds__registered_repositories_of_event_type_should_be_refreshed(self):
+        request = mock(spec=aiohttp.web_request.Request, strict=True)
+        deregistration_query: DeregistrationQuery = mock({'event_type': 'labeled'}, spec=DeregistrationQuery, strict=True)
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories: RegisteredRepositories = mock(spec=RegisteredRepositories, strict=True)
+        pipeline_controller = PipelineController(mock(), mongo_client, registered_repositories)
+
+        data = {'eventType': 'labeled', 'jobName': 'job', 'caller': 'del_job#7', 'jenkins_url': 'url'}
+        when(request).json().thenReturn(async_value(data))
+        when(DeregistrationQuery).from_deregistration_request_data(data).thenReturn(deregistration_query)
+        expect(mongo_client).deregister(deregistration_query).thenReturn(async_value(None))
+        expect(registered_repositories).refresh_event_type(EventType.PR_LABELED).thenReturn(async_value(None))
+
+        response: aiohttp.web.Response = await pipeline_controller.handle_deregister(request)
+        assert response.status == 200
+
     async def test__when_clear_is_missing_parameters__should_return_400(self):
         request = mock(spec=aiohttp.web_request.Request, strict=True)
 
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from mockito import mock, expect
+
+from app.builds.build_debouncer import BuildDebouncer
+from app.clients.jenkins_client import JenkinsClient, JenkinsInstanceConfig
+from app.clients.jenkinses_clients import JenkinsesClients
+from app.clients.mongo_client import MongoClient
+from app.diagnostics.inflight_report import InflightReport
+from app.diagnostics.inflight_tracker import InflightTracker
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from app.metrics.triggear_metrics import UPSTREAM_IN_FLIGHT
+from app.mongo.registered_repositories import RegisteredRepositories
+from app.tasks.task_supervisor import TaskSupervisor
+from app.utilities.ttl_cache import TtlCache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestInflightReport:
+    async def test__tracked_items__should_be_filtered_by_age__sorted__and_limited(self):
+        inflight_tracker = InflightTracker()
+        inflight_report = InflightReport(inflight_tracker)
+
+        with inflight_tracker.track(InflightTracker.WATCHES, job='old', polls=7) as old, \
+                inflight_tracker.track(InflightTracker.WATCHES, job='busy', polls=30) as busy, \
+                inflight_tracker.track(InflightTracker.WATCHES, job='new', polls=1):
+            old.started -= 100
+            busy.started -= 50
+            by_age = inflight_report.get_report([InflightTracker.WATCHES], limit=2, min_age=10)[InflightTracker.WATCHES]
+            by_polls = inflight_report.get_report([InflightTracker.WATCHES], sort='polls')[InflightTracker.WATCHES]
+
+        assert by_age['count'] == 2
+        assert [item['job'] for item in by_age['items']] == ['old', 'busy']
+        assert by_age['items'][0]['age'] >= 100
+        assert [item['job'] for item in by_polls['items']] == ['busy', 'old', 'new']
+
+    async def test__queued_triggers__should_be_counted_per_jenkins(self):
+        task_supervisor = TaskSupervisor(max_concurrency=1, group_concurrency={}, drain_timeout=1)
+        build_debouncer = BuildDebouncer(window=10, abort_superseded=False, task_supervisor=task_supervisor)
+        release = asyncio.Event()
+
+        async def build():
+            await release.wait()
+
+        tasks = [task_supervisor.spawn(TaskSupervisor.BUILDS, build(), jenkins_url='first', job='job') for _ in range(3)]
+        build_debouncer.schedule(('push', 'second', 'job', 'repo', 'master'), build)
+        await asyncio.sleep(0)
+        report = InflightReport(InflightTracker(), task_supervisor, build_debouncer).get_report(['queued_triggers', 'tasks'])
+        release.set()
+        await asyncio.gather(*tasks)
+        await build_debouncer.stop(mock())
+
+        assert report['queued_triggers'] == {'first': {'debounced': 0, 'waiting_for_slot': 2},
+                                             'second': {'debounced': 1, 'waiting_for_slot': 0}}
+        assert report['tasks']['count'] == 3
+        assert [item['running'] for item in report['tasks']['items']].count(True) == 1
+        assert report['tasks']['items'][0]['jenkins_url'] == 'first'
+
+    async def test__upstreams_and_caches__should_be_reported(self):
+        missed_info_cache = TtlCache(ttl=10)
+        missed_info_cache.set('key', [])
+        missed_info_cache.get('key')
+        missed_info_cache.get('other')
+        mongo_client = mock({'missed_info_cache': missed_info_cache}, spec=MongoClient, strict=True)
+        delivery_deduplicator = DeliveryDeduplicator(mongo=mock(), max_entries=10, ttl=60)
+        delivery_deduplicator.checked, delivery_deduplicator.duplicates = 4, 1
+        registered_repositories = mock(spec=RegisteredRepositories, strict=True)
+        jenkinses_clients = mock(spec=JenkinsesClients, strict=True)
+        jenkins_client = JenkinsClient(JenkinsInstanceConfig('https://jenkins', 'user', 'token'))
+        jenkins_client.job_catalog.replace({'job'})
+        jenkins_client.job_catalog.hits, jenkins_client.job_catalog.misses = 3, 1
+        UPSTREAM_IN_FLIGHT.labels('jenkins', 'https://report-test').inc(2)
+
+        expect(registered_repositories).get_counts().thenReturn({'push': 3})
+        expect(jenkinses_clients).get_created_jenkinses().thenReturn({'https://jenkins': jenkins_client})
+
+        report = InflightReport(InflightTracker(),
+                                mongo_client=mongo_client,
+                                delivery_deduplicator=delivery_deduplicator,
+                                registered_repositories=registered_repositories,
+                                jenkinses_clients=jenkinses_clients).get_report(['upstreams', 'caches'])
+        UPSTREAM_IN_FLIGHT.labels('jenkins', 'https://report-test').dec(2)
+
+        assert report['upstreams']['jenkins']['https://report-test'] == 2
+        assert report['caches']['missed_info'] == {'entries': 1, 'max_entries': 128, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        assert report['caches']['deliveries'] == {'entries': 0, 'max_entries': 10, 'checked': 4, 'duplicates': 1, 'duplicate_rate': 0.25}
+        assert report['caches']['registered_repositories'] == {'push': 3}
+        job_catalog = report['caches']['job_catalogs']['https://jenkins']
+        assert (job_catalog['jobs'], job_catalog['missing'], job_catalog['hit_rate']) == (1, 0, 0.75)
+
+    async def test__unknown_section__should_raise(self):
+        with pytest.raises(ValueError):
+            InflightReport(InflightTracker()).get_report(['threads'])
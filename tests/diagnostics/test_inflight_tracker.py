@@ -0,0 +1,25 @@
+import pytest
+
+from app.diagnostics.inflight_tracker import InflightTracker
+
+
+class TestInflightTracker:
+    def test__tracked_item__is_listed_only_while_its_block_runs(self):
+        inflight_tracker = InflightTracker()
+
+        with inflight_tracker.track(InflightTracker.WATCHES, job='job', polls=0) as watch:
+            watch.update(polls=1)
+            with inflight_tracker.track(InflightTracker.HOOKS, event='push'):
+                assert [item.details for item in inflight_tracker.get_items()] == [{'job': 'job', 'polls': 1}, {'event': 'push'}]
+                assert [item.details for item in inflight_tracker.get_items(InflightTracker.HOOKS)] == [{'event': 'push'}]
+
+        assert inflight_tracker.get_items() == []
+
+    def test__item__is_forgotten__when_its_block_raises(self):
+        inflight_tracker = InflightTracker()
+
+        with pytest.raises(ValueError):
+            with inflight_tracker.track(InflightTracker.TRIGGERS, job='job'):
+                raise ValueError()
+
+        assert inflight_tracker.get_items() == []
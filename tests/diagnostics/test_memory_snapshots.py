@@ -0,0 +1,62 @@
+import tracemalloc
+
+import pytest
+from mockito import mock
+import aiohttp.web
+
+from app.diagnostics.memory_snapshots import MemorySnapshots
+
+pytestmark = pytest.mark.asyncio
+
+HELD = []
+
+
+def allocate() -> None:
+    HELD.append([bytearray(1024) for _ in range(100)])
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMemorySnapshots:
+    def teardown_method(self):
+        HELD.clear()
+
+    async def test__compare_without_tracing__should_trace_only_for_window(self, monkeypatch):
+        memory_snapshots = MemorySnapshots(frames=1, trace_on_startup=False, max_window=1)
+        original_take = MemorySnapshots.take
+        snapshots = []
+
+        def take():
+            if snapshots:
+                allocate()
+            snapshots.append(original_take())
+            return snapshots[-1]
+        monkeypatch.setattr(MemorySnapshots, 'take', staticmethod(take))
+
+        report = await memory_snapshots.compare(0.01, 5, 'filename')
+
+        assert not tracemalloc.is_tracing()
+        assert report['group_by'] == 'filename'
+        assert report['traced_bytes'] > 0
+        assert len(report['top']) <= 5
+        assert report['diff'][0]['size_diff'] >= 100 * 1024
+        assert report['diff'][0]['location'][0].startswith(__file__)
+
+    async def test__compare_with_tracing_on_startup__should_diff_against_previous_request(self):
+        app = mock(spec=aiohttp.web.Application, strict=True)
+        memory_snapshots = MemorySnapshots(frames=1, trace_on_startup=True, max_window=1)
+
+        await memory_snapshots.start(app)
+        try:
+            allocate()
+            first = await memory_snapshots.compare(0, 50, 'lineno')
+            second = await memory_snapshots.compare(0, 50, 'lineno')
+        finally:
+            await memory_snapshots.stop(app)
+
+        assert not tracemalloc.is_tracing()
+        assert any(__file__ in diff['location'][0] and diff['size_diff'] >= 100 * 1024 for diff in first['diff'])
+        assert not any(__file__ in diff['location'][0] and diff['size_diff'] >= 100 * 1024 for diff in second['diff'])
+
+    async def test__unknown_grouping__should_raise(self):
+        with pytest.raises(ValueError):
+            await MemorySnapshots(frames=1, trace_on_startup=False, max_window=1).compare(0, 5, 'module')
@@ -0,0 +1,60 @@
+import asyncio
+import collections
+import threading
+import time
+
+import pytest
+
+from app.diagnostics.sampling_profiler import SamplingProfiler
+from app.exceptions.triggear_error import TriggearError
+
+pytestmark = pytest.mark.asyncio
+
+
+def spin(stopped: threading.Event) -> None:
+    while not stopped.is_set():
+        time.sleep(0.001)
+
+
+async def wait_forever() -> None:
+    await asyncio.sleep(3600)
+
+
+class TestSamplingProfiler:
+    async def test__profile__should_collapse_stacks_of_threads__and_suspended_tasks(self):
+        stopped = threading.Event()
+        worker = threading.Thread(target=spin, args=(stopped,), name='spinner')
+        worker.start()
+        waiting_task = asyncio.get_event_loop().create_task(wait_forever())
+        try:
+            samples = await SamplingProfiler(interval=0.005, max_duration=1).profile(0.1, include_tasks=True)
+        finally:
+            stopped.set()
+            worker.join()
+            waiting_task.cancel()
+
+        assert any(stack.startswith('spinner;') and 'spin (test_sampling_profiler.py:' in stack for stack in samples)
+        assert any(stack.startswith(f'{SamplingProfiler.TASKS_ROOT};wait_forever (test_sampling_profiler.py:') for stack in samples)
+        assert not any(stack.startswith('sampling-profiler;') for stack in samples)
+
+    async def test__profile__should_be_capped_at_max_duration(self):
+        started = time.monotonic()
+
+        await SamplingProfiler(interval=0.01, max_duration=0.05).profile(30)
+
+        assert time.monotonic() - started < 1
+
+    async def test__concurrent_profile__should_raise(self):
+        sampling_profiler = SamplingProfiler(interval=0.01, max_duration=1)
+        running = asyncio.get_event_loop().create_task(sampling_profiler.profile(0.1))
+        await asyncio.sleep(0)
+
+        with pytest.raises(TriggearError):
+            await sampling_profiler.profile(0.1)
+        await running
+        assert not sampling_profiler.running
+
+    async def test__render__should_write_most_common_stacks_first(self):
+        samples = collections.Counter({'main;a (x.py:1)': 1, 'main;b (x.py:5)': 3})
+
+        assert SamplingProfiler.render(samples) == 'main;b (x.py:5) 3\nmain;a (x.py:1) 1\n'
@@ -102,6 +102,21 @@ class TestHookDetailsFactory:
         assert second_hook_details.who == 'karolgil'
         assert second_hook_details.pr_url == 'pr_url'
 
+    async def test__when_pr_labeled_sync_hook_is_provided__should_return_hook_details_per_label(self):
+        hook_data = {'pull_request': {'html_url': 'pr.url',
+                                      'head': {'repo': {'full_name': 'repo'},
+                                               'ref': 'sandbox', 'sha': '321321'}},
+                     'sender': {'login': 'karolgil'}}
+        hook_details: List[LabeledHookDetails] = HookDetailsFactory.get_pr_labeled_sync_details(hook_data, ['first', 'second'])
+        assert [details.label for details in hook_details] == ['first', 'second']
+        for details in hook_details:
+            assert details.repository == 'repo'
+            assert details.branch == 'sandbox'
+            assert details.sha == '321321'
+            assert details.who == 'karolgil'
+            assert details.pr_url == 'pr.url'
+        assert 'label' not in hook_data
+
     async def test__when_pr_sync_hook_is_provided__should_return_proper_hook_details(self):
         hook_data = {'repository': {'full_name': 'repo'}}
         hook_details = HookDetailsFactory.get_pr_sync_details(hook_data, 'master', '123456')
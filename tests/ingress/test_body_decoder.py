@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from mockito import expect
+
+from app.ingress.body_decoder import BodyDecoder
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestBodyDecoder:
+    async def test__small_body__should_be_decoded_inline(self):
+        body_decoder = BodyDecoder(offload_threshold=100, workers=2)
+        expect(body_decoder, times=0).get_executor()
+
+        assert await body_decoder.decode(b'{"ref": "refs/heads/master"}') == {'ref': 'refs/heads/master'}
+
+    async def test__when_no_workers_are_configured__large_body_should_be_decoded_inline(self):
+        body_decoder = BodyDecoder(offload_threshold=1, workers=0)
+        expect(body_decoder, times=0).get_executor()
+
+        assert await body_decoder.decode(b'{"ref": "refs/heads/master"}') == {'ref': 'refs/heads/master'}
+
+    async def test__large_body__should_be_decoded_in_worker_process(self):
+        body_decoder = BodyDecoder(offload_threshold=1, workers=1)
+        try:
+            assert await body_decoder.decode(b'{"commits": [{"id": "123"}]}') == {'commits': [{'id': '123'}]}
+        finally:
+            await body_decoder.stop(None)
+
+    async def test__invalid_body_from_worker_process__should_raise(self):
+        body_decoder = BodyDecoder(offload_threshold=1, workers=1)
+        try:
+            with pytest.raises(ValueError):
+                await body_decoder.decode(b'{not json')
+        finally:
+            await body_decoder.stop(None)
+
+    async def test__push_body__commits_should_be_reduced_to_changed_paths(self):
+        body = b'{"ref": "refs/heads/master", "after": "123", "repository": {"full_name": "org/repo"}, "commits": [' \
+               b'{"id": "1", "message": "big", "author": {"name": "a"}, "added": ["a.py"], "removed": [], "modified": ["b.py"]}]}'
+        body_decoder = BodyDecoder(offload_threshold=1000, workers=0)
+
+        assert await body_decoder.decode(body, 'push') == {
+            'ref': 'refs/heads/master',
+            'after': '123',
+            'repository': {'full_name': 'org/repo'},
+            'commits': [{'id': '1', 'added': ['a.py'], 'removed': [], 'modified': ['b.py']}]
+        }
+
+    async def test__non_push_body__should_be_decoded_whole(self):
+        body = b'{"pull_request": {"added": [], "removed": [], "modified": [], "title": "kept"}}'
+        body_decoder = BodyDecoder(offload_threshold=1000, workers=0)
+
+        assert await body_decoder.decode(body, 'pull_request') == {'pull_request': {'added': [], 'removed': [], 'modified': [], 'title': 'kept'}}
@@ -0,0 +1,67 @@
+import pytest
+
+from app.ingress.capture_ring import CaptureRing
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestCaptureRing:
+    async def test__captured_hooks__are_read_back_in_order__after_reopen(self, tmpdir):
+        file_path = str(tmpdir.join('hooks.capture'))
+        capture_ring = CaptureRing(file_path, size=4096)
+        await capture_ring.start(None)
+        capture_ring.capture({'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'first', 'X-Hub-Signature-256': 'sha256=secret'}, b'{"a": 1}')
+        capture_ring.append({'X-GitHub-Event': 'release'}, b'{"b": 2}', received_at=12.5)
+        await capture_ring.stop(None)
+
+        reopened = CaptureRing(file_path, size=4096)
+        reopened.open()
+        assert reopened.records == 2
+        assert reopened.next_sequence == 3
+        reopened.close()
+        first, second = CaptureRing.read_file(file_path)
+        assert (first.sequence, first.event_header, first.headers, first.body) == \
+            (1, 'push', {'X-GitHub-Event': 'push', 'X-GitHub-Delivery': 'first'}, b'{"a": 1}')
+        assert (second.sequence, second.received_at, second.event_header, second.body) == (2, 12.5, 'release', b'{"b": 2}')
+
+    async def test__when_ring_is_full__oldest_hooks_are_overwritten(self, tmpdir):
+        file_path = str(tmpdir.join('hooks.capture'))
+        capture_ring = CaptureRing(file_path, size=1024)
+        capture_ring.open()
+        for index in range(100):
+            assert capture_ring.append({}, str(index).encode() * 10)
+        capture_ring.close()
+
+        captured = CaptureRing.read_file(file_path)
+        assert 0 < len(captured) < 100
+        assert [hook.sequence for hook in captured] == list(range(101 - len(captured), 101))
+        assert [hook.body for hook in captured] == [str(hook.sequence - 1).encode() * 10 for hook in captured]
+
+    async def test__hook_bigger_than_half_of_ring__is_skipped(self, tmpdir):
+        capture_ring = CaptureRing(str(tmpdir.join('hooks.capture')), size=1024)
+        capture_ring.open()
+
+        assert not capture_ring.append({}, b'x' * 600)
+        assert capture_ring.skipped == 1
+        assert capture_ring.records == 0
+        capture_ring.close()
+
+    async def test__when_size_changes__ring_starts_empty(self, tmpdir):
+        file_path = str(tmpdir.join('hooks.capture'))
+        capture_ring = CaptureRing(file_path, size=1024)
+        capture_ring.open()
+        capture_ring.append({}, b'body')
+        capture_ring.close()
+
+        resized = CaptureRing(file_path, size=2048)
+        resized.open()
+        assert resized.records == 0
+        resized.close()
+        assert CaptureRing.read_file(file_path) == []
+
+    async def test__file_that_is_not_a_ring__cannot_be_read(self, tmpdir):
+        file_path = tmpdir.join('hooks.capture')
+        file_path.write(b'\0' * 1024, mode='wb')
+
+        with pytest.raises(ValueError):
+            CaptureRing.read_file(str(file_path))
@@ -0,0 +1,81 @@
+import pytest
+from mockito import mock, expect, when
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+from app.ingress.delivery_deduplicator import DeliveryDeduplicator
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+async def raise_error(error: Exception):
+    raise error
+
+
+@pytest.mark.usefixtures('unstub')
+class TestDeliveryDeduplicator:
+    async def test__start__creates_ttl_index(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        deduplicator = DeliveryDeduplicator(mock(spec=AsyncIOMotorClient, strict=True), max_entries=10, ttl=60)
+
+        when(deduplicator).get_deliveries().thenReturn(collection)
+        expect(collection).create_index([('timestamp', 1)], expireAfterSeconds=60, name='timestamp_ttl').thenReturn(async_value(None))
+
+        await deduplicator.start(mock())
+
+    async def test__delivery_without_id__is_never_duplicate(self):
+        deduplicator = DeliveryDeduplicator(mock(spec=AsyncIOMotorClient, strict=True), max_entries=10, ttl=60)
+        expect(deduplicator, times=0).get_deliveries()
+
+        assert not await deduplicator.is_duplicate(None)
+        assert deduplicator.duplicates == 0
+
+    async def test__delivery_seen_in_memory__is_duplicate_without_mongo_roundtrip(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        deduplicator = DeliveryDeduplicator(mock(spec=AsyncIOMotorClient, strict=True), max_entries=10, ttl=60)
+
+        when(deduplicator).get_deliveries().thenReturn(collection)
+        expect(collection, times=1).insert_one(any).thenReturn(async_value(None))
+
+        assert not await deduplicator.is_duplicate('delivery')
+        assert await deduplicator.is_duplicate('delivery')
+        assert deduplicator.duplicates == 1
+
+    async def test__delivery_stored_in_mongo__is_duplicate__after_eviction_from_memory(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        deduplicator = DeliveryDeduplicator(mock(spec=AsyncIOMotorClient, strict=True), max_entries=1, ttl=60)
+
+        when(deduplicator).get_deliveries().thenReturn(collection)
+        when(collection).insert_one(any).thenAnswer(lambda document: async_value(None))
+
+        assert not await deduplicator.is_duplicate('first')
+        assert not await deduplicator.is_duplicate('second')
+
+        when(collection).insert_one(any).thenAnswer(lambda document: raise_error(DuplicateKeyError('duplicate')))
+        assert await deduplicator.is_duplicate('first')
+        assert deduplicator.duplicates == 1
+
+    async def test__delivery__is_processed__when_mongo_is_unavailable(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        deduplicator = DeliveryDeduplicator(mock(spec=AsyncIOMotorClient, strict=True), max_entries=10, ttl=60)
+
+        when(deduplicator).get_deliveries().thenReturn(collection)
+        expect(collection).insert_one(any).thenReturn(raise_error(ServerSelectionTimeoutError('down')))
+
+        assert not await deduplicator.is_duplicate('delivery')
+        assert deduplicator.duplicates == 0
+
+    async def test__forgotten_delivery__is_not_duplicate_anymore(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        deduplicator = DeliveryDeduplicator(mock(spec=AsyncIOMotorClient, strict=True), max_entries=10, ttl=60)
+
+        when(deduplicator).get_deliveries().thenReturn(collection)
+        when(collection).insert_one(any).thenAnswer(lambda document: async_value(None))
+        expect(collection, times=1).delete_one({'_id': 'delivery'}).thenReturn(async_value(None))
+
+        assert not await deduplicator.is_duplicate('delivery')
+        await deduplicator.forget('delivery')
+        await deduplicator.forget(None)
+        assert not await deduplicator.is_duplicate('delivery')
+        assert deduplicator.duplicates == 0
@@ -0,0 +1,60 @@
+import pytest
+
+from app.data_objects.github_event import GithubEvent
+from app.enums.event_types import EventType
+from app.ingress.event_router import EventRouter
+
+
+class TestEventRouter:
+    @pytest.mark.parametrize("github_event, expected_event_type", [
+        (GithubEvent('release', 'published', None), EventType.RELEASE),
+        (GithubEvent('pull_request', 'labeled', None), EventType.PR_LABELED),
+        (GithubEvent('issue_comment', 'created', None), EventType.ISSUE_COMMENT),
+        (GithubEvent('pull_request', 'opened', None), EventType.PR_OPENED),
+        (GithubEvent('pull_request', 'synchronize', None), EventType.SYNCHRONIZE),
+        (GithubEvent('push', None, 'refs/tags/1.0.0'), EventType.TAGGED),
+        (GithubEvent('push', None, 'refs/heads/master'), EventType.PUSH),
+        (GithubEvent('push', None, 'refs/heads/feature/nested'), EventType.PUSH)
+    ])
+    def test__route__matches_same_event_types_as_event_type_comparison(self, github_event: GithubEvent, expected_event_type: EventType):
+        assert EventRouter.route(github_event) is expected_event_type
+        assert expected_event_type == github_event
+
+    @pytest.mark.parametrize("github_event", [
+        GithubEvent('pull_request', 'closed', None),
+        GithubEvent('push', None, 'refs/pull/1/head'),
+        GithubEvent('push', None, 'master'),
+        GithubEvent('check_run', 'completed', None)
+    ])
+    def test__route__returns_none__for_unhandled_events(self, github_event: GithubEvent):
+        assert EventRouter.route(github_event) is None
+
+    @pytest.mark.parametrize("event_header, expected", [
+        ('push', True),
+        ('pull_request', True),
+        ('issue_comment', True),
+        ('release', True),
+        ('status', False),
+        ('workflow_run', False),
+        (None, False)
+    ])
+    def test__is_handled__checks_event_header_only(self, event_header: str, expected: bool):
+        assert EventRouter.is_handled(event_header) == expected
+
+    @pytest.mark.parametrize("ref, expected", [
+        (None, None),
+        ('refs/heads/master', 'refs/heads/'),
+        ('refs/tags/v1/rc', 'refs/tags/'),
+        ('master', 'master')
+    ])
+    def test__get_ref_prefix(self, ref: str, expected: str):
+        assert EventRouter.get_ref_prefix(ref) == expected
+
+    @pytest.mark.parametrize("event_type, expected", [
+        (EventType.PUSH, (EventType.PUSH,)),
+        (EventType.RELEASE, (EventType.RELEASE,)),
+        (EventType.SYNCHRONIZE, (EventType.PR_OPENED, EventType.PR_LABELED)),
+        (EventType.ISSUE_COMMENT, (EventType.PR_OPENED, EventType.PR_LABELED))
+    ])
+    def test__get_registration_event_types(self, event_type: EventType, expected: tuple):
+        assert EventRouter.get_registration_event_types(event_type) == expected
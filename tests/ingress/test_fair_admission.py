@@ -0,0 +1,171 @@
+import asyncio
+import json
+
+import pytest
+from mockito import mock, expect, when, captor
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.data_objects.github_event import GithubEvent
+from app.ingress.fair_admission import FairAdmission, AdmittedEvent
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+async def raise_error(error: Exception):
+    raise error
+
+
+def get_fair_admission(collection: AsyncIOMotorCollection, repository_high_water: int = 10, total_high_water: int = 100) -> FairAdmission:
+    fair_admission = FairAdmission(mock(spec=AsyncIOMotorClient, strict=True),
+                                   workers=0,
+                                   repository_high_water=repository_high_water,
+                                   total_high_water=total_high_water,
+                                   low_priority_events=['push'],
+                                   overflow_drain_interval=60)
+    when(fair_admission).get_overflow().thenReturn(collection)
+    when(collection).create_index([('timestamp', 1)], name='timestamp').thenReturn(async_value(None))
+    return fair_admission
+
+
+def get_data(repository: str) -> dict:
+    return {'repository': {'full_name': repository}}
+
+
+@pytest.mark.usefixtures('unstub')
+class TestFairAdmission:
+    async def test__repositories__are_served_round_robin(self):
+        fair_admission = get_fair_admission(mock(spec=AsyncIOMotorCollection, strict=True))
+        await fair_admission.start(mock())
+        try:
+            for _ in range(3):
+                await fair_admission.submit(GithubEvent('push', None, 'refs/heads/master'), get_data('monorepo'))
+            await fair_admission.submit(GithubEvent('push', None, 'refs/heads/master'), get_data('small'))
+            await fair_admission.submit(GithubEvent('release', 'published', None), get_data('other'))
+
+            assert fair_admission.get_repository_backlog() == {'monorepo': 3, 'small': 1, 'other': 1}
+            assert [fair_admission.dequeue().repository for _ in range(5)] == ['monorepo', 'small', 'other', 'monorepo', 'monorepo']
+            assert fair_admission.backlog == 0
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__low_priority_event_over_repository_high_water__is_spilled_to_overflow(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        fair_admission = get_fair_admission(collection, repository_high_water=1)
+        document_captor = captor()
+        expect(collection, times=1).insert_one(document_captor).thenReturn(async_value(None))
+        await fair_admission.start(mock())
+        try:
+            await fair_admission.submit(GithubEvent('push', None, 'refs/heads/master'), get_data('monorepo'))
+            spilled = await fair_admission.submit(GithubEvent('push', None, 'refs/heads/master'), get_data('monorepo'))
+
+            assert spilled.done()
+            assert fair_admission.spilled == 1
+            assert fair_admission.get_repository_backlog() == {'monorepo': 1}
+            assert document_captor.value['repository'] == 'monorepo'
+            assert json.loads(document_captor.value['body']) == get_data('monorepo')
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__high_priority_event_over_high_water__is_kept_in_memory(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        fair_admission = get_fair_admission(collection, repository_high_water=1, total_high_water=1)
+        expect(collection, times=0).insert_one(any)
+        await fair_admission.start(mock())
+        try:
+            await fair_admission.submit(GithubEvent('pull_request', 'labeled', None), get_data('repo'))
+            await fair_admission.submit(GithubEvent('pull_request', 'labeled', None), get_data('repo'))
+
+            assert fair_admission.backlog == 2
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__when_overflow_is_unavailable__event_should_be_kept_in_memory(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        fair_admission = get_fair_admission(collection, total_high_water=0)
+        expect(collection).insert_one(any).thenReturn(raise_error(ServerSelectionTimeoutError()))
+        await fair_admission.start(mock())
+        try:
+            processed = await fair_admission.submit(GithubEvent('push', None, 'refs/heads/master'), get_data('repo'))
+
+            assert not processed.done()
+            assert fair_admission.backlog == 1
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__drain_overflow__enqueues_spilled_events_until_low_water(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        fair_admission = get_fair_admission(collection, total_high_water=4)
+        document = {'_id': 'id', 'repository': 'repo', 'event_header': 'push', 'action': None, 'ref': 'refs/heads/master',
+                    'body': '{"after": "123"}'}
+        lease_captor = captor()
+        expect(collection, times=2).find_one_and_update(lease_captor, any, sort=[('timestamp', 1)])\
+            .thenAnswer(lambda *args, **kwargs: async_value(document))
+        await fair_admission.start(mock())
+        try:
+            assert await fair_admission.drain_overflow() == 2
+
+            admitted_event = fair_admission.dequeue()
+            assert admitted_event.github_event.ref == 'refs/heads/master'
+            assert admitted_event.data == {'after': '123'}
+            assert admitted_event.overflow_id == 'id'
+            assert list(lease_captor.value) == ['leased_until']
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__drained_event__is_deleted_from_overflow__only_after_it_was_processed(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        fair_admission = get_fair_admission(collection)
+        calls = []
+
+        async def handler(github_event: GithubEvent, data: dict):
+            calls.append('handled')
+
+        fair_admission.set_handler(handler)
+        when(collection).delete_one({'_id': 'id'}).thenAnswer(lambda document: calls.append('deleted') or async_value(None))
+        await fair_admission.start(mock())
+        try:
+            admitted_event = AdmittedEvent('repo', GithubEvent('push', None, 'refs/heads/master'), {'after': '123'}, 'id')
+            await fair_admission.process(admitted_event)
+
+            assert calls == ['handled', 'deleted']
+            assert admitted_event.processed.done()
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__event_interrupted_by_stop__is_neither_deleted_from_overflow_nor_resolved(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        fair_admission = get_fair_admission(collection)
+
+        async def handler(github_event: GithubEvent, data: dict):
+            raise asyncio.CancelledError()
+
+        fair_admission.set_handler(handler)
+        expect(collection, times=0).delete_one(any)
+        await fair_admission.start(mock())
+        try:
+            admitted_event = AdmittedEvent('repo', GithubEvent('push', None, 'refs/heads/master'), {}, 'id')
+            with pytest.raises(asyncio.CancelledError):
+                await fair_admission.process(admitted_event)
+            assert not admitted_event.processed.done()
+        finally:
+            await fair_admission.stop(mock())
+
+    async def test__workers__process_events_and_resolve_their_futures(self):
+        fair_admission = get_fair_admission(mock(spec=AsyncIOMotorCollection, strict=True))
+        fair_admission.workers = 1
+        handled = []
+
+        async def handler(github_event: GithubEvent, data: dict):
+            handled.append(data['repository']['full_name'])
+            raise ValueError('failures are only logged')
+
+        fair_admission.set_handler(handler)
+        await fair_admission.start(mock())
+        try:
+            processed = await fair_admission.submit(GithubEvent('push', None, 'refs/heads/master'), get_data('repo'))
+            await asyncio.wait_for(processed, 1)
+            assert handled == ['repo']
+        finally:
+            await fair_admission.stop(mock())
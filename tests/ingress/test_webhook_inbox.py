@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from mockito import mock
+
+from app.ingress.webhook_inbox import WebhookInbox, InboxEntry
+from app.ingress.write_ahead_log import WriteAheadLog
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestWebhookInbox:
+    async def test__inbox_entry__survives_encoding(self):
+        entry = InboxEntry.decode(3, InboxEntry.encode('push', 'delivery', b'{"a":\n"b"}'))
+        assert entry.sequence == 3
+        assert entry.event_header == 'push'
+        assert entry.delivery_id == 'delivery'
+        assert entry.body == b'{"a":\n"b"}'
+
+    async def test__mark_done__advances_checkpoint_only_over_contiguous_entries(self):
+        webhook_inbox = WebhookInbox(mock(spec=WriteAheadLog, strict=True), workers=1, checkpoint_interval=1)
+        webhook_inbox.mark_done(2)
+        assert webhook_inbox.checkpoint == 0
+        webhook_inbox.mark_done(1)
+        assert webhook_inbox.checkpoint == 2
+        webhook_inbox.mark_done(4)
+        assert webhook_inbox.checkpoint == 2
+
+    async def test__accepted_hooks__are_processed_by_workers__and_checkpointed(self, tmpdir):
+        processed = []
+
+        async def handler(entry: InboxEntry):
+            processed.append(entry.body)
+
+        webhook_inbox = WebhookInbox(WriteAheadLog(str(tmpdir), segment_size=1024), workers=2, checkpoint_interval=0.01)
+        webhook_inbox.set_handler(handler)
+        await webhook_inbox.start(mock())
+        await webhook_inbox.accept('push', 'first', b'{}')
+        await webhook_inbox.accept('push', 'second', b'[]')
+        await asyncio.sleep(0.05)
+        await webhook_inbox.stop(mock())
+
+        assert sorted(processed) == [b'[]', b'{}']
+        assert WriteAheadLog(str(tmpdir), segment_size=1024).read_checkpoint() == 2
+
+    async def test__unprocessed_hooks__are_replayed_on_start(self, tmpdir):
+        write_ahead_log = WriteAheadLog(str(tmpdir), segment_size=1024)
+        await write_ahead_log.open()
+        _, committed = write_ahead_log.append(InboxEntry.encode('release', 'lost', b'{"action": "published"}'))
+        await committed
+        await write_ahead_log.close()
+
+        replayed = []
+
+        async def handler(entry: InboxEntry):
+            replayed.append(entry.delivery_id)
+
+        webhook_inbox = WebhookInbox(WriteAheadLog(str(tmpdir), segment_size=1024), workers=1, checkpoint_interval=1)
+        webhook_inbox.set_handler(handler)
+        await webhook_inbox.start(mock())
+        await asyncio.sleep(0.01)
+        await webhook_inbox.stop(mock())
+
+        assert replayed == ['lost']
+        assert webhook_inbox.checkpoint == 1
+
+    async def test__failing_handler__does_not_block_checkpoint(self):
+        async def handler(entry: InboxEntry):
+            raise ValueError('boom')
+
+        webhook_inbox = WebhookInbox(mock(spec=WriteAheadLog, strict=True), workers=1, checkpoint_interval=1)
+        webhook_inbox.set_handler(handler)
+        await webhook_inbox.process(InboxEntry(1, 'push', 'delivery', b'{}'))
+        assert webhook_inbox.checkpoint == 1
+
+    async def test__entry_interrupted_by_stop__is_not_checkpointed__and_is_replayed_on_start(self, tmpdir):
+        started = asyncio.Event()
+        replayed = []
+
+        async def blocking_handler(entry: InboxEntry):
+            started.set()
+            await asyncio.sleep(10)
+
+        webhook_inbox = WebhookInbox(WriteAheadLog(str(tmpdir), segment_size=1024), workers=1, checkpoint_interval=1)
+        webhook_inbox.set_handler(blocking_handler)
+        await webhook_inbox.start(mock())
+        await webhook_inbox.accept('push', 'interrupted', b'{}')
+        await started.wait()
+        await webhook_inbox.stop(mock())
+        assert webhook_inbox.checkpoint == 0
+
+        async def handler(entry: InboxEntry):
+            replayed.append(entry.delivery_id)
+
+        webhook_inbox = WebhookInbox(WriteAheadLog(str(tmpdir), segment_size=1024), workers=1, checkpoint_interval=1)
+        webhook_inbox.set_handler(handler)
+        await webhook_inbox.start(mock())
+        await asyncio.sleep(0.01)
+        await webhook_inbox.stop(mock())
+
+        assert replayed == ['interrupted']
+        assert webhook_inbox.checkpoint == 1
+
+    async def test__entry_handed_over_by_handler__is_checkpointed_only_when_it_gets_processed(self):
+        processed = [asyncio.get_event_loop().create_future(), asyncio.get_event_loop().create_future()]
+
+        async def handler(entry: InboxEntry):
+            return processed[entry.sequence - 1]
+
+        webhook_inbox = WebhookInbox(mock(spec=WriteAheadLog, strict=True), workers=1, checkpoint_interval=1)
+        webhook_inbox.set_handler(handler)
+        await webhook_inbox.process(InboxEntry(1, 'push', 'first', b'{}'))
+        await webhook_inbox.process(InboxEntry(2, 'push', 'second', b'{}'))
+        assert webhook_inbox.checkpoint == 0
+
+        processed[1].cancel()
+        processed[0].set_result(None)
+        await asyncio.sleep(0)
+        assert webhook_inbox.checkpoint == 1
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from app.ingress.write_ahead_log import WriteAheadLog
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestWriteAheadLog:
+    async def test__appended_records__are_committed__and_replayed_after_reopen(self, tmpdir):
+        write_ahead_log = WriteAheadLog(str(tmpdir), segment_size=1024)
+        assert await write_ahead_log.open() == []
+
+        first_sequence, first_committed = write_ahead_log.append(b'first')
+        second_sequence, second_committed = write_ahead_log.append(b'second')
+        assert await first_committed == first_sequence == 1
+        assert await second_committed == second_sequence == 2
+        await write_ahead_log.close()
+
+        reopened = WriteAheadLog(str(tmpdir), segment_size=1024)
+        assert await reopened.open() == [(1, b'first'), (2, b'second')]
+        assert reopened.next_sequence == 3
+        await reopened.close()
+
+    async def test__checkpointed_records__are_not_replayed__and_their_segments_are_removed(self, tmpdir):
+        write_ahead_log = WriteAheadLog(str(tmpdir), segment_size=10)
+        await write_ahead_log.open()
+        for payload in [b'first', b'second', b'third']:
+            _, committed = write_ahead_log.append(payload)
+            await committed
+        write_ahead_log.write_checkpoint(2)
+        await write_ahead_log.close()
+
+        assert [first_sequence for first_sequence, _ in write_ahead_log.get_segments()] == [3, 4]
+        reopened = WriteAheadLog(str(tmpdir), segment_size=10)
+        assert await reopened.open() == [(3, b'third')]
+        assert reopened.next_sequence == 4
+        await reopened.close()
+
+    async def test__torn_record__is_ignored_on_replay(self, tmpdir):
+        write_ahead_log = WriteAheadLog(str(tmpdir), segment_size=1024)
+        await write_ahead_log.open()
+        _, committed = write_ahead_log.append(b'complete')
+        await committed
+        await write_ahead_log.close()
+        _, segment_path = write_ahead_log.get_segments()[0]
+        with open(segment_path, 'ab') as segment:
+            segment.write(WriteAheadLog.RECORD_HEADER.pack(2, 100, 0) + b'torn')
+
+        reopened = WriteAheadLog(str(tmpdir), segment_size=1024)
+        assert await reopened.open() == [(1, b'complete')]
+        assert reopened.next_sequence == 2
+        await reopened.close()
+
+    async def test__read_checkpoint__is_zero__when_checkpoint_file_does_not_exist(self, tmpdir):
+        write_ahead_log = WriteAheadLog(str(tmpdir), segment_size=1024)
+        assert write_ahead_log.read_checkpoint() == 0
+        write_ahead_log.write_checkpoint(12)
+        assert write_ahead_log.read_checkpoint() == 12
+        assert not os.path.exists(os.path.join(str(tmpdir), 'checkpoint.tmp'))
+
+    async def test__append__raises__when_log_is_not_open(self, tmpdir):
+        with pytest.raises(RuntimeError):
+            WriteAheadLog(str(tmpdir), segment_size=1024).append(b'payload')
@@ -0,0 +1,74 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from app.logs.log_pipeline import LogPipeline, NonBlockingQueueHandler
+from app.logs.rate_limit_filter import RateLimitFilter
+from app.logs.structured_formatters import log_fields
+from app.tracing.trace_log_filter import TraceLogFilter
+from app.tracing.tracer import Tracer
+
+pytestmark = pytest.mark.asyncio
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.addFilter(TraceLogFilter())
+        self.lines = []
+        self.threads = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+        self.threads.append(threading.current_thread())
+
+
+@pytest.fixture
+def recording_handler():
+    handlers, level = logging.root.handlers, logging.root.level
+    handler = RecordingHandler()
+    logging.root.handlers = [handler]
+    yield handler
+    logging.root.handlers = handlers
+    logging.root.setLevel(level)
+
+
+class TestLogPipeline:
+    async def test__records__are_written_as_json_on_writer_thread__with_trace_id_of_caller(self, recording_handler):
+        log_pipeline = LogPipeline(queue_size=10, json_format=True, level='DEBUG')
+        await log_pipeline.start(None)
+        with Tracer(sample_rate=1).span('request') as span:
+            logging.debug('Payload %s', {'key': 'value'}, extra=log_fields(job='job'))
+        await log_pipeline.stop(None)
+
+        assert recording_handler in logging.root.handlers
+        assert not any(isinstance(handler, NonBlockingQueueHandler) for handler in logging.root.handlers)
+        assert recording_handler.threads[0] is not threading.current_thread()
+        document = json.loads(recording_handler.lines[0])
+        assert document['message'] == "Payload {'key': 'value'}"
+        assert document['job'] == 'job'
+        assert document['trace_id'] == span.trace_id
+
+    async def test__rate_limited_records__are_not_queued(self, recording_handler):
+        log_pipeline = LogPipeline(queue_size=10, json_format=False, level='INFO',
+                                   rate_limit_filter=RateLimitFilter(rate=1, burst=2, clock=lambda: 0.0))
+        await log_pipeline.start(None)
+        for index in range(5):
+            logging.warning('Hook %s received', index)
+        logging.debug('not enabled')
+        await log_pipeline.stop(None)
+
+        assert [line.split('] ')[1] for line in recording_handler.lines] == ['Hook 0 received', 'Hook 1 received']
+
+    async def test__when_queue_is_full__records_are_dropped_without_blocking(self, recording_handler):
+        log_pipeline = LogPipeline(queue_size=1, json_format=False, level='INFO')
+        blocked = threading.Event()
+        recording_handler.emit = lambda record: blocked.wait(5)
+        await log_pipeline.start(None)
+        for index in range(50):
+            logging.warning('Hook %s received', index)
+        assert log_pipeline.dropped > 0
+        blocked.set()
+        await log_pipeline.stop(None)
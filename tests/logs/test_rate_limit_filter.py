@@ -0,0 +1,46 @@
+import logging
+
+import pytest
+
+from app.logs.rate_limit_filter import RateLimitFilter
+
+
+def get_record(level: int = logging.WARNING, line: int = 1) -> logging.LogRecord:
+    return logging.LogRecord('triggear', level, __file__, line, 'message', None, None)
+
+
+class TestRateLimitFilter:
+    def test__records_over_burst__are_suppressed__and_counted_on_next_passed_record(self):
+        now = [0.0]
+        rate_limit_filter = RateLimitFilter(rate=1, burst=2, clock=lambda: now[0])
+
+        assert [rate_limit_filter.filter(get_record()) for _ in range(4)] == [True, True, False, False]
+        now[0] = 1.0
+        record = get_record()
+        assert rate_limit_filter.filter(record)
+        assert record.suppressed == 2
+        assert not rate_limit_filter.filter(get_record())
+
+    def test__keys_are_call_sites__limited_independently(self):
+        rate_limit_filter = RateLimitFilter(rate=1, burst=1, clock=lambda: 0.0)
+
+        assert rate_limit_filter.filter(get_record(line=1))
+        assert rate_limit_filter.filter(get_record(line=2))
+        assert not rate_limit_filter.filter(get_record(line=1))
+
+    def test__errors__are_never_limited(self):
+        rate_limit_filter = RateLimitFilter(rate=1, burst=1, clock=lambda: 0.0)
+
+        assert all(rate_limit_filter.filter(get_record(logging.ERROR)) for _ in range(10))
+
+    def test__zero_rate__disables_limiting(self):
+        rate_limit_filter = RateLimitFilter(rate=0, burst=0)
+
+        assert all(rate_limit_filter.filter(get_record()) for _ in range(10))
+
+    @pytest.mark.parametrize('sample, passed', [(0.05, True), (0.5, False)])
+    def test__debug_records__are_sampled(self, sample: float, passed: bool):
+        rate_limit_filter = RateLimitFilter(rate=0, burst=0, debug_sample_rate=0.1, sampler=lambda: sample)
+
+        assert rate_limit_filter.filter(get_record(logging.DEBUG)) == passed
+        assert rate_limit_filter.filter(get_record(logging.INFO))
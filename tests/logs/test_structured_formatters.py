@@ -0,0 +1,45 @@
+import json
+import logging
+
+from app.logs.structured_formatters import TextFormatter, JsonFormatter, log_fields, log_items
+
+
+def get_record(message: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord('triggear', logging.WARNING, __file__, 1, message, args, None)
+    record.trace_id = 'trace'
+    record.__dict__.update(extra)
+    return record
+
+
+class TestStructuredFormatters:
+    def test__text_formatter__appends_fields__and_suppressed_count(self):
+        record = get_record('Register %s', 'REQ', suppressed=3, **log_fields(job='job', url=lambda: 'http://jenkins'))
+
+        assert TextFormatter().format(record).endswith('WARNING  [trace] Register REQ job=job url=http://jenkins (3 similar messages suppressed)')
+
+    def test__json_formatter__writes_message_and_fields_as_json(self):
+        record = get_record('Register %s', 'REQ', **log_items({'jobName': 'job', 'other': 'skipped'}, 'jobName', 'repository'))
+
+        document = json.loads(JsonFormatter().format(record))
+        assert document['level'] == 'WARNING'
+        assert document['logger'] == 'triggear'
+        assert document['trace_id'] == 'trace'
+        assert document['message'] == 'Register REQ'
+        assert document['jobName'] == 'job'
+        assert document['repository'] is None
+        assert 'other' not in document
+        assert 'suppressed' not in document
+
+    def test__lazy_fields__are_not_evaluated_until_formatting__and_their_errors_are_not_raised(self):
+        evaluated = []
+
+        def field():
+            evaluated.append(True)
+            raise ValueError('broken')
+
+        record = get_record('message', **log_fields(field=field))
+        assert evaluated == []
+
+        document = json.loads(JsonFormatter().format(record))
+        assert evaluated == [True]
+        assert document['field'] == "<could not evaluate: ValueError('broken')>"
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.metrics.api_budget import ApiBudget, api_budget_scope, record_upstream_call, CURRENT_API_BUDGET, retain_api_budget
+from app.metrics.triggear_metrics import ATTRIBUTED_UPSTREAM_CALLS, UPSTREAM_CALLS_PER_SCOPE
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestApiBudget:
+    async def test__calls_in_scope__should_be_attributed_to_it__and_observed_per_scope(self):
+        calls_per_scope = UPSTREAM_CALLS_PER_SCOPE.labels(ApiBudget.HOOK, 'push_budget', 'github')
+        observed, observed_sum = calls_per_scope.count, calls_per_scope.sum
+
+        with api_budget_scope(ApiBudget.HOOK, 'push of org/budget', event='push_budget', repository='org/budget') as api_budget:
+            record_upstream_call('github')
+            record_upstream_call('github')
+            record_upstream_call('jenkins')
+            assert ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.HOOK, 'push_budget', 'org/budget', 'github').value == 0
+
+        assert CURRENT_API_BUDGET.get() is None
+        assert dict(api_budget.calls) == {'github': 2, 'jenkins': 1}
+        assert api_budget.get_summary() == 'github=2, jenkins=1'
+        assert ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.HOOK, 'push_budget', 'org/budget', 'github').value == 2
+        assert ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.HOOK, 'push_budget', 'org/budget', 'jenkins').value == 1
+        assert calls_per_scope.count == observed + 1
+        assert calls_per_scope.sum == observed_sum + 2
+
+    async def test__calls_without_scope__should_be_attributed_to_background(self):
+        background = ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.BACKGROUND, '', '', 'background_upstream')
+
+        record_upstream_call('background_upstream')
+
+        assert background.value == 1
+
+    async def test__nested_scope__should_inherit_labels__and_count_calls_for_parent(self):
+        with api_budget_scope(ApiBudget.HOOK, 'tagged of org/nested', event='tagged_nested', repository='org/nested') as hook:
+            with api_budget_scope(ApiBudget.TRIGGER, 'url:job') as trigger:
+                record_upstream_call('jenkins')
+            record_upstream_call('github')
+
+        assert (trigger.event, trigger.repository, trigger.parent) == ('tagged_nested', 'org/nested', hook)
+        assert dict(trigger.calls) == {'jenkins': 1}
+        assert dict(hook.calls) == {'jenkins': 1, 'github': 1}
+        assert ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.HOOK, 'tagged_nested', 'org/nested', 'jenkins').value == 1
+        assert ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.TRIGGER, 'tagged_nested', 'org/nested', 'jenkins').value == 0
+        assert UPSTREAM_CALLS_PER_SCOPE.labels(ApiBudget.TRIGGER, 'tagged_nested', 'jenkins').count == 1
+
+    async def test__task_outliving_scope__should_attribute_its_calls_to_finished_scope_as_they_happen(self):
+        called = asyncio.Event()
+        release = asyncio.Event()
+
+        async def watch_build():
+            record_upstream_call('jenkins')
+            called.set()
+            await release.wait()
+            record_upstream_call('jenkins')
+
+        with api_budget_scope(ApiBudget.HOOK, 'release of org/late', event='release_late', repository='org/late') as api_budget:
+            task = asyncio.ensure_future(watch_build())
+            await called.wait()
+
+        attributed = ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.HOOK, 'release_late', 'org/late', 'jenkins')
+        assert attributed.value == 1
+        release.set()
+        await task
+        assert attributed.value == 2
+        assert api_budget.calls['jenkins'] == 2
+
+    async def test__retained_task__should_keep_scope_open__until_it_finishes(self):
+        calls_per_scope = UPSTREAM_CALLS_PER_SCOPE.labels(ApiBudget.HOOK, 'push_retained', 'jenkins')
+        observed = calls_per_scope.count
+        release = asyncio.Event()
+
+        async def debounced_trigger():
+            await release.wait()
+            with api_budget_scope(ApiBudget.TRIGGER, 'url:job'):
+                record_upstream_call('jenkins')
+
+        with api_budget_scope(ApiBudget.HOOK, 'push of org/retained', event='push_retained', repository='org/retained') as api_budget:
+            task = asyncio.ensure_future(debounced_trigger())
+            retain_api_budget(task)
+
+        assert not api_budget.finished
+        assert api_budget.holders == 1
+        release.set()
+        await task
+        await asyncio.sleep(0)
+
+        assert api_budget.finished
+        assert api_budget.holders == 0
+        assert dict(api_budget.calls) == {'jenkins': 1}
+        assert calls_per_scope.count == observed + 1
+        assert ATTRIBUTED_UPSTREAM_CALLS.labels(ApiBudget.HOOK, 'push_retained', 'org/retained', 'jenkins').value == 1
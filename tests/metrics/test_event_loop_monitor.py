@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+from mockito import mock
+import aiohttp.web
+
+from app.metrics.event_loop_monitor import EventLoopMonitor
+from app.metrics.triggear_metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_BLOCKED, EVENT_LOOP_TASKS
+
+pytestmark = pytest.mark.asyncio
+
+
+def block_event_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.mark.usefixtures('unstub')
+class TestEventLoopMonitor:
+    async def test__blocking_callback__should_be_observed_as_lag__and_reported_with_its_stack(self):
+        app = mock(spec=aiohttp.web.Application, strict=True)
+        lag_count, blocked = EVENT_LOOP_LAG_SECONDS.count, EVENT_LOOP_BLOCKED.value
+        event_loop_monitor = EventLoopMonitor(interval=0.01, slow_callback_threshold=0.05)
+
+        await event_loop_monitor.start(app)
+        await asyncio.sleep(0.05)
+        block_event_loop(0.3)
+        await asyncio.sleep(0.05)
+        await event_loop_monitor.stop(app)
+
+        assert EVENT_LOOP_LAG_SECONDS.count > lag_count
+        assert EVENT_LOOP_LAG_SECONDS.sum >= 0.2
+        assert EVENT_LOOP_TASKS.get() >= 1
+        assert EVENT_LOOP_BLOCKED.value == blocked + 1
+        assert len(event_loop_monitor.reports) == 1
+        assert 'block_event_loop' in event_loop_monitor.reports[0][2]
+
+    async def test__stall__should_be_reported_once__and_not_before_threshold(self):
+        event_loop_monitor = EventLoopMonitor(interval=0.1, slow_callback_threshold=0.5)
+        now = time.monotonic()
+
+        assert event_loop_monitor.check(now + 0.5) is None
+        assert event_loop_monitor.check(now + 0.7) is not None
+        assert event_loop_monitor.check(now + 1.5) is None
+        assert len(event_loop_monitor.reports) == 1
+
+    async def test__zero_interval__should_disable_monitor(self):
+        app = mock(spec=aiohttp.web.Application, strict=True)
+        event_loop_monitor = EventLoopMonitor(interval=0, slow_callback_threshold=0.5)
+
+        await event_loop_monitor.start(app)
+        await event_loop_monitor.stop(app)
+
+        assert len(event_loop_monitor.reports) == 0
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from app.metrics.metrics_registry import MetricsRegistry
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMetricsRegistry:
+    def test__counter__should_be_rendered_with_help_and_type(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('hooks_total', 'Hooks received')
+        counter.inc()
+        counter.inc(2)
+
+        assert registry.render() == '# HELP hooks_total Hooks received\n' \
+                                    '# TYPE hooks_total counter\n' \
+                                    'hooks_total 3.0\n'
+
+    def test__labelled_children__should_be_reused__and_rendered_with_escaped_values(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('hooks_total', 'Hooks received', ['event', 'reason'])
+
+        assert counter.labels('push', 'dup"licate') is counter.labels('push', 'dup"licate')
+        counter.labels('push', 'dup"licate').inc()
+
+        assert 'hooks_total{event="push",reason="dup\\"licate"} 1.0' in registry.render()
+
+    def test__labelled_metric_without_children__should_render_only_header(self):
+        registry = MetricsRegistry()
+        registry.counter('hooks_total', 'Hooks received', ['event'])
+
+        assert registry.render() == '# HELP hooks_total Hooks received\n' \
+                                    '# TYPE hooks_total counter\n'
+
+    def test__gauge__should_prefer_function_over_set_value(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge('queued', 'Queued hooks')
+        gauge.inc(5)
+        gauge.dec(2)
+        assert gauge.get() == 3
+
+        gauge.set_function(lambda: 7)
+        assert gauge.get() == 7
+        assert 'queued 7\n' in registry.render()
+
+    def test__histogram__should_render_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.render() == '# HELP latency_seconds Latency\n' \
+                                    '# TYPE latency_seconds histogram\n' \
+                                    'latency_seconds_bucket{le="0.1"} 2\n' \
+                                    'latency_seconds_bucket{le="1"} 3\n' \
+                                    'latency_seconds_bucket{le="+Inf"} 4\n' \
+                                    'latency_seconds_sum 5.65\n' \
+                                    'latency_seconds_count 4\n'
+
+    def test__counter__should_not_lose_increments__from_concurrent_threads(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('lines_total', 'Log lines')
+
+        threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(10000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value == 40000
+
+    def test__registering_metric_twice__should_fail(self):
+        registry = MetricsRegistry()
+        registry.gauge('queued', 'Queued hooks')
+
+        with pytest.raises(ValueError):
+            registry.counter('queued', 'Queued hooks')
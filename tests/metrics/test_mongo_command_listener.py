@@ -0,0 +1,25 @@
+import pytest
+from mockito import mock
+from pymongo import monitoring
+
+from app.metrics.mongo_command_listener import MongoCommandListener
+from app.metrics.triggear_metrics import MONGO_COMMAND_SECONDS, MONGO_COMMAND_FAILURES
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMongoCommandListener:
+    def test__succeeded_command__should_be_observed_in_seconds(self):
+        event = mock({'command_name': 'test_find', 'duration_micros': 250000}, spec=monitoring.CommandSucceededEvent, strict=True)
+
+        MongoCommandListener().succeeded(event)
+
+        assert MONGO_COMMAND_SECONDS.labels('test_find').count == 1
+        assert MONGO_COMMAND_SECONDS.labels('test_find').sum == 0.25
+
+    def test__failed_command__should_be_observed__and_counted_as_failure(self):
+        event = mock({'command_name': 'test_insert', 'duration_micros': 1000}, spec=monitoring.CommandFailedEvent, strict=True)
+
+        MongoCommandListener().failed(event)
+
+        assert MONGO_COMMAND_SECONDS.labels('test_insert').count == 1
+        assert MONGO_COMMAND_FAILURES.labels('test_insert').value == 1
@@ -0,0 +1,45 @@
+import pytest
+import aiohttp.web_request
+import aiohttp.web
+from mockito import mock
+
+from app.metrics.api_budget import ApiBudget, CURRENT_API_BUDGET
+from app.middlewares.api_budget_middleware import api_budget
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestApiBudgetMiddleware:
+    async def test__pipeline_request__should_be_handled_in_its_budget_scope(self):
+        request: aiohttp.web_request.Request = mock({'path': '/register'}, spec=aiohttp.web_request.Request, strict=True)
+        response: aiohttp.web.Response = mock(spec=aiohttp.web.Response, strict=True)
+        budgets = []
+
+        async def handler(handled_request):
+            assert handled_request == request
+            budgets.append(CURRENT_API_BUDGET.get())
+            return response
+
+        assert response == await api_budget(request, handler)
+        assert (budgets[0].source, budgets[0].event, budgets[0].repository) == (ApiBudget.PIPELINE, 'register', '')
+        assert budgets[0].finished
+        assert CURRENT_API_BUDGET.get() is None
+
+    @pytest.mark.parametrize("path", [
+        '/github',
+        '/health',
+        '/metrics',
+        '/debug/inflight'
+    ])
+    async def test__non_pipeline_request__should_be_handled_without_budget_scope(self, path):
+        request: aiohttp.web_request.Request = mock({'path': path}, spec=aiohttp.web_request.Request, strict=True)
+        response: aiohttp.web.Response = mock(spec=aiohttp.web.Response, strict=True)
+        budgets = []
+
+        async def handler(handled_request):
+            budgets.append(CURRENT_API_BUDGET.get())
+            return response
+
+        assert response == await api_budget(request, handler)
+        assert budgets == [None]
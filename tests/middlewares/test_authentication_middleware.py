@@ -64,6 +64,36 @@ class TestAuthenticationMiddleware:
         actual_response: aiohttp.web.Response = await AuthenticationMiddleware(triggear_config).authentication(request, github_controller.handle_hook)
         assert response == actual_response
 
+    async def test__github__when_valid_sha256_signature_is_sent__should_return_value_from_handler(self):
+        triggear_config: TriggearConfig = mock({'triggear_token': 'api_token'}, spec=TriggearConfig, strict=True)
+        github_controller: GithubController = mock(spec=GithubController, strict=True)
+
+        request = mock({'path': '/github', 'headers': {'X-Hub-Signature': 'sha1=invalid',
+                                                     'X-Hub-Signature-256': 'sha256=3eee347767423b4368cfe76cd543815398b1712a90c3e1563317ddde3a3fdfe4'}},
+                       spec=aiohttp.web_request.Request, strict=True)
+        response = mock(spec=aiohttp.web.Response, strict=True)
+
+        when(request).read().thenReturn(async_value(b"valid_data"))
+        expect(github_controller).handle_hook(request).thenReturn(async_value(response))
+
+        actual_response: aiohttp.web.Response = await AuthenticationMiddleware(triggear_config).authentication(request, github_controller.handle_hook)
+        assert response == actual_response
+
+    async def test__github__when_body_exceeds_offload_threshold__signature_should_be_verified_in_executor(self):
+        triggear_config: TriggearConfig = mock({'triggear_token': 'api_token'}, spec=TriggearConfig, strict=True)
+        github_controller: GithubController = mock(spec=GithubController, strict=True)
+
+        request = mock({'path': '/github', 'headers': {'X-Hub-Signature-256': 'sha256=invalid'}},
+                       spec=aiohttp.web_request.Request, strict=True)
+        authentication_middleware = AuthenticationMiddleware(triggear_config, offload_threshold=10)
+
+        when(request).read().thenReturn(async_value(b"valid_data"))
+        expect(authentication_middleware).is_signature_valid(b"valid_data", 'sha256', 'invalid').thenReturn(False)
+        expect(github_controller, times=0).handle_hook(request)
+
+        response: aiohttp.web.Response = await authentication_middleware.authentication(request, github_controller.handle_hook)
+        assert response.status == 401
+
     @pytest.mark.parametrize("endpoint", [
         '/register',
         '/status',
@@ -72,7 +102,11 @@ class TestAuthenticationMiddleware:
         '/deregister',
         '/clear',
         '/deployment',
-        '/deployment_status'
+        '/deployment_status',
+        '/metrics',
+        '/debug/profile',
+        '/debug/memory',
+        '/debug/inflight'
     ])
     async def test__token_authorized_endpoints__when_invalid_token_is_sent__should_return_401(self, endpoint: str):
         triggear_config: TriggearConfig = mock({'triggear_token': 'api_token'}, spec=TriggearConfig, strict=True)
@@ -95,7 +129,11 @@ class TestAuthenticationMiddleware:
         '/deregister',
         '/clear',
         '/deployment',
-        '/deployment_status'
+        '/deployment_status',
+        '/metrics',
+        '/debug/profile',
+        '/debug/memory',
+        '/debug/inflight'
     ])
     async def test__token_authorized_endpoints__when_valid_token_is_sent__should_return_handler_response(self, endpoint: str):
         triggear_config: TriggearConfig = mock({'triggear_token': 'api_token'}, spec=TriggearConfig, strict=True)
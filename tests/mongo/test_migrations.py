@@ -0,0 +1,53 @@
+import pytest
+from mockito import mock, expect, when
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+
+from app.mongo.migrations import MigrationRunner, Migration
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMigrationRunner:
+    async def test__run__applies_only_migrations_newer_than_stored_version__in_order(self):
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        schema: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        applied = []
+
+        async def apply(version):
+            applied.append(version)
+
+        migrations = [Migration(3, 'third', lambda m: apply(3)),
+                      Migration(1, 'first', lambda m: apply(1)),
+                      Migration(2, 'second', lambda m: apply(2))]
+        runner = MigrationRunner(mongo, migrations)
+
+        when(runner).get_schema_collection().thenReturn(schema)
+        expect(schema).find_one({'_id': 'registrations'}).thenReturn(async_value({'_id': 'registrations', 'version': 1}))
+        expect(schema).update_one({'_id': 'registrations'}, {'$set': {'version': 2}}, upsert=True).thenReturn(async_value(None))
+        expect(schema).update_one({'_id': 'registrations'}, {'$set': {'version': 3}}, upsert=True).thenReturn(async_value(None))
+
+        assert await runner.run() == 3
+        assert applied == [2, 3]
+
+    async def test__run__does_nothing__when_schema_is_up_to_date(self):
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        schema: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        runner = MigrationRunner(mongo, [Migration(1, 'first', lambda m: async_value(None))])
+
+        when(runner).get_schema_collection().thenReturn(schema)
+        expect(schema).find_one({'_id': 'registrations'}).thenReturn(async_value({'_id': 'registrations', 'version': 1}))
+        expect(schema, times=0).update_one(...)
+
+        assert await runner.run() == 1
+
+    async def test__get_current_version__is_zero__without_schema_document(self):
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        schema: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        runner = MigrationRunner(mongo, [])
+
+        when(runner).get_schema_collection().thenReturn(schema)
+        expect(schema).find_one({'_id': 'registrations'}).thenReturn(async_value(None))
+
+        assert await runner.get_current_version() == 0
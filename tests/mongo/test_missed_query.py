@@ -0,0 +1,41 @@
+import pytest
+from bson import ObjectId
+
+from app.enums.event_types import EventType
+from app.mongo.missed_query import MissedQuery
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMissedQuery:
+    async def test__builder_method__uses_defaults(self):
+        result = MissedQuery.from_missing_request_data('push', {})
+        assert result.event_type == 'push'
+        assert result.threshold == 1
+        assert result.limit == 1000
+        assert result.after is None
+
+    async def test__builder_method__reads_query_params(self):
+        result = MissedQuery.from_missing_request_data('all', {'threshold': '3', 'limit': '50', 'after': 'push:abc'})
+        assert result.event_type == 'all'
+        assert result.threshold == 3
+        assert result.limit == 50
+        assert result.after == 'push:abc'
+
+    async def test__get_event_types__for_single_event_type(self):
+        assert MissedQuery('push', 1, 10).get_event_types() == [EventType.PUSH]
+
+    async def test__get_event_types__for_all_starts_from_cursor_collection(self):
+        after = MissedQuery.get_cursor(EventType.PR_OPENED, ObjectId())
+        assert MissedQuery('all', 1, 10).get_event_types() == EventType.get_allowed_registration_event_types()
+        assert MissedQuery('all', 1, 10, after).get_event_types() == [EventType.PR_OPENED, EventType.PUSH, EventType.RELEASE]
+
+    async def test__get_event_types__is_empty__when_cursor_points_to_other_collection(self):
+        assert MissedQuery('push', 1, 10, MissedQuery.get_cursor(EventType.TAGGED, ObjectId())).get_event_types() == []
+
+    async def test__get_missed_query__filters_by_id_only_in_cursor_collection(self):
+        document_id = ObjectId()
+        missed_query = MissedQuery('all', 2, 10, MissedQuery.get_cursor(EventType.PUSH, document_id))
+        assert missed_query.get_missed_query(EventType.PUSH) == {'missed_times': {'$gt': 0, '$gte': 2}, '_id': {'$gt': document_id}}
+        assert missed_query.get_missed_query(EventType.RELEASE) == {'missed_times': {'$gt': 0, '$gte': 2}}
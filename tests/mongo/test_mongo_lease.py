@@ -0,0 +1,52 @@
+import pytest
+from mockito import mock, expect, when
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+from app.mongo.mongo_lease import MongoLease
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+async def raise_error(error: Exception):
+    raise error
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMongoLease:
+    async def test__acquire__succeeds__when_lease_is_free_expired_or_ours(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        lease = MongoLease(mock(spec=AsyncIOMotorClient, strict=True), name='lease', ttl=30, owner='me')
+
+        when(lease).get_leases().thenReturn(collection)
+        expect(collection).find_one_and_update(any, any, upsert=True).thenReturn(async_value(None))
+
+        assert await lease.acquire()
+
+    async def test__acquire__fails__when_lease_is_held_by_someone_else(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        lease = MongoLease(mock(spec=AsyncIOMotorClient, strict=True), name='lease', ttl=30, owner='me')
+
+        when(lease).get_leases().thenReturn(collection)
+        expect(collection).find_one_and_update(any, any, upsert=True).thenReturn(raise_error(DuplicateKeyError('held')))
+
+        assert not await lease.acquire()
+
+    async def test__acquire__fails__when_mongo_is_unavailable(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        lease = MongoLease(mock(spec=AsyncIOMotorClient, strict=True), name='lease', ttl=30, owner='me')
+
+        when(lease).get_leases().thenReturn(collection)
+        expect(collection).find_one_and_update(any, any, upsert=True).thenReturn(raise_error(ServerSelectionTimeoutError('down')))
+
+        assert not await lease.acquire()
+
+    async def test__release__removes_only_own_lease(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        lease = MongoLease(mock(spec=AsyncIOMotorClient, strict=True), name='lease', ttl=30, owner='me')
+
+        when(lease).get_leases().thenReturn(collection)
+        expect(collection).delete_one({'_id': 'lease', 'owner': 'me'}).thenReturn(async_value(None))
+
+        await lease.release()
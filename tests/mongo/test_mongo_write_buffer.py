@@ -0,0 +1,166 @@
+import asyncio
+from typing import Tuple
+
+import pytest
+from mockito import mock, expect, captor, when
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.mongo.mongo_write_buffer import MongoWriteBuffer
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMongoWriteBuffer:
+    @staticmethod
+    def get_mongo(*collections: Tuple[str, str, AsyncIOMotorCollection]) -> AsyncIOMotorClient:
+        mongo: AsyncIOMotorClient = mock(spec=AsyncIOMotorClient, strict=True)
+        for database_name, collection_name, collection in collections:
+            database: AsyncIOMotorDatabase = mock(spec=AsyncIOMotorDatabase, strict=True)
+            when(mongo).get_database(database_name).thenReturn(database)
+            when(database).get_collection(collection_name).thenReturn(collection)
+        return mongo
+
+    async def test__increments_with_same_query__are_aggregated_into_one_operation(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('registered', 'push', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5)
+
+        write_buffer.increment('registered', 'push', {'repository': 'repo', 'job': 'job'}, 'missed_times')
+        write_buffer.increment('registered', 'push', {'job': 'job', 'repository': 'repo'}, 'missed_times')
+        write_buffer.increment('registered', 'push', {'repository': 'repo', 'job': 'other'}, 'missed_times')
+        assert write_buffer.pending_increments == 2
+
+        operations_captor = captor()
+        expect(collection).bulk_write(operations_captor, ordered=False).thenReturn(async_value(None))
+        await write_buffer.flush()
+
+        assert operations_captor.value == [UpdateOne({'repository': 'repo', 'job': 'job'}, {'$inc': {'missed_times': 2}}),
+                                           UpdateOne({'repository': 'repo', 'job': 'other'}, {'$inc': {'missed_times': 1}})]
+        assert write_buffer.pending_increments == 0
+
+    async def test__inserts__are_flushed_with_insert_many(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('deregistered', 'log', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5)
+
+        write_buffer.insert('deregistered', 'log', {'job': 'first'})
+        write_buffer.insert('deregistered', 'log', {'job': 'second'})
+        assert write_buffer.pending_inserts == 2
+
+        expect(collection).insert_many([{'job': 'first'}, {'job': 'second'}], ordered=False).thenReturn(async_value(None))
+        await write_buffer.flush()
+
+        assert write_buffer.pending_inserts == 0
+
+    async def test__when_max_size_is_reached__flush_is_scheduled(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('deregistered', 'log', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=2, flush_interval=5)
+
+        expect(collection, times=1).insert_many([{'job': 'first'}, {'job': 'second'}], ordered=False).thenReturn(async_value(None))
+        write_buffer.insert('deregistered', 'log', {'job': 'first'})
+        write_buffer.insert('deregistered', 'log', {'job': 'second'})
+        await asyncio.sleep(0)
+
+        assert write_buffer.pending_inserts == 0
+
+    async def test__failed_flush__does_not_stop_other_collections_from_flushing(self):
+        failing_collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('registered', 'push', failing_collection), ('deregistered', 'log', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5)
+
+        write_buffer.increment('registered', 'push', {'job': 'job'}, 'missed_times')
+        write_buffer.insert('deregistered', 'log', {'job': 'job'})
+
+        expect(failing_collection).bulk_write(any, ordered=False).thenRaise(ConnectionError())
+        expect(collection).insert_many([{'job': 'job'}], ordered=False).thenReturn(async_value(None))
+        await write_buffer.flush()
+
+        assert write_buffer.pending_increments == 1
+        assert write_buffer.pending_inserts == 0
+
+    async def test__stop__flushes_pending_writes(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('deregistered', 'log', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5)
+        await write_buffer.start(mock())
+
+        write_buffer.insert('deregistered', 'log', {'job': 'job'})
+        expect(collection).insert_many([{'job': 'job'}], ordered=False).thenReturn(async_value(None))
+        await write_buffer.stop(mock())
+
+    async def test__failed_batch__is_put_back__and_merged_with_newer_writes(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        log_collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('registered', 'push', collection), ('deregistered', 'log', log_collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5)
+
+        write_buffer.increment('registered', 'push', {'job': 'job'}, 'missed_times')
+        write_buffer.insert('deregistered', 'log', {'job': 'first'})
+        when(collection).bulk_write(any, ordered=False).thenRaise(ConnectionError())
+        when(log_collection).insert_many(any, ordered=False).thenRaise(ConnectionError())
+        await write_buffer.flush()
+
+        write_buffer.increment('registered', 'push', {'job': 'job'}, 'missed_times')
+        write_buffer.insert('deregistered', 'log', {'job': 'second'})
+        operations_captor = captor()
+        expect(collection).bulk_write(operations_captor, ordered=False).thenReturn(async_value(None))
+        expect(log_collection).insert_many([{'job': 'first'}, {'job': 'second'}], ordered=False).thenReturn(async_value(None))
+        await write_buffer.flush()
+
+        assert operations_captor.value == [UpdateOne({'job': 'job'}, {'$inc': {'missed_times': 2}})]
+        assert (write_buffer.pending_increments, write_buffer.pending_inserts) == (0, 0)
+
+    async def test__flushed_increments__are_reported__only_when_they_reach_mongo(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('registered', 'push', collection))
+        flushed = []
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5, on_increments_flushed=lambda: flushed.append('flushed'))
+
+        write_buffer.increment('registered', 'push', {'job': 'job'}, 'missed_times')
+        when(collection).bulk_write(any, ordered=False).thenRaise(ConnectionError()).thenReturn(async_value(None))
+        await write_buffer.flush()
+        assert flushed == []
+
+        await write_buffer.flush()
+        assert flushed == ['flushed']
+
+        await write_buffer.flush()
+        assert flushed == ['flushed']
+
+    async def test__batch_partially_rejected_by_mongo__is_not_retried(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('deregistered', 'log', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=5)
+
+        write_buffer.insert('deregistered', 'log', {'_id': 'duplicate'})
+        expect(collection).insert_many(any, ordered=False).thenRaise(BulkWriteError({'writeErrors': [{'index': 0, 'code': 11000}]}))
+        await write_buffer.flush()
+
+        assert write_buffer.pending_inserts == 0
+
+    async def test__stop__waits_for_flush_in_progress__instead_of_cancelling_it(self):
+        collection: AsyncIOMotorCollection = mock(spec=AsyncIOMotorCollection, strict=True)
+        mongo = self.get_mongo(('deregistered', 'log', collection))
+        write_buffer = MongoWriteBuffer(mongo, max_size=100, flush_interval=0.01)
+        flushing = asyncio.Event()
+        written = []
+
+        async def slow_insert_many(documents):
+            flushing.set()
+            await asyncio.sleep(0.05)
+            written.extend(documents)
+
+        when(collection).insert_many(any, ordered=False).thenAnswer(lambda documents, ordered: slow_insert_many(documents))
+        await write_buffer.start(mock())
+        write_buffer.insert('deregistered', 'log', {'job': 'first'})
+        await flushing.wait()
+        write_buffer.insert('deregistered', 'log', {'job': 'second'})
+        await write_buffer.stop(mock())
+
+        assert written == [{'job': 'first'}, {'job': 'second'}]
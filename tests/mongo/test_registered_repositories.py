@@ -0,0 +1,124 @@
+import time
+
+import pytest
+from mockito import mock, expect, when
+
+from app.clients.mongo_client import MongoClient
+from app.enums.event_types import EventType
+from app.mongo.registered_repositories import RegisteredRepositories
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+async def raise_error(error: Exception):
+    raise error
+
+
+@pytest.mark.usefixtures('unstub')
+class TestRegisteredRepositories:
+    async def test__before_first_refresh__every_repository_is_registered(self):
+        registered_repositories = RegisteredRepositories(mock(spec=MongoClient, strict=True), refresh_interval=60)
+
+        assert registered_repositories.is_registered([EventType.PUSH], ['org/any'])
+
+    async def test__refresh__loads_repositories_of_every_registration_event_type(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60)
+
+        for event_type in [EventType.PR_LABELED, EventType.TAGGED, EventType.PR_OPENED, EventType.RELEASE]:
+            expect(mongo_client).get_registered_repositories(event_type).thenReturn(async_value(set()))
+        expect(mongo_client).get_registered_repositories(EventType.PUSH).thenReturn(async_value({'org/repo'}))
+
+        await registered_repositories.refresh()
+
+        assert registered_repositories.is_registered([EventType.PUSH], ['org/other', 'org/repo'])
+        assert not registered_repositories.is_registered([EventType.PUSH], ['org/other'])
+        assert not registered_repositories.is_registered([EventType.PR_OPENED, EventType.PR_LABELED], ['org/repo'])
+
+    async def test__refresh__keeps_previous_repositories__when_mongo_fails(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60)
+        registered_repositories.add(EventType.PUSH, 'org/repo')
+
+        when(mongo_client).get_registered_repositories(...).thenAnswer(lambda event_type: raise_error(TimeoutError()))
+
+        await registered_repositories.refresh()
+
+        assert registered_repositories.is_registered([EventType.PUSH], ['org/repo'])
+
+    async def test__added_repository__is_registered_immediately(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60)
+        expect(mongo_client).get_registered_repositories(EventType.PUSH).thenReturn(async_value(set()))
+        await registered_repositories.refresh_event_type(EventType.PUSH)
+
+        registered_repositories.add(EventType.PUSH, 'org/new')
+
+        assert registered_repositories.is_registered([EventType.PUSH], ['org/new'])
+        assert registered_repositories.get_counts() == {'push': 1}
+
+    async def test__refresh_event_type__replaces_repositories_of_that_event_type(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60)
+        registered_repositories.add(EventType.PUSH, 'org/deregistered')
+        registered_repositories.add(EventType.RELEASE, 'org/released')
+
+        expect(mongo_client).get_registered_repositories(EventType.PUSH).thenReturn(async_value({'org/kept'}))
+
+        await registered_repositories.refresh_event_type(EventType.PUSH)
+
+        assert not registered_repositories.is_registered([EventType.PUSH], ['org/deregistered'])
+        assert registered_repositories.is_registered([EventType.PUSH], ['org/kept'])
+        assert registered_repositories.is_registered([EventType.RELEASE], ['org/released'])
+
+    async def test__check__asks_mongo_before_dropping__and_remembers_repositories_registered_elsewhere(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60)
+        for event_type in EventType.get_allowed_registration_event_types():
+            when(mongo_client).get_registered_repositories(event_type).thenReturn(async_value(set()))
+        await registered_repositories.refresh()
+
+        expect(mongo_client, times=1).get_registered_repositories_among(EventType.PUSH, ['org/new']).thenReturn(async_value({'org/new'}))
+        assert await registered_repositories.check([EventType.PUSH], ['org/new'])
+        assert await registered_repositories.check([EventType.PUSH], ['org/new'])
+
+        expect(mongo_client).get_registered_repositories_among(EventType.PUSH, ['org/other']).thenReturn(async_value(set()))
+        assert not await registered_repositories.check([EventType.PUSH], ['org/other'])
+        assert registered_repositories.rechecked == 2
+
+    async def test__check__asks_mongo_once__for_consecutive_hooks_of_same_unknown_repository(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60, unknown_ttl=10)
+        expect(mongo_client).get_registered_repositories(EventType.PUSH).thenReturn(async_value(set()))
+        await registered_repositories.refresh_event_type(EventType.PUSH)
+
+        expect(mongo_client, times=1).get_registered_repositories_among(EventType.PUSH, ['org/unknown']).thenReturn(async_value(set()))
+
+        assert not await registered_repositories.check([EventType.PUSH], ['org/unknown'])
+        assert not await registered_repositories.check([EventType.PUSH], ['org/unknown'])
+        assert registered_repositories.rechecked == 1
+
+    async def test__check__asks_mongo_again__when_unknown_repository_expires(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60, unknown_ttl=10)
+        expect(mongo_client).get_registered_repositories(EventType.PUSH).thenReturn(async_value(set()))
+        await registered_repositories.refresh_event_type(EventType.PUSH)
+
+        expect(mongo_client, times=2).get_registered_repositories_among(EventType.PUSH, ['org/unknown'])\
+            .thenReturn(async_value(set()))\
+            .thenReturn(async_value({'org/unknown'}))
+        when(time).monotonic().thenReturn(100).thenReturn(111)
+
+        assert not await registered_repositories.check([EventType.PUSH], ['org/unknown'])
+        assert await registered_repositories.check([EventType.PUSH], ['org/unknown'])
+
+    async def test__check__lets_hook_through__when_mongo_fails(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        registered_repositories = RegisteredRepositories(mongo_client, refresh_interval=60)
+        expect(mongo_client).get_registered_repositories(EventType.PUSH).thenReturn(async_value(set()))
+        await registered_repositories.refresh_event_type(EventType.PUSH)
+
+        when(mongo_client).get_registered_repositories_among(EventType.PUSH, ['org/repo']).thenAnswer(lambda *args: raise_error(TimeoutError()))
+
+        assert await registered_repositories.check([EventType.PUSH], ['org/repo'])
@@ -0,0 +1,30 @@
+import pytest
+
+from app.mongo.registration_indexes import RegistrationIndexes
+
+
+class TestRegistrationIndexes:
+    def test__get_index_models__names_every_index(self):
+        assert [model.document['name'] for model in RegistrationIndexes.get_index_models()] == \
+               ['repository_labels', 'jenkins_url_repository_job', 'job_jenkins_url', 'missed_times_partial']
+
+    def test__missed_times_index__is_partial(self):
+        missed_times_index = RegistrationIndexes.get_index_models()[-1].document
+        assert missed_times_index['partialFilterExpression'] == {'missed_times': {'$gt': 0}}
+
+    def test__get_query_shapes__covers_every_query_kind_with_unique_names(self):
+        names = [name for name, _, _ in RegistrationIndexes.get_query_shapes()]
+        assert len(names) == len(set(names))
+        assert 'MissedQuery' in names
+        assert 'LabeledHookDetails' in names
+        assert 'RegisteredRepositoriesAmong' in names
+        assert 'MissedCounters' not in names
+
+    @pytest.mark.parametrize("explain, expected", [
+        ({'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}, True),
+        ({'queryPlanner': {'winningPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}}}, True),
+        ({'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}}, False),
+        ({}, False)
+    ])
+    def test__uses_collection_scan(self, explain, expected):
+        assert RegistrationIndexes.uses_collection_scan(explain) == expected
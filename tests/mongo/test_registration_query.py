@@ -17,7 +17,8 @@ class TestRegistrationQuery:
             'repository': 'repo',
             'requested_params': ['rp'],
             'file_restrictions': ['fr'],
-            'change_restrictions': ['cr']
+            'change_restrictions': ['cr'],
+            'missed_times': 0
         }
         registration_query: RegistrationQuery = RegistrationQuery.from_registration_request_data(data)
         assert registration_query.file_restrictions == ['fr']
@@ -44,5 +45,6 @@ class TestRegistrationQuery:
             'repository': 'repo',
             'requested_params': ['rp'],
             'file_restrictions': ['fr'],
-            'change_restrictions': ['cr']
+            'change_restrictions': ['cr'],
+            'missed_times': 0
         }
@@ -0,0 +1,31 @@
+import pytest
+from bson import ObjectId
+
+from app.request_schemes.missing_request_data import MissingRequestData
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestMissingRequestData:
+    @pytest.mark.parametrize("event_type, query", [
+        (None, {}),
+        ('synchronize', {}),
+        ('push', {'limit': '0'}),
+        ('push', {'limit': '-1'}),
+        ('push', {'limit': '10001'}),
+        ('push', {'threshold': 'many'}),
+        ('push', {'after': 'push'}),
+        ('push', {'after': 'unknown:5c0f6b1e2f8fb814b56fa181'}),
+    ])
+    async def test__when_data_is_invalid__should_not_be_valid(self, event_type, query):
+        assert not MissingRequestData.is_valid_missing_request_data(event_type, query)
+
+    @pytest.mark.parametrize("event_type, query", [
+        ('push', {}),
+        ('all', {}),
+        ('labeled', {'limit': '10000', 'threshold': '3'}),
+        ('all', {'after': f'tagged:{ObjectId()}'}),
+    ])
+    async def test__when_data_is_valid__should_be_valid(self, event_type, query):
+        assert MissingRequestData.is_valid_missing_request_data(event_type, query)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+
+import pytest
+from mockito import expect
+
+from app.metrics.api_budget import ApiBudget, api_budget_scope
+from app.tasks.task_supervisor import TaskSupervisor
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestTaskSupervisor:
+    async def test__spawned_task__is_tracked_until_it_finishes(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return 'done'
+
+        task = task_supervisor.spawn('hooks', work())
+        await asyncio.sleep(0)
+        assert [supervised_task.group for supervised_task in task_supervisor.get_tasks()] == ['hooks']
+        assert task_supervisor.get_group_stats()['hooks']['running'] == 1
+
+        release.set()
+        assert await task == 'done'
+        assert task_supervisor.get_tasks() == []
+
+    async def test__spawned_task__holds_api_budget_of_its_caller__until_it_finishes(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+        release = asyncio.Event()
+
+        with api_budget_scope(ApiBudget.HOOK, 'push of org/held', event='push', repository='org/held') as api_budget:
+            task = task_supervisor.spawn('builds', release.wait())
+
+        assert api_budget.holders == 1
+        release.set()
+        await task
+        await asyncio.sleep(0)
+        assert api_budget.finished
+
+    async def test__group_concurrency__limits_running_tasks(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={'builds': 1}, drain_timeout=1)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        first = task_supervisor.spawn('builds', work())
+        second = task_supervisor.spawn('builds', work())
+        other = task_supervisor.spawn('hooks', work())
+        await asyncio.sleep(0)
+
+        stats = task_supervisor.get_group_stats()
+        assert (stats['builds']['running'], stats['builds']['waiting']) == (1, 1)
+        assert (stats['hooks']['running'], stats['hooks']['waiting']) == (1, 0)
+
+        release.set()
+        await asyncio.gather(first, second, other)
+
+    async def test__global_concurrency__limits_running_tasks_across_groups(self):
+        task_supervisor = TaskSupervisor(max_concurrency=1, group_concurrency={}, drain_timeout=1)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        tasks = [task_supervisor.spawn('builds', work()), task_supervisor.spawn('hooks', work())]
+        await asyncio.sleep(0)
+
+        stats = task_supervisor.get_group_stats()
+        assert stats['builds']['running'] + stats['hooks']['running'] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test__failed_task__should_be_logged_and_counted(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+
+        async def work():
+            raise ValueError('boom')
+
+        expect(logging).error(...)
+
+        task = task_supervisor.spawn('hooks', work())
+        with pytest.raises(ValueError):
+            await task
+        assert task_supervisor.failed == 1
+
+    async def test__drain__waits_for_tasks_and_ones_they_spawn(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+        finished = []
+
+        async def build():
+            await asyncio.sleep(0.01)
+            finished.append('build')
+
+        async def hook():
+            await asyncio.sleep(0.01)
+            task_supervisor.spawn('builds', build())
+            finished.append('hook')
+
+        task_supervisor.spawn('hooks', hook())
+        await task_supervisor.drain(None)
+
+        assert finished == ['hook', 'build']
+
+    async def test__drain__cancels_tasks_after_deadline(self):
+        task_supervisor = TaskSupervisor(max_concurrency=1, group_concurrency={}, drain_timeout=0.01)
+
+        async def work():
+            await asyncio.sleep(10)
+
+        running = task_supervisor.spawn('hooks', work())
+        waiting = task_supervisor.spawn('hooks', work())
+        await task_supervisor.drain(None)
+
+        assert running.cancelled()
+        assert waiting.cancelled()
+        assert task_supervisor.get_tasks() == []
+
+    async def test__spawn_details__are_kept_on_supervised_task(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+
+        async def work():
+            pass
+
+        task = task_supervisor.spawn('builds', work(), jenkins_url='url', job='job')
+        assert [supervised_task.details for supervised_task in task_supervisor.get_tasks()] == [{'jenkins_url': 'url', 'job': 'job'}]
+        await task
+
+    async def test__detached_task__releases_its_slots_to_waiting_tasks(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={'builds': 1}, drain_timeout=1)
+        release = asyncio.Event()
+        started = []
+
+        async def build(name: str):
+            started.append(name)
+            task_supervisor.detach()
+            await release.wait()
+
+        tasks = [task_supervisor.spawn('builds', build('first')), task_supervisor.spawn('builds', build('second'))]
+        await asyncio.sleep(0.01)
+
+        assert started == ['first', 'second']
+        assert [supervised_task.detached for supervised_task in task_supervisor.get_tasks()] == [True, True]
+        release.set()
+        await asyncio.gather(*tasks)
+        assert task_supervisor.get_group_semaphore('builds')._value == 1
+        assert task_supervisor.get_semaphore()._value == 10
+
+    async def test__drain__neither_waits_for_nor_cancels_detached_tasks(self):
+        task_supervisor = TaskSupervisor(max_concurrency=10, group_concurrency={}, drain_timeout=1)
+
+        async def watch():
+            task_supervisor.detach()
+            await asyncio.sleep(10)
+
+        async def hook():
+            await asyncio.sleep(0.01)
+
+        detached = task_supervisor.spawn('builds', watch())
+        attached = task_supervisor.spawn('hooks', hook())
+        await asyncio.sleep(0)
+        await asyncio.wait_for(task_supervisor.drain(None), 0.5)
+
+        assert attached.done()
+        assert not detached.done()
+        detached.cancel()
+        await asyncio.gather(detached, return_exceptions=True)
@@ -1,3 +1,6 @@
+import os
+import signal
+
 import pytest
 from aiohttp.web_urldispatcher import UrlDispatcher
 
@@ -5,6 +8,13 @@ import app.config.triggear_config
 import app.controllers.github_controller
 import app.controllers.pipeline_controller
 import app.controllers.health_controller
+import app.controllers.metrics_controller
+import app.controllers.diagnostics_controller
+import app.diagnostics.inflight_report
+import app.diagnostics.memory_snapshots
+import app.diagnostics.sampling_profiler
+import app.diagnostics.triggear_inflight
+import app.exceptions.triggear_error
 from mockito import when, mock, expect
 from aiohttp import web
 import motor.motor_asyncio
@@ -12,8 +22,26 @@ import app.clients.jenkins_client
 import app.clients.github_client
 import app.clients.mongo_client
 import app.clients.jenkinses_clients
+import app.tasks.task_supervisor
 import app.triggear_heart
+import app.builds.build_debouncer
+import app.workers.job_catalog_refresher
+import app.ingress.body_decoder
+import app.ingress.delivery_deduplicator
+import app.ingress.fair_admission
+import app.ingress.webhook_inbox
+import app.ingress.write_ahead_log
+import app.mongo.registered_repositories
+import app.metrics.mongo_command_listener
+import app.metrics.triggear_metrics
 import app.middlewares.authentication_middleware
+import app.tracing.span_exporter
+import app.ingress.capture_ring
+import app.logs.log_pipeline
+import app.metrics.event_loop_monitor
+import app.logs.rate_limit_filter
+import app.tracing.triggear_tracer
+from app.middlewares.api_budget_middleware import api_budget
 from app.middlewares.exceptions_middleware import exceptions
 
 pytestmark = pytest.mark.asyncio
@@ -24,15 +52,61 @@ class TestMain:
     async def test__main_app_flow(self):
         triggear_config = mock({
                 'github_token': 'gh_token',
+                'github_api_url': 'https://github.example.com/api/v3',
                 'jenkins_url': 'url',
                 'jenkins_user_id': 'user',
                 'jenkins_api_token': 'jenkins_token',
                 'triggear_token': 'triggear_token',
-                'rerun_time_limit': 1
+                'rerun_time_limit': 1,
+                'delivery_cache_size': 100,
+                'delivery_ttl': 3600,
+                'inbox_directory': 'inbox',
+                'inbox_segment_size': 1024,
+                'inbox_workers': 4,
+                'inbox_checkpoint_interval': 1,
+                'ingress_workers': 1,
+                'ingress_host': '0.0.0.0',
+                'ingress_port': 8080,
+                'build_debounce_window': 5,
+                'build_abort_superseded': True,
+                'body_offload_threshold': 1024,
+                'body_decode_workers': 2,
+                'max_body_size': 4096,
+                'task_max_concurrency': 50,
+                'task_group_concurrency': {'hooks': 10},
+                'task_drain_timeout': 15,
+                'admission_workers': 3,
+                'admission_repository_high_water': 5,
+                'admission_total_high_water': 20,
+                'admission_low_priority_events': ['push'],
+                'admission_overflow_drain_interval': 2,
+                'registered_repositories_refresh_interval': 7,
+                'registered_repositories_unknown_ttl': 4,
+                'tracing_sample_rate': 0.1,
+                'tracing_file_path': 'traces.jsonl',
+                'tracing_collector_url': None,
+                'tracing_flush_interval': 3,
+                'tracing_debug_target_url': True,
+                'capture_file_path': 'hooks.capture',
+                'capture_size': 1024,
+                'log_queue_size': 100,
+                'log_json_format': True,
+                'log_level': 'DEBUG',
+                'log_rate_per_key': 5,
+                'log_burst_per_key': 10,
+                'log_debug_sample_rate': 0.5,
+                'loop_monitor_interval': 0.2,
+                'loop_monitor_slow_callback_threshold': 0.4,
+                'profile_interval': 0.02,
+                'max_profile_seconds': 30,
+                'tracemalloc_frames': 5,
+                'tracemalloc_on_startup': True
             },
             spec=app.config.triggear_config.TriggearConfig, strict=True)
         github_controller = mock({
-                'handle_hook': 'hook_handler_method'
+                'handle_hook': 'hook_handler_method',
+                'handle_inbox_entry': 'inbox_entry_handler_method',
+                'process_event': 'process_event_method'
             },
             spec=app.controllers.github_controller.GithubController, strict=True)
         pipeline_controller = mock({
@@ -51,13 +125,52 @@ class TestMain:
             },
             spec=app.controllers.health_controller.HealthController, strict=True)
 
+        metrics_controller = mock({
+                'handle_metrics': 'metrics_handle_method'
+            },
+            spec=app.controllers.metrics_controller.MetricsController, strict=True)
+        event_loop_monitor = mock({'start': 'loop_monitor_start', 'stop': 'loop_monitor_stop'},
+                                  spec=app.metrics.event_loop_monitor.EventLoopMonitor, strict=True)
+        memory_snapshots = mock({'start': 'memory_snapshots_start', 'stop': 'memory_snapshots_stop'},
+                                spec=app.diagnostics.memory_snapshots.MemorySnapshots, strict=True)
+        sampling_profiler = mock(spec=app.diagnostics.sampling_profiler.SamplingProfiler, strict=True)
+        inflight_report = mock(spec=app.diagnostics.inflight_report.InflightReport, strict=True)
+        diagnostics_controller = mock({
+                'handle_profile': 'profile_handle_method',
+                'handle_memory': 'memory_handle_method',
+                'handle_inflight': 'inflight_handle_method'
+            },
+            spec=app.controllers.diagnostics_controller.DiagnosticsController, strict=True)
+        mongo_command_listener = mock(spec=app.metrics.mongo_command_listener.MongoCommandListener, strict=True)
+
         router = mock(spec=UrlDispatcher, strict=True)
-        web_app = mock({'router': router}, spec=web.Application, strict=True)
+        on_startup = mock(strict=True)
+        on_shutdown = mock(strict=True)
+        on_cleanup = mock(strict=True)
+        web_app = mock({'router': router, 'on_startup': on_startup, 'on_shutdown': on_shutdown, 'on_cleanup': on_cleanup},
+                       spec=web.Application, strict=True)
         github_client = mock(spec=app.clients.github_client.GithubClient, strict=True)
         motor_client = mock(spec=motor.motor_asyncio, strict=True)
-        mongo_client = mock(spec=app.clients.mongo_client.MongoClient, strict=True)
+        mongo_client = mock({'start': 'mongo_start', 'stop': 'mongo_stop'}, spec=app.clients.mongo_client.MongoClient, strict=True)
         jenkinses_clients = mock(spec=app.clients.jenkinses_clients.JenkinsesClients, strict=True)
         triggear_heart = mock(spec=app.triggear_heart.TriggearHeart, strict=True)
+        task_supervisor = mock({'drain': 'supervisor_drain'}, spec=app.tasks.task_supervisor.TaskSupervisor, strict=True)
+        build_debouncer = mock({'stop': 'debouncer_stop'}, spec=app.builds.build_debouncer.BuildDebouncer, strict=True)
+        job_catalog_refresher = mock({'start': 'refresher_start', 'stop': 'refresher_stop'},
+                                     spec=app.workers.job_catalog_refresher.JobCatalogRefresher, strict=True)
+        delivery_deduplicator = mock({'start': 'deduplicator_start'},
+                                     spec=app.ingress.delivery_deduplicator.DeliveryDeduplicator, strict=True)
+        write_ahead_log = mock(spec=app.ingress.write_ahead_log.WriteAheadLog, strict=True)
+        webhook_inbox = mock({'start': 'inbox_start', 'stop': 'inbox_stop'}, spec=app.ingress.webhook_inbox.WebhookInbox, strict=True)
+        fair_admission = mock({'start': 'admission_start', 'stop': 'admission_stop'},
+                              spec=app.ingress.fair_admission.FairAdmission, strict=True)
+        body_decoder = mock({'stop': 'decoder_stop'}, spec=app.ingress.body_decoder.BodyDecoder, strict=True)
+        registered_repositories = mock({'start': 'repositories_start', 'stop': 'repositories_stop'},
+                                       spec=app.mongo.registered_repositories.RegisteredRepositories, strict=True)
+        span_exporter = mock({'start': 'exporter_start', 'stop': 'exporter_stop'}, spec=app.tracing.span_exporter.SpanExporter, strict=True)
+        log_pipeline = mock({'start': 'log_pipeline_start', 'stop': 'log_pipeline_stop'}, spec=app.logs.log_pipeline.LogPipeline, strict=True)
+        rate_limit_filter = mock(spec=app.logs.rate_limit_filter.RateLimitFilter, strict=True)
+        capture_ring = mock({'start': 'capture_start', 'stop': 'capture_stop'}, spec=app.ingress.capture_ring.CaptureRing, strict=True)
         authentication_middleware = mock({'authentication': 'auth_method'},
                                          spec=app.middlewares.authentication_middleware.AuthenticationMiddleware, strict=True)
 
@@ -65,40 +178,117 @@ class TestMain:
         expect(app.config.triggear_config)\
             .TriggearConfig()\
             .thenReturn(triggear_config)
+        expect(app.metrics.mongo_command_listener)\
+            .MongoCommandListener()\
+            .thenReturn(mongo_command_listener)
         expect(motor.motor_asyncio)\
-            .AsyncIOMotorClient('localhost:27017')\
+            .AsyncIOMotorClient('localhost:27017', event_listeners=[mongo_command_listener])\
             .thenReturn(motor_client)
+        expect(app.logs.rate_limit_filter).RateLimitFilter(rate=5, burst=10, debug_sample_rate=0.5).thenReturn(rate_limit_filter)
+        expect(app.logs.log_pipeline)\
+            .LogPipeline(queue_size=100, json_format=True, level='DEBUG', rate_limit_filter=rate_limit_filter)\
+            .thenReturn(log_pipeline)
+        expect(app.tracing.span_exporter)\
+            .SpanExporter(file_path='traces.jsonl', collector_url=None, flush_interval=3)\
+            .thenReturn(span_exporter)
+        expect(app.tracing.triggear_tracer.TRACER)\
+            .configure(sample_rate=0.1, exporter=span_exporter)
         expect(app.clients.github_client)\
-            .GithubClient('gh_token')\
+            .GithubClient('gh_token', trace_target_url=True, api_url='https://github.example.com/api/v3')\
             .thenReturn(github_client)
         expect(app.clients.mongo_client) \
-            .MongoClient(mongo=motor_client) \
+            .MongoClient(mongo=motor_client, config=triggear_config) \
             .thenReturn(mongo_client)
         expect(app.clients.jenkinses_clients) \
             .JenkinsesClients(triggear_config) \
             .thenReturn(jenkinses_clients)
+        expect(app.tasks.task_supervisor) \
+            .TaskSupervisor(max_concurrency=50, group_concurrency={'hooks': 10}, drain_timeout=15) \
+            .thenReturn(task_supervisor)
+        expect(app.mongo.registered_repositories) \
+            .RegisteredRepositories(mongo_client=mongo_client, refresh_interval=7, unknown_ttl=4) \
+            .thenReturn(registered_repositories)
+        expect(app.builds.build_debouncer) \
+            .BuildDebouncer(window=5, abort_superseded=True, task_supervisor=task_supervisor) \
+            .thenReturn(build_debouncer)
         expect(app.triggear_heart) \
-            .TriggearHeart(mongo_client, github_client, jenkinses_clients) \
+            .TriggearHeart(mongo_client, github_client, jenkinses_clients, build_debouncer, task_supervisor) \
             .thenReturn(triggear_heart)
+        expect(app.ingress.delivery_deduplicator) \
+            .DeliveryDeduplicator(mongo=motor_client, max_entries=100, ttl=3600) \
+            .thenReturn(delivery_deduplicator)
+        expect(app.ingress.write_ahead_log) \
+            .WriteAheadLog(directory='inbox', segment_size=1024) \
+            .thenReturn(write_ahead_log)
+        expect(app.ingress.webhook_inbox) \
+            .WebhookInbox(write_ahead_log=write_ahead_log, workers=4, checkpoint_interval=1) \
+            .thenReturn(webhook_inbox)
+        expect(app.workers.job_catalog_refresher) \
+            .JobCatalogRefresher(config=triggear_config, jenkinses_clients=jenkinses_clients) \
+            .thenReturn(job_catalog_refresher)
 
+        expect(app.ingress.fair_admission) \
+            .FairAdmission(mongo=motor_client, workers=3, repository_high_water=5, total_high_water=20,
+                           low_priority_events=['push'], overflow_drain_interval=2) \
+            .thenReturn(fair_admission)
+        expect(app.ingress.capture_ring) \
+            .CaptureRing(file_path='hooks.capture', size=1024) \
+            .thenReturn(capture_ring)
+        expect(app.ingress.body_decoder) \
+            .BodyDecoder(offload_threshold=1024, workers=2) \
+            .thenReturn(body_decoder)
         expect(app.controllers.github_controller)\
             .GithubController(triggear_heart=triggear_heart,
                               github_client=github_client,
-                              config=triggear_config)\
+                              config=triggear_config,
+                              delivery_deduplicator=delivery_deduplicator,
+                              webhook_inbox=webhook_inbox,
+                              body_decoder=body_decoder,
+                              task_supervisor=task_supervisor,
+                              fair_admission=fair_admission,
+                              registered_repositories=registered_repositories,
+                              capture_ring=capture_ring)\
             .thenReturn(github_controller)
+        expect(webhook_inbox).set_handler('inbox_entry_handler_method')
+        expect(fair_admission).set_handler('process_event_method')
         expect(app.controllers.pipeline_controller)\
             .PipelineController(github_client=github_client,
-                                mongo_client=mongo_client)\
+                                mongo_client=mongo_client,
+                                registered_repositories=registered_repositories)\
             .thenReturn(pipeline_controller)
         expect(app.controllers.health_controller)\
-            .HealthController()\
+            .HealthController(delivery_deduplicator=delivery_deduplicator, task_supervisor=task_supervisor)\
             .thenReturn(health_controller)
+        expect(app.controllers.metrics_controller)\
+            .MetricsController(registry=app.metrics.triggear_metrics.REGISTRY, worker_id=None)\
+            .thenReturn(metrics_controller)
+        expect(app.metrics.event_loop_monitor)\
+            .EventLoopMonitor(interval=0.2, slow_callback_threshold=0.4)\
+            .thenReturn(event_loop_monitor)
+        expect(app.diagnostics.memory_snapshots)\
+            .MemorySnapshots(frames=5, trace_on_startup=True, max_window=30)\
+            .thenReturn(memory_snapshots)
+        expect(app.diagnostics.sampling_profiler)\
+            .SamplingProfiler(interval=0.02, max_duration=30)\
+            .thenReturn(sampling_profiler)
+        expect(app.diagnostics.inflight_report)\
+            .InflightReport(inflight_tracker=app.diagnostics.triggear_inflight.INFLIGHT,
+                            task_supervisor=task_supervisor,
+                            build_debouncer=build_debouncer,
+                            mongo_client=mongo_client,
+                            delivery_deduplicator=delivery_deduplicator,
+                            registered_repositories=registered_repositories,
+                            jenkinses_clients=jenkinses_clients)\
+            .thenReturn(inflight_report)
+        expect(app.controllers.diagnostics_controller)\
+            .DiagnosticsController(sampling_profiler=sampling_profiler, memory_snapshots=memory_snapshots, inflight_report=inflight_report)\
+            .thenReturn(diagnostics_controller)
         expect(app.middlewares.authentication_middleware) \
-            .AuthenticationMiddleware(config=triggear_config) \
+            .AuthenticationMiddleware(config=triggear_config, offload_threshold=1024) \
             .thenReturn(authentication_middleware)
 
         expect(web)\
-            .Application(middlewares=(authentication_middleware.authentication, exceptions))\
+            .Application(middlewares=(authentication_middleware.authentication, exceptions, api_budget), client_max_size=4096)\
             .thenReturn(web_app)
 
         expect(router).add_post('/github', 'hook_handler_method')
@@ -111,9 +301,80 @@ class TestMain:
         expect(router).add_post('/clear', 'clear_handle_method')
         expect(router).add_post('/deployment', 'deployment_handle_method')
         expect(router).add_post('/deployment_status', 'deployment_status_handle_method')
+        expect(router).add_get('/metrics', 'metrics_handle_method')
+        expect(router).add_get('/debug/profile', 'profile_handle_method')
+        expect(router).add_get('/debug/memory', 'memory_handle_method')
+        expect(router).add_get('/debug/inflight', 'inflight_handle_method')
+
+        expect(on_startup).append('log_pipeline_start')
+        expect(on_startup).append('exporter_start')
+        expect(on_startup).append('loop_monitor_start')
+        expect(on_startup).append('memory_snapshots_start')
+        expect(on_startup).append('mongo_start')
+        expect(on_startup).append('repositories_start')
+        expect(on_startup).append('deduplicator_start')
+        expect(on_startup).append('refresher_start')
+        expect(on_startup).append('admission_start')
+        expect(on_startup).append('inbox_start')
+        expect(on_startup).append('capture_start')
+        expect(on_shutdown).append('debouncer_stop')
+        expect(on_shutdown).append('supervisor_drain')
+        expect(on_cleanup).append('inbox_stop')
+        expect(on_cleanup).append('capture_stop')
+        expect(on_cleanup).append('admission_stop')
+        expect(on_cleanup).append('decoder_stop')
+        expect(on_cleanup).append('repositories_stop')
+        expect(on_cleanup).append('refresher_stop')
+        expect(on_cleanup).append('mongo_stop')
+        expect(on_cleanup).append('memory_snapshots_stop')
+        expect(on_cleanup).append('loop_monitor_stop')
+        expect(on_cleanup).append('exporter_stop')
+        expect(on_cleanup).append('log_pipeline_stop')
 
-        when(web).run_app(web_app)
+        expect(web).run_app(web_app, host='0.0.0.0', port=8080)
 
         # then
         from app.main import main
         main()
+
+    async def test__main__runs_supervised_workers__when_more_than_one_worker_is_configured(self):
+        import app.main as main_module
+        triggear_config = mock({'ingress_workers': 3, 'build_debounce_window': 0, 'build_abort_superseded': False},
+                               spec=app.config.triggear_config.TriggearConfig, strict=True)
+
+        expect(main_module).TriggearConfig().thenReturn(triggear_config)
+        expect(main_module).run_supervised_workers(3, any)
+        expect(web, times=0).run_app(...)
+
+        main_module.main()
+
+    @pytest.mark.parametrize('debounce_window, abort_superseded', [(5, False), (0, True)])
+    async def test__main__refuses_many_workers__when_builds_are_debounced(self, debounce_window, abort_superseded):
+        import app.main as main_module
+        triggear_config = mock({'ingress_workers': 3, 'build_debounce_window': debounce_window, 'build_abort_superseded': abort_superseded},
+                               spec=app.config.triggear_config.TriggearConfig, strict=True)
+
+        expect(main_module).TriggearConfig().thenReturn(triggear_config)
+        expect(main_module, times=0).run_supervised_workers(...)
+        expect(web, times=0).run_app(...)
+
+        with pytest.raises(app.exceptions.triggear_error.TriggearError):
+            main_module.main()
+
+    async def test__run_supervised_workers__restarts_only_crashed_workers(self):
+        import app.main as main_module
+
+        forked_workers = []
+
+        def fork_worker(worker_target, worker_id):
+            forked_workers.append(worker_id)
+            return 100 + len(forked_workers)
+
+        when(main_module).fork_worker(any, any).thenAnswer(fork_worker)
+        when(signal).signal(any, any)
+        # worker 0 (pid 101) crashes and is restarted as pid 103, other workers exit cleanly
+        when(os).wait().thenReturn((101, 256)).thenReturn((102, 0)).thenReturn((103, 0))
+
+        main_module.run_supervised_workers(2, lambda worker_id: None, restart_delay=0)
+
+        assert forked_workers == [0, 1, 0]
@@ -4,14 +4,19 @@ import logging
 import pytest
 from mockito import mock, expect, when, captor
 
-from app.clients.async_client import AsyncClientNotFoundException, AsyncClientException
+from app.builds.build_debouncer import BuildDebouncer
+from app.clients.async_client import AsyncClientException
 from app.clients.github_client import GithubClient
 from app.clients.jenkins_client import JenkinsClient
 from app.clients.jenkinses_clients import JenkinsesClients
 from app.clients.mongo_client import MongoClient
+from app.diagnostics.triggear_inflight import INFLIGHT
 from app.hook_details.hook_details import HookDetails
 from app.hook_details.hook_params_parser import HookParamsParser
+from app.hook_details.labeled_hook_details import LabeledHookDetails
+from app.hook_details.push_hook_details import PushHookDetails
 from app.mongo.registration_cursor import RegistrationCursor
+from app.tasks.task_supervisor import TaskSupervisor
 from app.triggear_heart import TriggearHeart
 from tests.async_mockito import async_iter, async_value
 
@@ -20,7 +25,7 @@ pytestmark = pytest.mark.asyncio
 
 @pytest.mark.usefixtures('unstub')
 class TestTriggearHeart:
-    async def test__when_job_does_not_exist__it_should_have_missed_times_field_incremented(self):
+    async def test__when_job_does_not_exist__it_should_be_skipped__and_missed_times_incremented(self):
         mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
         jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
         jenkins_client: JenkinsClient = mock(spec=JenkinsClient, strict=True)
@@ -35,13 +40,15 @@ class TestTriggearHeart:
         when(mongo_client).get_registered_jobs(hook_details).thenReturn(async_iter(registration_cursor))
         when(hook_details).should_trigger(registration_cursor, github_client).thenReturn(async_value(True))
         when(jenkinses_clients).get_jenkins('url').thenReturn(jenkins_client)
-        when(jenkins_client).get_job_info('job_path').thenRaise(AsyncClientNotFoundException('Job not found'))
+        when(jenkins_client).job_exists('job_path').thenReturn(async_value(False))
 
         expect(hook_details).get_query()
-        expect(mongo_client, strict=True, times=1).increment_missed_counter(hook_details, registration_cursor).thenReturn(async_value(None))
+        expect(mongo_client, times=1).increment_missed_counter(hook_details, registration_cursor).thenReturn(async_value(None))
 
+        triggear_heart = TriggearHeart(mongo_client, github_client, jenkinses_clients)
+        expect(triggear_heart, times=0).trigger_registered_job(hook_details, registration_cursor)
         # when
-        await TriggearHeart(mongo_client, github_client, jenkinses_clients).trigger_registered_jobs(hook_details)
+        await triggear_heart.trigger_registered_jobs(hook_details)
 
     async def test__when_job_does_exist__it_should_be_triggered(self):
         mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
@@ -58,14 +65,79 @@ class TestTriggearHeart:
         when(mongo_client).get_registered_jobs(hook_details).thenReturn(async_iter(registration_cursor))
         when(hook_details).should_trigger(registration_cursor, github_client).thenReturn(async_value(True))
         when(jenkinses_clients).get_jenkins('url').thenReturn(jenkins_client)
-        when(jenkins_client).get_job_info('job_path').thenReturn(async_value({}))
+        when(jenkins_client).job_exists('job_path').thenReturn(async_value(True))
 
         triggear_heart = TriggearHeart(mongo_client, github_client, jenkinses_clients)
         expect(triggear_heart).trigger_registered_job(hook_details, registration_cursor).thenReturn(async_value(None))
         # when
         await triggear_heart.trigger_registered_jobs(hook_details)
 
-    async def test__when_job_should_not_be_triggered__warning_is_displayed(self):
+    async def test__when_debouncer_is_set__job_trigger_should_be_scheduled_through_it(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
+        jenkins_client: JenkinsClient = mock(spec=JenkinsClient, strict=True)
+        github_client: GithubClient = mock(spec=GithubClient, strict=True)
+        build_debouncer: BuildDebouncer = mock(spec=BuildDebouncer, strict=True)
+        hook_details = PushHookDetails('repo', 'master', 'sha', set())
+        registration_cursor: RegistrationCursor = mock({'jenkins_url': 'url', 'job_name': 'job_path'}, spec=RegistrationCursor, strict=True)
+        trigger_captor = captor()
+
+        when(hook_details).should_trigger(registration_cursor, github_client).thenReturn(async_value(True))
+        when(jenkinses_clients).get_jenkins('url').thenReturn(jenkins_client)
+        when(jenkins_client).job_exists('job_path').thenReturn(async_value(True))
+        expect(build_debouncer).schedule(('push', 'url', 'job_path', 'repo', 'master'), trigger_captor, jenkins_url='url', job='job_path')
+
+        triggear_heart = TriggearHeart(mongo_client, github_client, jenkinses_clients, build_debouncer)
+        await triggear_heart.trigger_registration(hook_details, registration_cursor)
+
+        expect(triggear_heart).trigger_registered_job(hook_details, registration_cursor).thenReturn(async_value(None))
+        await trigger_captor.value()
+
+    async def test__report_superseded_build__stops_build__and_reports_status(self):
+        hook_details: HookDetails = mock(spec=HookDetails, strict=True)
+        registration_cursor: RegistrationCursor = mock({'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
+                                                       spec=RegistrationCursor, strict=True)
+        jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
+        jenkins_client: JenkinsClient = mock(spec=JenkinsClient, strict=True)
+        github_client: GithubClient = mock(spec=GithubClient, strict=True)
+
+        expect(hook_details).get_ref().thenReturn('sha')
+        expect(jenkinses_clients).get_jenkins('url').thenReturn(jenkins_client)
+        expect(jenkins_client).stop_build('job_path', 3).thenRaise(AsyncClientException('already finished', 400))
+        expect(github_client).create_github_build_status(repo='repo',
+                                                         sha='sha',
+                                                         state='error',
+                                                         url='build_url',
+                                                         description='build superseded by newer commit',
+                                                         context='job_path').thenReturn(async_value(None))
+
+        await TriggearHeart(mock(), github_client, jenkinses_clients).report_superseded_build(hook_details, registration_cursor, 3, 'build_url')
+
+    async def test__trigger_labeled_sync__queries_registrations_once__and_triggers_them_per_label(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        github_client: GithubClient = mock(spec=GithubClient, strict=True)
+        first_hook_details = LabeledHookDetails('repo', 'branch', 'sha', 'first', 'who', 'pr_url')
+        second_hook_details = LabeledHookDetails('repo', 'branch', 'sha', 'second', 'who', 'pr_url')
+        first_cursor: RegistrationCursor = mock(spec=RegistrationCursor, strict=True)
+        second_cursor: RegistrationCursor = mock(spec=RegistrationCursor, strict=True)
+
+        expect(mongo_client, times=1).get_registered_jobs_by_labels('repo', ['first', 'second'])\
+            .thenReturn(async_value({'first': [first_cursor, second_cursor], 'second': [second_cursor]}))
+
+        triggear_heart = TriggearHeart(mongo_client, github_client, mock(spec=JenkinsesClients, strict=True))
+        expect(triggear_heart).trigger_registration(first_hook_details, first_cursor).thenReturn(async_value(None))
+        expect(triggear_heart).trigger_registration(first_hook_details, second_cursor).thenReturn(async_value(None))
+        expect(triggear_heart).trigger_registration(second_hook_details, second_cursor).thenReturn(async_value(None))
+
+        await triggear_heart.trigger_labeled_sync([first_hook_details, second_hook_details])
+
+    async def test__trigger_labeled_sync__does_not_query_mongo__without_labels(self):
+        mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
+        expect(mongo_client, times=0).get_registered_jobs_by_labels(any, any)
+
+        await TriggearHeart(mongo_client, mock(spec=GithubClient, strict=True), mock(spec=JenkinsesClients, strict=True)).trigger_labeled_sync([])
+
+    async def test__when_job_should_not_be_triggered__it_is_logged__with_details_dumped_only_at_debug_level(self):
         mock(logging, strict=True)
         mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
         jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
@@ -82,12 +154,11 @@ class TestTriggearHeart:
 
         triggear_heart = TriggearHeart(mongo_client, github_client, jenkinses_clients)
         expect(triggear_heart, times=0).trigger_registered_job(hook_details, registration_cursor).thenReturn(async_value(None))
-        arg_captor = captor()
-        expect(logging).warning(arg_captor)
+        expect(logging).info('Registration %s:%s will not be run due to unmet registration restrictions', 'url', 'job_path')
+        # INFO: hook details and registration are passed as arguments - their reprs are built only if debug is enabled
+        expect(logging).debug('Hook details %s will not be run due to unmet registration restrictions in %s', hook_details, registration_cursor)
         # when
         await triggear_heart.trigger_registered_jobs(hook_details)
-        assert isinstance(arg_captor.value, str)
-        assert 'will not be run due to unmet registration restrictions in' in arg_captor.value
 
     async def test__when_job_url_is_none__not_found_status_is_not_reported(self):
         hook_details: HookDetails = mock(spec=HookDetails, strict=True)
@@ -169,7 +240,7 @@ class TestTriggearHeart:
         mock(HookParamsParser)
         mock(asyncio)
 
-        hook_details: HookDetails = mock(spec=HookDetails, strict=True)
+        hook_details: HookDetails = mock({'received_at': 0.0}, spec=HookDetails, strict=True)
         registration_cursor: RegistrationCursor = mock(
             {'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
             spec=RegistrationCursor,
@@ -180,7 +251,8 @@ class TestTriggearHeart:
         mongo_client: MongoClient = mock(spec=MongoClient, strict=True)
         jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
         github_client: GithubClient = mock(spec=GithubClient, strict=True)
-        triggear_heart = TriggearHeart(mongo_client, github_client, jenkinses_clients)
+        task_supervisor: TaskSupervisor = mock(spec=TaskSupervisor, strict=True)
+        triggear_heart = TriggearHeart(mongo_client, github_client, jenkinses_clients, task_supervisor=task_supervisor)
 
         expect(hook_details).setup_final_param_values(registration_cursor)
         expect(HookParamsParser).get_requested_parameters_values(hook_details, registration_cursor).thenReturn({})
@@ -191,6 +263,7 @@ class TestTriggearHeart:
         expect(jenkins_client).get_build_info_data('job_path', 3)\
             .thenReturn(async_value({'url': 'job_url'}))\
             .thenReturn(async_value({'url': 'job_url', 'result': 'SUCCESS'}))
+        expect(task_supervisor, times=1).detach()
         expect(hook_details).get_ref().thenReturn('ref')
         expect(github_client).create_github_build_status(repo='repo',
                                                          sha='ref',
@@ -199,13 +272,101 @@ class TestTriggearHeart:
                                                          description='build in progress',
                                                          context='job_path').thenReturn(async_value(None))
         expect(jenkins_client).is_job_building('job_path', 3).thenReturn(async_value(True)).thenReturn(async_value(False))
-        expect(asyncio).sleep(1).thenReturn(async_value(None))
+        expect(asyncio).sleep(1).thenAnswer(lambda _: watched.extend((item.kind, dict(item.details)) for item in INFLIGHT.get_items()) or async_value(None))
         expect(github_client).create_github_build_status(repo='repo',
                                                          sha='ref',
                                                          state='success',
                                                          url='job_url',
                                                          description='build succeeded',
                                                          context='job_path').thenReturn(async_value(None))
+        watched = []
+
+        await triggear_heart.trigger_registered_job(hook_details, registration_cursor)
+
+        assert watched == [
+            ('triggers', {'jenkins_url': 'url', 'job': 'job_path', 'phase': 'watching', 'build_number': 3}),
+            ('watches', {'jenkins_url': 'url', 'job': 'job_path', 'build_number': 3, 'polls': 1, 'next_poll_at': watched[1][1]['next_poll_at']})
+        ]
+        assert INFLIGHT.get_items() == []
+
+    @pytest.mark.parametrize("superseded, reports", [
+        (True, 1),
+        (False, 0)
+    ])
+    async def test__trigger_registered_job__cancelled_watch__is_reported_as_superseded__only_when_debouncer_replaced_it(self, superseded, reports):
+        mock(HookParamsParser)
+        mock(asyncio)
+
+        hook_details: HookDetails = mock({'received_at': 0.0}, spec=HookDetails, strict=True)
+        registration_cursor: RegistrationCursor = mock(
+            {'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
+            spec=RegistrationCursor,
+            strict=True
+        )
+
+        jenkins_client: JenkinsClient = mock(spec=JenkinsClient, strict=True)
+        jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
+        github_client: GithubClient = mock(spec=GithubClient, strict=True)
+        build_debouncer: BuildDebouncer = mock(spec=BuildDebouncer, strict=True)
+        triggear_heart = TriggearHeart(mock(spec=MongoClient, strict=True), github_client, jenkinses_clients, build_debouncer)
+
+        expect(hook_details).setup_final_param_values(registration_cursor)
+        expect(HookParamsParser).get_requested_parameters_values(hook_details, registration_cursor).thenReturn({})
+        expect(jenkinses_clients).get_jenkins('url').thenReturn(jenkins_client)
+        expect(jenkins_client).get_jobs_next_build_number('job_path').thenReturn(async_value(3))
+        expect(jenkins_client).get_job_url('job_path').thenReturn(async_value('job_url'))
+        expect(jenkins_client).build_jenkins_job('job_path', {}).thenReturn(async_value(None))
+        expect(jenkins_client).get_build_info_data('job_path', 3).thenReturn(async_value({'url': 'build_url'}))
+        expect(hook_details).get_ref().thenReturn('ref')
+        expect(github_client).create_github_build_status(repo='repo',
+                                                         sha='ref',
+                                                         state='pending',
+                                                         url='build_url',
+                                                         description='build in progress',
+                                                         context='job_path').thenReturn(async_value(None))
+        expect(build_debouncer).start_watching(any).thenReturn(False)
+        expect(jenkins_client).is_job_building('job_path', 3).thenReturn(async_value(True))
+        expect(asyncio).sleep(1).thenRaise(asyncio.CancelledError())
+        expect(build_debouncer).is_superseded(any).thenReturn(superseded)
+        expect(triggear_heart, times=reports).report_superseded_build(hook_details, registration_cursor, 3, 'build_url')\
+            .thenReturn(async_value(None))
+
+        with pytest.raises(asyncio.CancelledError):
+            await triggear_heart.trigger_registered_job(hook_details, registration_cursor)
+
+    async def test__trigger_registered_job__superseded_while_triggering__is_reported__once_build_number_is_known(self):
+        mock(HookParamsParser)
+
+        hook_details: HookDetails = mock({'received_at': 0.0}, spec=HookDetails, strict=True)
+        registration_cursor: RegistrationCursor = mock(
+            {'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
+            spec=RegistrationCursor,
+            strict=True
+        )
+
+        jenkins_client: JenkinsClient = mock(spec=JenkinsClient, strict=True)
+        jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
+        github_client: GithubClient = mock(spec=GithubClient, strict=True)
+        build_debouncer: BuildDebouncer = mock(spec=BuildDebouncer, strict=True)
+        triggear_heart = TriggearHeart(mock(spec=MongoClient, strict=True), github_client, jenkinses_clients, build_debouncer)
+
+        expect(hook_details).setup_final_param_values(registration_cursor)
+        expect(HookParamsParser).get_requested_parameters_values(hook_details, registration_cursor).thenReturn({})
+        expect(jenkinses_clients).get_jenkins('url').thenReturn(jenkins_client)
+        expect(jenkins_client).get_jobs_next_build_number('job_path').thenReturn(async_value(3))
+        expect(jenkins_client).get_job_url('job_path').thenReturn(async_value('job_url'))
+        expect(jenkins_client).build_jenkins_job('job_path', {}).thenReturn(async_value(None))
+        expect(jenkins_client).get_build_info_data('job_path', 3).thenReturn(async_value({'url': 'build_url'}))
+        expect(hook_details).get_ref().thenReturn('ref')
+        expect(github_client).create_github_build_status(repo='repo',
+                                                         sha='ref',
+                                                         state='pending',
+                                                         url='build_url',
+                                                         description='build in progress',
+                                                         context='job_path').thenReturn(async_value(None))
+        expect(build_debouncer).start_watching(any).thenReturn(True)
+        expect(jenkins_client, times=0).is_job_building(...)
+        expect(triggear_heart).report_superseded_build(hook_details, registration_cursor, 3, 'build_url').thenReturn(async_value(None))
 
         await triggear_heart.trigger_registered_job(hook_details, registration_cursor)
 
@@ -240,7 +401,7 @@ class TestTriggearHeart:
         mock(HookParamsParser)
         mock(asyncio)
 
-        hook_details: HookDetails = mock(spec=HookDetails, strict=True)
+        hook_details: HookDetails = mock({'received_at': 0.0}, spec=HookDetails, strict=True)
         registration_cursor: RegistrationCursor = mock(
             {'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
             spec=RegistrationCursor,
@@ -275,7 +436,7 @@ class TestTriggearHeart:
         mock(HookParamsParser)
         mock(asyncio)
 
-        hook_details: HookDetails = mock(spec=HookDetails, strict=True)
+        hook_details: HookDetails = mock({'received_at': 0.0}, spec=HookDetails, strict=True)
         registration_cursor: RegistrationCursor = mock(
             {'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
             spec=RegistrationCursor,
@@ -313,7 +474,7 @@ class TestTriggearHeart:
         mock(HookParamsParser)
         mock(asyncio)
 
-        hook_details: HookDetails = mock(spec=HookDetails, strict=True)
+        hook_details: HookDetails = mock({'received_at': 0.0}, spec=HookDetails, strict=True)
         registration_cursor: RegistrationCursor = mock(
             {'jenkins_url': 'url', 'job_name': 'job_path', 'repo': 'repo'},
             spec=RegistrationCursor,
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from app.tracing.span_exporter import SpanExporter
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestSpanExporter:
+    async def test__flush__should_append_otlp_document_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'traces.jsonl')
+            exporter = SpanExporter(file_path=file_path, collector_url=None, flush_interval=1)
+            exporter.export({'spanId': '1'})
+            exporter.export({'spanId': '2'})
+
+            await exporter.flush()
+            await exporter.flush()
+
+            with open(file_path) as traces_file:
+                lines = traces_file.readlines()
+            assert len(lines) == 1
+            document = json.loads(lines[0])
+            assert document['resourceSpans'][0]['resource']['attributes'] == [{'key': 'service.name', 'value': {'stringValue': 'triggear'}}]
+            assert document['resourceSpans'][0]['scopeSpans'][0]['spans'] == [{'spanId': '1'}, {'spanId': '2'}]
+
+    async def test__export__should_drop_spans_over_queue_size(self):
+        exporter = SpanExporter(file_path=None, collector_url=None, flush_interval=1, max_queue_size=1)
+        exporter.export({'spanId': '1'})
+        exporter.export({'spanId': '2'})
+        assert exporter.dropped == 1
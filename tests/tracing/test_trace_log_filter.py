@@ -0,0 +1,27 @@
+import logging
+
+import pytest
+
+from app.tracing.trace_log_filter import TraceLogFilter
+from app.tracing.tracer import Tracer
+
+
+@pytest.mark.usefixtures('unstub')
+class TestTraceLogFilter:
+    def test__record__should_get_current_trace_id__or_placeholder(self):
+        record = logging.LogRecord('triggear', logging.WARNING, __file__, 1, 'message', None, None)
+
+        assert TraceLogFilter().filter(record)
+        assert record.trace_id == '-'
+
+        with Tracer().span('request') as span:
+            TraceLogFilter().filter(record)
+        assert record.trace_id == span.trace_id
+
+    def test__trace_id_stamped_by_caller__should_be_kept_on_writer_thread(self):
+        record = logging.LogRecord('triggear', logging.WARNING, __file__, 1, 'message', None, None)
+        with Tracer().span('request') as span:
+            TraceLogFilter().filter(record)
+
+        assert TraceLogFilter().filter(record)
+        assert record.trace_id == span.trace_id
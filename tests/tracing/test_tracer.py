@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from mockito import mock, expect
+
+from app.tracing.span_exporter import SpanExporter
+from app.tracing.tracer import Tracer, Span
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestTracer:
+    async def test__nested_spans__should_share_trace_id__and_point_to_parent(self):
+        tracer = Tracer(sample_rate=1.0)
+
+        with tracer.span('parent') as parent:
+            with tracer.span('child', job='job') as child:
+                assert tracer.get_current_span() is child
+            assert tracer.get_current_span() is parent
+
+        assert tracer.get_current_span() is None
+        assert child.trace_id == parent.trace_id
+        assert child.parent_span_id == parent.span_id
+        assert parent.parent_span_id is None
+        assert child.attributes == {'job': 'job'}
+        assert child.end_time is not None
+
+    async def test__sampling__should_be_decided_on_root_span__and_inherited(self):
+        with Tracer(sample_rate=0.0).span('root') as root:
+            assert not root.sampled
+            assert Tracer(sample_rate=1.0).start_span('child').sampled is False
+
+    async def test__only_sampled_spans__should_be_exported(self):
+        exporter = mock(spec=SpanExporter, strict=True)
+        expect(exporter, times=1).export(...)
+
+        with Tracer(sample_rate=1.0, exporter=exporter).span('sampled'):
+            pass
+        with Tracer(sample_rate=0.0, exporter=exporter).span('unsampled'):
+            pass
+
+    async def test__exception__should_mark_span_as_error(self):
+        tracer = Tracer(sample_rate=1.0)
+
+        with pytest.raises(ValueError):
+            with tracer.span('failing') as span:
+                raise ValueError('boom')
+
+        assert span.status == Span.STATUS_ERROR
+        assert span.get_otlp_span()['status'] == {'code': 2, 'message': 'ValueError: boom'}
+
+    async def test__spawned_tasks__should_inherit_current_span(self):
+        tracer = Tracer()
+
+        @tracer.traced('task')
+        async def task() -> Span:
+            return tracer.get_current_span()
+
+        with tracer.span('request') as request_span:
+            task_span = await asyncio.get_event_loop().create_task(task())
+
+        assert task_span.trace_id == request_span.trace_id
+        assert task_span.parent_span_id == request_span.span_id
+
+    async def test__activate__should_restore_span_for_work_queued_in_other_context(self):
+        tracer = Tracer()
+        with tracer.span('request') as request_span:
+            pass
+
+        with tracer.activate(request_span):
+            with tracer.span('worker') as worker_span:
+                pass
+
+        assert worker_span.parent_span_id == request_span.span_id
+        assert tracer.get_current_span() is None
+
+    async def test__otlp_span__should_contain_typed_attributes(self):
+        span = Span('name', 'a' * 32, 'b' * 16, True, {'job': 'job', 'number': 5, 'ratio': 0.5, 'flag': True})
+        span.end()
+
+        otlp_span = span.get_otlp_span()
+
+        assert otlp_span['traceId'] == 'a' * 32
+        assert otlp_span['parentSpanId'] == 'b' * 16
+        assert otlp_span['attributes'] == [
+            {'key': 'job', 'value': {'stringValue': 'job'}},
+            {'key': 'number', 'value': {'intValue': '5'}},
+            {'key': 'ratio', 'value': {'doubleValue': 0.5}},
+            {'key': 'flag', 'value': {'boolValue': True}}
+        ]
+        assert int(otlp_span['endTimeUnixNano']) >= int(otlp_span['startTimeUnixNano'])
+
+    async def test__traced_url__should_carry_trace_id__only_within_trace(self):
+        tracer = Tracer()
+        assert tracer.get_traced_url('http://jenkins/job/1') == 'http://jenkins/job/1'
+        with tracer.span('request') as span:
+            assert tracer.get_traced_url('http://jenkins/job/1') == f'http://jenkins/job/1#trace-{span.trace_id}'
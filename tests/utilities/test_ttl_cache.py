@@ -0,0 +1,44 @@
+import time
+
+import pytest
+from mockito import when
+
+from app.utilities.ttl_cache import TtlCache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestTtlCache:
+    async def test__get__returns_value_until_ttl_passes(self):
+        when(time).monotonic().thenReturn(100).thenReturn(105).thenReturn(111)
+        cache = TtlCache(ttl=10)
+
+        cache.set('key', 'value')
+
+        assert cache.get('key') == 'value'
+        assert cache.get('key') is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    async def test__when_ttl_is_not_positive__nothing_is_cached(self):
+        cache = TtlCache(ttl=0)
+        cache.set('key', 'value')
+        assert len(cache) == 0
+        assert cache.get('key') is None
+
+    async def test__when_max_entries_is_reached__oldest_entry_is_evicted(self):
+        cache = TtlCache(ttl=10, max_entries=2)
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.set('third', 3)
+
+        assert cache.get('first') is None
+        assert cache.get('second') == 2
+        assert cache.get('third') == 3
+
+    async def test__clear__removes_all_entries(self):
+        cache = TtlCache(ttl=10)
+        cache.set('key', 'value')
+        cache.clear()
+        assert cache.get('key') is None
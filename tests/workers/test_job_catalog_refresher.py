@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from mockito import mock, expect, when
+
+from app.clients.jenkins_client import JenkinsClient, JenkinsInstanceConfig
+from app.clients.jenkinses_clients import JenkinsesClients
+from app.config.triggear_config import TriggearConfig
+from app.workers.job_catalog_refresher import JobCatalogRefresher
+from tests.async_mockito import async_value
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.usefixtures('unstub')
+class TestJobCatalogRefresher:
+    async def test__refresh_catalogs__refreshes_all_configured_jenkinses__even_if_one_fails(self):
+        config: TriggearConfig = mock({'job_catalog_folder_depth': 3}, spec=TriggearConfig, strict=True)
+        jenkinses_clients: JenkinsesClients = mock(spec=JenkinsesClients, strict=True)
+        failing_jenkins: JenkinsClient = mock({'config': JenkinsInstanceConfig('url1', 'u', 't')}, spec=JenkinsClient, strict=True)
+        working_jenkins: JenkinsClient = mock({'config': JenkinsInstanceConfig('url2', 'u', 't')}, spec=JenkinsClient, strict=True)
+
+        expect(jenkinses_clients).get_configured_jenkinses().thenReturn([failing_jenkins, working_jenkins])
+        expect(failing_jenkins).refresh_job_catalog(3).thenRaise(TimeoutError())
+        expect(working_jenkins).refresh_job_catalog(3).thenReturn(async_value(None))
+
+        await JobCatalogRefresher(config, jenkinses_clients).refresh_catalogs()
+
+    async def test__run__refreshes_catalogs__every_interval(self):
+        config: TriggearConfig = mock({'job_catalog_refresh_interval': 60}, spec=TriggearConfig, strict=True)
+        refresher = JobCatalogRefresher(config, mock(spec=JenkinsesClients, strict=True))
+
+        expect(refresher, times=2).refresh_catalogs().thenAnswer(lambda: async_value(None))
+        when(asyncio).sleep(60).thenAnswer(lambda interval: async_value(None)).thenRaise(asyncio.CancelledError())
+
+        with pytest.raises(asyncio.CancelledError):
+            await refresher.run()